@@ -1,12 +1,85 @@
 import os
+import re
 import json
-import boto3
 import math
-from typing import List, Dict, Any, Optional
+import time
+import threading
+from typing import List, Dict, Any, Iterator, NamedTuple, Optional, Set, Tuple
 from datetime import datetime, timedelta
 from decimal import Decimal
-from openai import OpenAI
+from core.services.container import get_dynamodb, get_openai_client
 from core.utils.text_processing import normalize_text
+from core.utils.logger import get_logger, LazyJson, payload
+from core.utils.tracing import traced, record_usage
+
+logger = get_logger(__name__)
+
+# Fila de metadatos de la tabla de embeddings con la versión del índice.
+# Cada actualización de embeddings la incrementa para que los recomendadores
+# con el índice en memoria lo recarguen.
+# También guarda el modelo activo (activeModel) y el modelo en migración
+# (shadowModel) como etiquetas "nombre:dimensión".
+INDEX_META_KEY = {"stockId": "__index_version__", "lastUpdate": "meta"}
+
+# Modelo con el que se generaron las filas sin etiqueta de modelo
+LEGACY_EMBEDDING_MODEL = "text-embedding-ada-002:1536"
+
+class EmbeddingUnavailable(Exception):
+    """
+    No se pudo obtener el embedding de un texto (OpenAI falló después de los
+    reintentos). Las búsquedas lo propagan para que la herramienta reporte el
+    error en lugar de responder que no hay autos.
+    """
+
+class EmbeddingModel(NamedTuple):
+    """Modelo de embeddings y dimensión de sus vectores."""
+    name: str
+    dimensions: int
+
+    @classmethod
+    def parse(cls, tag: str) -> "EmbeddingModel":
+        """
+        Crea el modelo a partir de su etiqueta "nombre:dimensión"
+        (ej: text-embedding-3-small:512).
+        """
+        name, _, dimensions = tag.partition(":")
+        return cls(name, int(dimensions or 1536))
+
+    @property
+    def tag(self) -> str:
+        return f"{self.name}:{self.dimensions}"
+
+    def attribute(self, text_type: str) -> str:
+        """
+        Atributo de la fila con el embedding de un tipo de texto. Los del
+        modelo original conservan el nombre sin sufijo ({tipo}_embedding).
+        """
+        if self.tag == LEGACY_EMBEDDING_MODEL:
+            return f"{text_type}_embedding"
+        return f"{text_type}_embedding__{re.sub(r'[^0-9A-Za-z]+', '_', self.name)}_{self.dimensions}"
+
+    def request_params(self) -> Dict[str, Any]:
+        """Parámetros de embeddings.create (ada-002 no admite dimensions)."""
+        if self.name == "text-embedding-ada-002":
+            return {"model": self.name}
+        return {"model": self.name, "dimensions": self.dimensions}
+
+def embedding_models_of(row: Dict[str, Any]) -> Set[str]:
+    """
+    Obtiene las etiquetas de los modelos con embeddings en una fila (las
+    filas anteriores al versionado no tienen embeddingModels y son del
+    modelo original).
+    """
+    return set(row.get("embeddingModels") or [LEGACY_EMBEDDING_MODEL])
+
+def _scan_items(table: Any, **params: Any) -> Iterator[Dict[str, Any]]:
+    """Recorre todas las páginas de un scan."""
+    while True:
+        response = table.scan(**params)
+        yield from response.get("Items", [])
+        if "LastEvaluatedKey" not in response:
+            return
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
 
 def _convert_decimal_to_float(obj: Any) -> Any:
     """
@@ -29,26 +102,35 @@ def _convert_decimal_to_float(obj: Any) -> Any:
 class CarRecommender:
     """Servicio para recomendar autos basado en preferencias del usuario."""
 
-    def __init__(self):
-        """Inicializa el servicio con DynamoDB y OpenAI."""
+    def __init__(self, dynamodb: Any = None, client: Any = None):
+        """
+        Inicializa el servicio con DynamoDB y OpenAI.
+        
+        Args:
+            dynamodb: Recurso de DynamoDB (por defecto el compartido)
+            client: Cliente de OpenAI (por defecto el compartido)
+        """
         self.catalog_table = os.environ["CATALOG_TABLE"]
         self.embeddings_table = os.environ["EMBEDDINGS_TABLE"]
         
-        # Configurar DynamoDB según el entorno
-        if os.environ.get('STAGE') == 'dev':
-            self.dynamodb = boto3.resource(
-                'dynamodb',
-                endpoint_url='http://localhost:8000',
-                region_name='us-east-1',
-                aws_access_key_id='dummy',
-                aws_secret_access_key='dummy'
-            )
-        else:
-            self.dynamodb = boto3.resource('dynamodb')
-            
+        # Recursos compartidos del contenedor (endpoint local en desarrollo)
+        self.dynamodb = dynamodb or get_dynamodb()
         self.catalog_db = self.dynamodb.Table(self.catalog_table)
         self.embeddings_db = self.dynamodb.Table(self.embeddings_table)
-        self.client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+        self.client = client or get_openai_client()
+        
+        # Modelo activo si la fila de metadatos aún no indica uno
+        self.default_model = EmbeddingModel.parse(os.environ.get("EMBEDDING_MODEL", LEGACY_EMBEDDING_MODEL))
+        
+        # Índice de embeddings en memoria por (tipo, modelo): (textos, stock_ids, embeddings).
+        # Se recarga cuando cambia la versión del índice (se consulta cada
+        # INDEX_VERSION_CHECK_SECONDS como máximo).
+        self.index_check_seconds = float(os.environ.get("INDEX_VERSION_CHECK_SECONDS", "30"))
+        self._index: Dict[Tuple[str, str], Tuple[List[str], List[str], List[List[float]]]] = {}
+        self._index_version: Optional[int] = None
+        self._active_model: Optional[EmbeddingModel] = None
+        self._index_checked_at = 0.0
+        self._index_lock = threading.Lock()
 
     def _normalize_car_text(self, car: Dict[str, Any], text_type: str = "full") -> str:
         """
@@ -123,7 +205,7 @@ class CarRecommender:
         Este método debe ejecutarse una sola vez después de crear el GSI.
         """
         try:
-            print("[DEBUG] Actualizando embeddings con tipo...")
+            logger.debug("Actualizando embeddings con tipo...")
             
             # Obtener todos los embeddings
             response = self.embeddings_db.scan()
@@ -153,17 +235,15 @@ class CarRecommender:
                             UpdateExpression=f"SET {update_expr}",
                             ExpressionAttributeValues=expression_values
                         )
-                        print(f"[DEBUG] Actualizado {stock_id} con tipo {expression_values}")
+                        logger.debug("Actualizado %s con tipo %s", stock_id, expression_values)
                     except Exception as e:
-                        print(f"[ERROR] Error actualizando {stock_id}: {str(e)}")
+                        logger.error("Error actualizando %s: %s", stock_id, e)
                         continue
             
-            print("[DEBUG] Actualización de tipos completada")
+            logger.debug("Actualización de tipos completada")
             
         except Exception as e:
-            print(f"[ERROR] Error en actualización de tipos: {str(e)}")
-            import traceback
-            print(f"[ERROR] Error traceback: {traceback.format_exc()}")
+            logger.exception("Error en actualización de tipos: %s", e)
 
     def _ensure_embeddings(self) -> None:
         """
@@ -184,7 +264,7 @@ class CarRecommender:
                 )
             except Exception as e:
                 if 'ResourceNotFoundException' in str(e):
-                    print("[DEBUG] GSI no encontrado, actualizando tipos de embeddings...")
+                    logger.debug("GSI no encontrado, actualizando tipos de embeddings...")
                     self._update_embeddings_with_type()
                 else:
                     raise e
@@ -212,22 +292,28 @@ class CarRecommender:
                 model_text = self._normalize_car_text(car, "model")
                 full_text = self._normalize_car_text(car, "full")
                 
-                # Verificar si necesita actualización
+                # Verificar si necesita actualización (los textos se guardan ya normalizados)
                 needs_update = (
                     stock_id not in existing_embeddings or
                     existing_embeddings[stock_id]["lastUpdate"] < update_threshold or
-                    normalize_text(existing_embeddings[stock_id].get("make_text", "")) != make_text or
-                    normalize_text(existing_embeddings[stock_id].get("model_text", "")) != model_text or
-                    normalize_text(existing_embeddings[stock_id].get("full_text", "")) != full_text
+                    existing_embeddings[stock_id].get("make_text", "") != make_text or
+                    existing_embeddings[stock_id].get("model_text", "") != model_text or
+                    existing_embeddings[stock_id].get("full_text", "") != full_text
                 )
                 
                 if needs_update:
-                    print(f"[DEBUG] Actualizando embeddings para {stock_id}...")
+                    logger.debug("Actualizando embeddings para %s...", stock_id)
                     
                     # Obtener embeddings para cada tipo
-                    make_embedding = self._get_embedding(make_text)
-                    model_embedding = self._get_embedding(model_text)
-                    full_embedding = self._get_embedding(full_text)
+                    # Escribe los atributos sin sufijo, que son los del modelo original
+                    legacy_model = EmbeddingModel.parse(LEGACY_EMBEDDING_MODEL)
+                    try:
+                        make_embedding = self._get_embedding(make_text, legacy_model)
+                        model_embedding = self._get_embedding(model_text, legacy_model)
+                        full_embedding = self._get_embedding(full_text, legacy_model)
+                    except EmbeddingUnavailable:
+                        # Se reintenta en la siguiente verificación
+                        continue
                     
                     if make_embedding and model_embedding and full_embedding:
                         # Guardar en DynamoDB
@@ -244,53 +330,94 @@ class CarRecommender:
                         
                         try:
                             self.embeddings_db.put_item(Item=item)
-                            print(f"[DEBUG] Embeddings actualizados para {stock_id}")
+                            logger.debug("Embeddings actualizados para %s", stock_id)
                         except Exception as db_error:
-                            print(f"[ERROR] Error al guardar en DynamoDB: {str(db_error)}")
-                            print(f"[ERROR] Item que causó el error: {json.dumps({k: str(v) if 'embedding' in k else v for k, v in item.items()}, ensure_ascii=False)}")
+                            logger.error("Error al guardar en DynamoDB: %s", db_error)
+                            logger.error("Item que causó el error: %s", LazyJson({k: str(v) if 'embedding' in k else v for k, v in item.items()}))
             
         except Exception as e:
-            print(f"[ERROR] Error al verificar embeddings: {str(e)}")
-            import traceback
-            print(f"[ERROR] Error traceback: {traceback.format_exc()}")
+            logger.exception("Error al verificar embeddings: %s", e)
 
-    def _get_embedding(self, text: str) -> List[float]:
+    @traced("car_recommender.embedding")
+    def _get_embedding(self, text: str, model: Optional[EmbeddingModel] = None) -> List[float]:
         """
         Obtiene el embedding de un texto usando OpenAI.
         
         Args:
             text: Texto a convertir en embedding
+            model: Modelo de embeddings (por defecto el activo)
             
         Returns:
             Lista de floats representando el embedding
+            
+        Raises:
+            EmbeddingUnavailable: Si OpenAI falla después de los reintentos
         """
+        # Normalizar el texto antes de obtener el embedding
+        normalized_text = normalize_text(text)
+        logger.debug("Texto normalizado para embedding: %s", normalized_text)
+        
         try:
-            # Normalizar el texto antes de obtener el embedding
-            normalized_text = normalize_text(text)
-            print(f"[DEBUG] Texto normalizado para embedding: {normalized_text}")
-            
             response = self.client.embeddings.create(
                 input=normalized_text,
-                model="text-embedding-ada-002"
+                **(model or self.active_model()).request_params()
             )
-            return response.data[0].embedding
         except Exception as e:
-            print(f"Error al obtener embedding: {str(e)}")
-            return []
+            logger.error("Error al obtener embedding: %s", e)
+            raise EmbeddingUnavailable(f"No se pudo obtener el embedding: {e}") from e
+        record_usage(response.usage)
+        return response.data[0].embedding
 
+    @traced("car_recommender.embeddings_batch")
+    def get_embeddings_batch(
+        self,
+        texts: List[str],
+        batch_size: int = 100,
+        model: Optional[EmbeddingModel] = None
+    ) -> List[List[float]]:
+        """
+        Obtiene los embeddings de varios textos ya normalizados, en lotes de
+        batch_size textos por llamada a OpenAI.
+        
+        Args:
+            texts: Textos normalizados
+            batch_size: Textos por llamada
+            model: Modelo de embeddings (por defecto el activo)
+            
+        Returns:
+            Embeddings en el mismo orden que texts
+            
+        Raises:
+            Exception: Si falla alguna llamada (el llamador decide si reintentar)
+        """
+        params = (model or self.active_model()).request_params()
+        embeddings: List[List[float]] = []
+        for start in range(0, len(texts), batch_size):
+            response = self.client.embeddings.create(
+                input=texts[start:start + batch_size],
+                **params
+            )
+            record_usage(response.usage)
+            embeddings.extend(data.embedding for data in sorted(response.data, key=lambda data: data.index))
+        return embeddings
+
+    @traced("car_recommender.catalog_embeddings")
     def _get_catalog_embeddings(
         self, 
         embedding_type: str = "full",
         last_evaluated_key: Optional[Dict] = None,
-        batch_size: int = 100
+        batch_size: int = 100,
+        model: Optional[EmbeddingModel] = None
     ) -> tuple[List[str], List[str], List[List[float]], Optional[Dict]]:
         """
         Obtiene los embeddings del catálogo desde DynamoDB usando scan con paginación.
+        Solo se incluyen los vectores del modelo indicado con su dimensión.
         
         Args:
             embedding_type: Tipo de embedding a obtener ("make", "model", o "full")
             last_evaluated_key: Clave para paginación (opcional)
             batch_size: Tamaño del lote a obtener
+            model: Modelo de embeddings (por defecto el original)
             
         Returns:
             Tupla con (textos, stock_ids, embeddings, next_key)
@@ -316,9 +443,12 @@ class CarRecommender:
             for item in items:
                 # Usar el texto normalizado para búsquedas
                 text_key = f"{embedding_type}_text"
-                embedding_key = f"{embedding_type}_embedding"
+                embedding_key = (model or EmbeddingModel.parse(LEGACY_EMBEDDING_MODEL)).attribute(embedding_type)
                 
                 if text_key in item and embedding_key in item:
+                    if model and len(item[embedding_key]) != model.dimensions:
+                        logger.warning("Embedding de %s con dimensión %s, se esperaba %s", item["stockId"], len(item[embedding_key]), model.dimensions)
+                        continue
                     texts.append(item[text_key])
                     stock_ids.append(item["stockId"])
                     # Convertir embedding de Decimal a float
@@ -331,54 +461,205 @@ class CarRecommender:
             return texts, stock_ids, embeddings, next_key
             
         except Exception as e:
-            print(f"Error al obtener embeddings del catálogo: {str(e)}")
-            import traceback
-            print(f"[ERROR] Error traceback: {traceback.format_exc()}")
+            logger.exception("Error al obtener embeddings del catálogo: %s", e)
             return [], [], [], None
 
+    def get_index_state(self) -> Dict[str, Any]:
+        """
+        Obtiene la versión del índice de embeddings y sus modelos.
+        
+        Returns:
+            Diccionario con version (0 si nunca se ha actualizado), active
+            (EmbeddingModel con el que se busca) y shadow (EmbeddingModel en
+            migración o None)
+        """
+        item = self.embeddings_db.get_item(Key=INDEX_META_KEY, ConsistentRead=True).get("Item", {})
+        return {
+            "version": int(item.get("indexVersion", 0)),
+            "active": EmbeddingModel.parse(item["activeModel"]) if item.get("activeModel") else self.default_model,
+            "shadow": EmbeddingModel.parse(item["shadowModel"]) if item.get("shadowModel") else None
+        }
+
+    def get_index_version(self) -> int:
+        """
+        Obtiene la versión actual del índice de embeddings.
+        
+        Returns:
+            Versión del índice (0 si nunca se ha actualizado)
+        """
+        return self.get_index_state()["version"]
+
+    def set_shadow_model(self, model: Optional[EmbeddingModel]) -> None:
+        """
+        Inicia la migración a un nuevo modelo: las actualizaciones de
+        embeddings generan también los vectores del modelo sombra hasta que
+        cubren todo el catálogo y se promueve. Con None cancela la migración.
+        
+        Args:
+            model: Modelo nuevo o None
+            
+        Raises:
+            ValueError: Si el modelo ya es el activo
+        """
+        now = datetime.utcnow().isoformat()
+        if model is None:
+            self.embeddings_db.update_item(
+                Key=INDEX_META_KEY,
+                UpdateExpression="REMOVE shadowModel SET updatedAt = :now",
+                ExpressionAttributeValues={":now": now}
+            )
+            logger.info("Migración de modelo de embeddings cancelada")
+            return
+        
+        active = self.get_index_state()["active"]
+        if model == active:
+            raise ValueError(f"{model.tag} ya es el modelo activo")
+        self.embeddings_db.update_item(
+            Key=INDEX_META_KEY,
+            UpdateExpression="SET shadowModel = :shadow, activeModel = if_not_exists(activeModel, :active), updatedAt = :now",
+            ExpressionAttributeValues={":shadow": model.tag, ":active": active.tag, ":now": now}
+        )
+        logger.info("Migración de embeddings iniciada: %s -> %s", active.tag, model.tag)
+
+    def shadow_coverage(self, model: EmbeddingModel) -> Tuple[int, int]:
+        """
+        Cuenta los autos del catálogo que ya tienen embeddings del modelo.
+        
+        Args:
+            model: Modelo a revisar
+            
+        Returns:
+            Tupla (autos con embeddings del modelo, autos en el catálogo)
+        """
+        catalog_ids = {item["stockId"] for item in _scan_items(self.catalog_db, ProjectionExpression="stockId")}
+        covered = {
+            item["stockId"]
+            for item in _scan_items(self.embeddings_db, ProjectionExpression="stockId, embeddingModels")
+            if model.tag in embedding_models_of(item)
+        }
+        return len(catalog_ids & covered), len(catalog_ids)
+
+    def promote_shadow_model(self, model: EmbeddingModel) -> int:
+        """
+        Convierte el modelo sombra en el activo e incrementa la versión del
+        índice en una sola escritura condicional, así los recomendadores
+        cambian de índice (y de modelo para las consultas) al mismo tiempo.
+        
+        Args:
+            model: Modelo sombra a promover
+            
+        Returns:
+            Nueva versión del índice
+        """
+        response = self.embeddings_db.update_item(
+            Key=INDEX_META_KEY,
+            UpdateExpression="SET activeModel = :shadow, updatedAt = :now REMOVE shadowModel ADD indexVersion :one",
+            ConditionExpression="shadowModel = :shadow",
+            ExpressionAttributeValues={":shadow": model.tag, ":one": 1, ":now": datetime.utcnow().isoformat()},
+            ReturnValues="UPDATED_NEW"
+        )
+        version = int(response["Attributes"]["indexVersion"])
+        logger.info("Modelo de embeddings %s promovido (versión del índice %s)", model.tag, version)
+        return version
+
+    def bump_index_version(self) -> int:
+        """
+        Incrementa la versión del índice después de actualizar embeddings.
+        
+        Returns:
+            Nueva versión del índice
+        """
+        response = self.embeddings_db.update_item(
+            Key=INDEX_META_KEY,
+            UpdateExpression="ADD indexVersion :one SET updatedAt = :now",
+            ExpressionAttributeValues={":one": 1, ":now": datetime.utcnow().isoformat()},
+            ReturnValues="UPDATED_NEW"
+        )
+        version = int(response["Attributes"]["indexVersion"])
+        logger.info("Versión del índice de embeddings: %s", version)
+        return version
+
+    def _check_index_version(self) -> None:
+        """Descarta el índice en memoria si cambió su versión en DynamoDB."""
+        now = time.monotonic()
+        if self._index and now - self._index_checked_at < self.index_check_seconds:
+            return
+        try:
+            state = self.get_index_state()
+        except Exception as e:
+            # Sin la versión se sigue usando el índice cargado
+            logger.warning("No se pudo consultar la versión del índice: %s", e)
+            return
+        with self._index_lock:
+            self._index_checked_at = now
+            if state["version"] != self._index_version or state["active"] != self._active_model:
+                if self._index:
+                    logger.info("El índice cambió (versión %s -> %s), se recargará", self._index_version, state["version"])
+                self._index = {}
+                self._index_version = state["version"]
+                self._active_model = state["active"]
+
+    def active_model(self) -> EmbeddingModel:
+        """
+        Obtiene el modelo activo (con el que se generan los embeddings de
+        las consultas y se busca en el índice).
+        
+        Returns:
+            Modelo activo
+        """
+        self._check_index_version()
+        return self._active_model or self.default_model
+
     def get_all_catalog_embeddings(
         self,
         embedding_type: str = "full",
-        max_batches: int = 10
-    ) -> tuple[List[str], List[str], List[List[float]]]:
+        model: Optional[EmbeddingModel] = None
+    ) -> Tuple[List[str], List[str], List[List[float]]]:
         """
-        Obtiene todos los embeddings del catálogo usando paginación.
+        Obtiene todos los embeddings del catálogo de un tipo. Se leen de
+        DynamoDB (scan paginado) solo la primera vez o cuando cambia la
+        versión del índice; el resto de las veces se usan los de memoria.
         
         Args:
             embedding_type: Tipo de embedding a obtener ("make", "model", o "full")
-            max_batches: Número máximo de lotes a procesar
+            model: Modelo de embeddings (por defecto el activo)
             
         Returns:
             Tupla con (textos, stock_ids, embeddings)
         """
+        model = model or self.active_model()
+        key = (embedding_type, model.tag)
+        cached = self._index.get(key)
+        if cached is not None:
+            return cached
+        
         all_texts = []
         all_stock_ids = []
         all_embeddings = []
         last_key = None
         batch_count = 0
         
-        while batch_count < max_batches:
+        while True:
             texts, stock_ids, embeddings, next_key = self._get_catalog_embeddings(
                 embedding_type,
                 last_key,
-                batch_size=100
+                batch_size=100,
+                model=model
             )
-            
-            if not embeddings:
-                break
-                
+            batch_count += 1
             all_texts.extend(texts)
             all_stock_ids.extend(stock_ids)
             all_embeddings.extend(embeddings)
-            
             if not next_key:
                 break
-                
             last_key = next_key
-            batch_count += 1
             
-        print(f"[DEBUG] Se obtuvieron {len(all_embeddings)} embeddings en {batch_count} lotes")
-        return all_texts, all_stock_ids, all_embeddings
+        logger.debug("Se obtuvieron %s embeddings de %s en %s lotes", len(all_embeddings), model.tag, batch_count)
+        cached = (all_texts, all_stock_ids, all_embeddings)
+        if all_embeddings:
+            with self._index_lock:
+                self._index[key] = cached
+        return cached
 
     def _calculate_similarity(
         self, 
@@ -420,6 +701,7 @@ class CarRecommender:
 
         return similarities
 
+    @traced("car_recommender.get_recommendations")
     def get_recommendations(
         self, 
         query: str, 
@@ -440,31 +722,31 @@ class CarRecommender:
         try:
             # Normalizar la consulta
             normalized_query = normalize_text(query)
-            print(f"[DEBUG] Buscando recomendaciones para: {normalized_query}")
+            logger.debug("Buscando recomendaciones para: %s", normalized_query)
+            
+            # La consulta y el índice usan el mismo modelo aunque cambie a la mitad
+            embedding_model = self.active_model()
             
             # Obtener embedding de la consulta
-            print("[DEBUG] Obteniendo embedding de la consulta...")
-            query_embedding = self._get_embedding(normalized_query)
-            if not query_embedding:
-                print("[ERROR] No se pudo obtener el embedding de la consulta")
-                return []
+            logger.debug("Obteniendo embedding de la consulta...")
+            query_embedding = self._get_embedding(normalized_query, embedding_model)
 
             # Obtener todos los embeddings del catálogo
-            print("[DEBUG] Obteniendo embeddings del catálogo...")
-            _, stock_ids, catalog_embeddings = self.get_all_catalog_embeddings()
+            logger.debug("Obteniendo embeddings del catálogo...")
+            _, stock_ids, catalog_embeddings = self.get_all_catalog_embeddings(model=embedding_model)
             if not catalog_embeddings:
-                print("[ERROR] No se encontraron embeddings en el catálogo")
+                logger.error("No se encontraron embeddings en el catálogo")
                 return []
 
             # Calcular similitudes
-            print("[DEBUG] Calculando similitudes...")
+            logger.debug("Calculando similitudes...")
             similarities = self._calculate_similarity(query_embedding, catalog_embeddings)
             if not similarities:
-                print("[ERROR] No se pudieron calcular similitudes")
+                logger.error("No se pudieron calcular similitudes")
                 return []
 
             # Ordenar por similitud
-            print("[DEBUG] Ordenando resultados por similitud...")
+            logger.debug("Ordenando resultados por similitud...")
             stock_scores = list(zip(stock_ids, similarities))
             stock_scores.sort(key=lambda x: x[1], reverse=True)
             
@@ -475,11 +757,11 @@ class CarRecommender:
             ][:max_recommendations]
             
             if not top_stocks:
-                print("[DEBUG] No se encontraron autos con similitud suficiente")
+                logger.debug("No se encontraron autos con similitud suficiente")
                 return []
             
             # Obtener información actualizada del catálogo
-            print("[DEBUG] Obteniendo información actualizada del catálogo...")
+            logger.debug("Obteniendo información actualizada del catálogo...")
             recommendations = []
             for stock_id in top_stocks:
                 try:
@@ -492,45 +774,43 @@ class CarRecommender:
                         )
                         recommendations.append(car)
                 except Exception as e:
-                    print(f"[ERROR] Error al obtener auto {stock_id}: {str(e)}")
+                    logger.error("Error al obtener auto %s: %s", stock_id, e)
                     continue
             
             # Convertir Decimal a float antes de devolver
             recommendations = _convert_decimal_to_float(recommendations)
-            print(f"[DEBUG] Se encontraron {len(recommendations)} recomendaciones")
+            logger.debug("Se encontraron %s recomendaciones", len(recommendations))
             return recommendations
             
+        except EmbeddingUnavailable:
+            raise
         except Exception as e:
-            print(f"[ERROR] Error al obtener recomendaciones: {str(e)}")
-            import traceback
-            print(f"[ERROR] Error traceback: {traceback.format_exc()}")
+            logger.exception("Error al obtener recomendaciones: %s", e)
             return []
 
+    @traced("car_recommender.search_by_make_model")
     def search_by_make_model(
         self,
         make: str = None,
         model: str = None,
         limit: int = 10,
-        min_similarity: float = 0.7,
-        max_batches: int = 3
+        min_similarity: float = 0.7
     ) -> List[Dict[str, Any]]:
         """
         Busca autos por marca y/o modelo usando embeddings para búsqueda semántica.
-        Implementa paginación para manejar grandes conjuntos de datos.
         
         Args:
             make: Marca del auto (opcional)
             model: Modelo del auto (opcional)
             limit: Límite de resultados
             min_similarity: Umbral mínimo de similitud
-            max_batches: Número máximo de lotes a procesar
             
         Returns:
             Lista de autos encontrados
         """
         try:
             if not make and not model:
-                print("[ERROR] Se requiere al menos marca o modelo para buscar")
+                logger.error("Se requiere al menos marca o modelo para buscar")
                 return []
             
             # Determinar el tipo de búsqueda y texto
@@ -541,61 +821,35 @@ class CarRecommender:
                 search_type = "model"
                 search_text = f"{make or ''} {model or ''}".strip()
             
-            print(f"[DEBUG] Buscando por tipo: {search_type}, texto: {search_text}")
+            logger.debug("Buscando por tipo: %s, texto: %s", search_type, search_text)
             
             # Normalizar la consulta
             normalized_query = normalize_text(search_text)
-            print(f"[DEBUG] Texto normalizado: {normalized_query}")
+            logger.debug("Texto normalizado: %s", normalized_query)
+            
+            # La consulta y el índice usan el mismo modelo aunque cambie a la mitad
+            embedding_model = self.active_model()
             
             # Obtener embedding de la consulta
-            print("[DEBUG] Obteniendo embedding de la consulta...")
-            query_embedding = self._get_embedding(normalized_query)
-            if not query_embedding:
-                print("[ERROR] No se pudo obtener el embedding de la consulta")
-                return []
+            logger.debug("Obteniendo embedding de la consulta...")
+            query_embedding = self._get_embedding(normalized_query, embedding_model)
 
-            # Obtener embeddings del catálogo con paginación
-            print(f"[DEBUG] Obteniendo embeddings del catálogo (tipo: {search_type})...")
-            all_texts = []
-            all_stock_ids = []
-            all_embeddings = []
-            last_key = None
-            batch_count = 0
-            
-            while batch_count < max_batches:
-                texts, stock_ids, embeddings, next_key = self._get_catalog_embeddings(
-                    search_type, 
-                    last_key,
-                    batch_size=100
-                )
-                
-                if not embeddings:
-                    break
-                    
-                all_texts.extend(texts)
-                all_stock_ids.extend(stock_ids)
-                all_embeddings.extend(embeddings)
-                
-                if not next_key:
-                    break
-                    
-                last_key = next_key
-                batch_count += 1
-                
+            # Obtener embeddings del catálogo (índice en memoria)
+            logger.debug("Obteniendo embeddings del catálogo (tipo: %s)...", search_type)
+            _, all_stock_ids, all_embeddings = self.get_all_catalog_embeddings(search_type, embedding_model)
             if not all_embeddings:
-                print("[ERROR] No se encontraron embeddings en el catálogo")
+                logger.error("No se encontraron embeddings en el catálogo")
                 return []
-            print(f"[DEBUG] Se encontraron {len(all_embeddings)} embeddings en {batch_count} lotes")
 
             # Calcular similitudes
-            print("[DEBUG] Calculando similitudes...")
+            logger.debug("Calculando similitudes...")
             similarities = self._calculate_similarity(query_embedding, all_embeddings)
             if not similarities:
-                print("[ERROR] No se pudieron calcular similitudes")
+                logger.error("No se pudieron calcular similitudes")
                 return []
 
             # Ordenar por similitud
-            print("[DEBUG] Ordenando resultados por similitud...")
+            logger.debug("Ordenando resultados por similitud...")
             stock_scores = list(zip(all_stock_ids, similarities))
             stock_scores.sort(key=lambda x: x[1], reverse=True)
             
@@ -606,11 +860,13 @@ class CarRecommender:
             ][:limit]
             
             if not top_stocks:
-                print("[DEBUG] No se encontraron autos con similitud suficiente")
+                logger.debug("No se encontraron autos con similitud suficiente")
                 return []
             
             # Obtener información actualizada del catálogo
-            print("[DEBUG] Obteniendo información actualizada del catálogo...")
+            logger.debug("Obteniendo información actualizada del catálogo...")
+            normalized_make = normalize_text(make) if make else ""
+            normalized_model = normalize_text(model) if model else ""
             recommendations = []
             for stock_id in top_stocks:
                 try:
@@ -622,26 +878,27 @@ class CarRecommender:
                             score for sid, score in stock_scores if sid == stock_id
                         )
                         # Filtrar por marca/modelo si se especificó
-                        if make and normalize_text(car.get("make", "")) != normalize_text(make):
+                        if make and normalize_text(car.get("make", "")) != normalized_make:
                             continue
-                        if model and normalize_text(car.get("model", "")) != normalize_text(model):
+                        if model and normalize_text(car.get("model", "")) != normalized_model:
                             continue
                         recommendations.append(car)
                 except Exception as e:
-                    print(f"[ERROR] Error al obtener auto {stock_id}: {str(e)}")
+                    logger.error("Error al obtener auto %s: %s", stock_id, e)
                     continue
             
             # Convertir Decimal a float antes de devolver
             recommendations = _convert_decimal_to_float(recommendations)
-            print(f"[DEBUG] Se encontraron {len(recommendations)} autos")
+            logger.debug("Se encontraron %s autos", len(recommendations))
             return recommendations
             
+        except EmbeddingUnavailable:
+            raise
         except Exception as e:
-            print(f"[ERROR] Error al buscar por marca/modelo: {str(e)}")
-            import traceback
-            print(f"[ERROR] Error traceback: {traceback.format_exc()}")
+            logger.exception("Error al buscar por marca/modelo: %s", e)
             return []
 
+    @traced("car_recommender.search_by_price_range")
     def search_by_price_range(
         self,
         min_price: float = None,
@@ -673,14 +930,14 @@ class CarRecommender:
                 min_price_int = int(min_price)
                 filter_expressions.append("price >= :min_price")
                 expression_values[":min_price"] = min_price_int
-                print(f"[DEBUG] Precio mínimo convertido a entero: {min_price_int}")
+                logger.debug("Precio mínimo convertido a entero: %s", min_price_int)
                 
             if max_price is not None:
                 # Convertir a entero (sin decimales)
                 max_price_int = int(max_price)
                 filter_expressions.append("price <= :max_price")
                 expression_values[":max_price"] = max_price_int
-                print(f"[DEBUG] Precio máximo convertido a entero: {max_price_int}")
+                logger.debug("Precio máximo convertido a entero: %s", max_price_int)
             
             # Agregar filtro de año si existe
             if year is not None:
@@ -688,15 +945,15 @@ class CarRecommender:
                 expression_values[":year"] = year
             
             if not filter_expressions:
-                print("[ERROR] Se requiere al menos un criterio de búsqueda (precio o año)")
+                logger.error("Se requiere al menos un criterio de búsqueda (precio o año)")
                 return []
             
             # Construir la expresión de filtro completa
             filter_expression = " AND ".join(filter_expressions)
             
             # Realizar la consulta
-            print(f"[DEBUG] Buscando con filtros: {filter_expression}")
-            print(f"[DEBUG] Valores de expresión: {expression_values}")
+            logger.debug("Buscando con filtros: %s", filter_expression)
+            logger.debug("Valores de expresión: %s", expression_values)
             
             # Ahora hacer la búsqueda real
             response = self.catalog_db.scan(
@@ -707,21 +964,20 @@ class CarRecommender:
             
             items = response.get("Items", [])
             if not items:
-                print("[DEBUG] No se encontraron autos que coincidan con los criterios")
+                logger.debug("No se encontraron autos que coincidan con los criterios")
                 return []
             
             # Convertir Decimal a float antes de devolver
             results = _convert_decimal_to_float(items)
-            print(f"[DEBUG] Se encontraron {len(results)} autos")
-            print(f"[DEBUG] Primeros resultados: {json.dumps(results[:2], indent=2)}")
+            logger.debug("Se encontraron %s autos", len(results))
+            logger.debug("Primeros resultados: %s", payload(results[:2]))
             return results
             
         except Exception as e:
-            print(f"[ERROR] Error al buscar por precio: {str(e)}")
-            import traceback
-            print(f"[ERROR] Error traceback: {traceback.format_exc()}")
+            logger.exception("Error al buscar por precio: %s", e)
             return []
 
+    @traced("car_recommender.get_financing_options")
     def get_financing_options(
         self, 
         car_price: float, 
@@ -773,9 +1029,10 @@ class CarRecommender:
             return options
 
         except Exception as e:
-            print(f"Error al calcular opciones de financiamiento: {str(e)}")
+            logger.error("Error al calcular opciones de financiamiento: %s", e)
             return []
 
+    @traced("car_recommender.get_car_details")
     def get_car_details(self, stock_id: str) -> Optional[Dict[str, Any]]:
         """
         Obtiene todos los detalles disponibles de un auto específico.
@@ -793,7 +1050,7 @@ class CarRecommender:
             )
             
             if "Item" not in response:
-                print(f"[WARN] Auto no encontrado: {stock_id}")
+                logger.debug("[WARN] Auto no encontrado: %s", stock_id)
                 return None
                 
             car = response["Item"]
@@ -801,5 +1058,50 @@ class CarRecommender:
             return _convert_decimal_to_float(car)
             
         except Exception as e:
-            print(f"[ERROR] Error obteniendo detalles del auto {stock_id}: {str(e)}")
-            return None 
\ No newline at end of file
+            logger.error("Error obteniendo detalles del auto %s: %s", stock_id, e)
+            return None 
+
+    @traced("car_recommender.get_cars_details")
+    def get_cars_details(
+        self,
+        stock_ids: List[str],
+        fields: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene los detalles de varios autos con BatchGetItem (lotes de 100
+        llaves), reintentando las llaves no procesadas.
+        
+        Args:
+            stock_ids: IDs de los autos en el catálogo
+            fields: Atributos a obtener (por defecto todos)
+            
+        Returns:
+            Diccionario stockId -> detalles del auto (los que no existen se omiten)
+        """
+        unique_ids = list(dict.fromkeys(str(stock_id) for stock_id in stock_ids if stock_id))
+        cars: Dict[str, Dict[str, Any]] = {}
+        try:
+            for start in range(0, len(unique_ids), 100):
+                request: Dict[str, Any] = {"Keys": [{"stockId": stock_id} for stock_id in unique_ids[start:start + 100]]}
+                if fields:
+                    names = {f"#f{idx}": field for idx, field in enumerate(dict.fromkeys(["stockId", *fields]))}
+                    request["ProjectionExpression"] = ", ".join(names)
+                    request["ExpressionAttributeNames"] = names
+                
+                pending = {self.catalog_table: request}
+                for attempt in range(5):
+                    response = self.dynamodb.batch_get_item(RequestItems=pending)
+                    for car in response.get("Responses", {}).get(self.catalog_table, []):
+                        cars[car["stockId"]] = _convert_decimal_to_float(car)
+                    pending = response.get("UnprocessedKeys") or {}
+                    if not pending:
+                        break
+                    time.sleep(0.05 * 2 ** attempt)
+                if pending:
+                    logger.warning("Llaves sin procesar después de reintentos: %s", len(pending[self.catalog_table]["Keys"]))
+            
+            return cars
+            
+        except Exception as e:
+            logger.error("Error obteniendo detalles de autos: %s", e)
+            return cars
@@ -0,0 +1,190 @@
+import os
+import threading
+from typing import Any, Callable, Dict
+
+# Instancias compartidas por contenedor de Lambda (se crean al primer uso)
+_instances: Dict[str, Any] = {}
+_lock = threading.RLock()
+
+def _get_or_create(name: str, factory: Callable[[], Any]) -> Any:
+    """
+    Obtiene una instancia compartida, creándola la primera vez.
+
+    Args:
+        name: Nombre de la instancia
+        factory: Función que crea la instancia
+
+    Returns:
+        Instancia compartida
+    """
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = factory()
+                _instances[name] = instance
+    return instance
+
+def reset() -> None:
+    """Descarta las instancias compartidas (ej: al cambiar variables de entorno en scripts)."""
+    with _lock:
+        _instances.clear()
+
+def get_dynamodb_endpoint() -> Any:
+    """
+    Obtiene el endpoint de DynamoDB: DYNAMODB_ENDPOINT si está definido,
+    DynamoDB local en desarrollo o None para usar el de AWS.
+
+    Returns:
+        URL del endpoint o None
+    """
+    if os.environ.get("DYNAMODB_ENDPOINT"):
+        return os.environ["DYNAMODB_ENDPOINT"]
+    if os.environ.get("STAGE") == "dev":
+        return "http://localhost:8000"
+    return None
+
+def get_boto3_session() -> Any:
+    """
+    Obtiene la sesión de boto3 compartida.
+
+    Returns:
+        boto3.session.Session
+    """
+    def factory():
+        import boto3
+        if os.environ.get("STAGE") == "dev":
+            return boto3.session.Session(
+                region_name="us-east-1",
+                aws_access_key_id="dummy",
+                aws_secret_access_key="dummy"
+            )
+        return boto3.session.Session()
+    return _get_or_create("boto3_session", factory)
+
+def get_dynamodb() -> Any:
+    """
+    Obtiene el recurso de DynamoDB compartido, con un pool de conexiones
+    dimensionado para las herramientas que se ejecutan en paralelo.
+
+    Returns:
+        Recurso de DynamoDB de boto3
+    """
+    def factory():
+        from botocore.config import Config
+        config = Config(
+            max_pool_connections=int(os.environ.get("DYNAMODB_MAX_POOL_CONNECTIONS", "20")),
+            retries={"max_attempts": 3, "mode": "standard"}
+        )
+        return get_boto3_session().resource(
+            "dynamodb",
+            endpoint_url=get_dynamodb_endpoint(),
+            config=config
+        )
+    return _get_or_create("dynamodb", factory)
+
+def get_openai_client() -> Any:
+    """
+    Obtiene el cliente de OpenAI compartido, con un pool de conexiones HTTP
+    que se reutiliza entre llamadas (keep-alive). Las llamadas pasan por un
+    limitador de RPM/TPM y llamadas simultáneas, con reintentos ante 429 y
+    errores temporales (ver core.utils.rate_limiter).
+
+    Returns:
+        Cliente de OpenAI (RateLimitedOpenAI)
+    """
+    def factory():
+        import httpx
+        from openai import OpenAI
+        from core.utils.rate_limiter import RateLimitedOpenAI
+        http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=int(os.environ.get("OPENAI_MAX_CONNECTIONS", "20")),
+                max_keepalive_connections=int(os.environ.get("OPENAI_MAX_KEEPALIVE", "10"))
+            ),
+            timeout=httpx.Timeout(float(os.environ.get("OPENAI_TIMEOUT_SECONDS", "60")), connect=5.0)
+        )
+        # Los reintentos los hace RateLimitedOpenAI, que también cuenta la espera en el limitador
+        client = OpenAI(api_key=os.environ["OPENAI_API_KEY"], http_client=http_client, max_retries=0)
+        return RateLimitedOpenAI(client)
+    return _get_or_create("openai_client", factory)
+
+def get_twilio_client() -> Any:
+    """
+    Obtiene el cliente de Twilio compartido, que reutiliza su sesión HTTP
+    (keep-alive) entre envíos. TWILIO_API_BASE_URL permite apuntar a un
+    stub local en pruebas (ej: http://127.0.0.1:8090).
+
+    Returns:
+        Cliente de Twilio
+    """
+    def factory():
+        from twilio.rest import Client
+        from twilio.http.http_client import TwilioHttpClient
+        http_client = TwilioHttpClient(
+            pool_connections=True,
+            timeout=float(os.environ.get("TWILIO_TIMEOUT_SECONDS", "10"))
+        )
+        client = Client(
+            os.environ["TWILIO_ACCOUNT_SID"],
+            os.environ["TWILIO_AUTH_TOKEN"],
+            http_client=http_client
+        )
+        if os.environ.get("TWILIO_API_BASE_URL"):
+            client.api.base_url = os.environ["TWILIO_API_BASE_URL"].rstrip("/")
+        return client
+    return _get_or_create("twilio_client", factory)
+
+def get_car_recommender() -> Any:
+    """Obtiene el CarRecommender compartido."""
+    def factory():
+        from core.services.car_recommender import CarRecommender
+        return CarRecommender()
+    return _get_or_create("car_recommender", factory)
+
+def get_prompt_optimizer() -> Any:
+    """Obtiene el PromptOptimizer compartido."""
+    def factory():
+        from core.services.prompt_optimizer import PromptOptimizer
+        return PromptOptimizer()
+    return _get_or_create("prompt_optimizer", factory)
+
+def get_prospect_service() -> Any:
+    """Obtiene el ProspectService compartido."""
+    def factory():
+        from core.services.prospect_service import ProspectService
+        return ProspectService()
+    return _get_or_create("prospect_service", factory)
+
+def get_conversation_service() -> Any:
+    """Obtiene el ConversationService compartido."""
+    def factory():
+        from core.services.conversation import ConversationService
+        return ConversationService()
+    return _get_or_create("conversation_service", factory)
+
+def get_idempotency_service() -> Any:
+    """Obtiene el IdempotencyService compartido."""
+    def factory():
+        from core.services.idempotency import IdempotencyService
+        return IdempotencyService()
+    return _get_or_create("idempotency_service", factory)
+
+def get_message_buffer() -> Any:
+    """Obtiene el MessageBuffer compartido."""
+    def factory():
+        from core.services.message_buffer import MessageBuffer
+        return MessageBuffer()
+    return _get_or_create("message_buffer", factory)
+
+def get_s3_client() -> Any:
+    """
+    Obtiene el cliente de S3 compartido (S3_ENDPOINT permite usar un S3 local).
+
+    Returns:
+        Cliente de S3 de boto3
+    """
+    def factory():
+        return get_boto3_session().client("s3", endpoint_url=os.environ.get("S3_ENDPOINT") or None)
+    return _get_or_create("s3_client", factory)
@@ -1,13 +1,19 @@
 import os
 import json
-import boto3
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from datetime import datetime, timedelta
 from decimal import Decimal
-from core.services.car_recommender import CarRecommender
-from core.services.prompt_optimizer import PromptOptimizer
-from openai import OpenAI
-from core.services.prospect_service import ProspectService
+from core.services.container import (
+    get_dynamodb,
+    get_openai_client,
+    get_car_recommender,
+    get_conversation_service,
+    get_prospect_service
+)
+from core.utils.logger import get_logger, payload
+from core.utils.tracing import traced, record_usage
+
+logger = get_logger(__name__)
 
 def _convert_decimals(obj):
     """
@@ -24,26 +30,23 @@ def _convert_decimals(obj):
 class ConversationService:
     """Servicio para manejar el almacenamiento y recuperación de conversaciones de WhatsApp."""
 
-    def __init__(self):
-        """Inicializa el servicio con la tabla de DynamoDB."""
+    def __init__(self, dynamodb: Any = None, client: Any = None):
+        """
+        Inicializa el servicio con la tabla de DynamoDB.
+        
+        Args:
+            dynamodb: Recurso de DynamoDB (por defecto el compartido)
+            client: Cliente de OpenAI (por defecto el compartido)
+        """
         self.table_name = f"kavak-ai-agent-conversations-{os.environ.get('STAGE', 'dev')}"
         
-        # Configurar DynamoDB según el entorno
-        if os.environ.get('STAGE') == 'dev':
-            self.dynamodb = boto3.resource(
-                'dynamodb',
-                endpoint_url='http://localhost:8000',
-                region_name='us-east-1',
-                aws_access_key_id='dummy',
-                aws_secret_access_key='dummy'
-            )
-        else:
-            self.dynamodb = boto3.resource('dynamodb')
-            
+        # Recursos compartidos del contenedor (endpoint local en desarrollo)
+        self.dynamodb = dynamodb or get_dynamodb()
         self.table = self.dynamodb.Table(self.table_name)
-        self.client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+        self.client = client or get_openai_client()
         self.summary_update_threshold = 5  # Número de mensajes antes de actualizar el resumen
 
+    @traced("conversation.summary")
     def _generate_summary(self, messages: List[Dict[str, str]], whatsapp_number: str) -> str:
         """
         Genera un resumen de la conversación usando GPT.
@@ -95,11 +98,12 @@ class ConversationService:
                 max_tokens=250,  # Aumentado para dar espacio al formato estructurado
                 temperature=0.3
             )
+            record_usage(response.usage)
             
             return response.choices[0].message.content.strip()
             
         except Exception as e:
-            print(f"Error al generar resumen: {str(e)}")
+            logger.error("Error al generar resumen: %s", e)
             return ""
 
     def _should_update_summary(self, conversation_id: str) -> bool:
@@ -136,9 +140,10 @@ class ConversationService:
             )
             
         except Exception as e:
-            print(f"Error al verificar actualización de resumen: {str(e)}")
+            logger.error("Error al verificar actualización de resumen: %s", e)
             return True
 
+    @traced("conversation.get_msat_status")
     def get_msat_status(self, whatsapp_number: str) -> Dict[str, Any]:
         """
         Obtiene el estado del MSAT para un usuario.
@@ -178,13 +183,14 @@ class ConversationService:
             }
             
         except Exception as e:
-            print(f"[ERROR] Error al obtener estado MSAT: {str(e)}")
+            logger.error("Error al obtener estado MSAT: %s", e)
             return {
                 "has_pending_msat": False,
                 "msat_sent_time": "",
                 "expires_at": ""
             }
 
+    @traced("conversation.get_context")
     def get_conversation_context(
         self, 
         whatsapp_number: str,
@@ -298,11 +304,10 @@ INSTRUCCIONES:
             return recent_context
             
         except Exception as e:
-            print(f"[ERROR] Error al obtener contexto de conversación: {str(e)}")
-            import traceback
-            print(f"[ERROR] Error traceback: {traceback.format_exc()}")
+            logger.exception("Error al obtener contexto de conversación: %s", e)
             return []
 
+    @traced("conversation.save_message")
     def save_message(
         self,
         whatsapp_number: str,
@@ -335,21 +340,21 @@ INSTRUCCIONES:
             }
             
             if is_msat:
-                print(f"[DEBUG] Guardando mensaje MSAT para {whatsapp_number}")
+                logger.debug("Guardando mensaje MSAT para %s", whatsapp_number)
                 item["messageType"] = "msat"
                 item["msatStatus"] = "pending"
                 item["msatRating"] = 0
                 item["msatResponseTime"] = ""
                 item["msatSentTime"] = timestamp
                 item["expiresAt"] = (datetime.utcnow() + timedelta(hours=24)).isoformat()
-                print(f"[DEBUG] Item MSAT a guardar: {json.dumps(item, ensure_ascii=False)}")
+                logger.debug("Item MSAT a guardar: %s", payload(item))
             
             # Guardar mensajes
             response = self.table.put_item(
                 Item=item,
                 ReturnValues="ALL_OLD"
             )
-            print(f"[DEBUG] Respuesta de guardado: {json.dumps(response, ensure_ascii=False)}")
+            logger.debug("Respuesta de guardado: %s", payload(response))
             
             # Verificar si se debe actualizar el resumen
             if self._should_update_summary(whatsapp_number):
@@ -391,9 +396,7 @@ INSTRUCCIONES:
             return True
             
         except Exception as e:
-            print(f"[ERROR] Error al guardar mensaje: {str(e)}")
-            import traceback
-            print(f"[ERROR] Error traceback: {traceback.format_exc()}")
+            logger.exception("Error al guardar mensaje: %s", e)
             return False
 
     def get_user_conversations(
@@ -435,10 +438,11 @@ INSTRUCCIONES:
             return conversations
 
         except Exception as e:
-            print(f"Error al obtener conversaciones del usuario: {str(e)}")
+            logger.error("Error al obtener conversaciones del usuario: %s", e)
             return []
 
     
+    @traced("conversation.send_msat")
     def send_msat_message(self, from_number: str) -> Tuple[bool, str]:
         """
         Envía el mensaje de MSAT al usuario y guarda su estado.
@@ -450,7 +454,7 @@ INSTRUCCIONES:
             Tupla con (éxito, mensaje MSAT)
         """
         try:
-            print(f"[DEBUG] Enviando MSAT a {from_number}")
+            logger.debug("Enviando MSAT a %s", from_number)
             
             # Generar mensaje MSAT usando formato de encuesta de WhatsApp
             msat_message = """¡Gracias por usar nuestro asistente! ¿Cómo calificarías tu experiencia?
@@ -465,7 +469,7 @@ Califica tu experiencia del 1 al 5, donde:
 Responde solo con el número de tu calificación (1, 2, 3, 4 o 5)."""
 
             # Guardar el MSAT en la base de datos
-            print("[DEBUG] Guardando MSAT en la base de datos...")
+            logger.debug("Guardando MSAT en la base de datos...")
             success = self.save_message(
                 whatsapp_number=from_number,
                 user_message="",  # No hay mensaje del usuario al enviar MSAT
@@ -474,16 +478,14 @@ Responde solo con el número de tu calificación (1, 2, 3, 4 o 5)."""
             )
             
             if not success:
-                print("[ERROR] No se pudo guardar el MSAT en la base de datos")
+                logger.error("No se pudo guardar el MSAT en la base de datos")
                 return False, ""
                 
-            print("[DEBUG] MSAT guardado exitosamente")
+            logger.debug("MSAT guardado exitosamente")
             return True, msat_message
             
         except Exception as e:
-            print(f"[ERROR] Error al enviar MSAT: {str(e)}")
-            import traceback
-            print(f"[ERROR] Error traceback: {traceback.format_exc()}")
+            logger.exception("Error al enviar MSAT: %s", e)
             return False, ""
 
     def process_msat_response(self, from_number: str, message: str) -> Tuple[bool, int, str]:
@@ -498,28 +500,27 @@ Responde solo con el número de tu calificación (1, 2, 3, 4 o 5)."""
             Tupla con (éxito, calificación, mensaje de error)
         """
         try:
-            print(f"[DEBUG] Verificando respuesta MSAT de {from_number}: {message}")
+            logger.debug("Verificando respuesta MSAT de %s: %s", from_number, message)
             
             # Extraer calificación
             clean_message = ''.join(c for c in message if c.isdigit())
             if not clean_message:
-                print("[DEBUG] No se encontró un número en la respuesta")
+                logger.debug("No se encontró un número en la respuesta")
                 return False, 0, "Por favor, responde solo con un número del 1 al 5."
                 
             rating = int(clean_message)
             if not 1 <= rating <= 5:
-                print(f"[DEBUG] Calificación inválida: {rating}")
+                logger.debug("Calificación inválida: %s", rating)
                 return False, 0, "Por favor, responde con un número del 1 al 5."
             
-            print(f"[DEBUG] Calificación válida extraída: {rating}")
+            logger.debug("Calificación válida extraída: %s", rating)
             return True, rating, ""
             
         except Exception as e:
-            print(f"[ERROR] Error al procesar respuesta MSAT: {str(e)}")
-            import traceback
-            print(f"[ERROR] Error traceback: {traceback.format_exc()}")
+            logger.exception("Error al procesar respuesta MSAT: %s", e)
             return False, 0, "Hubo un error al procesar tu respuesta. Por favor, intenta de nuevo."
 
+    @traced("conversation.save_msat_response")
     def save_msat_response(self, from_number: str, rating: int) -> Tuple[bool, str]:
         """
         Guarda la respuesta del MSAT y actualiza su estado.
@@ -532,10 +533,10 @@ Responde solo con el número de tu calificación (1, 2, 3, 4 o 5)."""
             Tupla con (éxito, mensaje de agradecimiento)
         """
         try:
-            print(f"[DEBUG] Guardando respuesta MSAT de {from_number} con calificación {rating}")
+            logger.debug("Guardando respuesta MSAT de %s con calificación %s", from_number, rating)
             
             # Buscar MSAT pendiente
-            print(f"[DEBUG] Buscando MSAT pendiente para {from_number}")
+            logger.debug("Buscando MSAT pendiente para %s", from_number)
             
             # Primero, obtener todos los mensajes MSAT para diagnóstico
             all_msat = self.table.query(
@@ -547,7 +548,7 @@ Responde solo con el número de tu calificación (1, 2, 3, 4 o 5)."""
                 },
                 ScanIndexForward=False
             )
-            print(f"[DEBUG] Todos los MSAT encontrados: {json.dumps(_convert_decimals(all_msat.get('Items', [])), ensure_ascii=False)}")
+            logger.debug("Todos los MSAT encontrados: %s", payload(_convert_decimals(all_msat.get('Items', []))))
             
             # Si encontramos MSATs, usar el más reciente que esté pendiente
             msat_items = all_msat.get("Items", [])
@@ -558,18 +559,18 @@ Responde solo con el número de tu calificación (1, 2, 3, 4 o 5)."""
                     if item.get("msatStatus") == "pending" and 
                     datetime.fromisoformat(item["expiresAt"].replace('Z', '+00:00')) > datetime.utcnow()
                 ]
-                print(f"[DEBUG] MSATs pendientes encontrados: {json.dumps(_convert_decimals(pending_msats), ensure_ascii=False)}")
+                logger.debug("MSATs pendientes encontrados: %s", payload(_convert_decimals(pending_msats)))
                 
                 if pending_msats:
                     msat_item = pending_msats[0]  # Tomar el más reciente
-                    print(f"[DEBUG] Usando MSAT más reciente: {json.dumps(_convert_decimals(msat_item), ensure_ascii=False)}")
+                    logger.debug("Usando MSAT más reciente: %s", payload(_convert_decimals(msat_item)))
                     
                     # Verificar que tenemos los campos necesarios
                     if "messageId" not in msat_item:
-                        print("[ERROR] MSAT item no tiene messageId")
+                        logger.error("MSAT item no tiene messageId")
                         return False, "Error interno: MSAT inválido"
                         
-                    print(f"[DEBUG] Intentando actualizar MSAT con key: conversationId={from_number}, messageId={msat_item['messageId']}")
+                    logger.debug("Intentando actualizar MSAT con key: conversationId=%s, messageId=%s", from_number, msat_item['messageId'])
                     
                     try:
                         # Actualizar estado del MSAT usando la clave primaria completa
@@ -588,7 +589,7 @@ Responde solo con el número de tu calificación (1, 2, 3, 4 o 5)."""
                             ConditionExpression="attribute_exists(messageId)"  # Asegurar que el item existe
                         )
                         
-                        print(f"[DEBUG] MSAT actualizado exitosamente: {json.dumps(_convert_decimals(update_response.get('Attributes', {})), ensure_ascii=False)}")
+                        logger.debug("MSAT actualizado exitosamente: %s", payload(_convert_decimals(update_response.get('Attributes', {}))))
                         
                         # Mensaje de agradecimiento personalizado según la calificación
                         if rating >= 4:
@@ -598,42 +599,51 @@ Responde solo con el número de tu calificación (1, 2, 3, 4 o 5)."""
                         else:
                             thank_you = "¡Gracias por tu retroalimentación! 🙏 Nos disculpamos por no haber cumplido tus expectativas. Tu opinión nos ayuda a mejorar."
                         
-                        print(f"[DEBUG] Mensaje de agradecimiento: {thank_you}")
+                        logger.debug("Mensaje de agradecimiento: %s", thank_you)
                         return True, thank_you
                         
                     except Exception as update_error:
-                        print(f"[ERROR] Error al actualizar MSAT: {str(update_error)}")
-                        import traceback
-                        print(f"[ERROR] Error traceback: {traceback.format_exc()}")
+                        logger.exception("Error al actualizar MSAT: %s", update_error)
                         return False, "Hubo un error al guardar tu calificación. Por favor, intenta de nuevo."
             
-            print("[DEBUG] No se encontró ningún MSAT pendiente válido")
+            logger.debug("No se encontró ningún MSAT pendiente válido")
             return False, "Lo siento, no encontré una encuesta de satisfacción pendiente para responder."
             
         except Exception as e:
-            print(f"[ERROR] Error al guardar respuesta MSAT: {str(e)}")
-            import traceback
-            print(f"[ERROR] Error traceback: {traceback.format_exc()}")
+            logger.exception("Error al guardar respuesta MSAT: %s", e)
             return False, "Hubo un error al procesar tu respuesta. Por favor, intenta de nuevo."
 
-# Inicializar servicios
-conversation_service = ConversationService()
-car_recommender = CarRecommender()
-prompt_optimizer = PromptOptimizer()
-prospect_service = ProspectService()
+def _lazy_method(get_service: Callable[[], Any], method_name: str) -> Callable[..., Any]:
+    """
+    Crea una función que resuelve el servicio compartido hasta que se invoca,
+    para no construir servicios (ni clientes) al importar el módulo.
+    
+    Args:
+        get_service: Función del contenedor que retorna el servicio
+        method_name: Nombre del método a invocar
+        
+    Returns:
+        Función con la misma firma que el método
+    """
+    def call(*args, **kwargs):
+        return getattr(get_service(), method_name)(*args, **kwargs)
+    call.__name__ = method_name
+    return call
 
 # Definición de herramientas disponibles
 available_functions = {
-    "search_by_make_model": car_recommender.search_by_make_model,
-    "search_by_price_range": car_recommender.search_by_price_range,
-    "get_car_recommendations": car_recommender.get_recommendations,
-    "get_financing_options": car_recommender.get_financing_options,
-    "get_car_details": car_recommender.get_car_details,
-    "send_msat": conversation_service.send_msat_message,
-    "process_msat": conversation_service.process_msat_response,
-    "save_msat_response": conversation_service.save_msat_response,
-    "save_appointment": prospect_service.save_appointment,
-    "get_prospect_appointments": prospect_service.get_prospect_appointments
+    "search_by_make_model": _lazy_method(get_car_recommender, "search_by_make_model"),
+    "search_by_price_range": _lazy_method(get_car_recommender, "search_by_price_range"),
+    "get_car_recommendations": _lazy_method(get_car_recommender, "get_recommendations"),
+    "get_financing_options": _lazy_method(get_car_recommender, "get_financing_options"),
+    "get_car_details": _lazy_method(get_car_recommender, "get_car_details"),
+    "send_msat": _lazy_method(get_conversation_service, "send_msat_message"),
+    "process_msat": _lazy_method(get_conversation_service, "process_msat_response"),
+    "save_msat_response": _lazy_method(get_conversation_service, "save_msat_response"),
+    "save_appointment": _lazy_method(get_prospect_service, "save_appointment"),
+    "get_prospect_appointments": _lazy_method(get_prospect_service, "get_prospect_appointments"),
+    "get_available_slots": _lazy_method(get_prospect_service, "get_free_slots"),
+    "suggest_appointment_slots": _lazy_method(get_prospect_service, "suggest_slots")
 }
 
 # Definición de esquemas de funciones para OpenAI
@@ -857,10 +867,61 @@ function_schemas = [
                     "type": "string",
                     "description": "Filtrar por estado de la cita (pending, confirmed, cancelled, completed)",
                     "enum": ["pending", "confirmed", "cancelled", "completed"]
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Número máximo de citas a obtener (por defecto 10)",
+                    "default": 10
+                },
+                "next_token": {
+                    "type": "string",
+                    "description": "Token next_token de la respuesta anterior para obtener la siguiente página"
                 }
             },
             "required": ["whatsapp_number"]
         }
+    },
+    {
+        "name": "get_available_slots",
+        "description": "Obtiene los horarios libres para citas en los próximos días (fecha, hora y lugares disponibles). Usar esta función cuando el usuario pregunte qué horarios hay disponibles o antes de proponer un horario para agendar.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "days": {
+                    "type": "integer",
+                    "description": "Número de días a consultar a partir de start_date (por defecto 7)",
+                    "default": 7
+                },
+                "start_date": {
+                    "type": "string",
+                    "description": "Fecha inicial en formato YYYY-MM-DD (por defecto hoy)"
+                }
+            },
+            "required": []
+        }
+    },
+    {
+        "name": "suggest_appointment_slots",
+        "description": "Sugiere los horarios libres más cercanos a una fecha y hora solicitadas (dentro del horario de la sucursal y con lugar disponible). Usar esta función cuando el horario pedido por el usuario no esté disponible o quede fuera del horario de atención, para ofrecerle opciones concretas y agendar en el mismo turno.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "appointment_date": {
+                    "type": "string",
+                    "description": "Fecha solicitada en formato YYYY-MM-DD"
+                },
+                "appointment_time": {
+                    "type": "string",
+                    "description": "Hora solicitada en formato HH:MM (por defecto 12:00)"
+                },
+                "count": {
+                    "type": "integer",
+                    "description": "Número de horarios a sugerir (por defecto 3)",
+                    "default": 3
+                }
+            },
+            "required": ["appointment_date"]
+        }
     }
 ]
 
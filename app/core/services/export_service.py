@@ -0,0 +1,418 @@
+import io
+import os
+import csv
+import json
+import time
+import uuid
+import zlib
+import threading
+import contextvars
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from core.services.container import get_dynamodb, get_s3_client, get_car_recommender
+from core.utils.logger import get_logger
+from core.utils.tracing import emit_metric
+
+logger = get_logger(__name__)
+
+# Campos del catálogo que se agregan a cada cita
+CAR_FIELDS = ["make", "model", "version", "year", "price", "km"]
+
+# Tablas exportables: variable de entorno, nombre por defecto y columnas del CSV
+DATASETS: Dict[str, Dict[str, Any]] = {
+    "prospects": {
+        "table_env": "PROSPECTS_TABLE",
+        "table_name": "prospects",
+        "columns": [
+            "appointmentId", "whatsappNumber", "prospectName", "appointmentDate",
+            "appointmentTime", "status", "stockId", "createdAt", "lastUpdated",
+            *[f"car_{field}" for field in CAR_FIELDS]
+        ]
+    },
+    "conversations": {
+        "table_env": "CONVERSATIONS_TABLE",
+        "table_name": "conversations",
+        "columns": [
+            "conversationId", "messageId", "timestamp", "messageType", "userMessage",
+            "agentMessage", "summary", "msatStatus", "msatRating"
+        ]
+    }
+}
+
+FORMATS = ("jsonl", "csv")
+
+def new_export_id() -> str:
+    """Genera el ID de una exportación nueva (fecha y sufijo aleatorio)."""
+    return time.strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+def _json_default(value: Any) -> Any:
+    """Serializa los Decimal de DynamoDB (enteros sin decimales)."""
+    if isinstance(value, Decimal):
+        return int(value) if value % 1 == 0 else float(value)
+    if isinstance(value, set):
+        return sorted(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+class _GzipPart:
+    """
+    Parte de un archivo comprimido. Cada parte es un miembro gzip completo;
+    al concatenarlas (partes de S3 multipart o bloques de un archivo local)
+    el resultado es un .gz válido. La memoria se limita al tamaño de parte.
+    """
+
+    def __init__(self):
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        self.buffer = io.BytesIO()
+        self.rows = 0
+
+    def write(self, data: bytes, rows: int) -> None:
+        self.buffer.write(self.compressor.compress(data))
+        self.rows += rows
+
+    @property
+    def size(self) -> int:
+        return self.buffer.tell()
+
+    def close(self) -> bytes:
+        self.buffer.write(self.compressor.flush())
+        return self.buffer.getvalue()
+
+class S3ExportSink:
+    """Destino en S3: un multipart upload por archivo y el checkpoint como objeto JSON."""
+
+    def __init__(self, bucket: str, prefix: str, s3: Any = None):
+        """
+        Args:
+            bucket: Bucket de destino
+            prefix: Prefijo de la exportación (ej: exports/<export_id>)
+            s3: Cliente de S3 (por defecto el compartido)
+        """
+        self.bucket = bucket
+        self.prefix = prefix.rstrip("/")
+        self.s3 = s3 or get_s3_client()
+
+    def location(self, name: str) -> str:
+        return f"s3://{self.bucket}/{self.prefix}/{name}"
+
+    def start(self, name: str) -> str:
+        response = self.s3.create_multipart_upload(Bucket=self.bucket, Key=f"{self.prefix}/{name}")
+        return response["UploadId"]
+
+    def resume(self, name: str, state: Dict[str, Any]) -> None:
+        # Las partes se vuelven a subir con el mismo número; S3 conserva la última
+        return None
+
+    def write_part(self, name: str, state: Dict[str, Any], data: bytes) -> Dict[str, Any]:
+        part_number = len(state["parts"]) + 1
+        response = self.s3.upload_part(
+            Bucket=self.bucket,
+            Key=f"{self.prefix}/{name}",
+            UploadId=state["upload_id"],
+            PartNumber=part_number,
+            Body=data
+        )
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+    def complete(self, name: str, state: Dict[str, Any]) -> None:
+        self.s3.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=f"{self.prefix}/{name}",
+            UploadId=state["upload_id"],
+            MultipartUpload={"Parts": [
+                {"PartNumber": part["PartNumber"], "ETag": part["ETag"]} for part in state["parts"]
+            ]}
+        )
+
+    def load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        try:
+            response = self.s3.get_object(Bucket=self.bucket, Key=f"{self.prefix}/_checkpoint.json")
+        except Exception as e:
+            if getattr(e, "response", {}).get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return None
+            raise
+        return json.loads(response["Body"].read())
+
+    def save_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=f"{self.prefix}/_checkpoint.json",
+            Body=json.dumps(checkpoint, default=_json_default).encode("utf-8"),
+            ContentType="application/json"
+        )
+
+class LocalExportSink:
+    """Destino en disco (CLI): las partes se agregan al archivo y el checkpoint es un JSON."""
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: Directorio de la exportación
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def location(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def start(self, name: str) -> str:
+        os.makedirs(os.path.dirname(self.location(name)), exist_ok=True)
+        open(self.location(name), "wb").close()
+        return name
+
+    def resume(self, name: str, state: Dict[str, Any]) -> None:
+        # Descartar lo escrito después del último checkpoint
+        with open(self.location(name), "r+b") as f:
+            f.truncate(sum(part["Size"] for part in state["parts"]))
+
+    def write_part(self, name: str, state: Dict[str, Any], data: bytes) -> Dict[str, Any]:
+        with open(self.location(name), "ab") as f:
+            f.write(data)
+        return {"PartNumber": len(state["parts"]) + 1, "Size": len(data)}
+
+    def complete(self, name: str, state: Dict[str, Any]) -> None:
+        return None
+
+    def load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self.directory, "_checkpoint.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        path = os.path.join(self.directory, "_checkpoint.json")
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f, default=_json_default)
+        os.replace(f"{path}.tmp", path)
+
+class ExportService:
+    """
+    Exportación masiva de prospectos/citas y conversaciones para ventas.
+
+    Cada tabla se lee con scan paralelo (un hilo por segmento) y cada
+    segmento se escribe como un archivo comprimido (JSON Lines o CSV) en
+    partes de tamaño fijo, así la memoria no depende del tamaño de la
+    tabla. Las citas se unen con los datos del auto del catálogo.
+
+    Después de cada parte se guarda un checkpoint con el LastEvaluatedKey
+    del segmento; si la exportación se interrumpe, se reanuda con el mismo
+    export_id desde la última parte escrita.
+    """
+
+    def __init__(
+        self,
+        sink: Any,
+        dynamodb: Any = None,
+        car_recommender: Any = None,
+        part_size_bytes: Optional[int] = None
+    ):
+        """
+        Inicializa el servicio.
+
+        Args:
+            sink: Destino (S3ExportSink o LocalExportSink)
+            dynamodb: Recurso de DynamoDB (por defecto el compartido)
+            car_recommender: CarRecommender para los datos de los autos (por defecto el compartido)
+            part_size_bytes: Tamaño comprimido de cada parte (mínimo 5 MB en S3; por defecto EXPORT_PART_SIZE_MB)
+        """
+        self.sink = sink
+        self.dynamodb = dynamodb or get_dynamodb()
+        self.car_recommender = car_recommender
+        self.part_size_bytes = part_size_bytes or int(float(os.environ.get("EXPORT_PART_SIZE_MB", "8")) * 1024 * 1024)
+        self.page_size = int(os.environ.get("EXPORT_PAGE_SIZE", "1000"))
+        self._cars: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._run_rows = 0
+
+    def _table_name(self, dataset: str) -> str:
+        config = DATASETS[dataset]
+        return os.environ.get(
+            config["table_env"],
+            f"kavak-ai-agent-{config['table_name']}-{os.environ.get('STAGE', 'dev')}"
+        )
+
+    def _new_checkpoint(self, export_id: str, datasets: List[str], fmt: str, segments: int) -> Dict[str, Any]:
+        return {
+            "export_id": export_id,
+            "format": fmt,
+            "segments": segments,
+            "files": {
+                f"{dataset}/part-{segment:03d}.{fmt}.gz": {
+                    "dataset": dataset,
+                    "segment": segment,
+                    "upload_id": None,
+                    "parts": [],
+                    "next_key": None,
+                    "rows": 0,
+                    "done": False
+                }
+                for dataset in datasets
+                for segment in range(segments)
+            }
+        }
+
+    def _join_cars(self, items: List[Dict[str, Any]]) -> None:
+        """Agrega los datos del auto a cada cita (BatchGetItem solo de los autos no vistos)."""
+        stock_ids = {str(item["stockId"]) for item in items if item.get("stockId")}
+        with self._lock:
+            missing = [stock_id for stock_id in stock_ids if stock_id not in self._cars]
+        if missing:
+            recommender = self.car_recommender or get_car_recommender()
+            found = recommender.get_cars_details(missing, fields=CAR_FIELDS)
+            with self._lock:
+                for stock_id in missing:
+                    self._cars[stock_id] = found.get(stock_id)
+        for item in items:
+            car = self._cars.get(str(item.get("stockId"))) or {}
+            item["car"] = {field: car.get(field) for field in CAR_FIELDS} if car else None
+
+    def _encode(self, dataset: str, fmt: str, items: List[Dict[str, Any]], header: bool) -> bytes:
+        """Codifica una página de items como JSON Lines o CSV."""
+        if fmt == "jsonl":
+            return "".join(
+                json.dumps(item, ensure_ascii=False, default=_json_default) + "\n" for item in items
+            ).encode("utf-8")
+
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=DATASETS[dataset]["columns"], extrasaction="ignore")
+        if header:
+            writer.writeheader()
+        for item in items:
+            row = {key: _json_default(value) if isinstance(value, Decimal) else value for key, value in item.items()}
+            for field, value in (item.get("car") or {}).items():
+                row[f"car_{field}"] = _json_default(value) if isinstance(value, Decimal) else value
+            writer.writerow(row)
+        return output.getvalue().encode("utf-8")
+
+    def _flush(self, name: str, state: Dict[str, Any], part: _GzipPart, next_key: Optional[Dict[str, Any]], checkpoint: Dict[str, Any]) -> None:
+        """Sube una parte y guarda el checkpoint con la posición del scan."""
+        rows = part.rows
+        uploaded = self.sink.write_part(name, state, part.close())
+        with self._lock:
+            state["parts"].append(uploaded)
+            state["rows"] += rows
+            state["next_key"] = next_key
+            self._run_rows += rows
+            self.sink.save_checkpoint(checkpoint)
+
+    def _export_segment(self, name: str, checkpoint: Dict[str, Any], should_stop: Callable[[], bool]) -> None:
+        """
+        Exporta un segmento del scan paralelo a su archivo.
+
+        Args:
+            name: Archivo del segmento (llave en checkpoint["files"])
+            checkpoint: Estado de la exportación
+            should_stop: Indica si hay que detenerse (ej: se acaba el tiempo de la Lambda)
+        """
+        state = checkpoint["files"][name]
+        if state["done"]:
+            return
+        dataset, fmt = state["dataset"], checkpoint["format"]
+        if state["upload_id"]:
+            self.sink.resume(name, state)
+        else:
+            with self._lock:
+                state["upload_id"] = self.sink.start(name)
+                self.sink.save_checkpoint(checkpoint)
+
+        table = self.dynamodb.Table(self._table_name(dataset))
+        scan_params: Dict[str, Any] = {
+            "Segment": state["segment"],
+            "TotalSegments": checkpoint["segments"],
+            "Limit": self.page_size
+        }
+        if state["next_key"]:
+            scan_params["ExclusiveStartKey"] = state["next_key"]
+
+        part = _GzipPart()
+        header = fmt == "csv" and not state["parts"]
+        while not should_stop():
+            response = table.scan(**scan_params)
+            items = response.get("Items", [])
+            if dataset == "prospects" and items:
+                self._join_cars(items)
+            part.write(self._encode(dataset, fmt, items, header), len(items))
+            header = False
+
+            last_key = response.get("LastEvaluatedKey")
+            # Las partes se cortan entre páginas para que el checkpoint sea exacto
+            if last_key is None or part.size >= self.part_size_bytes:
+                self._flush(name, state, part, last_key, checkpoint)
+                part = _GzipPart()
+            if last_key is None:
+                self.sink.complete(name, state)
+                with self._lock:
+                    state["done"] = True
+                    self.sink.save_checkpoint(checkpoint)
+                return
+            scan_params["ExclusiveStartKey"] = last_key
+        # Al detenerse se descarta la parte incompleta: se vuelve a leer al reanudar
+
+    def run(
+        self,
+        export_id: str,
+        datasets: Iterable[str] = ("prospects", "conversations"),
+        fmt: str = "jsonl",
+        segments: int = 4,
+        deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta una exportación, o la reanuda si el destino ya tiene su
+        checkpoint (en ese caso se usan las tablas, formato y segmentos
+        guardados).
+
+        Args:
+            export_id: ID de la exportación (new_export_id para una nueva)
+            datasets: Tablas a exportar (prospects, conversations)
+            fmt: Formato de salida (jsonl o csv)
+            segments: Segmentos del scan paralelo por tabla
+            deadline: Momento (time.monotonic) en que se debe detener y dejar el checkpoint
+
+        Returns:
+            Resumen con status (completed o incomplete), filas y filas por segundo
+        """
+        checkpoint = self.sink.load_checkpoint()
+        if checkpoint:
+            logger.info("Reanudando exportación %s", export_id)
+        else:
+            datasets = list(datasets)
+            unknown = [dataset for dataset in datasets if dataset not in DATASETS]
+            if unknown or fmt not in FORMATS:
+                raise ValueError(f"Exportación no soportada: datasets={unknown or datasets}, formato={fmt}")
+            checkpoint = self._new_checkpoint(export_id, datasets, fmt, max(1, segments))
+            self.sink.save_checkpoint(checkpoint)
+
+        self._run_rows = 0
+        started = time.monotonic()
+        should_stop = (lambda: time.monotonic() >= deadline) if deadline else (lambda: False)
+        names = [name for name, state in checkpoint["files"].items() if not state["done"]]
+        if names:
+            with ThreadPoolExecutor(max_workers=len(names)) as executor:
+                futures = [
+                    executor.submit(contextvars.copy_context().run, self._export_segment, name, checkpoint, should_stop)
+                    for name in names
+                ]
+                for future in futures:
+                    future.result()
+
+        elapsed = time.monotonic() - started
+        files = checkpoint["files"]
+        completed = all(state["done"] for state in files.values())
+        summary = {
+            "export_id": checkpoint["export_id"],
+            "status": "completed" if completed else "incomplete",
+            "format": checkpoint["format"],
+            "rows": sum(state["rows"] for state in files.values()),
+            "run_rows": self._run_rows,
+            "elapsed_s": round(elapsed, 2),
+            "rows_per_second": round(self._run_rows / elapsed, 1) if elapsed else 0.0,
+            "files": [self.sink.location(name) for name in files]
+        }
+        logger.info(
+            "Exportación %s %s: %s filas (%s filas/s)",
+            summary["export_id"], summary["status"], summary["run_rows"], summary["rows_per_second"],
+            extra={"metrics": {"export_rows": summary["run_rows"], "export_rows_per_second": summary["rows_per_second"]}}
+        )
+        emit_metric("ExportRowsPerSecond", summary["rows_per_second"], "Count/Second", Function="ExportData")
+        return summary
@@ -0,0 +1,145 @@
+import os
+import time
+from typing import Any, Dict, Optional
+from core.services.container import get_dynamodb
+from core.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class IdempotencyService:
+    """
+    Registro de mensajes ya recibidos (por MessageSid de Twilio) en una tabla
+    pequeña con TTL. Permite descartar los reintentos del webhook sin iniciar
+    trabajo duplicado.
+    """
+
+    def __init__(self, dynamodb: Any = None, table_name: Optional[str] = None, ttl_seconds: Optional[int] = None):
+        """
+        Inicializa el servicio.
+
+        Args:
+            dynamodb: Recurso de DynamoDB (por defecto el compartido)
+            table_name: Nombre de la tabla (por defecto IDEMPOTENCY_TABLE)
+            ttl_seconds: Tiempo que se recuerda cada mensaje (por defecto IDEMPOTENCY_TTL_SECONDS)
+        """
+        self.table_name = table_name or os.environ.get(
+            "IDEMPOTENCY_TABLE",
+            f"kavak-ai-agent-idempotency-{os.environ.get('STAGE', 'dev')}"
+        )
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400"))
+        self.dynamodb = dynamodb or get_dynamodb()
+        self.table = self.dynamodb.Table(self.table_name)
+        self.stats = {"claimed": 0, "duplicates": 0, "released": 0, "errors": 0}
+
+    def claim(self, message_sid: str, **attributes: Any) -> bool:
+        """
+        Registra el mensaje con un put condicional. Solo el primer intento
+        gana; los reintentos de Twilio con el mismo MessageSid pierden.
+        Si DynamoDB falla por otro motivo se permite el procesamiento
+        (es preferible un duplicado ocasional a perder un mensaje).
+
+        Args:
+            message_sid: MessageSid de Twilio
+            **attributes: Atributos informativos a guardar (ej: from_number)
+
+        Returns:
+            True si el mensaje es nuevo, False si es un duplicado
+        """
+        now = int(time.time())
+        try:
+            self.table.put_item(
+                Item={
+                    "messageSid": message_sid,
+                    "receivedAt": now,
+                    "expiresAt": now + self.ttl_seconds,
+                    **{key: value for key, value in attributes.items() if value}
+                },
+                ConditionExpression="attribute_not_exists(messageSid)"
+            )
+        except Exception as e:
+            error_code = getattr(e, "response", {}).get("Error", {}).get("Code")
+            if error_code == "ConditionalCheckFailedException":
+                self.stats["duplicates"] += 1
+                return False
+            self.stats["errors"] += 1
+            logger.warning("No se pudo registrar el mensaje %s para idempotencia: %s", message_sid, e)
+            return True
+
+        self.stats["claimed"] += 1
+        return True
+
+    def release(self, message_sid: str) -> None:
+        """
+        Elimina el registro de un mensaje cuyo procesamiento no se pudo
+        iniciar, para que el reintento de Twilio no se descarte como duplicado.
+
+        Args:
+            message_sid: MessageSid de Twilio
+        """
+        try:
+            self.table.delete_item(Key={"messageSid": message_sid})
+            self.stats["released"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error("No se pudo liberar el mensaje %s: %s", message_sid, e)
+
+    def get_reply(self, message_sid: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene la respuesta ya generada para un mensaje (ver save_reply).
+        Si DynamoDB falla se procesa de nuevo, como en claim.
+
+        Args:
+            message_sid: MessageSid de Twilio
+
+        Returns:
+            Diccionario con reply y sent_segments, o None si no hay respuesta guardada
+        """
+        try:
+            item = self.table.get_item(Key={"messageSid": message_sid}, ConsistentRead=True).get("Item")
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("No se pudo leer la respuesta guardada de %s: %s", message_sid, e)
+            return None
+        if not item or "reply" not in item:
+            return None
+        return {"reply": item["reply"], "sent_segments": int(item.get("sentSegments", 0))}
+
+    def save_reply(self, message_sid: str, reply: str) -> None:
+        """
+        Guarda la respuesta generada antes de enviarla: si el envío falla y
+        el mensaje se vuelve a entregar, solo se reenvía en lugar de volver a
+        procesar el turno (otra llamada al LLM y otro registro en la conversación).
+
+        Args:
+            message_sid: MessageSid de Twilio
+            reply: Respuesta pendiente de enviar
+        """
+        now = int(time.time())
+        try:
+            self.table.update_item(
+                Key={"messageSid": message_sid},
+                UpdateExpression="SET reply = :reply, sentSegments = :zero, expiresAt = if_not_exists(expiresAt, :expires)",
+                ExpressionAttributeValues={":reply": reply, ":zero": 0, ":expires": now + self.ttl_seconds}
+            )
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("No se pudo guardar la respuesta de %s: %s", message_sid, e)
+
+    def mark_sent(self, message_sid: str, sent_segments: int) -> None:
+        """
+        Registra cuántos segmentos de la respuesta ya se enviaron, para no
+        repetirlos si el envío se reintenta.
+
+        Args:
+            message_sid: MessageSid de Twilio
+            sent_segments: Segmentos enviados
+        """
+        try:
+            self.table.update_item(
+                Key={"messageSid": message_sid},
+                UpdateExpression="SET sentSegments = :sent",
+                ExpressionAttributeValues={":sent": sent_segments}
+            )
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("No se pudo registrar el envío de %s: %s", message_sid, e)
@@ -0,0 +1,232 @@
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from core.utils.templates import render_tool_results
+from core.utils.text_processing import (
+    CAR_MAKE_PATTERN,
+    CAR_MODEL_PATTERN,
+    normalize_text,
+    extract_car_info,
+    extract_price_range,
+    is_financing_query
+)
+from core.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Palabras que forman un saludo (el mensaje completo debe estar compuesto por ellas)
+GREETING_WORDS = {
+    "hola", "holi", "buenas", "buen", "buenos", "dia", "dias", "tarde", "tardes",
+    "noche", "noches", "que", "tal", "saludos", "hey", "hi", "hello", "ola"
+}
+
+# Palabras que pueden acompañar a una marca/modelo en una búsqueda directa
+# (ej: "busco un jetta", "¿tienen mazda 3?"); cualquier otra palabra requiere al LLM
+SEARCH_WORDS = {
+    "busco", "buscando", "estoy", "quiero", "necesito", "me", "interesa", "gustaria",
+    "tienen", "hay", "manejan", "venden", "muestrame", "ver", "opciones", "disponibles",
+    "un", "una", "unos", "el", "la", "los", "las", "algun", "alguna", "algo", "de", "del",
+    "y", "o", "en", "por", "favor", "que", "auto", "autos", "carro", "coche", "camioneta",
+    "marca", "modelo", "seminuevo", "seminuevos", "usado", "hola", "buenas", "buen", "dia", "tarde"
+}
+
+# Intenciones que requieren al LLM aunque el mensaje mencione un auto o precio
+LLM_KEYWORDS = [
+    "cita", "agendar", "agenda", "visita", "prueba de manejo", "detalle", "compar",
+    "diferencia", "recomien", "mejor", "vender", "cambiar mi", "garantia"
+]
+
+# Longitud máxima (en palabras) de un mensaje que se enruta sin LLM
+MAX_ROUTED_WORDS = 12
+
+GREETING_MESSAGE = """¡Hola! 👋 Soy el asistente virtual de Kavak, la plataforma líder de autos seminuevos en México 🚗
+
+Puedo ayudarte a encontrar tu próximo auto por marca, modelo o presupuesto, calcular tu financiamiento y agendar una cita.
+
+¿Qué tipo de auto estás buscando?"""
+
+class IntentRouter:
+    """
+    Enrutador de intenciones basado en reglas que atiende los mensajes
+    simples sin llamar al LLM (saludo inicial, respuesta de MSAT, búsqueda
+    por marca/modelo y búsqueda por rango de precio).
+    """
+
+    def __init__(self, conversation_service: Any, functions: Dict[str, Callable[..., Any]]):
+        """
+        Inicializa el enrutador.
+
+        Args:
+            conversation_service: Servicio de conversaciones (estado y respuesta de MSAT)
+            functions: Funciones disponibles (available_functions)
+        """
+        self.conversation_service = conversation_service
+        self.functions = functions
+        self.enabled = os.environ.get("INTENT_ROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.stats = {
+            "total_turns": 0,
+            "routed_turns": 0,
+            "routed_seconds": 0.0,
+            "llm_turns": 0,
+            "llm_seconds": 0.0,
+            "by_intent": {}
+        }
+
+    def classify(
+        self,
+        message_body: str,
+        conversation_context: List[Dict[str, str]]
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Clasifica el mensaje con reglas baratas.
+
+        Args:
+            message_body: Mensaje del usuario
+            conversation_context: Contexto de la conversación (formato OpenAI)
+
+        Returns:
+            Tupla con (intención, argumentos) o None si debe atenderlo el LLM
+        """
+        normalized = normalize_text(message_body)
+        if not normalized:
+            return None
+        words = normalized.split()
+
+        # Calificación de MSAT: el mensaje es solo un número del 1 al 5
+        if re.fullmatch(r"[1-5]", normalized):
+            return "msat_reply", {"rating": int(normalized)}
+
+        # Saludo en el primer contacto (sin mensajes previos en el contexto)
+        is_first_contact = not any(msg.get("role") in ("user", "assistant") for msg in conversation_context)
+        if is_first_contact and all(word in GREETING_WORDS for word in words):
+            return "greeting", {}
+
+        if len(words) > MAX_ROUTED_WORDS or is_financing_query(message_body):
+            return None
+        if any(keyword in normalized for keyword in LLM_KEYWORDS):
+            return None
+
+        car_info = extract_car_info(message_body)
+        price_range = extract_price_range(message_body)
+
+        # Marca/modelo explícito sin precio (combinarlos requiere al LLM) y sin
+        # otras palabras (ej: "¿tiene bluetooth el spark?" es una pregunta de detalle)
+        leftover = CAR_MODEL_PATTERN.sub(" ", normalized)
+        leftover = CAR_MAKE_PATTERN.sub(" ", leftover).split()
+        is_plain_search = all(word in SEARCH_WORDS or re.fullmatch(r"(19|20)\d{2}", word) for word in leftover)
+        if (car_info.get("make") or car_info.get("model")) and not price_range and is_plain_search:
+            args = {"make": car_info["make"]}
+            if car_info.get("model"):
+                args["model"] = car_info["model"]
+            return "search_by_make_model", args
+
+        # Rango de precio sin marca/modelo
+        if price_range and not car_info.get("make"):
+            args = dict(price_range)
+            if car_info.get("year"):
+                args["year"] = car_info["year"]
+            return "search_by_price_range", args
+
+        return None
+
+    def route(
+        self,
+        from_number: str,
+        message_body: str,
+        conversation_context: List[Dict[str, str]]
+    ) -> Optional[Tuple[str, str]]:
+        """
+        Intenta atender el mensaje sin LLM.
+
+        Args:
+            from_number: Número de WhatsApp del usuario
+            message_body: Mensaje del usuario
+            conversation_context: Contexto de la conversación
+
+        Returns:
+            Tupla con (intención, mensaje de respuesta) o None para continuar con el LLM
+        """
+        if not self.enabled:
+            return None
+
+        classified = self.classify(message_body, conversation_context)
+        if not classified:
+            return None
+        intent, args = classified
+        logger.debug("Intención detectada por reglas: %s %s", intent, args)
+
+        try:
+            if intent == "greeting":
+                return intent, GREETING_MESSAGE
+
+            if intent == "msat_reply":
+                # Solo es calificación si hay un MSAT pendiente
+                if not self.conversation_service.get_msat_status(from_number).get("has_pending_msat"):
+                    return None
+                success, thank_you = self.conversation_service.save_msat_response(from_number, args["rating"])
+                if not success:
+                    logger.debug("No se pudo guardar el MSAT por reglas, se delega al LLM")
+                    return None
+                return intent, thank_you
+
+            # Búsquedas: ejecutar la herramienta y renderizar con plantillas
+            result = self.functions[intent](**args)
+            message = render_tool_results([(intent, args, result)])
+            if not message:
+                # Sin resultados: el LLM sugiere alternativas
+                logger.debug("%s sin resultados renderizables, se delega al LLM", intent)
+                return None
+            return intent, message
+
+        except Exception as e:
+            logger.error("Error en el enrutador de intenciones (%s): %s", intent, e)
+            return None
+
+    def record_turn(self, intent: Optional[str], elapsed: float) -> None:
+        """
+        Registra la duración de un turno y reporta las métricas acumuladas.
+
+        Args:
+            intent: Intención atendida por reglas o None si pasó por el LLM
+            elapsed: Duración del turno en segundos
+        """
+        self.stats["total_turns"] += 1
+        if intent:
+            self.stats["routed_turns"] += 1
+            self.stats["routed_seconds"] += elapsed
+            self.stats["by_intent"][intent] = self.stats["by_intent"].get(intent, 0) + 1
+        else:
+            self.stats["llm_turns"] += 1
+            self.stats["llm_seconds"] += elapsed
+
+        summary = self.get_stats()
+        logger.info(
+            "Enrutador de intenciones: %d/%d turnos sin LLM (%.0f%%), ahorro estimado %.0f ms",
+            summary["routed_turns"],
+            summary["total_turns"],
+            summary["bypass_rate"] * 100,
+            summary["estimated_saved_ms"],
+            extra={"metrics": summary}
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Calcula las métricas del enrutador en este contenedor.
+        El ahorro se estima con la duración promedio de los turnos que sí usan el LLM.
+
+        Returns:
+            Diccionario con porcentaje de turnos sin LLM y latencia ahorrada
+        """
+        stats = self.stats
+        avg_llm = stats["llm_seconds"] / stats["llm_turns"] if stats["llm_turns"] else 0.0
+        avg_routed = stats["routed_seconds"] / stats["routed_turns"] if stats["routed_turns"] else 0.0
+        saved = max(0.0, avg_llm - avg_routed) * stats["routed_turns"] if stats["llm_turns"] else 0.0
+        return {
+            "total_turns": stats["total_turns"],
+            "routed_turns": stats["routed_turns"],
+            "bypass_rate": stats["routed_turns"] / stats["total_turns"] if stats["total_turns"] else 0.0,
+            "avg_llm_ms": avg_llm * 1000,
+            "avg_routed_ms": avg_routed * 1000,
+            "estimated_saved_ms": saved * 1000,
+            "by_intent": dict(stats["by_intent"])
+        }
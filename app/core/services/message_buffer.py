@@ -0,0 +1,201 @@
+import os
+import time
+from typing import Any, Dict, List, Optional
+from core.services.container import get_dynamodb
+from core.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MESSAGE_PREFIX = "msg#"
+LEASE_KEY = "lease"
+
+class ConversationBusy(Exception):
+    """
+    Otra ejecución tiene el lease de la conversación. El Step Function
+    reintenta la tarea con este nombre de error hasta que se libere.
+    """
+
+def get_coalesce_wait_seconds() -> int:
+    """
+    Obtiene la ventana de espera para agrupar mensajes (COALESCE_WAIT_SECONDS).
+    Con 0 cada mensaje se procesa por separado, como antes.
+
+    Returns:
+        Segundos de espera
+    """
+    return max(0, int(os.environ.get("COALESCE_WAIT_SECONDS", "0")))
+
+class MessageBuffer:
+    """
+    Buffer de mensajes pendientes por conversación y lease para serializar
+    su procesamiento. Cada mensaje entrante se guarda como pendiente; tras
+    la ventana de espera, solo la ejecución del mensaje más reciente procesa
+    el turno, uniendo todos los pendientes en orden de llegada.
+
+    Tabla (MESSAGE_BUFFER_TABLE):
+    - conversationId (HASH) + itemKey (RANGE)
+    - Pendientes: itemKey = "msg#<recibido en ms>#<MessageSid>"
+    - Lease: itemKey = "lease", con owner y leaseUntil
+    """
+
+    def __init__(self, dynamodb: Any = None, table_name: Optional[str] = None, lease_seconds: Optional[int] = None):
+        """
+        Inicializa el buffer.
+
+        Args:
+            dynamodb: Recurso de DynamoDB (por defecto el compartido)
+            table_name: Nombre de la tabla (por defecto MESSAGE_BUFFER_TABLE)
+            lease_seconds: Duración máxima del lease (debe superar el timeout de la Lambda)
+        """
+        self.table_name = table_name or os.environ.get(
+            "MESSAGE_BUFFER_TABLE",
+            f"kavak-ai-agent-message-buffer-{os.environ.get('STAGE', 'dev')}"
+        )
+        self.lease_seconds = lease_seconds if lease_seconds is not None else int(os.environ.get("MESSAGE_BUFFER_LEASE_SECONDS", "300"))
+        self.pending_ttl_seconds = int(os.environ.get("MESSAGE_BUFFER_TTL_SECONDS", "3600"))
+        self.dynamodb = dynamodb or get_dynamodb()
+        self.table = self.dynamodb.Table(self.table_name)
+
+    def append(self, conversation_id: str, message_sid: str, body: str, received_at_ms: Optional[int] = None) -> str:
+        """
+        Guarda un mensaje entrante como pendiente.
+
+        Args:
+            conversation_id: Número de WhatsApp del usuario
+            message_sid: MessageSid de Twilio
+            body: Texto del mensaje
+            received_at_ms: Momento de llegada en milisegundos (por defecto ahora)
+
+        Returns:
+            Clave del mensaje pendiente (buffer_key)
+        """
+        received_at_ms = received_at_ms or int(time.time() * 1000)
+        buffer_key = f"{MESSAGE_PREFIX}{received_at_ms:013d}#{message_sid}"
+        self.table.put_item(Item={
+            "conversationId": conversation_id,
+            "itemKey": buffer_key,
+            "messageSid": message_sid,
+            "body": body,
+            "expiresAt": int(received_at_ms / 1000) + self.pending_ttl_seconds
+        })
+        return buffer_key
+
+    def is_superseded(self, conversation_id: str, buffer_key: str) -> bool:
+        """
+        Indica si otra ejecución se encargará del mensaje: llegó uno más
+        reciente o el mensaje ya fue consumido en un turno anterior.
+
+        Args:
+            conversation_id: Número de WhatsApp del usuario
+            buffer_key: Clave del mensaje pendiente
+
+        Returns:
+            True si esta ejecución no debe procesar el turno
+        """
+        response = self.table.query(
+            KeyConditionExpression="conversationId = :cid AND itemKey >= :key",
+            ExpressionAttributeValues={":cid": conversation_id, ":key": buffer_key},
+            ConsistentRead=True,
+            ProjectionExpression="itemKey",
+            Limit=2
+        )
+        keys = [item["itemKey"] for item in response.get("Items", []) if item["itemKey"].startswith(MESSAGE_PREFIX)]
+        return not keys or keys[0] != buffer_key or len(keys) > 1
+
+    def acquire(self, conversation_id: str, owner: str) -> None:
+        """
+        Toma el lease de la conversación (o uno vencido de una ejecución caída).
+
+        Args:
+            conversation_id: Número de WhatsApp del usuario
+            owner: Identificador de la ejecución
+
+        Raises:
+            ConversationBusy: Si otra ejecución tiene el lease vigente
+        """
+        now = int(time.time())
+        try:
+            self.table.put_item(
+                Item={
+                    "conversationId": conversation_id,
+                    "itemKey": LEASE_KEY,
+                    "owner": owner,
+                    "leaseUntil": now + self.lease_seconds,
+                    "expiresAt": now + self.lease_seconds + self.pending_ttl_seconds
+                },
+                ConditionExpression="attribute_not_exists(itemKey) OR leaseUntil < :now OR #owner = :owner",
+                ExpressionAttributeNames={"#owner": "owner"},
+                ExpressionAttributeValues={":now": now, ":owner": owner}
+            )
+        except Exception as e:
+            if getattr(e, "response", {}).get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                raise ConversationBusy(f"La conversación {conversation_id} se está procesando")
+            raise
+
+    def release(self, conversation_id: str, owner: str) -> None:
+        """
+        Libera el lease si sigue siendo de esta ejecución.
+
+        Args:
+            conversation_id: Número de WhatsApp del usuario
+            owner: Identificador de la ejecución
+        """
+        try:
+            self.table.delete_item(
+                Key={"conversationId": conversation_id, "itemKey": LEASE_KEY},
+                ConditionExpression="#owner = :owner",
+                ExpressionAttributeNames={"#owner": "owner"},
+                ExpressionAttributeValues={":owner": owner}
+            )
+        except Exception as e:
+            logger.warning("No se pudo liberar el lease de %s: %s", conversation_id, e)
+
+    def pending(self, conversation_id: str, up_to_key: str) -> List[Dict[str, Any]]:
+        """
+        Obtiene los mensajes pendientes hasta buffer_key (inclusive), en orden de llegada.
+
+        Args:
+            conversation_id: Número de WhatsApp del usuario
+            up_to_key: Clave del último mensaje a incluir
+
+        Returns:
+            Lista de mensajes pendientes
+        """
+        items: List[Dict[str, Any]] = []
+        params = {
+            "KeyConditionExpression": "conversationId = :cid AND itemKey BETWEEN :first AND :last",
+            "ExpressionAttributeValues": {":cid": conversation_id, ":first": MESSAGE_PREFIX, ":last": up_to_key},
+            "ConsistentRead": True
+        }
+        while True:
+            response = self.table.query(**params)
+            items.extend(response.get("Items", []))
+            if "LastEvaluatedKey" not in response:
+                return items
+            params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def consume(self, conversation_id: str, items: List[Dict[str, Any]]) -> None:
+        """
+        Elimina los mensajes ya procesados (solo los de este turno; los que
+        llegaron durante el procesamiento quedan para la siguiente ejecución).
+
+        Args:
+            conversation_id: Número de WhatsApp del usuario
+            items: Mensajes procesados
+        """
+        with self.table.batch_writer() as batch:
+            for item in items:
+                batch.delete_item(Key={"conversationId": conversation_id, "itemKey": item["itemKey"]})
+
+    @staticmethod
+    def merge(items: List[Dict[str, Any]]) -> str:
+        """
+        Une los mensajes pendientes en un solo turno.
+
+        Args:
+            items: Mensajes en orden de llegada
+
+        Returns:
+            Texto combinado (un mensaje por línea)
+        """
+        return "\n".join(item["body"].strip() for item in items if item.get("body", "").strip())
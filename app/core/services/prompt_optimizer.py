@@ -1,7 +1,10 @@
 import os
 import json
 from typing import List, Dict, Any, Optional
-from openai import OpenAI
+from core.services.container import get_openai_client
+from core.utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 class PromptOptimizer:
     """Servicio para optimizar prompts y reducir el uso de tokens."""
@@ -89,6 +92,8 @@ INSTRUCCIONES CRÍTICAS:
    - Toma todo el contexto de la conversacion para tener toda la informacion necesaria para agendar citas
    - Si su intencion del usuario, o los datos proporcionados por el usuario son para agendar citas, usa la funcion save_appointment para agendar citas
    - Horario: L-V 9:00-18:00, S 9:00-14:00
+   - Si el usuario pregunta por horarios disponibles, usa get_available_slots (una sola llamada cubre varios días)
+   - Si el horario pedido no está disponible, ofrece los horarios sugeridos en la respuesta de save_appointment o usa suggest_appointment_slots; no preguntes al usuario por otro horario sin darle opciones
    - IMPORTANTE: Para agendar una cita necesitas TODA esta información:
      * whatsapp_number: DEBE ser el número EXACTO que aparece en el resumen después de "Número:". Por ejemplo, si en el resumen aparece "Número: whatsapp:+5215550838196", debes usar EXACTAMENTE "whatsapp:+5215550838196" como valor para whatsapp_number
      * Nombre completo del prospecto
@@ -175,9 +180,14 @@ DEBES:
     - Si no hay autos consultados o seleccionados, escribe "Ninguno" en esa sección
 
     Sé conciso pero incluye TODOS los elementos requeridos."""
-    def __init__(self):
-        """Inicializa el servicio con OpenAI."""
-        self.client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+    def __init__(self, client: Any = None):
+        """
+        Inicializa el servicio con OpenAI.
+        
+        Args:
+            client: Cliente de OpenAI (por defecto el compartido)
+        """
+        self.client = client or get_openai_client()
         self.system_prompt = self.SYSTEM_PROMPT
         self.summary_prompt = self.SUMMARY_PROMPT
 
@@ -218,12 +228,16 @@ DEBES:
             optimized = []
             remaining_tokens = max_tokens
             
-            # Siempre incluir el primer mensaje (system prompt)
+            # Siempre incluir el primer mensaje (system prompt) y el último
+            # (mensaje actual del usuario), aunque agoten el presupuesto
             if messages:
                 optimized.append(messages[0])
                 remaining_tokens -= len(messages[0]["content"].split()) * 1.3
-            # Incluir mensajes más recientes primero
-            for msg in reversed(messages[1:]):
+            current = messages[-1:] if len(messages) > 1 else []
+            for msg in current:
+                remaining_tokens -= len(msg["content"].split()) * 1.3
+            # Incluir el historial más reciente primero
+            for msg in reversed(messages[1:-1]):
                 msg_tokens = len(msg["content"].split()) * 1.3
                 if msg_tokens <= remaining_tokens:
                     optimized.insert(1, msg)  # Insertar después del system prompt
@@ -231,10 +245,10 @@ DEBES:
                 else:
                     break
             
-            return optimized
+            return optimized + current
             
         except Exception as e:
-            print(f"Error al optimizar mensajes: {str(e)}")
+            logger.error("Error al optimizar mensajes: %s", e)
             return messages
 
     def compress_car_info(self, car: Dict[str, Any]) -> str:
@@ -253,7 +267,7 @@ DEBES:
                 f"{car['year']} - ${car['price']:,} - {car['km']:,}km"
             )
         except Exception as e:
-            print(f"Error al comprimir info del auto: {str(e)}")
+            logger.error("Error al comprimir info del auto: %s", e)
             return str(car)
 
     def compress_recommendations(
@@ -280,5 +294,5 @@ DEBES:
             return "\n".join(compressed)
             
         except Exception as e:
-            print(f"Error al comprimir recomendaciones: {str(e)}")
+            logger.error("Error al comprimir recomendaciones: %s", e)
             return str(recommendations) 
\ No newline at end of file
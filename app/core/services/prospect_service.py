@@ -1,10 +1,82 @@
 import os
 import json
-import boto3
+import time
+import base64
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime, timedelta
 from decimal import Decimal
-from core.services.car_recommender import CarRecommender
+from core.services.container import get_dynamodb, get_car_recommender
+from core.utils.logger import get_logger, payload
+from core.utils.tracing import traced
+
+logger = get_logger(__name__)
+
+# Branch hours per weekday (Monday = 0): first and last (exclusive) hour of the day
+BUSINESS_HOURS = {
+    0: (9, 18),
+    1: (9, 18),
+    2: (9, 18),
+    3: (9, 18),
+    4: (9, 18),
+    5: (9, 14)
+}
+
+# Catalog fields used to render appointments
+APPOINTMENT_CAR_FIELDS = ["make", "model", "version", "year", "price"]
+
+# Background reads (e.g. car details while the booking transaction runs)
+_prefetch_executor = ThreadPoolExecutor(max_workers=4)
+
+def _status_key(status: str, date: str, time_of_day: str) -> str:
+    """Builds the WhatsappStatusIndex sort key (status#YYYY-MM-DD HH:MM)."""
+    return f"{status}#{date} {time_of_day}"
+
+def _encode_token(key: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Encodes a DynamoDB LastEvaluatedKey as an opaque pagination token."""
+    if not key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii")
+
+def _decode_token(token: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Decodes a pagination token created by _encode_token."""
+    if not token:
+        return None
+    return json.loads(base64.urlsafe_b64decode(token.encode("ascii")).decode("utf-8"))
+
+def _slot_key(date: str, hour: int) -> str:
+    """Builds the slot sort key (YYYY-MM-DD#HH)."""
+    return f"{date}#{hour:02d}"
+
+def _is_business_hour(moment: datetime) -> bool:
+    """
+    Checks whether a date/time falls within branch hours.
+
+    Args:
+        moment: Appointment date and time
+
+    Returns:
+        True if the branch is open at that hour
+    """
+    hours = BUSINESS_HOURS.get(moment.weekday())
+    return bool(hours) and hours[0] <= moment.hour < hours[1]
+
+def _cancellation_code(error: Exception, index: int) -> Optional[str]:
+    """
+    Gets the cancellation reason of one action of a failed TransactWriteItems.
+
+    Args:
+        error: TransactionCanceledException raised by boto3
+        index: Index of the action in the transaction
+
+    Returns:
+        Reason code (e.g. ConditionalCheckFailed) or None
+    """
+    reasons = getattr(error, "response", {}).get("CancellationReasons", [])
+    if index < len(reasons):
+        return reasons[index].get("Code")
+    return None
 
 def _convert_decimals(obj):
     """
@@ -21,26 +93,131 @@ def _convert_decimals(obj):
 class ProspectService:
     """Service for handling prospect and appointment storage and management."""
 
-    def __init__(self):
-        """Initializes the service with the DynamoDB table."""
+    def __init__(self, dynamodb: Any = None, car_recommender: Any = None):
+        """
+        Initializes the service with the DynamoDB table.
+        
+        Args:
+            dynamodb: DynamoDB resource (defaults to the shared one)
+            car_recommender: CarRecommender instance (defaults to the shared one)
+        """
         self.table_name = os.environ.get('PROSPECTS_TABLE', f"kavak-ai-prospects-{os.environ.get('STAGE', 'dev')}")
         self.cars_table_name = os.environ.get('CARS_TABLE', f"kavak-ai-cars-{os.environ.get('STAGE', 'dev')}")
-        self.car_recommender = CarRecommender()
-        # Configure DynamoDB based on environment
-        if os.environ.get('STAGE') == 'dev':
-            self.dynamodb = boto3.resource(
-                'dynamodb',
-                endpoint_url='http://localhost:8000',
-                region_name='us-east-1',
-                aws_access_key_id='dummy',
-                aws_secret_access_key='dummy'
-            )
-        else:
-            self.dynamodb = boto3.resource('dynamodb')
-            
+        self.car_recommender = car_recommender or get_car_recommender()
+        # Shared container resources (local endpoint in dev)
+        self.dynamodb = dynamodb or get_dynamodb()
         self.table = self.dynamodb.Table(self.table_name)
-        print(f"[DEBUG] Using prospects table: {self.table_name}")
+        # Slot calendar: one counter per calendar and hour (calendarId + slotKey)
+        self.slots_table_name = os.environ.get('SLOTS_TABLE', f"kavak-ai-agent-slots-{os.environ.get('STAGE', 'dev')}")
+        self.slots_table = self.dynamodb.Table(self.slots_table_name)
+        self.slot_capacity = int(os.environ.get('SLOT_CAPACITY', '3'))
+        self.calendar_id = os.environ.get('CALENDAR_ID', 'default')
+        # The resource's client serializes plain Python values (no TypeSerializer needed)
+        self.client = self.dynamodb.meta.client
+        # Day-level capacity map cache: date -> (loaded_at, {hour: booked})
+        self.capacity_cache: Dict[str, Tuple[float, Dict[int, int]]] = {}
+        self.capacity_cache_ttl = float(os.environ.get('SLOT_CACHE_TTL_SECONDS', '30'))
+        logger.debug("Using prospects table: %s", self.table_name)
 
+    def _booked_by_day(self, dates: List[str]) -> Dict[str, Dict[int, int]]:
+        """
+        Gets the booked count per hour for each date, using the cached
+        capacity map. Stale or missing dates are loaded with a single query
+        over their date range.
+
+        Args:
+            dates: Dates (YYYY-MM-DD) in chronological order
+
+        Returns:
+            Dictionary date -> {hour: booked appointments}
+        """
+        now = time.time()
+        stale = [
+            date for date in dates
+            if date not in self.capacity_cache or now - self.capacity_cache[date][0] > self.capacity_cache_ttl
+        ]
+        if stale:
+            loaded: Dict[str, Dict[int, int]] = {date: {} for date in stale}
+            query_params = {
+                "KeyConditionExpression": "calendarId = :cal AND slotKey BETWEEN :first AND :last",
+                "ExpressionAttributeValues": {
+                    ":cal": self.calendar_id,
+                    ":first": _slot_key(min(stale), 0),
+                    ":last": _slot_key(max(stale), 23)
+                },
+                "ProjectionExpression": "slotKey, booked"
+            }
+            while True:
+                response = self.slots_table.query(**query_params)
+                for item in response.get("Items", []):
+                    date, hour = item["slotKey"].split("#")
+                    if date in loaded:
+                        loaded[date][int(hour)] = int(item.get("booked", 0))
+                if "LastEvaluatedKey" not in response:
+                    break
+                query_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+            for date, hours in loaded.items():
+                self.capacity_cache[date] = (now, hours)
+        return {date: self.capacity_cache[date][1] for date in dates}
+
+    def _available_slots(self, dates: List[str]) -> List[Dict[str, Any]]:
+        """
+        Lists the future slots with remaining capacity within branch hours.
+
+        Args:
+            dates: Dates (YYYY-MM-DD) in chronological order
+
+        Returns:
+            Free slots with date, time and remaining capacity, in chronological order
+        """
+        now = datetime.utcnow()
+        booked = self._booked_by_day(dates)
+        free_slots = []
+        for date in dates:
+            day = datetime.strptime(date, "%Y-%m-%d")
+            opening, closing = BUSINESS_HOURS.get(day.weekday(), (0, 0))
+            for hour in range(opening, closing):
+                if day.replace(hour=hour) <= now:
+                    continue
+                remaining = self.slot_capacity - booked[date].get(hour, 0)
+                if remaining > 0:
+                    free_slots.append({"date": date, "time": f"{hour:02d}:00", "available": remaining})
+        return free_slots
+
+    def _slot_update(self, date: str, hour: int, delta: int, enforce_capacity: bool = True) -> Dict[str, Any]:
+        """
+        Builds the conditional counter update of a slot for TransactWriteItems.
+        Increments are only allowed while there is capacity left; decrements
+        never take the counter below zero.
+
+        Args:
+            date: Slot date (YYYY-MM-DD)
+            hour: Slot hour (0-23)
+            delta: +1 to book, -1 to release
+            enforce_capacity: Reject increments when the hour is full
+
+        Returns:
+            Update action of the transaction
+        """
+        condition = None
+        values = {":delta": delta, ":date": date, ":hour": hour}
+        if delta > 0 and enforce_capacity:
+            condition = "attribute_not_exists(booked) OR booked < :capacity"
+            values[":capacity"] = self.slot_capacity
+        elif delta < 0:
+            condition = "booked >= :minimum"
+            values[":minimum"] = -delta
+        update = {
+            "TableName": self.slots_table_name,
+            "Key": {"calendarId": self.calendar_id, "slotKey": _slot_key(date, hour)},
+            "UpdateExpression": "ADD booked :delta SET slotDate = :date, slotHour = :hour",
+            "ExpressionAttributeValues": values
+        }
+        if condition:
+            update["ConditionExpression"] = condition
+        return {"Update": update}
+
+    @traced("prospect.save_appointment")
     def save_appointment(
         self,
         whatsapp_number: str,
@@ -52,7 +229,9 @@ class ProspectService:
     ) -> Tuple[bool, str]:
         """
         Saves a new appointment for a prospect.
-        First checks availability for the requested date and time.
+        The slot counter is incremented (only if the hour still has capacity)
+        in the same transaction that inserts the appointment, so concurrent
+        bookings cannot overbook an hour.
         
         Args:
             whatsapp_number: Prospect's WhatsApp number
@@ -68,42 +247,37 @@ class ProspectService:
             - message contains success message or error description
         """
         try:
-            print(f"[DEBUG] Intentando guardar cita para {whatsapp_number}")
-            print(f"[DEBUG] Parámetros recibidos:")
-            print(f"  - prospect_name: {prospect_name}")
-            print(f"  - appointment_date: {appointment_date}")
-            print(f"  - appointment_time: {appointment_time}")
-            print(f"  - stock_id: {stock_id}")
-            print(f"  - status: {status}")
-            
-            # First check availability
-            print("[DEBUG] Verificando disponibilidad...")
-            is_available = self.check_availability(appointment_date, appointment_time)
-            if not is_available:
-                print("[DEBUG] No hay disponibilidad para la fecha/hora solicitada")
-                return False, "Lo siento, no hay disponibilidad para la fecha y hora solicitada. Por favor, intenta con otro horario."
-            
-            print("[DEBUG] Horario disponible, procediendo a guardar cita...")
-            
-            timestamp = datetime.utcnow().isoformat()
-            appointment_id = f"{timestamp}#{whatsapp_number}"
-            print(f"[DEBUG] Generated appointment_id: {appointment_id}")
+            logger.debug("Intentando guardar cita para %s", whatsapp_number)
+            logger.debug("Parámetros recibidos:")
+            logger.debug("- prospect_name: %s", prospect_name)
+            logger.debug("- appointment_date: %s", appointment_date)
+            logger.debug("- appointment_time: %s", appointment_time)
+            logger.debug("- stock_id: %s", stock_id)
+            logger.debug("- status: %s", status)
             
             # Convert date and time to datetime for validation
             try:
                 appointment_datetime = datetime.strptime(f"{appointment_date} {appointment_time}", "%Y-%m-%d %H:%M")
-                print(f"[DEBUG] Parsed appointment_datetime: {appointment_datetime.isoformat()}")
+                logger.debug("Parsed appointment_datetime: %s", appointment_datetime.isoformat())
             except ValueError as e:
-                print(f"[ERROR] Error parsing date/time: {str(e)}")
+                logger.error("Error parsing date/time: %s", e)
                 return False, "El formato de fecha u hora no es válido. Por favor, usa el formato YYYY-MM-DD para la fecha y HH:MM para la hora."
             
             # Validate that appointment is in the future
             if appointment_datetime < datetime.utcnow():
-                print("[ERROR] Appointment date must be in the future")
-                print(f"[DEBUG] Current time: {datetime.utcnow().isoformat()}")
-                print(f"[DEBUG] Appointment time: {appointment_datetime.isoformat()}")
+                logger.error("Appointment date must be in the future")
+                logger.debug("Current time: %s", datetime.utcnow().isoformat())
+                logger.debug("Appointment time: %s", appointment_datetime.isoformat())
                 return False, "La fecha y hora de la cita deben ser en el futuro."
             
+            if not _is_business_hour(appointment_datetime):
+                logger.debug("Requested time is outside branch hours")
+                return False, "Ese horario está fuera del horario de atención (L-V 9:00-18:00, S 9:00-14:00)." + self._format_suggestions(appointment_date, appointment_time)
+            
+            timestamp = datetime.utcnow().isoformat()
+            appointment_id = f"{timestamp}#{whatsapp_number}"
+            logger.debug("Generated appointment_id: %s", appointment_id)
+            
             item = {
                 "whatsappNumber": whatsapp_number,
                 "prospectName": prospect_name,
@@ -111,74 +285,125 @@ class ProspectService:
                 "createdAt": timestamp,
                 "appointmentDate": appointment_date,
                 "appointmentTime": appointment_time,
+                "slotKey": _slot_key(appointment_date, appointment_datetime.hour),
+                "statusAppointment": _status_key(status, appointment_date, appointment_time),
                 "stockId": stock_id,
                 "status": status,
                 "lastUpdated": timestamp
             }
             
-            print(f"[DEBUG] Item a guardar: {json.dumps(_convert_decimals(item), ensure_ascii=False)}")
-            print(f"[DEBUG] Usando tabla: {self.table_name}")
+            logger.debug("Item a guardar: %s", payload(_convert_decimals(item)))
+            logger.debug("Usando tabla: %s", self.table_name)
             
-            # Save to DynamoDB
+            # Read the car details while the booking is written
+            car_future = _prefetch_executor.submit(
+                contextvars.copy_context().run, self.car_recommender.get_car_details, stock_id
+            )
+            
+            # Book the slot and insert the appointment in a single transaction:
+            # the conditional increment fails when the hour is already full
             try:
-                response = self.table.put_item(Item=item)
-                print(f"[DEBUG] Respuesta de DynamoDB: {json.dumps(_convert_decimals(response), ensure_ascii=False)}")
-                print("[DEBUG] Appointment saved successfully")
-                
-                car = self.car_recommender.get_car_details(stock_id)
-                car_description = f"{car.get('make', '')} {car.get('model', '')} {car.get('version', '')} {car.get('year', '')}".strip()
-                success_message = f"¡Perfecto, {prospect_name}! Tu cita para ver el {car_description} está confirmada para el {appointment_date} a las {appointment_time}. Nos vemos en Kavak para que puedas conocer tu posible próximo auto. Si tienes alguna pregunta antes de tu cita, no dudes en contactarnos. ¡Te esperamos! 🚗✨"
-                
-                return True, success_message
+                self.client.transact_write_items(TransactItems=[
+                    self._slot_update(appointment_date, appointment_datetime.hour, 1),
+                    {
+                        "Put": {
+                            "TableName": self.table_name,
+                            "Item": item,
+                            "ConditionExpression": "attribute_not_exists(appointmentId)"
+                        }
+                    }
+                ])
+                logger.debug("Appointment saved successfully")
+                self.capacity_cache.pop(appointment_date, None)
             except Exception as e:
-                print(f"[ERROR] Error en put_item: {str(e)}")
-                import traceback
-                print(f"[ERROR] Error traceback: {traceback.format_exc()}")
+                if _cancellation_code(e, 0) == "ConditionalCheckFailed":
+                    logger.debug("No hay disponibilidad para la fecha/hora solicitada")
+                    self.capacity_cache.pop(appointment_date, None)
+                    return False, "Lo siento, no hay disponibilidad para la fecha y hora solicitada." + self._format_suggestions(appointment_date, appointment_time)
+                logger.exception("Error en transact_write_items: %s", e)
                 return False, "Hubo un error al guardar la cita. Por favor, intenta de nuevo."
             
+            car = car_future.result() or {}
+            car_description = f"{car.get('make', '')} {car.get('model', '')} {car.get('version', '')} {car.get('year', '')}".strip()
+            success_message = f"¡Perfecto, {prospect_name}! Tu cita para ver el {car_description} está confirmada para el {appointment_date} a las {appointment_time}. Nos vemos en Kavak para que puedas conocer tu posible próximo auto. Si tienes alguna pregunta antes de tu cita, no dudes en contactarnos. ¡Te esperamos! 🚗✨"
+            
+            return True, success_message
+            
         except Exception as e:
-            print(f"[ERROR] Error saving appointment: {str(e)}")
-            import traceback
-            print(f"[ERROR] Error traceback: {traceback.format_exc()}")
+            logger.exception("Error saving appointment: %s", e)
             return False, "Hubo un error al procesar tu solicitud. Por favor, intenta de nuevo."
 
+    @traced("prospect.get_appointments")
     def get_prospect_appointments(
         self,
         whatsapp_number: str,
-        status: Optional[str] = None
-    ) -> List[Dict[str, Any]]:
+        status: Optional[str] = None,
+        limit: int = 10,
+        next_token: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
-        Gets a prospect's appointments.
+        Gets a prospect's appointments, one page at a time, with the car
+        details hydrated in a single BatchGetItem.
+        Filtering by status uses the WhatsappStatusIndex key
+        (status#date time), so no items are read and discarded.
         
         Args:
             whatsapp_number: Prospect's WhatsApp number
             status: Filter by status (optional)
+            limit: Maximum number of appointments in the page
+            next_token: Token returned by the previous page (optional)
             
         Returns:
-            List of prospect's appointments
+            Dictionary with the compact appointments and next_token (None on
+            the last page)
         """
         try:
-            # Build query parameters
-            query_params = {
+            query_params: Dict[str, Any] = {
                 "KeyConditionExpression": "whatsappNumber = :num",
                 "ExpressionAttributeValues": {":num": whatsapp_number},
-                "ScanIndexForward": False  # Descending order (most recent first)
+                "Limit": max(1, min(int(limit), 50))
             }
-            
-            # Only add filter expression if status is provided
             if status:
-                query_params["FilterExpression"] = "status = :status"
-                query_params["ExpressionAttributeValues"][":status"] = status
+                # Appointments with that status, in date order
+                query_params["IndexName"] = "WhatsappStatusIndex"
+                query_params["KeyConditionExpression"] += " AND begins_with(statusAppointment, :prefix)"
+                query_params["ExpressionAttributeValues"][":prefix"] = f"{status}#"
+            else:
+                query_params["ScanIndexForward"] = False  # Descending order (most recent first)
+            exclusive_start_key = _decode_token(next_token)
+            if exclusive_start_key:
+                query_params["ExclusiveStartKey"] = exclusive_start_key
             
-            # Query appointments
             response = self.table.query(**query_params)
+            items = _convert_decimals(response.get("Items", []))
             
-            return _convert_decimals(response.get("Items", []))
+            cars = self.car_recommender.get_cars_details(
+                [item.get("stockId") for item in items],
+                fields=APPOINTMENT_CAR_FIELDS
+            )
+            appointments = [
+                {
+                    "appointmentId": item["appointmentId"],
+                    "date": item.get("appointmentDate"),
+                    "time": item.get("appointmentTime"),
+                    "status": item.get("status"),
+                    "prospectName": item.get("prospectName"),
+                    "stockId": item.get("stockId"),
+                    "car": cars.get(str(item.get("stockId")))
+                }
+                for item in items
+            ]
+            
+            return {
+                "appointments": appointments,
+                "next_token": _encode_token(response.get("LastEvaluatedKey"))
+            }
             
         except Exception as e:
-            print(f"[ERROR] Error getting appointments: {str(e)}")
-            return []
+            logger.error("Error getting appointments: %s", e)
+            return {"appointments": [], "next_token": None}
 
+    @traced("prospect.update_appointment_status")
     def update_appointment_status(
         self,
         whatsapp_number: str,
@@ -200,29 +425,74 @@ class ProspectService:
             # Validate status
             valid_statuses = ["pending", "confirmed", "cancelled", "completed"]
             if new_status not in valid_statuses:
-                print(f"[ERROR] Invalid status: {new_status}")
+                logger.error("Invalid status: %s", new_status)
                 return False
             
-            # Update status
-            self.table.update_item(
-                Key={
-                    "whatsappNumber": whatsapp_number,
-                    "appointmentId": appointment_id
-                },
-                UpdateExpression="SET status = :status, lastUpdated = :time",
-                ExpressionAttributeValues={
-                    ":status": new_status,
-                    ":time": datetime.utcnow().isoformat()
-                }
-            )
+            key = {
+                "whatsappNumber": whatsapp_number,
+                "appointmentId": appointment_id
+            }
+            now = datetime.utcnow().isoformat()
+            
+            current = self.table.get_item(Key=key, ConsistentRead=True).get("Item")
+            if not current:
+                logger.error("Appointment not found: %s", appointment_id)
+                return False
+            old_status = current.get("status")
+            status_key = _status_key(new_status, current["appointmentDate"], current["appointmentTime"])
+            
+            # Cancelling releases the slot; reactivating a cancelled one books it again.
+            # Appointments without slotKey predate the slot counters and never
+            # incremented one (see backfill_slot_counters)
+            delta = 0
+            if new_status == "cancelled" and old_status != "cancelled" and current.get("slotKey"):
+                delta = -1
+            elif old_status == "cancelled" and new_status != "cancelled":
+                delta = 1
             
-            print(f"[DEBUG] Appointment status updated successfully to: {new_status}")
+            if delta == 0:
+                self.table.update_item(
+                    Key=key,
+                    UpdateExpression="SET #st = :status, statusAppointment = :status_key, lastUpdated = :time",
+                    ExpressionAttributeNames={"#st": "status"},
+                    ExpressionAttributeValues={
+                        ":status": new_status,
+                        ":status_key": status_key,
+                        ":time": now
+                    }
+                )
+            else:
+                hour = int(current["appointmentTime"].split(":")[0])
+                self.client.transact_write_items(TransactItems=[
+                    self._slot_update(current["appointmentDate"], hour, delta),
+                    {
+                        "Update": {
+                            "TableName": self.table_name,
+                            "Key": key,
+                            "UpdateExpression": "SET #st = :status, statusAppointment = :status_key, lastUpdated = :time, slotKey = :slot_key",
+                            # Guards against a concurrent status change between the read and the write
+                            "ConditionExpression": "#st = :old_status",
+                            "ExpressionAttributeNames": {"#st": "status"},
+                            "ExpressionAttributeValues": {
+                                ":status": new_status,
+                                ":status_key": status_key,
+                                ":time": now,
+                                ":old_status": old_status,
+                                ":slot_key": _slot_key(current["appointmentDate"], hour)
+                            }
+                        }
+                    }
+                ])
+                self.capacity_cache.pop(current["appointmentDate"], None)
+            
+            logger.debug("Appointment status updated successfully to: %s", new_status)
             return True
             
         except Exception as e:
-            print(f"[ERROR] Error updating appointment status: {str(e)}")
+            logger.error("Error updating appointment status: %s", e)
             return False
 
+    @traced("prospect.check_availability")
     def check_availability(
         self,
         date: str,
@@ -239,27 +509,170 @@ class ProspectService:
             True if available
         """
         try:
-            # Query appointments for date and time using the DateStatusIndex
-            # Use expression attribute names for both date and status to avoid reserved keywords
-            response = self.table.query(
-                IndexName="DateStatusIndex",
-                KeyConditionExpression="#dt = :date AND #st = :status",
-                FilterExpression="#tm = :time",
-                ExpressionAttributeValues={
-                    ":date": date,
-                    ":time": time,
-                    ":status": "confirmed"
-                },
-                ExpressionAttributeNames={
-                    "#dt": "appointmentDate",  # Map 'appointmentDate' to '#dt'
-                    "#st": "status",          # Map 'status' to '#st'
-                    "#tm": "appointmentTime"  # Map 'appointmentTime' to '#tm'
-                }
-            )
+            moment = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
+            if not _is_business_hour(moment):
+                return False
             
-            # For now, allow maximum 3 appointments per hour
-            return len(response.get("Items", [])) < 3
+            # Single read of the slot counter (one item per date and hour)
+            response = self.slots_table.get_item(
+                Key={"calendarId": self.calendar_id, "slotKey": _slot_key(date, moment.hour)},
+                ConsistentRead=True
+            )
+            booked = int(response.get("Item", {}).get("booked", 0))
+            return booked < self.slot_capacity
             
         except Exception as e:
-            print(f"[ERROR] Error checking availability: {str(e)}")
+            logger.error("Error checking availability: %s", e)
             return False
+
+    @traced("prospect.get_free_slots")
+    def get_free_slots(
+        self,
+        days: int = 7,
+        start_date: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Gets the free appointment slots for the next N days with (at most)
+        a single query over the slot calendar.
+        
+        Args:
+            days: Number of days to cover (including the start date)
+            start_date: First date (YYYY-MM-DD); defaults to today
+            
+        Returns:
+            List of free slots with date, time and remaining capacity, in chronological order
+        """
+        try:
+            first_day = datetime.strptime(start_date, "%Y-%m-%d") if start_date else datetime.utcnow()
+            dates = [(first_day + timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(max(1, days))]
+            return self._available_slots(dates)
+            
+        except Exception as e:
+            logger.error("Error getting free slots: %s", e)
+            return []
+
+    @traced("prospect.suggest_slots")
+    def suggest_slots(
+        self,
+        appointment_date: str,
+        appointment_time: str = "12:00",
+        count: int = 3,
+        window_days: int = 3
+    ) -> List[Dict[str, Any]]:
+        """
+        Suggests the K free slots closest to a requested date and time,
+        within branch hours and the per-hour capacity.
+        
+        Args:
+            appointment_date: Requested date (YYYY-MM-DD)
+            appointment_time: Requested time (HH:MM)
+            count: Number of suggestions (K)
+            window_days: Days before and after the requested date to consider
+            
+        Returns:
+            Up to K free slots with date, time and remaining capacity, closest first
+        """
+        try:
+            requested = datetime.strptime(f"{appointment_date} {appointment_time}", "%Y-%m-%d %H:%M")
+            dates = [
+                (requested + timedelta(days=offset)).strftime("%Y-%m-%d")
+                for offset in range(-window_days, window_days + 1)
+            ]
+            candidates = self._available_slots(dates)
+            
+            def distance(slot: Dict[str, Any]) -> Tuple[float, str]:
+                moment = datetime.strptime(f"{slot['date']} {slot['time']}", "%Y-%m-%d %H:%M")
+                # Ties go to the earlier slot
+                return abs((moment - requested).total_seconds()), f"{slot['date']} {slot['time']}"
+            
+            return sorted(candidates, key=distance)[:max(1, count)]
+            
+        except Exception as e:
+            logger.error("Error suggesting slots: %s", e)
+            return []
+
+    def _format_suggestions(self, appointment_date: str, appointment_time: str) -> str:
+        """
+        Builds the sentence with nearby free slots for a rejected booking.
+        
+        Args:
+            appointment_date: Requested date (YYYY-MM-DD)
+            appointment_time: Requested time (HH:MM)
+            
+        Returns:
+            Sentence with suggestions, or an empty string if there are none
+        """
+        suggestions = self.suggest_slots(appointment_date, appointment_time)
+        if not suggestions:
+            return ""
+        options = ", ".join(f"{slot['date']} a las {slot['time']}" for slot in suggestions)
+        return f" Horarios disponibles más cercanos: {options}."
+
+    def backfill_slot_counters(self, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Counts in the slot calendar the future pending and confirmed
+        appointments created before the slot counters existed (those without
+        slotKey). Each appointment is counted in its own transaction that
+        increments its slot and sets slotKey, so the backfill can run while
+        bookings are live and can be re-run without counting twice.
+
+        Args:
+            dry_run: Only count the appointments, without writing
+
+        Returns:
+            Statistics: scanned, counted, already_counted, skipped (past,
+            cancelled or completed) and failed
+        """
+        stats = {"scanned": 0, "counted": 0, "already_counted": 0, "skipped": 0, "failed": 0}
+        now = datetime.utcnow()
+        scan_params: Dict[str, Any] = {}
+        while True:
+            response = self.table.scan(**scan_params)
+            for item in response.get("Items", []):
+                stats["scanned"] += 1
+                if item.get("slotKey"):
+                    stats["already_counted"] += 1
+                    continue
+                status = item.get("status")
+                try:
+                    moment = datetime.strptime(f"{item['appointmentDate']} {item['appointmentTime']}", "%Y-%m-%d %H:%M")
+                except (KeyError, ValueError):
+                    stats["skipped"] += 1
+                    continue
+                if status not in ("pending", "confirmed") or moment <= now:
+                    stats["skipped"] += 1
+                    continue
+                if dry_run:
+                    stats["counted"] += 1
+                    continue
+
+                try:
+                    self.client.transact_write_items(TransactItems=[
+                        # Existing appointments are counted even if the hour is already full
+                        self._slot_update(item["appointmentDate"], moment.hour, 1, enforce_capacity=False),
+                        {
+                            "Update": {
+                                "TableName": self.table_name,
+                                "Key": {"whatsappNumber": item["whatsappNumber"], "appointmentId": item["appointmentId"]},
+                                "UpdateExpression": "SET slotKey = :slot_key",
+                                # Skips appointments counted or cancelled since the scan
+                                "ConditionExpression": "attribute_not_exists(slotKey) AND #st = :status",
+                                "ExpressionAttributeNames": {"#st": "status"},
+                                "ExpressionAttributeValues": {
+                                    ":slot_key": _slot_key(item["appointmentDate"], moment.hour),
+                                    ":status": status
+                                }
+                            }
+                        }
+                    ])
+                    stats["counted"] += 1
+                    self.capacity_cache.pop(item["appointmentDate"], None)
+                except Exception as e:
+                    if _cancellation_code(e, 1) == "ConditionalCheckFailed":
+                        stats["already_counted"] += 1
+                    else:
+                        stats["failed"] += 1
+                        logger.error("Error counting appointment %s: %s", item["appointmentId"], e)
+            if "LastEvaluatedKey" not in response:
+                return stats
+            scan_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
@@ -0,0 +1,217 @@
+import os
+import math
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from core.services.container import get_openai_client
+from core.services.car_recommender import EmbeddingModel, LEGACY_EMBEDDING_MODEL
+from core.utils.text_processing import normalize_text, is_faq_query
+from core.utils.logger import get_logger
+from core.utils.tracing import record_usage
+
+logger = get_logger(__name__)
+
+class SemanticResponseCache:
+    """
+    Caché en memoria de respuestas a preguntas frecuentes, indexada por el
+    embedding de la pregunta. Vive mientras el contenedor de Lambda siga caliente.
+    """
+
+    def __init__(
+        self,
+        client: Any = None,
+        threshold: Optional[float] = None,
+        ttl_seconds: Optional[int] = None,
+        max_entries: Optional[int] = None
+    ):
+        """
+        Inicializa la caché.
+
+        Args:
+            client: Cliente de OpenAI para obtener embeddings (por defecto el compartido)
+            threshold: Similitud coseno mínima para considerar un acierto
+            ttl_seconds: Tiempo de vida de cada respuesta
+            max_entries: Número máximo de respuestas (se desalojan las menos usadas)
+        """
+        self.client = client or get_openai_client()
+        self.enabled = os.environ.get("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.threshold = threshold if threshold is not None else float(os.environ.get("RESPONSE_CACHE_THRESHOLD", "0.95"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+        self.max_entries = max_entries if max_entries is not None else int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "128"))
+        # Los vectores solo se comparan entre sí, no con el índice del catálogo
+        self.embedding_model = EmbeddingModel.parse(
+            os.environ.get("RESPONSE_CACHE_EMBEDDING_MODEL", LEGACY_EMBEDDING_MODEL)
+        )
+        self.namespace = ""
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "saved_seconds": 0.0
+        }
+
+    def _check_namespace(self, system_prompt: str) -> None:
+        """
+        Invalida la caché si cambió el system prompt o el modelo.
+
+        Args:
+            system_prompt: System prompt vigente
+        """
+        source = f"{os.environ.get('MODEL_NAME', 'gpt-4-turbo-preview')}\n{system_prompt}"
+        namespace = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+        if namespace != self.namespace:
+            if self.entries:
+                logger.debug("System prompt cambió, invalidando %s respuestas en caché", len(self.entries))
+                self.stats["invalidations"] += 1
+            self.entries.clear()
+            self.namespace = namespace
+
+    def _expire(self) -> None:
+        """Elimina las respuestas que superaron su TTL."""
+        now = time.time()
+        expired = [key for key, entry in self.entries.items() if now - entry["created_at"] > self.ttl_seconds]
+        for key in expired:
+            del self.entries[key]
+
+    def is_cacheable(self, message: str, conversation_context: List[Dict[str, str]]) -> bool:
+        """
+        Indica si la pregunta puede responderse desde la caché.
+        Solo aplica a preguntas frecuentes no personales fuera del primer contacto
+        (la respuesta del primer contacto incluye el saludo).
+
+        Args:
+            message: Mensaje del usuario
+            conversation_context: Contexto de la conversación
+
+        Returns:
+            True si se debe consultar la caché
+        """
+        if not self.enabled:
+            return False
+        if not any(msg.get("role") in ("user", "assistant") for msg in conversation_context):
+            return False
+        return is_faq_query(message)
+
+    def embed(self, message: str) -> List[float]:
+        """
+        Obtiene el embedding normalizado (norma 1) de la pregunta.
+
+        Args:
+            message: Mensaje del usuario
+
+        Returns:
+            Embedding normalizado o lista vacía si hubo un error
+        """
+        try:
+            response = self.client.embeddings.create(
+                input=normalize_text(message),
+                **self.embedding_model.request_params()
+            )
+            record_usage(response.usage)
+            embedding = response.data[0].embedding
+            norm = math.sqrt(sum(x * x for x in embedding)) or 1.0
+            return [x / norm for x in embedding]
+        except Exception as e:
+            logger.error("Error al obtener embedding para la caché: %s", e)
+            return []
+
+    def lookup(self, embedding: List[float], system_prompt: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca una respuesta para una pregunta similar.
+
+        Args:
+            embedding: Embedding normalizado de la pregunta
+            system_prompt: System prompt vigente
+
+        Returns:
+            Entrada con la respuesta (answer, question, similarity, cost_seconds) o None
+        """
+        self._check_namespace(system_prompt)
+        self._expire()
+        if not embedding:
+            return None
+
+        best_key, best_score = None, 0.0
+        for key, entry in self.entries.items():
+            score = sum(a * b for a, b in zip(embedding, entry["embedding"]))
+            if score > best_score:
+                best_key, best_score = key, score
+
+        if best_key is None or best_score < self.threshold:
+            self.stats["misses"] += 1
+            logger.debug("Caché de respuestas: fallo (mejor similitud %.3f)", best_score)
+            return None
+
+        # Marcar como usada recientemente
+        self.entries.move_to_end(best_key)
+        entry = self.entries[best_key]
+        entry["hits"] += 1
+        self.stats["hits"] += 1
+        logger.debug("Caché de respuestas: acierto (similitud %.3f) para '%s'", best_score, entry['question'])
+        return {**entry, "similarity": best_score}
+
+    def store(
+        self,
+        message: str,
+        embedding: List[float],
+        answer: str,
+        system_prompt: str,
+        cost_seconds: float
+    ) -> None:
+        """
+        Guarda la respuesta del LLM a una pregunta frecuente.
+
+        Args:
+            message: Pregunta del usuario
+            embedding: Embedding normalizado de la pregunta
+            answer: Respuesta del agente
+            system_prompt: System prompt con el que se generó la respuesta
+            cost_seconds: Duración del turno que generó la respuesta
+        """
+        if not embedding or not answer:
+            return
+        self._check_namespace(system_prompt)
+
+        key = hashlib.sha256(normalize_text(message).encode("utf-8")).hexdigest()[:16]
+        self.entries[key] = {
+            "question": message,
+            "embedding": embedding,
+            "answer": answer,
+            "cost_seconds": cost_seconds,
+            "created_at": time.time(),
+            "hits": 0
+        }
+        self.entries.move_to_end(key)
+        self.stats["stores"] += 1
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def record_hit_latency(self, cost_seconds: float, elapsed: float) -> None:
+        """
+        Acumula la latencia ahorrada por un acierto y reporta las métricas.
+
+        Args:
+            cost_seconds: Duración del turno que generó la respuesta original
+            elapsed: Duración del turno atendido desde la caché
+        """
+        self.stats["saved_seconds"] += max(0.0, cost_seconds - elapsed)
+        self.report()
+
+    def report(self) -> None:
+        """Registra las métricas acumuladas de la caché."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        hit_rate = self.stats["hits"] / lookups if lookups else 0.0
+        logger.info(
+            "Caché de respuestas: %d aciertos, %d fallos (%.0f%%), ahorro %.0f ms",
+            self.stats["hits"],
+            self.stats["misses"],
+            hit_rate * 100,
+            self.stats["saved_seconds"] * 1000,
+            extra={"metrics": {**self.stats, "hit_rate": hit_rate, "entries": len(self.entries)}}
+        )
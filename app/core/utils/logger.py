@@ -0,0 +1,110 @@
+import os
+import sys
+import json
+import random
+import logging
+import contextvars
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+# Contexto de la invocación actual (correlation id, conversación, muestreo)
+_log_context: contextvars.ContextVar = contextvars.ContextVar("log_context", default={})
+_payloads_sampled: contextvars.ContextVar = contextvars.ContextVar("payloads_sampled", default=False)
+
+# Atributos estándar de LogRecord que no se copian como campos extra
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+ROOT_LOGGER_NAME = "kavak"
+
+class LazyJson:
+    """
+    Serializa un objeto a JSON solo si el registro llega a formatearse
+    (el nivel está habilitado), evitando json.dumps en los registros descartados.
+    """
+
+    def __init__(self, obj: Any):
+        self.obj = obj
+
+    def __str__(self) -> str:
+        try:
+            return json.dumps(self.obj, ensure_ascii=False, default=str)
+        except Exception:
+            return repr(self.obj)
+
+class JsonFormatter(logging.Formatter):
+    """Formatea los registros como una línea JSON para CloudWatch Logs Insights."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        entry.update(_log_context.get())
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def _configure_root() -> logging.Logger:
+    """Configura una sola vez el logger raíz de la aplicación."""
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    if not getattr(root, "_kavak_configured", False):
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JsonFormatter())
+        root.addHandler(handler)
+        # Evitar que el handler de Lambda duplique los registros
+        root.propagate = False
+        root._kavak_configured = True
+    root.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+    return root
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Obtiene un logger de la aplicación. El nivel se controla con LOG_LEVEL
+    (DEBUG, INFO, WARNING, ERROR; INFO por defecto).
+
+    Args:
+        name: Nombre del módulo (normalmente __name__)
+
+    Returns:
+        Logger que escribe registros JSON estructurados
+    """
+    _configure_root()
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}")
+
+def set_correlation_id(correlation_id: Optional[str], **fields: Any) -> None:
+    """
+    Asocia los registros de la invocación actual a un correlation id (MessageSid
+    o conversación) y decide si se registran los payloads detallados.
+    La fracción de invocaciones con payloads se controla con LOG_PAYLOAD_SAMPLE_RATE.
+
+    Args:
+        correlation_id: Identificador de correlación
+        **fields: Campos adicionales para todos los registros (ej: conversation_id)
+    """
+    context = {key: value for key, value in fields.items() if value is not None}
+    if correlation_id:
+        context["correlation_id"] = correlation_id
+    _log_context.set(context)
+    sample_rate = float(os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", "0.1"))
+    _payloads_sampled.set(random.random() < sample_rate)
+
+def payload(obj: Any) -> Any:
+    """
+    Prepara un payload voluminoso (prompts, contexto, resultados de herramientas)
+    para registrarlo con un argumento %s: se serializa de forma perezosa y solo
+    en las invocaciones muestreadas.
+
+    Args:
+        obj: Objeto a registrar
+
+    Returns:
+        LazyJson del objeto, o un marcador si la invocación no fue muestreada
+    """
+    if not _payloads_sampled.get():
+        return "<omitido por muestreo>"
+    return LazyJson(obj)
@@ -0,0 +1,258 @@
+import os
+import time
+import json
+import random
+import threading
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional
+
+from core.utils.logger import get_logger
+from core.utils.tracing import emit_metric
+
+logger = get_logger(__name__)
+
+# Errores de OpenAI que vale la pena reintentar (además de los de conexión)
+RETRYABLE_STATUS = {408, 409, 429}
+
+def estimate_request_tokens(operation: str, params: Dict[str, Any]) -> int:
+    """
+    Estima los tokens de una llamada antes de hacerla (misma heurística que
+    PromptOptimizer: palabras * 1.3). Al terminar se corrige con el uso real.
+
+    Args:
+        operation: "chat" o "embeddings"
+        params: Parámetros de la llamada
+
+    Returns:
+        Tokens estimados (entrada más max_tokens de salida en chat)
+    """
+    if operation == "embeddings":
+        inputs = params.get("input", "")
+        texts = [inputs] if isinstance(inputs, str) else inputs
+        return max(1, int(sum(len(str(text).split()) for text in texts) * 1.3))
+
+    words = 0
+    for message in params.get("messages", []):
+        content = message.get("content") if isinstance(message, dict) else getattr(message, "content", None)
+        words += len(str(content or "").split())
+    if params.get("tools"):
+        words += len(json.dumps(params["tools"]).split())
+    return max(1, int(words * 1.3) + int(params.get("max_tokens") or 0))
+
+class TokenBucket:
+    """
+    Cubeta de tokens que se rellena de forma continua (capacidad de un
+    minuto). Las reservas pueden dejar el saldo en negativo: quien reserva
+    espera a que se recupere, así las llamadas se atienden en orden de llegada.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """
+        Reserva amount (como máximo la capacidad).
+
+        Returns:
+            Segundos a esperar antes de usar la reserva
+        """
+        self._refill(now)
+        self.available -= min(amount, self.capacity)
+        return max(0.0, -self.available / self.rate)
+
+    def adjust(self, amount: float, now: float) -> None:
+        """Corrige una reserva (positivo consume más, negativo devuelve)."""
+        self._refill(now)
+        self.available = min(self.capacity, self.available - amount)
+
+class RateLimiter:
+    """
+    Limita las llamadas a OpenAI por solicitudes por minuto (RPM), tokens
+    por minuto (TPM) y llamadas simultáneas. Los límites son por contenedor
+    de Lambda: configúralos como la cuota de la organización dividida entre
+    los contenedores que la comparten.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, max_concurrency: int):
+        """
+        Inicializa el limitador.
+
+        Args:
+            requests_per_minute: Solicitudes por minuto (0 = sin límite)
+            tokens_per_minute: Tokens por minuto (0 = sin límite)
+            max_concurrency: Llamadas simultáneas
+        """
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """Crea el limitador con OPENAI_RPM, OPENAI_TPM y OPENAI_MAX_CONCURRENCY."""
+        return cls(
+            requests_per_minute=float(os.environ.get("OPENAI_RPM", "3000")),
+            tokens_per_minute=float(os.environ.get("OPENAI_TPM", "1000000")),
+            max_concurrency=int(os.environ.get("OPENAI_MAX_CONCURRENCY", "16"))
+        )
+
+    def wait_for_capacity(self, tokens: int) -> float:
+        """
+        Reserva una solicitud y tokens, esperando si no hay cupo.
+
+        Args:
+            tokens: Tokens estimados de la llamada
+
+        Returns:
+            Segundos esperados
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self.requests:
+                wait = max(wait, self.requests.reserve(1, now))
+            if self.tokens:
+                wait = max(wait, self.tokens.reserve(tokens, now))
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def correct_tokens(self, delta: int) -> None:
+        """Corrige la reserva de tokens con el uso real de la llamada."""
+        if self.tokens and delta:
+            with self._lock:
+                self.tokens.adjust(delta, time.monotonic())
+
+def _is_retryable(error: Exception) -> bool:
+    """Indica si un error de OpenAI es temporal (límite, 5xx o conexión)."""
+    if getattr(error, "code", None) == "insufficient_quota":
+        return False
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+def _retry_delay(error: Exception, attempt: int, base_seconds: float, max_seconds: float) -> float:
+    """
+    Calcula la espera antes de reintentar: Retry-After si OpenAI lo indica,
+    si no backoff exponencial con jitter.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value:
+            try:
+                return min(max_seconds, max(0.0, float(value) * scale))
+            except ValueError:
+                continue
+    return random.uniform(0, min(max_seconds, base_seconds * 2 ** attempt))
+
+class _Endpoint:
+    """Expone create() de un endpoint del cliente pasando por el limitador."""
+
+    def __init__(self, owner: "RateLimitedOpenAI", operation: str, create: Callable[..., Any]):
+        self._owner = owner
+        self._operation = operation
+        self._create = create
+
+    def create(self, **params: Any) -> Any:
+        return self._owner.call(self._operation, self._create, params)
+
+class RateLimitedOpenAI:
+    """
+    Envoltura del cliente de OpenAI compartida por todos los servicios:
+    chat.completions.create y embeddings.create esperan cupo en el
+    limitador, respetan el máximo de llamadas simultáneas y reintentan los
+    errores temporales con backoff (honrando Retry-After). El resto de los
+    atributos se delegan al cliente original.
+    """
+
+    def __init__(self, client: Any, limiter: Optional[RateLimiter] = None, max_retries: Optional[int] = None):
+        """
+        Inicializa la envoltura.
+
+        Args:
+            client: Cliente de OpenAI (idealmente con max_retries=0)
+            limiter: Limitador (por defecto se configura con variables de entorno)
+            max_retries: Reintentos por llamada (por defecto OPENAI_MAX_RETRIES)
+        """
+        self._client = client
+        self.limiter = limiter or RateLimiter.from_env()
+        self.max_retries = int(os.environ.get("OPENAI_MAX_RETRIES", "5")) if max_retries is None else max_retries
+        self.backoff_base_seconds = float(os.environ.get("OPENAI_BACKOFF_BASE_SECONDS", "0.5"))
+        self.backoff_max_seconds = float(os.environ.get("OPENAI_BACKOFF_MAX_SECONDS", "30"))
+        self.chat = SimpleNamespace(completions=_Endpoint(self, "chat", client.chat.completions.create))
+        self.embeddings = _Endpoint(self, "embeddings", client.embeddings.create)
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "failed": 0, "wait_seconds": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    def _count(self, **increments: float) -> None:
+        with self._stats_lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def call(self, operation: str, create: Callable[..., Any], params: Dict[str, Any]) -> Any:
+        """
+        Ejecuta una llamada a OpenAI con el limitador y los reintentos.
+
+        Args:
+            operation: "chat" o "embeddings" (dimensión de las métricas)
+            create: Método create del cliente original
+            params: Parámetros de la llamada
+
+        Returns:
+            Respuesta de OpenAI
+
+        Raises:
+            Exception: El último error si no es temporal o se agotan los reintentos
+        """
+        estimated = estimate_request_tokens(operation, params)
+        attempt = 0
+        while True:
+            waited = self.limiter.wait_for_capacity(estimated)
+            if waited:
+                self._count(wait_seconds=waited)
+                emit_metric("OpenAIRateLimitWait", round(waited * 1000, 1), "Milliseconds", Operation=operation)
+
+            error: Optional[Exception] = None
+            with self.limiter.slots:
+                try:
+                    response = create(**params)
+                except Exception as e:
+                    error = e
+
+            if error is None:
+                usage = getattr(response, "usage", None)
+                if getattr(usage, "total_tokens", None):
+                    self.limiter.correct_tokens(int(usage.total_tokens) - estimated)
+                self._count(requests=1)
+                return response
+
+            throttled = getattr(error, "status_code", None) == 429
+            if throttled:
+                self._count(throttled=1)
+            if not _is_retryable(error) or attempt >= self.max_retries:
+                self._count(failed=1)
+                emit_metric("OpenAIErrors", 1, Operation=operation)
+                raise error
+
+            delay = _retry_delay(error, attempt, self.backoff_base_seconds, self.backoff_max_seconds)
+            attempt += 1
+            self._count(retries=1)
+            emit_metric("OpenAIRetries", 1, Operation=operation, Reason="throttled" if throttled else "error")
+            logger.warning(
+                "OpenAI %s falló (%s); reintento %s/%s en %.2fs",
+                operation, error, attempt, self.max_retries, delay
+            )
+            time.sleep(delay)
+
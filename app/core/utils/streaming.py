@@ -0,0 +1,205 @@
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from core.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PARAGRAPH_SEPARATOR = "\n\n"
+
+def is_streaming_enabled() -> bool:
+    """
+    Indica si el modo streaming está activado (STREAM_RESPONSES=true).
+
+    Returns:
+        True si se deben consumir las respuestas con stream=True
+    """
+    return os.environ.get("STREAM_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+class StreamingDelivery:
+    """
+    Entrega anticipada de una respuesta en streaming, cortando en párrafos.
+
+    El primer párrafo completo se envía en cuanto llega; los siguientes se
+    agrupan hasta alcanzar min_chunk_chars. Lo que no se alcanzó a enviar
+    queda pendiente para SendResponse.
+    """
+
+    def __init__(
+        self,
+        to_number: str,
+        send: Optional[Callable[[str, str], Any]] = None,
+        min_chunk_chars: Optional[int] = None
+    ):
+        """
+        Inicializa la entrega para un destinatario.
+
+        Args:
+            to_number: Número de WhatsApp del destinatario
+            send: Función de envío (to_number, body); por defecto Twilio
+            min_chunk_chars: Tamaño mínimo de los envíos posteriores al primero
+        """
+        if send is None:
+            from core.utils.whatsapp_sender import send_whatsapp_message
+            send = send_whatsapp_message
+        self.to_number = to_number
+        self.send = send
+        self.min_chunk_chars = (
+            min_chunk_chars if min_chunk_chars is not None
+            else int(os.environ.get("STREAM_MIN_CHUNK_CHARS", "300"))
+        )
+        self.text = ""          # Texto acumulado (streams previos entregados + stream actual)
+        self.stream_start = 0   # Índice donde empieza el stream actual
+        self.sent_upto = 0      # Índice hasta donde ya se entregó
+        self.stopped = False
+        self.chunks: List[str] = []
+
+    def begin_stream(self) -> None:
+        """Prepara la entrega para una nueva respuesta en streaming."""
+        if self.sent_upto == 0:
+            # Nada entregado: descartar el texto del stream anterior
+            self.text = ""
+        else:
+            # El usuario ya vio parte del texto anterior; conservarlo
+            self.text = self.text.rstrip() + PARAGRAPH_SEPARATOR
+        self.stream_start = len(self.text)
+        self.stopped = False
+
+    def stop(self) -> None:
+        """Detiene la entrega anticipada (ej: el modelo pidió herramientas)."""
+        self.stopped = True
+
+    def feed(self, delta: str) -> None:
+        """
+        Agrega un fragmento del stream y envía los párrafos completos.
+
+        Args:
+            delta: Fragmento de texto recibido
+        """
+        self.text += delta
+        if self.stopped:
+            return
+
+        boundary = self.text.rfind(PARAGRAPH_SEPARATOR, self.sent_upto)
+        if boundary <= self.sent_upto:
+            return
+
+        chunk = self.text[self.sent_upto:boundary].strip()
+        if not chunk:
+            self.sent_upto = boundary + len(PARAGRAPH_SEPARATOR)
+            return
+        if self.chunks and len(chunk) < self.min_chunk_chars:
+            return
+
+        try:
+            self.send(self.to_number, chunk)
+        except Exception as e:
+            logger.error("Error en entrega anticipada, el resto se enviará al final: %s", e)
+            self.stop()
+            return
+
+        self.chunks.append(chunk)
+        self.sent_upto = boundary + len(PARAGRAPH_SEPARATOR)
+        logger.debug("Entrega anticipada #%s (%s caracteres)", len(self.chunks), len(chunk))
+
+    def stream_text(self) -> str:
+        """Retorna el texto del stream actual."""
+        return self.text[self.stream_start:].strip()
+
+    def compose(self, final_message: str) -> str:
+        """
+        Construye el mensaje completo que recibe el usuario, para persistirlo.
+
+        Args:
+            final_message: Mensaje final del agente
+
+        Returns:
+            Texto entregado anticipadamente más el mensaje final
+        """
+        if self.sent_upto == 0 or not final_message:
+            return final_message
+        if final_message == self.stream_text():
+            return self.text.strip()
+        return self.text.strip() + PARAGRAPH_SEPARATOR + final_message
+
+    def pending_text(self, composed_message: str) -> str:
+        """
+        Retorna la parte del mensaje que aún no se ha entregado.
+
+        Args:
+            composed_message: Mensaje completo (resultado de compose)
+
+        Returns:
+            Texto pendiente para SendResponse
+        """
+        if self.sent_upto == 0 or not composed_message:
+            return composed_message
+        leading = len(self.text) - len(self.text.lstrip())
+        delivered = self.text[leading:self.sent_upto]
+        if not composed_message.startswith(delivered):
+            # El mensaje final no incluye lo entregado (ej: retorno anticipado de MSAT)
+            return composed_message
+        return composed_message[len(delivered):].strip()
+
+def consume_chat_stream(
+    stream: Any,
+    delivery: Optional[StreamingDelivery] = None
+) -> Tuple[Any, Optional[str]]:
+    """
+    Consume una respuesta de chat.completions con stream=True.
+    Reconstruye el contenido y los tool calls, entregando párrafos anticipadamente.
+
+    Args:
+        stream: Iterador de chunks de OpenAI
+        delivery: Entrega anticipada (opcional)
+
+    Returns:
+        Tupla con (mensaje equivalente al de la respuesta sin streaming, finish_reason)
+    """
+    from openai.types.chat import ChatCompletionMessage, ChatCompletionMessageToolCall
+    from openai.types.chat.chat_completion_message_tool_call import Function
+
+    if delivery:
+        delivery.begin_stream()
+
+    content_parts: List[str] = []
+    tool_calls: Dict[int, Dict[str, str]] = {}
+    finish_reason = None
+
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        delta = choice.delta
+
+        if delta.tool_calls:
+            if delivery:
+                delivery.stop()
+            for tool_call in delta.tool_calls:
+                entry = tool_calls.setdefault(tool_call.index, {"id": "", "name": "", "arguments": ""})
+                if tool_call.id:
+                    entry["id"] = tool_call.id
+                if tool_call.function:
+                    entry["name"] += tool_call.function.name or ""
+                    entry["arguments"] += tool_call.function.arguments or ""
+
+        if delta.content:
+            content_parts.append(delta.content)
+            if delivery:
+                delivery.feed(delta.content)
+
+        if choice.finish_reason:
+            finish_reason = choice.finish_reason
+
+    message = ChatCompletionMessage(
+        role="assistant",
+        content="".join(content_parts) or None,
+        tool_calls=[
+            ChatCompletionMessageToolCall(
+                id=entry["id"],
+                type="function",
+                function=Function(name=entry["name"], arguments=entry["arguments"] or "{}")
+            )
+            for _, entry in sorted(tool_calls.items())
+        ] or None
+    )
+    return message, finish_reason
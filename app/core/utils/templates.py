@@ -0,0 +1,299 @@
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from core.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Número máximo de autos a mostrar en una respuesta renderizada
+DEFAULT_MAX_CARS = 5
+
+def _format_money(value: Any) -> str:
+    """
+    Formatea un monto en pesos sin decimales (ej: $325,000).
+
+    Args:
+        value: Monto a formatear
+
+    Returns:
+        Monto formateado
+    """
+    try:
+        return f"${float(value):,.0f}"
+    except (TypeError, ValueError):
+        return str(value)
+
+def _format_km(value: Any) -> str:
+    """
+    Formatea un kilometraje (ej: 77,400 km).
+
+    Args:
+        value: Kilometraje a formatear
+
+    Returns:
+        Kilometraje formateado
+    """
+    try:
+        return f"{float(value):,.0f} km"
+    except (TypeError, ValueError):
+        return str(value)
+
+def _car_title(car: Dict[str, Any]) -> str:
+    """
+    Construye el título de un auto con su stockId entre corchetes, como lo
+    espera el resumen de la conversación.
+
+    Args:
+        car: Diccionario con información del auto
+
+    Returns:
+        Título del auto (ej: [243587] Volkswagen Touareg 3.0 V6 TDI 2018)
+    """
+    year = car.get("year", "")
+    if isinstance(year, float) and year.is_integer():
+        year = int(year)
+    name = " ".join(
+        str(part) for part in (car.get("make"), car.get("model"), car.get("version"), year)
+        if part not in (None, "")
+    )
+    return f"[{car.get('stockId', '')}] {name}".strip()
+
+def _features_line(car: Dict[str, Any]) -> Optional[str]:
+    """
+    Construye la línea de características de conectividad de un auto.
+
+    Args:
+        car: Diccionario con información del auto
+
+    Returns:
+        Línea de características o None si no tiene ninguna
+    """
+    if car.get("bluetooth") and car.get("carPlay"):
+        return "🎵 Bluetooth y CarPlay"
+    if car.get("bluetooth"):
+        return "🎵 Bluetooth"
+    if car.get("carPlay"):
+        return "📱 CarPlay"
+    return None
+
+def render_car_card(car: Dict[str, Any]) -> str:
+    """
+    Renderiza un auto en formato de tarjeta para WhatsApp.
+
+    Args:
+        car: Diccionario con información del auto
+
+    Returns:
+        Tarjeta del auto
+    """
+    lines = [f"🚗 {_car_title(car)}"]
+    if car.get("price") is not None:
+        lines.append(f"💰 {_format_money(car['price'])}")
+    if car.get("km") is not None:
+        lines.append(f"🛣️ {_format_km(car['km'])}")
+    features = _features_line(car)
+    if features:
+        lines.append(features)
+    return "\n".join(lines)
+
+def render_car_list(args: Dict[str, Any], cars: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Renderiza los resultados de search_by_make_model y search_by_price_range.
+
+    Args:
+        args: Argumentos con los que se llamó la función
+        cars: Lista de autos encontrados
+
+    Returns:
+        Mensaje para WhatsApp o None si no hay resultados (el LLM sugiere alternativas)
+    """
+    if not cars or not isinstance(cars, list):
+        return None
+
+    max_cars = int(os.environ.get("TEMPLATE_MAX_CARS", DEFAULT_MAX_CARS))
+    shown = cars[:max_cars]
+
+    make_model = " ".join(
+        str(args[key]) for key in ("make", "model") if args.get(key)
+    )
+    if make_model:
+        header = f"Estas son las opciones de {make_model.title()} que tenemos para ti:"
+    elif args.get("min_price") is not None and args.get("max_price") is not None:
+        header = (
+            f"Estas son las opciones entre {_format_money(args['min_price'])} "
+            f"y {_format_money(args['max_price'])}:"
+        )
+    elif args.get("max_price") is not None:
+        header = f"Estas son las opciones de hasta {_format_money(args['max_price'])}:"
+    elif args.get("min_price") is not None:
+        header = f"Estas son las opciones desde {_format_money(args['min_price'])}:"
+    else:
+        header = "Te sugiero estas opciones:"
+
+    cards = "\n\n".join(render_car_card(car) for car in shown)
+    footer = "¿Te gustaría saber más detalles de alguno de estos autos?"
+    if len(cars) > len(shown):
+        footer = f"Tengo {len(cars) - len(shown)} opciones más si quieres verlas. {footer}"
+
+    return f"{header}\n\n{cards}\n\n{footer}"
+
+def render_car_details(args: Dict[str, Any], car: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Renderiza el resultado de get_car_details.
+
+    Args:
+        args: Argumentos con los que se llamó la función
+        car: Detalles del auto
+
+    Returns:
+        Mensaje para WhatsApp o None si el auto no existe
+    """
+    if not car or not isinstance(car, dict):
+        return None
+
+    lines = [render_car_card(car)]
+    dimensions = [
+        f"{label} {float(car[key]):,.0f} mm"
+        for key, label in (("largo", "largo"), ("ancho", "ancho"), ("altura", "alto"))
+        if car.get(key)
+    ]
+    if dimensions:
+        lines.append(f"📏 {', '.join(dimensions)}")
+
+    return (
+        "Estos son los detalles del auto:\n\n"
+        + "\n".join(lines)
+        + "\n\n¿Te gustaría agendar una cita para conocerlo o calcular su financiamiento?"
+    )
+
+def render_financing_options(args: Dict[str, Any], options: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Renderiza el resultado de get_financing_options.
+
+    Args:
+        args: Argumentos con los que se llamó la función
+        options: Lista de opciones de financiamiento
+
+    Returns:
+        Mensaje para WhatsApp o None si no hay opciones
+    """
+    if not options or not isinstance(options, list):
+        return None
+
+    car_price = args.get("car_price")
+    down_payment = args.get("down_payment", options[0].get("down_payment"))
+    interest_rate = args.get("interest_rate", 0.10)
+
+    header = "Te muestro las opciones de financiamiento"
+    if car_price:
+        header += f" para un auto de {_format_money(car_price)}"
+        if down_payment:
+            header += f" con enganche de {_format_money(down_payment)} ({down_payment / car_price:.0%})"
+    header += ":"
+
+    blocks = []
+    for idx, option in enumerate(options, start=1):
+        blocks.append("\n".join([
+            f"📊 Opción {idx}:",
+            f"📅 Plazo: {option['term_months']} meses",
+            f"💵 Mensualidad: {_format_money(option['monthly_payment'])}",
+            f"📈 Tasa: {interest_rate * 100:.1f}% anual",
+            f"💳 Total a pagar: {_format_money(option['total_payment'])}"
+        ]))
+
+    footer = "¿Te gustaría agendar una cita para revisar el auto y formalizar el financiamiento?"
+    return f"{header}\n\n" + "\n\n".join(blocks) + f"\n\n{footer}"
+
+APPOINTMENT_STATUS_LABELS = {
+    "pending": "🕒 Pendiente",
+    "confirmed": "📅 Confirmada",
+    "completed": "✅ Completada",
+    "cancelled": "❌ Cancelada"
+}
+
+def render_appointments(args: Dict[str, Any], result: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Renderiza el resultado de get_prospect_appointments: una línea por cita
+    con la fecha, el auto y el estado.
+
+    Args:
+        args: Argumentos con los que se llamó la función
+        result: Página de citas (appointments y next_token)
+
+    Returns:
+        Mensaje para WhatsApp, o None si no hay citas o hay más páginas (el
+        LLM ve next_token en el resultado de la herramienta y puede pedirlas)
+    """
+    if not result or not isinstance(result, dict) or not result.get("appointments"):
+        return None
+    if result.get("next_token"):
+        return None
+
+    lines = []
+    for appointment in result["appointments"]:
+        car = appointment.get("car")
+        car_text = _car_title(car) if car else f"auto {appointment.get('stockId')}"
+        status = APPOINTMENT_STATUS_LABELS.get(appointment.get("status"), appointment.get("status"))
+        lines.append(f"• {appointment.get('date')} {appointment.get('time')} · {car_text} · {status}")
+
+    return (
+        "Estas son tus citas:\n\n" + "\n".join(lines)
+        + "\n\n¿Te gustaría agendar, reprogramar o cancelar alguna cita?"
+    )
+
+# Renderizadores disponibles por herramienta
+TEMPLATE_RENDERERS: Dict[str, Callable[[Dict[str, Any], Any], Optional[str]]] = {
+    "search_by_make_model": render_car_list,
+    "search_by_price_range": render_car_list,
+    "get_car_details": render_car_details,
+    "get_financing_options": render_financing_options,
+    "get_prospect_appointments": render_appointments
+}
+
+def get_template_tools() -> List[str]:
+    """
+    Obtiene las herramientas cuya respuesta se renderiza con plantillas.
+    Se configura con TEMPLATE_TOOLS (lista separada por comas, "none" para desactivar).
+
+    Returns:
+        Lista de nombres de herramientas habilitadas
+    """
+    configured = os.environ.get("TEMPLATE_TOOLS")
+    if configured is None:
+        return list(TEMPLATE_RENDERERS)
+    return [
+        name.strip() for name in configured.split(",")
+        if name.strip() in TEMPLATE_RENDERERS
+    ]
+
+def render_tool_results(results: List[Tuple[str, Dict[str, Any], Any]]) -> Optional[str]:
+    """
+    Renderiza la respuesta final a partir de los resultados de las herramientas,
+    evitando la segunda llamada al LLM.
+
+    Args:
+        results: Lista de tuplas (nombre de función, argumentos, respuesta sin comprimir)
+
+    Returns:
+        Mensaje para WhatsApp, o None si alguna herramienta requiere al LLM
+    """
+    if not results:
+        return None
+
+    enabled = get_template_tools()
+    rendered = []
+    for function_name, function_args, function_response in results:
+        if function_name not in enabled:
+            return None
+        # Una herramienta que falló o excedió el tiempo la explica el LLM
+        if isinstance(function_response, dict) and "error" in function_response:
+            return None
+        try:
+            message = TEMPLATE_RENDERERS[function_name](function_args, function_response)
+        except Exception as e:
+            logger.error("Error al renderizar plantilla de %s: %s", function_name, e)
+            return None
+        if not message:
+            return None
+        rendered.append(message)
+
+    return "\n\n".join(rendered)
@@ -1,10 +1,142 @@
 import re
 import unicodedata
+from functools import lru_cache
 from typing import Optional
 
+# Alias de marcas (texto normalizado) -> marca como aparece en el catálogo
+CAR_MAKE_ALIASES = {
+    "volkswagen": "Volkswagen", "vw": "Volkswagen",
+    "toyota": "Toyota",
+    "honda": "Honda",
+    "bmw": "BMW",
+    "mercedes": "Mercedes Benz", "mercedes benz": "Mercedes Benz", "benz": "Mercedes Benz",
+    "audi": "Audi",
+    "nissan": "Nissan",
+    "mazda": "Mazda",
+    "kia": "KIA",
+    "ford": "Ford",
+    "chevrolet": "Chevrolet", "chevy": "Chevrolet",
+    "renault": "Renault",
+    "seat": "Seat",
+    "land rover": "Land Rover",
+    "dodge": "Dodge",
+    "mg": "MG",
+    "fiat": "Fiat",
+    "infiniti": "Infiniti",
+    "jeep": "Jeep",
+    "mini": "Mini",
+    "lincoln": "Lincoln",
+    "suzuki": "Suzuki",
+    "peugeot": "Peugeot",
+    "volvo": "Volvo",
+    "jac": "JAC",
+    "hyundai": "Hyundai"
+}
+
+# Alias de modelos (texto normalizado) -> (marca, modelo como aparece en el catálogo).
+# Se omiten modelos que son palabras comunes en español (uno, avanza, fiesta, escape).
+CAR_MODEL_ALIASES = {
+    "gol": ("Volkswagen", "Gol"), "golf": ("Volkswagen", "Golf"), "jetta": ("Volkswagen", "Jetta"),
+    "passat": ("Volkswagen", "Passat"), "tcross": ("Volkswagen", "T-Cross"), "t cross": ("Volkswagen", "T-Cross"),
+    "tiguan": ("Volkswagen", "Tiguan"), "touareg": ("Volkswagen", "Touareg"), "vento": ("Volkswagen", "Vento"),
+    "corolla": ("Toyota", "Corolla"), "camry": ("Toyota", "Camry"), "rav4": ("Toyota", "RAV4"),
+    "yaris": ("Toyota", "Yaris"),
+    "civic": ("Honda", "Civic"), "crv": ("Honda", "CR-V"), "cr v": ("Honda", "CR-V"),
+    "hrv": ("Honda", "HR-V"), "hr v": ("Honda", "HR-V"), "brv": ("Honda", "BR-V"), "br v": ("Honda", "BR-V"),
+    "odyssey": ("Honda", "Odyssey"),
+    "serie 1": ("BMW", "Serie 1"), "serie 2": ("BMW", "Serie 2"), "serie 3": ("BMW", "Serie 3"),
+    "serie 7": ("BMW", "Serie 7"), "x1": ("BMW", "X1"), "x3": ("BMW", "X3"), "x5": ("BMW", "X5"),
+    "clase a": ("Mercedes Benz", "Clase A"), "clase c": ("Mercedes Benz", "Clase C"),
+    "clase cla": ("Mercedes Benz", "Clase CLA"), "cla": ("Mercedes Benz", "Clase CLA"),
+    "a1": ("Audi", "A1"), "a3": ("Audi", "A3"), "a4": ("Audi", "A4"),
+    "altima": ("Nissan", "Altima"), "frontier": ("Nissan", "Frontier"), "kicks": ("Nissan", "Kicks"),
+    "march": ("Nissan", "March"), "murano": ("Nissan", "Murano"), "pathfinder": ("Nissan", "Pathfinder"),
+    "sentra": ("Nissan", "Sentra"), "versa": ("Nissan", "Versa"), "xtrail": ("Nissan", "X-Trail"),
+    "x trail": ("Nissan", "X-Trail"),
+    "mazda 3": ("Mazda", "Mazda 3"), "mazda3": ("Mazda", "Mazda 3"), "cx5": ("Mazda", "CX-5"),
+    "cx 5": ("Mazda", "CX-5"), "cx9": ("Mazda", "CX-9"), "cx 9": ("Mazda", "CX-9"),
+    "forte": ("KIA", "FORTE"), "rio": ("KIA", "Rio"), "sportage": ("KIA", "Sportage"),
+    "ecosport": ("Ford", "EcoSport"), "figo": ("Ford", "Figo"), "focus": ("Ford", "Focus"),
+    "aveo": ("Chevrolet", "Aveo"), "captiva": ("Chevrolet", "Captiva"), "onix": ("Chevrolet", "Onix"),
+    "sonic": ("Chevrolet", "Sonic"), "spark": ("Chevrolet", "Spark"), "tracker": ("Chevrolet", "Tracker"),
+    "trax": ("Chevrolet", "Trax"),
+    "captur": ("Renault", "Captur"), "duster": ("Renault", "Duster"), "koleos": ("Renault", "Koleos"),
+    "ibiza": ("Seat", "Ibiza"), "toledo": ("Seat", "Toledo"),
+    "discovery sport": ("Land Rover", "Discovery Sport"),
+    "durango": ("Dodge", "Durango"), "journey": ("Dodge", "Journey"),
+    "mg5": ("MG", "MG5"),
+    "palio": ("Fiat", "Palio"),
+    "q70": ("Infiniti", "Q70"),
+    "compass": ("Jeep", "Compass"),
+    "cooper": ("Mini", "Cooper"),
+    "nautilus": ("Lincoln", "Nautilus"),
+    "swift": ("Suzuki", "Swift"),
+    "s60": ("Volvo", "S60"),
+    "sei2": ("JAC", "SEI2")
+}
+
+def _alias_pattern(aliases) -> "re.Pattern":
+    """Compila un patrón que busca los alias completos, priorizando los más largos."""
+    alternatives = sorted(aliases, key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(re.escape(alias) for alias in alternatives) + r")\b")
+
+CAR_MAKE_PATTERN = _alias_pattern(CAR_MAKE_ALIASES)
+CAR_MODEL_PATTERN = _alias_pattern(CAR_MODEL_ALIASES)
+
+# Multiplicadores de las unidades de precio
+_PRICE_UNITS = {"k": 1_000, "mil": 1_000, "m": 1_000_000, "millon": 1_000_000, "millones": 1_000_000}
+_AMOUNT = r"\$?\s*(\d+(?:\.\d+)?)\s*(k|mil|millones|millon|m)?\b"
+_PRICE_RANGE_PATTERNS = [
+    ("range", re.compile(r"\b(?:entre|de)\s+" + _AMOUNT + r"\s*(?:y|a|-)\s*" + _AMOUNT)),
+    ("max", re.compile(r"\b(?:menos de|hasta|maximo|max|no mas de|por debajo de|abajo de|menor a|tope de)\s+" + _AMOUNT)),
+    ("min", re.compile(r"\b(?:mas de|desde|minimo|arriba de|por encima de|mayor a)\s+" + _AMOUNT)),
+    ("around", re.compile(r"\b(?:alrededor de|cerca de|aproximadamente|aprox|como)\s+" + _AMOUNT)),
+    ("max", re.compile(r"\b(?:presupuesto|precio)\s+(?:es\s+)?(?:de\s+)?" + _AMOUNT)),
+    ("max", re.compile(r"\$\s*(\d+(?:\.\d+)?)\s*(k|mil|millones|millon|m)?\b"))
+]
+
+# Montos menores se descartan (años, kilometrajes cortos, calificaciones)
+MIN_PRICE_AMOUNT = 10_000
+
+# Caracteres que conserva normalize_text (además de los espacios)
+_KEPT_CHARS = frozenset("abcdefghijklmnopqrstuvwxyz0123456789")
+
+class _NormalizeTable(dict):
+    """
+    Tabla de str.translate que calcula y guarda, la primera vez que aparece
+    cada carácter, su versión en minúsculas, sin acentos y sin caracteres
+    especiales (lo mismo que lower + NFKD + quitar diacríticos + quitar
+    todo lo que no sea a-z, 0-9 o espacio).
+    """
+
+    def __missing__(self, codepoint: int) -> str:
+        decomposed = unicodedata.normalize("NFKD", chr(codepoint).lower())
+        value = "".join(c for c in decomposed if c in _KEPT_CHARS or c.isspace())
+        self[codepoint] = value
+        return value
+
+_NORMALIZE_TABLE = _NormalizeTable()
+
+# Textos en ASCII: solo se eliminan los caracteres especiales
+_ASCII_DELETE = str.maketrans("", "", "".join(
+    chr(codepoint) for codepoint in range(128)
+    if chr(codepoint) not in _KEPT_CHARS and not chr(codepoint).isspace()
+))
+
+@lru_cache(maxsize=4096)
+def _normalize(text: str) -> str:
+    if text.isascii():
+        text = text.lower().translate(_ASCII_DELETE)
+    else:
+        text = text.translate(_NORMALIZE_TABLE)
+    return " ".join(text.split())
+
 def normalize_text(text: str) -> str:
     """
-    Normaliza un texto para búsqueda y comparación.
+    Normaliza un texto para búsqueda y comparación: minúsculas, sin acentos,
+    sin caracteres especiales y con un solo espacio entre palabras. Los
+    resultados se memorizan (los mismos textos del catálogo se normalizan
+    muchas veces).
     
     Args:
         text: Texto a normalizar
@@ -14,21 +146,7 @@ def normalize_text(text: str) -> str:
     """
     if not isinstance(text, str):
         return ""
-        
-    # Convertir a minúsculas
-    text = text.lower()
-    
-    # Remover acentos
-    text = unicodedata.normalize("NFKD", text)
-    text = "".join([c for c in text if not unicodedata.combining(c)])
-    
-    # Remover caracteres especiales
-    text = re.sub(r"[^a-z0-9\s]", "", text)
-    
-    # Remover espacios extra
-    text = " ".join(text.split())
-    
-    return text
+    return _normalize(text)
 
 def extract_car_info(text: str) -> dict:
     """
@@ -47,8 +165,8 @@ def extract_car_info(text: str) -> dict:
         "year": r"\b(19|20)\d{2}\b",  # Años entre 1900-2099
         "price": r"\b\d{1,3}(?:,\d{3})*(?:\.\d{2})?\s*(?:k|m|pesos|mxn)?\b",
         "km": r"\b\d{1,3}(?:,\d{3})*\s*(?:km|kilometros)\b",
-        "make": r"\b(?:volkswagen|toyota|honda|bmw|mercedes|audi|nissan|mazda|kia|ford|chevrolet)\b",
-        "model": r"\b(?:golf|jetta|passat|corolla|camry|civic|cr-v|serie|clase|a3|a4|sentra|versa|mazda3|cx-5|rio|forte|fiesta|focus|spark|onix)\b"
+        "make": CAR_MAKE_PATTERN,
+        "model": CAR_MODEL_PATTERN
     }
     
     info = {}
@@ -68,11 +186,80 @@ def extract_car_info(text: str) -> dict:
                 # Extraer solo números
                 value = re.sub(r"[^\d]", "", value)
                 info[key] = int(value)
+            elif key == "make":
+                # Usar la marca como aparece en el catálogo
+                info[key] = CAR_MAKE_ALIASES[value]
+            elif key == "model":
+                make, model = CAR_MODEL_ALIASES[value]
+                info[key] = model
+                # Inferir la marca a partir del modelo
+                info.setdefault("make", make)
             else:
                 info[key] = value
     
     return info
 
+def _parse_amount(number: str, unit: Optional[str]) -> float:
+    """
+    Convierte un monto con unidad opcional a pesos (ej: "300", "mil" -> 300000).
+    
+    Args:
+        number: Parte numérica del monto
+        unit: Unidad (k, mil, m, millon, millones) o None
+        
+    Returns:
+        Monto en pesos
+    """
+    return float(number) * _PRICE_UNITS.get(unit or "", 1)
+
+def extract_price_range(text: str) -> Optional[dict]:
+    """
+    Extrae un rango de precio de un texto (ej: "entre 200 y 300 mil",
+    "menos de 350k", "hasta $400,000").
+    
+    Args:
+        text: Texto a analizar
+        
+    Returns:
+        Diccionario con min_price y/o max_price, o None si no hay un precio
+    """
+    if not isinstance(text, str):
+        return None
+    
+    # Minúsculas sin acentos, conservando "$" y el punto decimal
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join([c for c in text if not unicodedata.combining(c)])
+    # Remover separadores de miles (300,000 / 1.500.000)
+    text = re.sub(r"(?<=\d)[,.](?=\d{3}(?!\d))", "", text)
+    text = text.replace(",", ".")
+    
+    for kind, pattern in _PRICE_RANGE_PATTERNS:
+        match = pattern.search(text)
+        if not match:
+            continue
+        
+        if kind == "range":
+            low_number, low_unit, high_number, high_unit = match.groups()
+            # "entre 200 y 300 mil": el primer monto hereda la unidad del segundo
+            low = _parse_amount(low_number, low_unit or high_unit)
+            high = _parse_amount(high_number, high_unit)
+            if low > high:
+                low, high = high, low
+            if low < MIN_PRICE_AMOUNT:
+                continue
+            return {"min_price": low, "max_price": high}
+        
+        amount = _parse_amount(*match.groups())
+        if amount < MIN_PRICE_AMOUNT:
+            continue
+        if kind == "max":
+            return {"max_price": amount}
+        if kind == "min":
+            return {"min_price": amount}
+        return {"min_price": float(round(amount * 0.9)), "max_price": float(round(amount * 1.1))}
+    
+    return None
+
 def is_car_query(text: str) -> bool:
     """
     Determina si un texto es una consulta sobre autos.
@@ -116,4 +303,62 @@ def is_financing_query(text: str) -> bool:
     ]
     
     # Verificar si contiene palabras clave
-    return any(keyword in text for keyword in financing_keywords) 
\ No newline at end of file
+    return any(keyword in text for keyword in financing_keywords)
+
+
+# Frases de preguntas frecuentes (palabras completas del texto normalizado)
+FAQ_PATTERN = re.compile(
+    r"\b(?:garantias?|periodo de prueba|dias de prueba|devolucion(?:es)?|devolver|inspeccion|"
+    r"240 puntos|certificad[oa]s?|certificacion|sedes?|sucursal(?:es)?|centros?|ubicacion(?:es)?|"
+    r"horarios?|kavak|como funciona|proceso de compra|requisitos|documentos|tasas?|plazos?|"
+    r"app|aplicacion|mantenimiento|seguros?|a cuenta|vender mi auto)\b"
+)
+
+# Palabras con las que empieza una pregunta sin signos de interrogación
+FAQ_QUESTION_STARTS = (
+    "que", "como", "cual", "cuales", "cuanto", "cuanta", "cuantos", "cuantas",
+    "donde", "cuando", "tienen", "hay", "puedo", "ofrecen", "aceptan"
+)
+
+# Referencias a la conversación o al usuario: la respuesta depende del contexto
+FAQ_CONTEXT_PATTERN = re.compile(
+    r"\b(?:ese|esa|eso|esos|esas|este|estos|aquel|aquella|primer|primero|primera|segundo|segunda|"
+    r"tercer|tercero|tercera|ultimo|ultima|elegi|escogi|cita|agendar|agende|llamo|nombre|"
+    r"enganche|mensualidad|mensualidades)\b"
+)
+
+def is_faq_query(text: str) -> bool:
+    """
+    Determina si un texto es una pregunta general sobre Kavak (garantía,
+    periodo de prueba, inspección, tasas, sedes) sin datos personales
+    ni referencias a la conversación, a un auto, precio o cita en particular.
+    
+    Args:
+        text: Texto a analizar
+        
+    Returns:
+        True si es una pregunta frecuente no personal, False en caso contrario
+    """
+    if not isinstance(text, str):
+        return False
+    normalized = normalize_text(text)
+    
+    # Solo preguntas: con signos de interrogación o que empiezan como pregunta
+    if "?" not in text and "¿" not in text and normalized.split(" ", 1)[0] not in FAQ_QUESTION_STARTS:
+        return False
+    if not FAQ_PATTERN.search(normalized):
+        return False
+    
+    # Excluir referencias personales o a la conversación: años, stockIds,
+    # montos, autos, precios o citas
+    if FAQ_CONTEXT_PATTERN.search(normalized):
+        return False
+    if re.search(r"\d{4,}|\d+\s*(?:mil|k)\b", normalized):
+        return False
+    car_info = extract_car_info(text)
+    if car_info.get("make") or car_info.get("model"):
+        return False
+    if extract_price_range(text):
+        return False
+    
+    return True
@@ -0,0 +1,96 @@
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from core.utils.logger import get_logger
+from core.utils.tracing import span
+
+logger = get_logger(__name__)
+
+# Herramientas de solo lectura que pueden ejecutarse en paralelo.
+# Las que tienen efectos (send_msat, process_msat, save_appointment, ...)
+# se ejecutan en orden para conservar el retorno anticipado.
+PARALLEL_SAFE_TOOLS = {
+    "search_by_make_model",
+    "search_by_price_range",
+    "get_car_recommendations",
+    "get_financing_options",
+    "get_car_details",
+    "get_prospect_appointments",
+    "get_available_slots",
+    "suggest_appointment_slots"
+}
+
+def execute_tool_calls(
+    calls: List[Tuple[str, Dict[str, Any]]],
+    functions: Dict[str, Callable[..., Any]],
+    max_workers: int = 4,
+    timeout: float = 20.0
+) -> List[Tuple[bool, Any, float]]:
+    """
+    Ejecuta varias llamadas a herramientas en un pool de hilos acotado.
+    El timeout se mide por herramienta desde que empieza a ejecutarse.
+
+    Args:
+        calls: Lista de tuplas (nombre de función, argumentos)
+        functions: Diccionario de funciones disponibles
+        max_workers: Número máximo de hilos
+        timeout: Tiempo máximo en segundos por herramienta
+
+    Returns:
+        Lista en el mismo orden que calls con tuplas (éxito, resultado o error, segundos)
+    """
+    results: List[Optional[Tuple[bool, Any, float]]] = [None] * len(calls)
+    if not calls:
+        return []
+
+    started: Dict[int, float] = {}
+
+    def _run(idx: int, name: str, args: Dict[str, Any]) -> Any:
+        started[idx] = time.monotonic()
+        with span(f"tool.{name}"):
+            return functions[name](**args)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(calls))))
+    # Cada hilo hereda una copia del contexto (correlation id y traza activa)
+    futures = {
+        executor.submit(contextvars.copy_context().run, _run, idx, name, args): idx
+        for idx, (name, args) in enumerate(calls)
+    }
+    pending = set(futures)
+
+    try:
+        while pending:
+            # Esperar hasta que termine alguna o venza el timeout más próximo
+            now = time.monotonic()
+            deadlines = [started[futures[f]] + timeout for f in pending if futures[f] in started]
+            wait_for = max(0.0, min(deadlines) - now) if deadlines else timeout
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            # Si los hilos siguen ocupados por herramientas vencidas, las pendientes nunca inician
+            if not done and not deadlines and not any(futures[f] in started for f in pending):
+                for future in pending:
+                    results[futures[future]] = (False, "No se pudo iniciar la herramienta a tiempo", 0.0)
+                break
+
+            for future in done:
+                idx = futures[future]
+                elapsed = time.monotonic() - started.get(idx, now)
+                try:
+                    results[idx] = (True, future.result(), elapsed)
+                except Exception as e:
+                    logger.error("Error ejecutando %s: %s", calls[idx][0], e)
+                    results[idx] = (False, str(e), elapsed)
+
+            now = time.monotonic()
+            for future in list(pending):
+                idx = futures[future]
+                if idx in started and now - started[idx] >= timeout:
+                    logger.error("Timeout de %ss ejecutando %s", timeout, calls[idx][0])
+                    results[idx] = (False, f"Timeout después de {timeout}s", now - started[idx])
+                    pending.discard(future)
+    finally:
+        # No esperar a las herramientas que excedieron el timeout
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
@@ -0,0 +1,289 @@
+import os
+import sys
+import json
+import time
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Traza y span activos en la invocación actual. Los hilos del ejecutor de
+# herramientas heredan el contexto, por lo que sus spans cuelgan del span padre.
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+# Última traza terminada (modo local)
+_last_trace: Optional["Trace"] = None
+
+def get_trace_mode() -> str:
+    """
+    Obtiene el modo de trazas (TRACE_MODE):
+    - emf: métricas en CloudWatch Embedded Metric Format (por defecto)
+    - local: guarda la traza para imprimir un resumen tipo flame
+    - off: sin trazas
+
+    Returns:
+        Modo de trazas
+    """
+    return os.environ.get("TRACE_MODE", "emf").lower()
+
+class Span:
+    """Segmento medido de una traza, con sus hijos y el uso de tokens."""
+
+    def __init__(self, name: str, tags: Dict[str, Any], start: float):
+        self.name = name
+        self.tags = tags
+        self.start = start
+        self.duration_ms = 0.0
+        self.children: List["Span"] = []
+        self.usage: Dict[str, int] = {}
+
+class Trace:
+    """Árbol de spans de una invocación."""
+
+    def __init__(self, name: str, dimensions: Dict[str, str]):
+        self.name = name
+        self.dimensions = dimensions
+        self.root = Span(name, {}, time.perf_counter())
+        self.lock = threading.Lock()
+
+    def iter_spans(self) -> Iterator[Span]:
+        """Recorre todos los spans (incluida la raíz) en profundidad."""
+        stack = [self.root]
+        while stack:
+            current = stack.pop()
+            yield current
+            stack.extend(reversed(current.children))
+
+@contextmanager
+def trace(name: str, **dimensions: str) -> Iterator[Optional[Trace]]:
+    """
+    Abre la traza de una invocación. Al cerrarla emite las métricas EMF
+    (modo emf) o la guarda para el resumen local (modo local).
+
+    Args:
+        name: Nombre del pipeline (ej: ProcessMessage)
+        **dimensions: Dimensiones adicionales de las métricas
+
+    Yields:
+        Traza activa o None si las trazas están desactivadas
+    """
+    global _last_trace
+    mode = get_trace_mode()
+    if mode == "off":
+        yield None
+        return
+
+    current = Trace(name, dimensions)
+    trace_token = _current_trace.set(current)
+    span_token = _current_span.set(current.root)
+    try:
+        yield current
+    finally:
+        current.root.duration_ms = (time.perf_counter() - current.root.start) * 1000
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        if mode == "local":
+            _last_trace = current
+        else:
+            for record in emf_records(current):
+                sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+            sys.stdout.flush()
+
+@contextmanager
+def span(name: str, **tags: Any) -> Iterator[Optional[Span]]:
+    """
+    Mide un segmento de la traza activa. Sin traza activa no hace nada.
+
+    Args:
+        name: Nombre del segmento (ej: llm.first_call, tool.search_by_make_model)
+        **tags: Etiquetas informativas del segmento
+
+    Yields:
+        Span activo o None si no hay traza
+    """
+    current_trace = _current_trace.get()
+    if current_trace is None:
+        yield None
+        return
+
+    parent = _current_span.get() or current_trace.root
+    current = Span(name, tags, time.perf_counter())
+    with current_trace.lock:
+        parent.children.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception:
+        current.tags["error"] = True
+        raise
+    finally:
+        current.duration_ms = (time.perf_counter() - current.start) * 1000
+        _current_span.reset(token)
+
+def traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorador que mide cada llamada a la función como un span.
+
+    Args:
+        name: Nombre del span
+
+    Returns:
+        Decorador
+    """
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_usage(usage: Any) -> None:
+    """
+    Registra el uso de tokens (response.usage de OpenAI) en el span activo.
+
+    Args:
+        usage: Objeto usage con prompt_tokens, completion_tokens y total_tokens
+    """
+    current = _current_span.get()
+    if current is None or usage is None:
+        return
+    for field in ("prompt_tokens", "completion_tokens", "total_tokens"):
+        value = getattr(usage, field, None)
+        if value is not None:
+            current.usage[field] = current.usage.get(field, 0) + int(value)
+
+def emit_metric(name: str, value: float = 1, unit: str = "Count", **dimensions: str) -> None:
+    """
+    Emite una métrica suelta en formato EMF (fuera de una traza), por
+    ejemplo contadores de eventos. Solo se emite en modo emf.
+
+    Args:
+        name: Nombre de la métrica
+        value: Valor
+        unit: Unidad de CloudWatch
+        **dimensions: Dimensiones de la métrica
+    """
+    if get_trace_mode() != "emf":
+        return
+    record = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": os.environ.get("TRACE_NAMESPACE", "KavakAIAgent"),
+                "Dimensions": [list(dimensions.keys())],
+                "Metrics": [{"Name": name, "Unit": unit}]
+            }]
+        },
+        **dimensions,
+        name: value
+    }
+    sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+def last_trace() -> Optional[Trace]:
+    """
+    Obtiene la última traza terminada en modo local.
+
+    Returns:
+        Traza o None
+    """
+    return _last_trace
+
+def emf_records(current: Trace) -> List[Dict[str, Any]]:
+    """
+    Convierte una traza en registros de CloudWatch Embedded Metric Format:
+    un registro por nombre de span con todas sus duraciones (CloudWatch
+    calcula p50/p95 sobre los valores) y uno por llamada con uso de tokens.
+
+    Args:
+        current: Traza terminada
+
+    Returns:
+        Lista de registros EMF
+    """
+    namespace = os.environ.get("TRACE_NAMESPACE", "KavakAIAgent")
+    timestamp = int(time.time() * 1000)
+    base = {"Pipeline": current.name, **current.dimensions}
+    base_dimensions = list(base.keys())
+
+    durations: Dict[str, List[float]] = {}
+    usage: Dict[str, Dict[str, int]] = {}
+    for item in current.iter_spans():
+        name = "total" if item is current.root else item.name
+        durations.setdefault(name, []).append(round(item.duration_ms, 3))
+        if item.usage:
+            totals = usage.setdefault(name, {})
+            for field, value in item.usage.items():
+                totals[field] = totals.get(field, 0) + value
+
+    records = []
+    for name, values in durations.items():
+        records.append({
+            "_aws": {
+                "Timestamp": timestamp,
+                "CloudWatchMetrics": [{
+                    "Namespace": namespace,
+                    "Dimensions": [base_dimensions + ["Stage"]],
+                    "Metrics": [{"Name": "Duration", "Unit": "Milliseconds"}]
+                }]
+            },
+            **base,
+            "Stage": name,
+            "Duration": values
+        })
+    for name, totals in usage.items():
+        records.append({
+            "_aws": {
+                "Timestamp": timestamp,
+                "CloudWatchMetrics": [{
+                    "Namespace": namespace,
+                    "Dimensions": [base_dimensions + ["Call"]],
+                    "Metrics": [
+                        {"Name": "PromptTokens", "Unit": "Count"},
+                        {"Name": "CompletionTokens", "Unit": "Count"},
+                        {"Name": "TotalTokens", "Unit": "Count"}
+                    ]
+                }]
+            },
+            **base,
+            "Call": name,
+            "PromptTokens": totals.get("prompt_tokens", 0),
+            "CompletionTokens": totals.get("completion_tokens", 0),
+            "TotalTokens": totals.get("total_tokens", 0)
+        })
+    return records
+
+def format_flame(current: Trace, width: int = 40) -> str:
+    """
+    Genera un resumen tipo flame/cascada de la traza: cada span con su
+    duración y una barra ubicada según su inicio dentro del turno.
+
+    Args:
+        current: Traza terminada
+        width: Ancho de la barra completa en caracteres
+
+    Returns:
+        Texto con una línea por span
+    """
+    total_ms = current.root.duration_ms or 1.0
+    lines = []
+
+    def render(item: Span, depth: int) -> None:
+        offset = int((item.start - current.root.start) * 1000 / total_ms * width)
+        length = max(1, round(item.duration_ms / total_ms * width))
+        label = ("  " * depth + item.name)[:44]
+        bar = " " * min(offset, width - 1) + "█" * min(length, width - min(offset, width - 1))
+        line = f"{label:<44} {item.duration_ms:9.1f} ms  {bar:<{width}}"
+        if item.usage:
+            line += f"  tokens {item.usage.get('prompt_tokens', 0)}+{item.usage.get('completion_tokens', 0)}"
+        if item.tags.get("error"):
+            line += "  [error]"
+        lines.append(line)
+        for child in sorted(item.children, key=lambda child: child.start):
+            render(child, depth + 1)
+
+    render(current.root, 0)
+    return "\n".join(lines)
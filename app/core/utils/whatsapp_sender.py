@@ -0,0 +1,192 @@
+import os
+import time
+import random
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from core.services.container import get_twilio_client
+from core.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Límite de caracteres del cuerpo de un mensaje de WhatsApp en Twilio
+MAX_MESSAGE_CHARS = 1600
+
+# Estados HTTP que se reintentan (límite de tasa y errores del servidor)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+def split_message(body: str, limit: int = MAX_MESSAGE_CHARS) -> List[str]:
+    """
+    Divide un mensaje largo en segmentos de hasta limit caracteres, cortando
+    preferentemente entre párrafos, luego entre líneas y luego entre palabras.
+
+    Args:
+        body: Texto del mensaje
+        limit: Tamaño máximo de cada segmento
+
+    Returns:
+        Lista de segmentos (un solo elemento si cabe completo)
+    """
+    body = body.strip()
+    if len(body) <= limit:
+        return [body]
+
+    segments = []
+    remaining = body
+    while len(remaining) > limit:
+        window = remaining[:limit + 1]
+        # Evitar segmentos demasiado cortos si el separador está al inicio
+        cut = limit
+        for separator in ("\n\n", "\n", " "):
+            position = window.rfind(separator)
+            if position > limit // 2:
+                cut = position
+                break
+        segments.append(remaining[:cut].rstrip())
+        remaining = remaining[cut:].lstrip()
+    if remaining:
+        segments.append(remaining)
+    return segments
+
+def _is_retryable(error: Exception) -> bool:
+    """
+    Indica si un error de envío es transitorio: 429/5xx de Twilio o un
+    error de conexión/timeout.
+
+    Args:
+        error: Excepción del envío
+
+    Returns:
+        True si se debe reintentar
+    """
+    status = getattr(error, "status", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS
+    return type(error).__name__ in ("ConnectionError", "Timeout", "ConnectTimeout", "ReadTimeout")
+
+def deadline_from_context(context: Any) -> Optional[float]:
+    """
+    Calcula el límite de tiempo (time.monotonic) para los envíos de una
+    invocación de Lambda, dejando TWILIO_DEADLINE_MARGIN_MS para terminar.
+
+    Args:
+        context: Contexto de Lambda (puede ser None en local)
+
+    Returns:
+        Límite en segundos de time.monotonic, o None si no hay contexto
+    """
+    if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+        return None
+    margin_ms = int(os.environ.get("TWILIO_DEADLINE_MARGIN_MS", "1000"))
+    return time.monotonic() + (context.get_remaining_time_in_millis() - margin_ms) / 1000
+
+def _with_retries(send: Callable[[], Any], max_retries: Optional[int] = None, deadline: Optional[float] = None) -> Any:
+    """
+    Ejecuta un envío con backoff exponencial y jitter completo. No reintenta
+    si la espera más un intento completo (TWILIO_TIMEOUT_SECONDS) excede el
+    límite de tiempo de la invocación.
+
+    Args:
+        send: Función que realiza el envío
+        max_retries: Reintentos máximos (por defecto TWILIO_MAX_RETRIES)
+        deadline: Límite de tiempo en segundos de time.monotonic (opcional)
+
+    Returns:
+        Resultado del envío
+
+    Raises:
+        Exception: El último error si no es transitorio o se agotaron los reintentos
+    """
+    max_retries = max_retries if max_retries is not None else int(os.environ.get("TWILIO_MAX_RETRIES", "3"))
+    base_delay = float(os.environ.get("TWILIO_RETRY_BASE_SECONDS", "0.5"))
+    max_delay = float(os.environ.get("TWILIO_RETRY_MAX_SECONDS", "8"))
+    attempt_seconds = float(os.environ.get("TWILIO_TIMEOUT_SECONDS", "10"))
+    attempt = 0
+    while True:
+        try:
+            return send()
+        except Exception as e:
+            if attempt >= max_retries or not _is_retryable(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            if deadline is not None and time.monotonic() + delay + attempt_seconds > deadline:
+                logger.warning(
+                    "Sin tiempo para reintentar el envío a Twilio (%s)",
+                    getattr(e, "status", type(e).__name__),
+                    extra={"metrics": {"twilio_retries_skipped": 1}}
+                )
+                raise
+            attempt += 1
+            logger.warning(
+                "Error transitorio de Twilio (%s), reintento %s/%s en %.2fs",
+                getattr(e, "status", type(e).__name__), attempt, max_retries, delay,
+                extra={"metrics": {"twilio_retries": 1}}
+            )
+            time.sleep(delay)
+
+def send_whatsapp_message(to_number: str, body: str, deadline: Optional[float] = None) -> str:
+    """
+    Envía un mensaje de WhatsApp a través de Twilio. Los mensajes más largos
+    que el límite se envían en varios segmentos, en orden.
+
+    Args:
+        to_number: Número de WhatsApp del destinatario (whatsapp:+52...)
+        body: Contenido del mensaje
+        deadline: Límite de tiempo para los reintentos (ver deadline_from_context)
+
+    Returns:
+        SID del primer mensaje enviado
+    """
+    client = get_twilio_client()
+    from_number = f"whatsapp:{os.environ['TWILIO_PHONE_NUMBER']}"
+    sids = []
+    for segment in split_message(body):
+        message = _with_retries(lambda: client.messages.create(
+            from_=from_number,
+            to=to_number,
+            body=segment
+        ), deadline=deadline)
+        sids.append(message.sid)
+    if len(sids) > 1:
+        logger.info("Mensaje enviado en %s segmentos", len(sids))
+    return sids[0]
+
+def send_whatsapp_messages(
+    messages: List[Dict[str, str]],
+    max_workers: Optional[int] = None,
+    deadline: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """
+    Envía varios mensajes en una sola invocación. Los destinatarios distintos
+    se atienden en paralelo y los mensajes de un mismo destinatario en orden.
+    Un fallo no detiene el resto de los envíos.
+
+    Args:
+        messages: Lista de mensajes con to_number y body
+        max_workers: Envíos simultáneos (por defecto TWILIO_MAX_WORKERS)
+        deadline: Límite de tiempo para los reintentos (ver deadline_from_context)
+
+    Returns:
+        Resultado por mensaje, en el orden recibido (status success/error, message_sid o error)
+    """
+    results: List[Dict[str, Any]] = [{} for _ in messages]
+    by_recipient: "OrderedDict[str, List[int]]" = OrderedDict()
+    for idx, message in enumerate(messages):
+        by_recipient.setdefault(message["to_number"], []).append(idx)
+
+    def send_recipient(indexes: List[int]) -> None:
+        for idx in indexes:
+            message = messages[idx]
+            try:
+                sid = send_whatsapp_message(message["to_number"], message["body"], deadline=deadline)
+                results[idx] = {"to_number": message["to_number"], "status": "success", "message_sid": sid}
+            except Exception as e:
+                logger.exception("Error al enviar mensaje a %s: %s", message["to_number"], e)
+                results[idx] = {"to_number": message["to_number"], "status": "error", "error": str(e)}
+
+    if not messages:
+        return results
+    max_workers = max_workers or int(os.environ.get("TWILIO_MAX_WORKERS", "4"))
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(by_recipient)))) as executor:
+        list(executor.map(send_recipient, by_recipient.values()))
+    return results
@@ -0,0 +1,68 @@
+import os
+import json
+import time
+from typing import Any, Dict
+from core.services.container import get_boto3_session
+from core.services.export_service import ExportService, S3ExportSink, new_export_id
+from core.utils.logger import get_logger, payload
+
+logger = get_logger(__name__)
+
+def _continue_async(context: Any, event: Dict[str, Any], export_id: str) -> None:
+    """
+    Vuelve a invocar la función de forma asíncrona para reanudar la
+    exportación desde su checkpoint.
+
+    Args:
+        context: Contexto de Lambda
+        event: Evento original
+        export_id: ID de la exportación a reanudar
+    """
+    invocation = int(event.get("invocation", 1)) + 1
+    max_invocations = int(os.environ.get("EXPORT_MAX_INVOCATIONS", "20"))
+    if invocation > max_invocations:
+        logger.error("Exportación %s sin terminar después de %s invocaciones", export_id, max_invocations)
+        return
+    get_boto3_session().client("lambda").invoke(
+        FunctionName=context.function_name,
+        InvocationType="Event",
+        Payload=json.dumps({**event, "export_id": export_id, "invocation": invocation}).encode("utf-8")
+    )
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Exporta prospectos/citas y conversaciones a CATALOG_BUCKET como archivos
+    comprimidos (exports/<export_id>/<tabla>/part-NNN.<formato>.gz, uno por
+    segmento del scan paralelo).
+
+    Antes de que se acabe el tiempo de la Lambda se guarda el checkpoint y
+    la función se vuelve a invocar con el mismo export_id para continuar.
+
+    Args:
+        event: {"datasets": [...], "format": "jsonl"|"csv", "segments": 4, "export_id": opcional}
+        context: Contexto de Lambda
+
+    Returns:
+        Resumen de la exportación (status, filas, filas por segundo y archivos)
+    """
+    logger.debug("Evento recibido: %s", payload(event))
+    export_id = event.get("export_id") or new_export_id()
+    prefix = os.environ.get("EXPORT_PREFIX", "exports")
+    sink = S3ExportSink(os.environ["CATALOG_BUCKET"], f"{prefix}/{export_id}")
+
+    deadline = None
+    if context is not None:
+        margin_ms = int(os.environ.get("EXPORT_SAFETY_MARGIN_MS", "60000"))
+        deadline = time.monotonic() + max(0, context.get_remaining_time_in_millis() - margin_ms) / 1000
+
+    summary = ExportService(sink).run(
+        export_id,
+        datasets=event.get("datasets", ["prospects", "conversations"]),
+        fmt=event.get("format", "jsonl"),
+        segments=int(event.get("segments", os.environ.get("EXPORT_SEGMENTS", "4"))),
+        deadline=deadline
+    )
+
+    if summary["status"] == "incomplete" and context is not None:
+        _continue_async(context, event, export_id)
+    return summary
@@ -0,0 +1,145 @@
+import os
+import json
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
+from core.services.container import get_idempotency_service
+from core.utils.whatsapp_sender import send_whatsapp_message, split_message
+from core.utils.streaming import StreamingDelivery, is_streaming_enabled
+from core.utils.logger import get_logger, payload, set_correlation_id
+from core.utils.tracing import trace
+from functions.process_message.handler import process_message
+
+logger = get_logger(__name__)
+
+ERROR_MESSAGE = "Lo siento, ha ocurrido un error al procesar tu mensaje. Por favor, intenta de nuevo más tarde."
+
+def _group_turns(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Agrupa los mensajes del lote por conversación. En la cola FIFO cada
+    conversación es un MessageGroupId, así que sus mensajes llegan en orden
+    y los que se acumularon mientras se procesaba el turno anterior se
+    responden como un solo turno.
+
+    Args:
+        records: Registros de SQS
+
+    Returns:
+        Lista de turnos con from_number, mensajes y registros
+    """
+    turns: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        message = json.loads(record["body"])
+        turn = turns.setdefault(message["from_number"], {
+            "from_number": message["from_number"],
+            "messages": [],
+            "records": []
+        })
+        turn["messages"].append(message)
+        turn["records"].append(record)
+    return list(turns.values())
+
+def _process_turn(turn: Dict[str, Any]) -> None:
+    """
+    Procesa y responde un turno: mismo trabajo que ProcessMessage y
+    SendResponse del Step Function, en una sola invocación.
+
+    La respuesta se guarda (por el MessageSid del último mensaje) antes de
+    enviarla, con los segmentos ya enviados: si el envío falla, la nueva
+    entrega de SQS solo envía lo que falta sin volver a procesar el turno.
+
+    Args:
+        turn: Turno agrupado por _group_turns
+
+    Raises:
+        Exception: Si falla el procesamiento o el envío (SQS reintenta)
+    """
+    from_number = turn["from_number"]
+    correlation_id = turn["messages"][-1].get("message_sid")
+    set_correlation_id(correlation_id, conversation_id=from_number)
+    idempotency = get_idempotency_service()
+
+    saved = idempotency.get_reply(correlation_id) if correlation_id else None
+    if saved:
+        logger.info("Turno ya procesado, se reenvía la respuesta desde el segmento %s", saved["sent_segments"] + 1)
+        pending, sent_segments = saved["reply"], saved["sent_segments"]
+    else:
+        message_body = "\n".join(message["message_body"].strip() for message in turn["messages"])
+        if len(turn["messages"]) > 1:
+            logger.info("Procesando turno agrupado de %s mensajes", len(turn["messages"]), extra={"metrics": {"turn_messages": len(turn["messages"])}})
+
+        delivery = StreamingDelivery(from_number) if is_streaming_enabled() else None
+        with trace("MessageWorker"):
+            agent_message = process_message(from_number, message_body, delivery=delivery)
+
+        pending = delivery.pending_text(agent_message) if delivery else agent_message
+        sent_segments = 0
+        if pending and correlation_id:
+            idempotency.save_reply(correlation_id, pending)
+
+    if not pending:
+        return
+    segments = split_message(pending)
+    for idx in range(sent_segments, len(segments)):
+        send_whatsapp_message(from_number, segments[idx])
+        if correlation_id:
+            idempotency.mark_sent(correlation_id, idx + 1)
+
+def _notify_failure(turn: Dict[str, Any]) -> None:
+    """
+    Avisa al usuario en el último intento (después el mensaje va a la DLQ),
+    como SendErrorResponse en el Step Function.
+
+    Args:
+        turn: Turno que falló
+    """
+    max_receive_count = int(os.environ.get("WORKER_MAX_RECEIVE_COUNT", "3"))
+    receive_count = max(int(record.get("attributes", {}).get("ApproximateReceiveCount", "1")) for record in turn["records"])
+    if receive_count < max_receive_count:
+        return
+    try:
+        send_whatsapp_message(turn["from_number"], ERROR_MESSAGE)
+    except Exception as e:
+        logger.exception("Error al enviar mensaje de error: %s", e)
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Worker de la cola SQS FIFO de mensajes (PipelineMode=worker). La firma
+    de Twilio ya se validó en el webhook; aquí se procesa y se envía la
+    respuesta en el mismo contenedor, sin transiciones de Step Functions.
+
+    Args:
+        event: Evento de SQS
+        context: Contexto de Lambda
+
+    Returns:
+        Respuesta parcial del lote (batchItemFailures) para reintentar solo lo que falló
+    """
+    records = event.get("Records", [])
+    turns = _group_turns(records)
+    logger.debug("Lote recibido: %s", payload({"records": len(records), "turns": len(turns)}))
+
+    def run(turn: Dict[str, Any]) -> bool:
+        try:
+            _process_turn(turn)
+            return True
+        except Exception as e:
+            logger.exception("Error procesando mensajes de %s: %s", turn["from_number"], e)
+            _notify_failure(turn)
+            return False
+
+    # Cada conversación en su propio hilo y contexto (correlation id y traza)
+    max_workers = max(1, min(len(turns), int(os.environ.get("WORKER_MAX_WORKERS", "4"))))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, run, turn) for turn in turns]
+        results = [future.result() for future in futures]
+
+    # Si falla un turno se reintentan todos sus mensajes para conservar el orden del grupo
+    failures = [
+        {"itemIdentifier": record["messageId"]}
+        for turn, ok in zip(turns, results) if not ok
+        for record in turn["records"]
+    ]
+    if failures:
+        logger.warning("%s mensajes se reintentarán", len(failures), extra={"metrics": {"failed_messages": len(failures)}})
+    return {"batchItemFailures": failures}
@@ -1,52 +1,188 @@
 import os
 import json
-from typing import Dict, Any
-from openai import OpenAI
-from core.services.conversation import ConversationService, function_schemas, available_functions
-from core.services.car_recommender import CarRecommender
-from core.services.prompt_optimizer import PromptOptimizer
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Any, Optional, Tuple
+from core.services.container import get_conversation_service, get_prompt_optimizer, get_openai_client, get_message_buffer
+from core.services.conversation import function_schemas, available_functions
+from core.services.intent_router import IntentRouter
+from core.services.message_buffer import ConversationBusy
+from core.services.response_cache import SemanticResponseCache
+from core.utils.templates import render_tool_results
+from core.utils.tool_executor import execute_tool_calls, PARALLEL_SAFE_TOOLS
+from core.utils.streaming import StreamingDelivery, consume_chat_stream, is_streaming_enabled
 from datetime import datetime
+from core.utils.logger import get_logger, payload, set_correlation_id
+from core.utils.tracing import trace, span, record_usage
 
-# Inicializar servicios
-conversation_service = ConversationService()
-car_recommender = CarRecommender()
-prompt_optimizer = PromptOptimizer()
-client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+logger = get_logger(__name__)
 
-def process_message(from_number: str, message_body: str) -> str:
+# Inicializar servicios (instancias compartidas del contenedor; CarRecommender y
+# ProspectService se crean hasta que una herramienta los necesita)
+conversation_service = get_conversation_service()
+prompt_optimizer = get_prompt_optimizer()
+client = get_openai_client()
+intent_router = IntentRouter(conversation_service, available_functions)
+response_cache = SemanticResponseCache(client=client)
+# Un hilo para generar respuestas de la caché sin retrasar el turno
+cache_filler = ThreadPoolExecutor(max_workers=1)
+
+def _create_completion(
+    messages: list,
+    use_tools: bool,
+    delivery: Optional[StreamingDelivery] = None
+) -> Tuple[Any, Optional[str], Any]:
+    """
+    Llama a chat.completions, en streaming si hay entrega anticipada.
+    
+    Args:
+        messages: Mensajes para OpenAI
+        use_tools: Indica si se envían los esquemas de funciones
+        delivery: Entrega anticipada por párrafos (opcional)
+        
+    Returns:
+        Tupla con (mensaje, finish_reason, usage); usage es None en streaming
+    """
+    params = {
+        "model": os.environ.get("MODEL_NAME", "gpt-4-turbo-preview"),
+        "messages": messages,
+        "temperature": float(os.environ.get("TEMPERATURE", "0.7")),
+        "max_tokens": int(os.environ.get("MAX_TOKENS", "1000"))
+    }
+    if use_tools:
+        params["tools"] = [{"type": "function", "function": schema} for schema in function_schemas]
+        params["tool_choice"] = "auto"
+    
+    with span("llm.first_call" if use_tools else "llm.second_call", model=params["model"]):
+        if delivery:
+            stream = client.chat.completions.create(stream=True, **params)
+            message, finish_reason = consume_chat_stream(stream, delivery)
+            return message, finish_reason, None
+        
+        response = client.chat.completions.create(**params)
+        record_usage(response.usage)
+        return response.choices[0].message, response.choices[0].finish_reason, response.usage
+
+def _fill_response_cache(message_body: str, cache_embedding: list, turn_start: float) -> None:
+    """
+    Genera y guarda en la caché la respuesta a una pregunta frecuente usando
+    solo el system prompt y la pregunta, sin herramientas. Esta respuesta no
+    se envía al usuario: la caché se comparte entre usuarios y no debe
+    incluir su contexto (nombre, autos, citas).
+    
+    Args:
+        message_body: Pregunta del usuario
+        cache_embedding: Embedding normalizado de la pregunta
+        turn_start: Inicio del turno (perf_counter) para medir el costo
+    """
+    try:
+        faq_message, _, _ = _create_completion(
+            [
+                {"role": "system", "content": prompt_optimizer.system_prompt},
+                {"role": "user", "content": message_body}
+            ],
+            use_tools=False
+        )
+        if faq_message.content:
+            response_cache.store(
+                message_body,
+                cache_embedding,
+                faq_message.content,
+                prompt_optimizer.system_prompt,
+                cost_seconds=time.perf_counter() - turn_start
+            )
+            response_cache.report()
+    except Exception as e:
+        logger.error("Error al generar la respuesta para la caché: %s", e)
+
+def process_message(
+    from_number: str,
+    message_body: str,
+    delivery: Optional[StreamingDelivery] = None
+) -> str:
     """
     Procesa el mensaje usando OpenAI y retorna la respuesta.
     
     Args:
         from_number: Número de WhatsApp del remitente
         message_body: Contenido del mensaje
+        delivery: Entrega anticipada por párrafos en modo streaming (opcional)
         
     Returns:
-        Respuesta del agente
+        Respuesta del agente completa (incluyendo lo entregado anticipadamente)
     """
+    turn_start = time.perf_counter()
+    routed_intent = None
+    cache_fill = None
     try:
-        print(f"[DEBUG] ===== INICIO DE PROCESAMIENTO =====")
-        print(f"[DEBUG] Timestamp: {datetime.now().isoformat()}")
-        print(f"[DEBUG] Número: {from_number}")
-        print(f"[DEBUG] Mensaje: {message_body}")
+        logger.debug("===== INICIO DE PROCESAMIENTO =====")
+        logger.debug("Timestamp: %s", datetime.now().isoformat())
+        logger.debug("Número: %s", from_number)
+        logger.debug("Mensaje: %s", message_body)
         
         # Inicializar agent_message
         agent_message = ""
         
         # Obtener contexto de conversación
-        print("[DEBUG] Obteniendo contexto de conversación...")
+        logger.debug("Obteniendo contexto de conversación...")
         conversation_context = conversation_service.get_conversation_context(
             from_number,
             recent_messages=10
         ) or []  # Asegurar que sea una lista
         
-        print(f"[DEBUG] Número de mensajes en contexto: {len(conversation_context)}")
+        logger.debug("Número de mensajes en contexto: %s", len(conversation_context))
         for idx, msg in enumerate(conversation_context):
-            print(f"[DEBUG] Mensaje {idx + 1}:")
-            print(f"[DEBUG] - Rol: {msg['role']}")
-            print(f"[DEBUG] - Contenido: {msg['content']}")
+            logger.debug("Mensaje %s:", idx + 1)
+            logger.debug("- Rol: %s", msg['role'])
+            logger.debug("- Contenido: %s", msg['content'])
+        
+        logger.debug("Contexto obtenido: %s", payload(conversation_context))
+        
+        # Atender intenciones simples sin llamar a OpenAI
+        with span("intent_router"):
+            routed = intent_router.route(from_number, message_body, conversation_context)
+        if routed:
+            routed_intent, agent_message = routed
+            logger.debug("Mensaje atendido por reglas (%s), omitiendo OpenAI", routed_intent)
+            # La calificación de MSAT no se guarda como conversación, igual que con process_msat
+            if routed_intent != "msat_reply":
+                conversation_service.save_message(
+                    whatsapp_number=from_number,
+                    user_message=message_body,
+                    agent_message=agent_message,
+                    is_msat=False
+                )
+                logger.debug("Conversación guardada exitosamente")
+            logger.debug("===== FIN DE PROCESAMIENTO =====")
+            return agent_message
         
-        print(f"[DEBUG] Contexto obtenido: {json.dumps(conversation_context, ensure_ascii=False)}")
+        # Responder preguntas frecuentes desde la caché semántica
+        cache_embedding = []
+        if response_cache.is_cacheable(message_body, conversation_context):
+            with span("response_cache.lookup"):
+                cache_embedding = response_cache.embed(message_body)
+                cached = response_cache.lookup(cache_embedding, prompt_optimizer.system_prompt)
+            if cached:
+                routed_intent = "response_cache"
+                agent_message = cached["answer"]
+                conversation_service.save_message(
+                    whatsapp_number=from_number,
+                    user_message=message_body,
+                    agent_message=agent_message,
+                    is_msat=False
+                )
+                response_cache.record_hit_latency(cached["cost_seconds"], time.perf_counter() - turn_start)
+                logger.debug("===== FIN DE PROCESAMIENTO =====")
+                return agent_message
+            
+            # Fallo: el turno sigue el camino normal con contexto y herramientas;
+            # en paralelo se genera la respuesta que se guarda en la caché
+            if cache_embedding:
+                cache_fill = cache_filler.submit(
+                    contextvars.copy_context().run,
+                    _fill_response_cache, message_body, cache_embedding, turn_start
+                )
         
         # Preparar mensajes para OpenAI
         messages = [
@@ -59,124 +195,153 @@ def process_message(from_number: str, message_body: str) -> str:
             
         # Agregar mensaje actual
         messages.append({"role": "user", "content": message_body})
-        print(f"[DEBUG] Total de mensajes para OpenAI: {len(messages)}")
-        print(f"[DEBUG] Mensajes preparados para OpenAI: {json.dumps(messages, ensure_ascii=False)}")
+        logger.debug("Total de mensajes para OpenAI: %s", len(messages))
+        logger.debug("Mensajes preparados para OpenAI: %s", payload(messages))
         
         # Optimizar mensajes
-        print("[DEBUG] Optimizando mensajes...")
-        messages = prompt_optimizer.optimize_messages(
-            messages,
-            max_tokens=int(os.environ.get("MAX_TOKENS", "1000"))
-        )
-        print(f"[DEBUG] Mensajes optimizados: {json.dumps(messages, ensure_ascii=False)}")
-        print(f"[DEBUG] Total de mensajes después de optimización: {len(messages)}")
+        logger.debug("Optimizando mensajes...")
+        with span("prompt_optimizer"):
+            messages = prompt_optimizer.optimize_messages(
+                messages,
+                max_tokens=int(os.environ.get("MAX_TOKENS", "1000"))
+            )
+        logger.debug("Mensajes optimizados: %s", payload(messages))
+        logger.debug("Total de mensajes después de optimización: %s", len(messages))
         
         # Obtener respuesta de OpenAI
-        print("[DEBUG] Llamando a OpenAI...")
-        print(f"[DEBUG] Modelo: {os.environ.get('MODEL_NAME', 'gpt-4-turbo-preview')}")
-        print(f"[DEBUG] Temperature: {os.environ.get('TEMPERATURE', '0.7')}")
-        print(f"[DEBUG] Max tokens: {os.environ.get('MAX_TOKENS', '1000')}")
+        logger.debug("Llamando a OpenAI...")
+        logger.debug("Modelo: %s", os.environ.get('MODEL_NAME', 'gpt-4-turbo-preview'))
+        logger.debug("Temperature: %s", os.environ.get('TEMPERATURE', '0.7'))
+        logger.debug("Max tokens: %s", os.environ.get('MAX_TOKENS', '1000'))
         
-        response = client.chat.completions.create(
-            model=os.environ.get("MODEL_NAME", "gpt-4-turbo-preview"),
-            messages=messages,
-            tools=[{"type": "function", "function": schema} for schema in function_schemas],
-            tool_choice="auto",
-            temperature=float(os.environ.get("TEMPERATURE", "0.7")),
-            max_tokens=int(os.environ.get("MAX_TOKENS", "1000"))
-        )
+        logger.debug("Streaming: %s", 'sí' if delivery else 'no')
         
-        response_message = response.choices[0].message
-        print(f"[DEBUG] Respuesta inicial de OpenAI: {json.dumps(response_message.model_dump(), ensure_ascii=False)}")
-        print(f"[DEBUG] Finish reason: {response.choices[0].finish_reason}")
-        print(f"[DEBUG] Usage: {json.dumps(response.usage.model_dump(), ensure_ascii=False)}")
+        response_message, finish_reason, usage = _create_completion(messages, use_tools=True, delivery=delivery)
+        logger.debug("Respuesta inicial de OpenAI: %s", payload(response_message.model_dump()))
+        logger.debug("Finish reason: %s", finish_reason)
+        if usage:
+            logger.debug("Usage: %s", payload(usage.model_dump()))
         
         # Analizar si se intentó usar alguna función
         if response_message.tool_calls:
-            print("[DEBUG] OpenAI intentó usar funciones:")
+            logger.debug("OpenAI intentó usar funciones:")
             for tool_call in response_message.tool_calls:
-                print(f"[DEBUG] - Función: {tool_call.function.name}")
-                print(f"[DEBUG] - Argumentos: {tool_call.function.arguments}")
+                logger.debug("- Función: %s", tool_call.function.name)
+                logger.debug("- Argumentos: %s", tool_call.function.arguments)
         else:
-            print("[DEBUG] OpenAI no intentó usar ninguna función")
-            print(f"[DEBUG] Contenido de la respuesta: {response_message.content}")
+            logger.debug("OpenAI no intentó usar ninguna función")
+            logger.debug("Contenido de la respuesta: %s", response_message.content)
         
         # Procesar tool calls si existen
         if response_message.tool_calls:
-            print("[DEBUG] Procesando tool calls...")
-            print(f"[DEBUG] Número de tool calls: {len(response_message.tool_calls)}")
+            logger.debug("Procesando tool calls...")
+            logger.debug("Número de tool calls: %s", len(response_message.tool_calls))
             messages.append(response_message.model_dump())
             
+            # Resultados sin comprimir para renderizar con plantillas
+            tool_results = []
+            
+            parsed_calls = [
+                (tool_call.function.name, json.loads(tool_call.function.arguments))
+                for tool_call in response_message.tool_calls
+            ]
+            
+            # Ejecutar en paralelo las herramientas de solo lectura; las que tienen
+            # efectos se ejecutan en orden dentro del ciclo
+            parallel_indexes = [
+                idx for idx, (name, _) in enumerate(parsed_calls)
+                if name in PARALLEL_SAFE_TOOLS
+            ]
+            prefetched = {}
+            if parallel_indexes:
+                logger.debug("Ejecutando %s tool calls en paralelo...", len(parallel_indexes))
+                with span("tools.parallel", count=len(parallel_indexes)):
+                    outcomes = execute_tool_calls(
+                        [parsed_calls[idx] for idx in parallel_indexes],
+                        available_functions,
+                        max_workers=int(os.environ.get("TOOL_MAX_WORKERS", "4")),
+                        timeout=float(os.environ.get("TOOL_TIMEOUT_SECONDS", "20"))
+                    )
+                for idx, (success, result, elapsed) in zip(parallel_indexes, outcomes):
+                    logger.debug("Tool call %s (%s) terminó en %.2fs", idx + 1, parsed_calls[idx][0], elapsed)
+                    prefetched[idx] = result if success else {"error": result}
+            
             for idx, tool_call in enumerate(response_message.tool_calls):
-                print(f"[DEBUG] Procesando tool call {idx + 1} de {len(response_message.tool_calls)}")
-                function_name = tool_call.function.name
-                function_args = json.loads(tool_call.function.arguments)
-                print(f"[DEBUG] Ejecutando función {function_name} con args: {json.dumps(function_args, ensure_ascii=False)}")
+                logger.debug("Procesando tool call %s de %s", idx + 1, len(response_message.tool_calls))
+                function_name, function_args = parsed_calls[idx]
+                logger.debug("Ejecutando función %s con args: %s", function_name, payload(function_args))
                 
                 function_to_call = available_functions[function_name]
-                function_response = function_to_call(**function_args)
-                print(f"[DEBUG] Respuesta de función {function_name}: {json.dumps(function_response, ensure_ascii=False)}")
+                if idx in prefetched:
+                    function_response = prefetched[idx]
+                else:
+                    with span(f"tool.{function_name}"):
+                        function_response = function_to_call(**function_args)
+                logger.debug("Respuesta de función %s: %s", function_name, payload(function_response))
+                tool_results.append((function_name, function_args, function_response))
                 
-                if function_name in ["search_by_make_model", "search_by_price_range", "get_car_recommendations"]:
+                if isinstance(function_response, dict) and "error" in function_response:
+                    logger.debug("La función %s falló, se envía el error al modelo", function_name)
+                elif function_name in ["search_by_make_model", "search_by_price_range", "get_car_recommendations"]:
                     function_response = prompt_optimizer.compress_recommendations(function_response)
-                    print(f"[DEBUG] Recomendaciones comprimidas: {json.dumps(function_response, ensure_ascii=False)}")
+                    logger.debug("Recomendaciones comprimidas: %s", payload(function_response))
                 elif function_name == "send_msat":
-                    print("[DEBUG] Procesando respuesta de send_msat...")
+                    logger.debug("Procesando respuesta de send_msat...")
                     success, msat_message = function_response
-                    print(f"[DEBUG] Resultado send_msat - success: {success}, message: {msat_message}")
+                    logger.debug("Resultado send_msat - success: %s, message: %s", success, msat_message)
                     if success:
                         # Guardar MSAT en la conversación
-                        print("[DEBUG] Guardando MSAT en la conversación...")
+                        logger.debug("Guardando MSAT en la conversación...")
                         conversation_service.save_message(
                             whatsapp_number=from_number,
                             user_message=message_body,
                             agent_message=msat_message,
                             is_msat=True
                         )
-                        print("[DEBUG] MSAT guardado exitosamente")
+                        logger.debug("MSAT guardado exitosamente")
                         agent_message = msat_message
-                        print("[DEBUG] Retornando mensaje MSAT directamente")
+                        logger.debug("Retornando mensaje MSAT directamente")
                         return agent_message
                     else:
                         function_response = "Lo siento, hubo un error al enviar la encuesta de satisfacción."
                 elif function_name == "process_msat":
-                    print("[DEBUG] Procesando respuesta de process_msat...")
+                    logger.debug("Procesando respuesta de process_msat...")
                     # Asegurar que usamos el mismo número de teléfono que viene en el evento
                     function_args["from_number"] = from_number
                     function_response = function_to_call(**function_args)
                     success, rating, error_message = function_response
-                    print(f"[DEBUG] Resultado process_msat - success: {success}, rating: {rating}, error: {error_message}")
+                    logger.debug("Resultado process_msat - success: %s, rating: %s, error: %s", success, rating, error_message)
                     
                     if not success:
                         agent_message = error_message
-                        print("[DEBUG] Retornando mensaje de error de validación")
+                        logger.debug("Retornando mensaje de error de validación")
                         return ""
                     
                     # Guardar la respuesta del MSAT usando el mismo número de teléfono
                     success, thank_you = conversation_service.save_msat_response(from_number, rating)
                     if not success:
-                        print("[DEBUG] Error al guardar respuesta MSAT")
+                        logger.debug("Error al guardar respuesta MSAT")
                         return ""
                     
                     agent_message = thank_you
-                    print("[DEBUG] Respuesta MSAT guardada exitosamente")
+                    logger.debug("Respuesta MSAT guardada exitosamente")
                     return agent_message
                 elif function_name == "save_appointment":
-                    print("[DEBUG] Procesando respuesta de save_appointment...")
+                    logger.debug("Procesando respuesta de save_appointment...")
                     success, message = function_response
-                    print(f"[DEBUG] Resultado save_appointment - success: {success}, message: {message}")
+                    logger.debug("Resultado save_appointment - success: %s, message: %s", success, message)
                     if success:
                         # Guardar mensaje de confirmación en la conversación
-                        print("[DEBUG] Guardando mensaje de confirmación en la conversación...")
+                        logger.debug("Guardando mensaje de confirmación en la conversación...")
                         conversation_service.save_message(
                             whatsapp_number=from_number,
                             user_message=message_body,
                             agent_message=message,
                             is_msat=False
                         )
-                        print("[DEBUG] Mensaje de confirmación guardado exitosamente")
+                        logger.debug("Mensaje de confirmación guardado exitosamente")
                         agent_message = message
-                        print("[DEBUG] Retornando mensaje de confirmación directamente")
+                        logger.debug("Retornando mensaje de confirmación directamente")
                         return agent_message
                     else:
                         function_response = message  # Usar el mensaje de error retornado
@@ -187,18 +352,18 @@ def process_message(from_number: str, message_body: str) -> str:
                     "name": function_name,
                     "content": json.dumps(function_response)
                 })
-                print(f"[DEBUG] Tool call {idx + 1} procesado y agregado a mensajes")
+                logger.debug("Tool call %s procesado y agregado a mensajes", idx + 1)
             
             # Verificar que todos los tool calls tengan respuestas
             tool_call_ids = {tool_call.id for tool_call in response_message.tool_calls}
             tool_response_ids = {msg.get("tool_call_id") for msg in messages if msg.get("role") == "tool"}
             
             if tool_call_ids != tool_response_ids:
-                print(f"[DEBUG] ADVERTENCIA: Mismatch en tool call IDs. Tool calls: {tool_call_ids}, Responses: {tool_response_ids}")
+                logger.warning("Mismatch en tool call IDs. Tool calls: %s, Responses: %s", tool_call_ids, tool_response_ids)
                 # Asegurar que todos los tool calls tengan respuestas
                 for tool_call in response_message.tool_calls:
                     if tool_call.id not in tool_response_ids:
-                        print(f"[DEBUG] Agregando respuesta faltante para tool call {tool_call.id}")
+                        logger.debug("Agregando respuesta faltante para tool call %s", tool_call.id)
                         messages.append({
                             "role": "tool",
                             "tool_call_id": tool_call.id,
@@ -206,61 +371,143 @@ def process_message(from_number: str, message_body: str) -> str:
                             "content": json.dumps({"error": "No se pudo procesar esta función"})
                         })
             
+            # Renderizar con plantillas si todas las herramientas lo permiten
+            with span("templates"):
+                templated_message = render_tool_results(tool_results)
+            
+            if templated_message:
+                logger.debug("Respuesta renderizada con plantillas, omitiendo segunda llamada a OpenAI")
+                agent_message = delivery.compose(templated_message) if delivery else templated_message
+                conversation_service.save_message(
+                    whatsapp_number=from_number,
+                    user_message=message_body,
+                    agent_message=agent_message,
+                    is_msat=False
+                )
+                logger.debug("Conversación guardada exitosamente")
             # Solo hacer segunda llamada a OpenAI si no es un MSAT
-            if not any(tool_call.function.name in ["send_msat", "process_msat"] for tool_call in response_message.tool_calls):
-                print("[DEBUG] Llamando a OpenAI por segunda vez...")
-                print(f"[DEBUG] Total de mensajes para segunda llamada: {len(messages)}")
-                second_response = client.chat.completions.create(
-                    model=os.environ.get("MODEL_NAME", "gpt-4-turbo-preview"),
-                    messages=messages,
-                    temperature=float(os.environ.get("TEMPERATURE", "0.7")),
-                    max_tokens=int(os.environ.get("MAX_TOKENS", "1000"))
+            elif not any(tool_call.function.name in ["send_msat", "process_msat"] for tool_call in response_message.tool_calls):
+                logger.debug("Llamando a OpenAI por segunda vez...")
+                logger.debug("Total de mensajes para segunda llamada: %s", len(messages))
+                second_message, second_finish_reason, second_usage = _create_completion(
+                    messages,
+                    use_tools=False,
+                    delivery=delivery
                 )
                 
-                agent_message = second_response.choices[0].message.content
-                print(f"[DEBUG] Respuesta final de OpenAI: {agent_message}")
-                print(f"[DEBUG] Finish reason (segunda llamada): {second_response.choices[0].finish_reason}")
-                print(f"[DEBUG] Usage (segunda llamada): {json.dumps(second_response.usage.model_dump(), ensure_ascii=False)}")
+                agent_message = second_message.content
+                if delivery:
+                    agent_message = delivery.compose(agent_message)
+                logger.debug("Respuesta final de OpenAI: %s", agent_message)
+                logger.debug("Finish reason (segunda llamada): %s", second_finish_reason)
+                if second_usage:
+                    logger.debug("Usage (segunda llamada): %s", payload(second_usage.model_dump()))
                 
                 # Guardar conversación normal solo si no se guardó un MSAT
                 if not (response_message.tool_calls and any(tool_call.function.name == "send_msat" for tool_call in response_message.tool_calls)):
-                    print("[DEBUG] Guardando conversación normal...")
+                    logger.debug("Guardando conversación normal...")
                     conversation_service.save_message(
                         whatsapp_number=from_number,
                         user_message=message_body,
                         agent_message=agent_message,
                         is_msat=False
                     )
-                    print("[DEBUG] Conversación guardada exitosamente")
+                    logger.debug("Conversación guardada exitosamente")
                 else:
-                    print("[DEBUG] Omitiendo guardado de conversación normal porque ya se guardó un MSAT")
+                    logger.debug("Omitiendo guardado de conversación normal porque ya se guardó un MSAT")
             else:
-                print("[DEBUG] Omitiendo segunda llamada a OpenAI para MSAT")
+                logger.debug("Omitiendo segunda llamada a OpenAI para MSAT")
         else:
             agent_message = response_message.content
-            print(f"[DEBUG] Respuesta directa de OpenAI: {agent_message}")
+            if delivery:
+                agent_message = delivery.compose(agent_message)
+            logger.debug("Respuesta directa de OpenAI: %s", agent_message)
             
             # Guardar conversación normal solo si no se guardó un MSAT
             if not (response_message.tool_calls and any(tool_call.function.name == "send_msat" for tool_call in response_message.tool_calls)):
-                print("[DEBUG] Guardando conversación normal...")
+                logger.debug("Guardando conversación normal...")
                 conversation_service.save_message(
                     whatsapp_number=from_number,
                     user_message=message_body,
                     agent_message=agent_message,
                     is_msat=False
                 )
-                print("[DEBUG] Conversación guardada exitosamente")
+                logger.debug("Conversación guardada exitosamente")
             else:
-                print("[DEBUG] Omitiendo guardado de conversación normal porque ya se guardó un MSAT")
+                logger.debug("Omitiendo guardado de conversación normal porque ya se guardó un MSAT")
         
-        print(f"[DEBUG] ===== FIN DE PROCESAMIENTO =====")
+        logger.debug("===== FIN DE PROCESAMIENTO =====")
         return agent_message
         
     except Exception as e:
-        print(f"[ERROR] Error en procesamiento de mensaje: {str(e)}")
-        import traceback
-        print(f"[ERROR] Error traceback: {traceback.format_exc()}")
+        logger.exception("Error en procesamiento de mensaje: %s", e)
         raise
+    finally:
+        if cache_fill:
+            # Esperar a la caché antes de que Lambda congele el hilo
+            wait([cache_fill], timeout=float(os.environ.get("RESPONSE_CACHE_FILL_TIMEOUT_SECONDS", "10")))
+        intent_router.record_turn(routed_intent, time.perf_counter() - turn_start)
+
+def _process_buffered_turn(event: Dict[str, Any], context: Any, buffer_key: str) -> Dict[str, Any]:
+    """
+    Procesa un turno agrupado: solo la ejecución del mensaje más reciente de
+    la ráfaga responde, uniendo los mensajes pendientes bajo el lease de la
+    conversación. Las demás terminan sin respuesta (agent_message vacío).
+    
+    Args:
+        event: Evento del Step Function (con buffer_key)
+        context: Contexto de Lambda
+        buffer_key: Clave del mensaje en el buffer
+        
+    Returns:
+        Diccionario con la respuesta procesada
+        
+    Raises:
+        ConversationBusy: Si otra ejecución está procesando la conversación
+    """
+    from_number = event['from_number']
+    correlation_id = event.get('correlation_id')
+    superseded = {
+        'from_number': from_number,
+        'message_body': event['message_body'],
+        'correlation_id': correlation_id,
+        'agent_message': '',
+        'full_agent_message': '',
+        'streamed_chunks': 0
+    }
+    
+    buffer = get_message_buffer()
+    if buffer.is_superseded(from_number, buffer_key):
+        logger.info("Mensaje agrupado en otro turno: %s", buffer_key, extra={"metrics": {"coalesced_messages": 1}})
+        return superseded
+    
+    owner = correlation_id or getattr(context, 'aws_request_id', buffer_key)
+    buffer.acquire(from_number, owner)
+    try:
+        # Releer bajo el lease: un mensaje posterior pudo llegar mientras tanto
+        if buffer.is_superseded(from_number, buffer_key):
+            logger.info("Mensaje agrupado en otro turno: %s", buffer_key, extra={"metrics": {"coalesced_messages": 1}})
+            return superseded
+        
+        items = buffer.pending(from_number, buffer_key)
+        message_body = buffer.merge(items) or event['message_body']
+        logger.info("Procesando turno agrupado de %s mensajes", len(items), extra={"metrics": {"turn_messages": len(items)}})
+        
+        delivery = StreamingDelivery(from_number) if is_streaming_enabled() else None
+        with trace("ProcessMessage"):
+            agent_message = process_message(from_number, message_body, delivery=delivery)
+        buffer.consume(from_number, items)
+    finally:
+        buffer.release(from_number, owner)
+    
+    return {
+        'from_number': from_number,
+        'message_body': message_body,
+        'correlation_id': correlation_id,
+        'agent_message': delivery.pending_text(agent_message) if delivery else agent_message,
+        'full_agent_message': agent_message,
+        'streamed_chunks': len(delivery.chunks) if delivery else 0
+    }
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -274,23 +521,37 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         Diccionario con la respuesta procesada
     """
     try:
-        print(f"[DEBUG] Evento recibido: {json.dumps(event, ensure_ascii=False)}")
         from_number = event['from_number']
         message_body = event['message_body']
+        correlation_id = event.get('correlation_id')
+        set_correlation_id(correlation_id, conversation_id=from_number)
+        logger.debug("Evento recibido: %s", payload(event))
         
-        print(f"[DEBUG] Procesando mensaje de {from_number}: {message_body}")
-        agent_message = process_message(from_number, message_body)
+        buffer_key = event.get('buffer_key')
+        if buffer_key:
+            return _process_buffered_turn(event, context, buffer_key)
         
+        logger.debug("Procesando mensaje de %s: %s", from_number, message_body)
+        delivery = StreamingDelivery(from_number) if is_streaming_enabled() else None
+        with trace("ProcessMessage"):
+            agent_message = process_message(from_number, message_body, delivery=delivery)
+        
+        # En streaming, SendResponse solo envía lo que no se entregó anticipadamente
         response = {
             'from_number': from_number,
             'message_body': message_body,
-            'agent_message': agent_message
+            'correlation_id': correlation_id,
+            'agent_message': delivery.pending_text(agent_message) if delivery else agent_message,
+            'full_agent_message': agent_message,
+            'streamed_chunks': len(delivery.chunks) if delivery else 0
         }
-        print(f"[DEBUG] Respuesta final: {json.dumps(response, ensure_ascii=False)}")
+        logger.debug("Respuesta final: %s", payload(response))
         return response
         
+    except ConversationBusy as e:
+        # El Step Function reintenta hasta que se libere el lease
+        logger.info("%s", e)
+        raise
     except Exception as e:
-        print(f"[ERROR] Error en el handler de procesamiento: {str(e)}")
-        import traceback
-        print(f"[ERROR] Error traceback: {traceback.format_exc()}")
+        logger.exception("Error en el handler de procesamiento: %s", e)
         raise 
\ No newline at end of file
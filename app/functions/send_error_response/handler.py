@@ -1,7 +1,9 @@
-import os
 import json
 from typing import Dict, Any
-from twilio.rest import Client
+from core.utils.whatsapp_sender import send_whatsapp_message, deadline_from_context
+from core.utils.logger import get_logger, set_correlation_id
+
+logger = get_logger(__name__)
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -16,31 +18,21 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     try:
         from_number = event['from_number']
+        set_correlation_id(event.get('correlation_id'), conversation_id=from_number)
         error_message = event.get('error', 'Lo siento, ha ocurrido un error al procesar tu mensaje. Por favor, intenta de nuevo más tarde.')
         
         # Enviar mensaje de error usando la API de Twilio
-        client = Client(
-            os.environ['TWILIO_ACCOUNT_SID'],
-            os.environ['TWILIO_AUTH_TOKEN']
-        )
-        
-        message = client.messages.create(
-            from_=f"whatsapp:{os.environ['TWILIO_PHONE_NUMBER']}",
-            to=from_number,
-            body=error_message
-        )
+        message_sid = send_whatsapp_message(from_number, error_message, deadline=deadline_from_context(context))
         
         return {
             'status': 'error_sent',
-            'message_sid': message.sid,
+            'message_sid': message_sid,
             'from_number': from_number,
             'error_message': error_message
         }
         
     except Exception as e:
-        print(f"Error al enviar mensaje de error: {str(e)}")
-        import traceback
-        print(f"Error traceback: {traceback.format_exc()}")
+        logger.exception("Error al enviar mensaje de error: %s", e)
         # En este caso no propagamos el error para evitar un loop infinito
         return {
             'status': 'error_sending_error',
@@ -1,44 +1,71 @@
-import os
 import json
-from typing import Dict, Any
-from twilio.rest import Client
+from typing import Dict, Any, List
+from core.utils.whatsapp_sender import send_whatsapp_message, send_whatsapp_messages, deadline_from_context
+from core.utils.logger import get_logger, set_correlation_id
+
+logger = get_logger(__name__)
+
+def _send_bulk(messages: List[Dict[str, Any]], context: Any) -> Dict[str, Any]:
+    """
+    Envía varios mensajes en cola en una sola invocación.
+    
+    Args:
+        messages: Mensajes con from_number y agent_message
+        context: Contexto de Lambda (limita el tiempo de los reintentos)
+        
+    Returns:
+        Diccionario con el resultado de cada envío
+        
+    Raises:
+        Exception: Si ningún mensaje se pudo enviar
+    """
+    results = send_whatsapp_messages([
+        {'to_number': message['from_number'], 'body': message['agent_message']}
+        for message in messages if message.get('agent_message')
+    ], deadline=deadline_from_context(context))
+    failed = [result for result in results if result['status'] != 'success']
+    if failed:
+        logger.warning("%s de %s mensajes no se pudieron enviar", len(failed), len(results))
+        if len(failed) == len(results):
+            raise Exception(f"No se pudo enviar ninguno de los {len(results)} mensajes")
+    
+    return {
+        'status': 'success' if not failed else 'partial',
+        'sent': len(results) - len(failed),
+        'failed': len(failed),
+        'results': results
+    }
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Envía la respuesta procesada al usuario a través de Twilio.
+    Con "messages" en el evento envía varios mensajes en la misma invocación.
     
     Args:
-        event: Evento del Step Function
+        event: Evento del Step Function, o {"messages": [{"from_number", "agent_message"}]}
         context: Contexto de Lambda
         
     Returns:
         Diccionario con el resultado del envío
     """
+    if 'messages' in event:
+        return _send_bulk(event['messages'], context)
+    
     try:
         from_number = event['from_number']
+        set_correlation_id(event.get('correlation_id'), conversation_id=from_number)
         agent_message = event['agent_message']
         
         # Enviar mensaje usando la API de Twilio
-        client = Client(
-            os.environ['TWILIO_ACCOUNT_SID'],
-            os.environ['TWILIO_AUTH_TOKEN']
-        )
-        
-        message = client.messages.create(
-            from_=f"whatsapp:{os.environ['TWILIO_PHONE_NUMBER']}",
-            to=from_number,
-            body=agent_message
-        )
+        message_sid = send_whatsapp_message(from_number, agent_message, deadline=deadline_from_context(context))
         
         return {
             'status': 'success',
-            'message_sid': message.sid,
+            'message_sid': message_sid,
             'from_number': from_number,
             'agent_message': agent_message
         }
         
     except Exception as e:
-        print(f"Error al enviar respuesta: {str(e)}")
-        import traceback
-        print(f"Error traceback: {traceback.format_exc()}")
+        logger.exception("Error al enviar respuesta: %s", e)
         raise 
\ No newline at end of file
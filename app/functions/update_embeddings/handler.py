@@ -1,11 +1,30 @@
 import os
 import json
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import List, Dict, Any
-from core.services.car_recommender import CarRecommender
+from typing import Callable, List, Dict, Any, Optional, Tuple
+from boto3.dynamodb.types import TypeDeserializer
+from core.services.car_recommender import CarRecommender, EmbeddingModel, embedding_models_of
+from core.services.container import get_boto3_session, get_car_recommender
 from core.utils.text_processing import normalize_text
 import time
+from core.utils.logger import get_logger, LazyJson, payload
+from core.utils.tracing import emit_metric
+
+logger = get_logger(__name__)
+
+TEXT_TYPES = ("make", "model", "full")
+
+# Atributos de las filas existentes que necesita la revisión completa (sin los embeddings)
+EXISTING_FIELDS = ["lastUpdate", "make_text", "model_text", "full_text", "embeddingModels"]
+
+# Fila de la tabla de embeddings con el cursor de la revisión completa
+REFRESH_CURSOR_KEY = {"stockId": "__refresh_cursor__", "lastUpdate": "meta"}
+REFRESH_TOTALS = ("processed", "updated", "skipped", "errors", "backfilled")
+
+_deserializer = TypeDeserializer()
 
 def _convert_to_decimal(obj):
     """
@@ -86,258 +105,636 @@ def _normalize_car_text(car: Dict[str, Any], text_type: str = "full") -> str:
     # Normalizar el texto final
     return normalize_text(text)
 
+def _embedding_rows(
+    recommender: CarRecommender,
+    stock_id: str,
+    fields: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Obtiene las filas de embeddings de un auto (la llave incluye lastUpdate,
+    así que puede haber filas de actualizaciones anteriores).
+
+    Args:
+        recommender: CarRecommender con la tabla de embeddings
+        stock_id: ID del auto
+        fields: Atributos a leer (por defecto todos, incluidos los embeddings)
+    """
+    params: Dict[str, Any] = {
+        "KeyConditionExpression": "stockId = :sid",
+        "ExpressionAttributeValues": {":sid": stock_id}
+    }
+    if fields:
+        params["ProjectionExpression"] = ", ".join(fields)
+    return recommender.embeddings_db.query(**params).get("Items", [])
+
+def _save_embeddings(
+    recommender: CarRecommender,
+    item: Dict[str, Any],
+    rows: Optional[List[Dict[str, Any]]] = None
+) -> None:
+    """
+    Guarda los embeddings de un auto y elimina sus filas anteriores para
+    dejar una sola fila por stockId.
+
+    Args:
+        recommender: CarRecommender con la tabla de embeddings
+        item: Fila nueva (stockId, lastUpdate, textos y embeddings)
+        rows: Filas actuales del auto (se consultan si no se indican)
+    """
+    rows = _embedding_rows(recommender, item["stockId"]) if rows is None else rows
+    recommender.embeddings_db.put_item(Item=item)
+    stale = [row["lastUpdate"] for row in rows if row["lastUpdate"] != item["lastUpdate"]]
+    if stale:
+        with recommender.embeddings_db.batch_writer() as batch:
+            for last_update in stale:
+                batch.delete_item(Key={"stockId": item["stockId"], "lastUpdate": last_update})
+
+def _delete_embeddings(recommender: CarRecommender, stock_id: str) -> int:
+    """
+    Elimina los embeddings de un auto que salió del inventario.
+
+    Returns:
+        Número de filas eliminadas
+    """
+    rows = _embedding_rows(recommender, stock_id)
+    with recommender.embeddings_db.batch_writer() as batch:
+        for row in rows:
+            batch.delete_item(Key={"stockId": stock_id, "lastUpdate": row["lastUpdate"]})
+    return len(rows)
+
+def _target_models(recommender: CarRecommender) -> List[EmbeddingModel]:
+    """
+    Obtiene los modelos para los que se generan embeddings: el activo y,
+    durante una migración, el modelo sombra.
+    """
+    state = recommender.get_index_state()
+    return [state["active"]] + ([state["shadow"]] if state["shadow"] else [])
+
+def _embed_texts(
+    recommender: CarRecommender,
+    texts_by_model: Dict[EmbeddingModel, List[str]]
+) -> Dict[Tuple[str, str], List[float]]:
+    """
+    Genera los embeddings de los textos de cada modelo, sin repetir textos
+    (varios autos comparten el texto de marca o modelo).
+
+    Args:
+        recommender: CarRecommender con el cliente de OpenAI
+        texts_by_model: Textos a convertir por modelo
+
+    Returns:
+        Diccionario (etiqueta del modelo, texto) -> embedding
+
+    Raises:
+        Exception: Si falla OpenAI
+    """
+    vectors: Dict[Tuple[str, str], List[float]] = {}
+    for model, texts in texts_by_model.items():
+        unique_texts = list(dict.fromkeys(texts))
+        embeddings = recommender.get_embeddings_batch(unique_texts, model=model)
+        vectors.update(((model.tag, text), vector) for text, vector in zip(unique_texts, embeddings))
+    return vectors
+
+def _add_model_embeddings(
+    recommender: CarRecommender,
+    stock_id: str,
+    existing: Dict[str, Any],
+    texts: Dict[str, str],
+    models: List[EmbeddingModel],
+    vectors: Dict[Tuple[str, str], List[float]]
+) -> None:
+    """
+    Agrega a la fila actual de un auto los embeddings de modelos que aún no
+    tiene (migración a un modelo nuevo) sin tocar los del modelo activo.
+    """
+    values: Dict[str, Any] = {":models": embedding_models_of(existing) | {model.tag for model in models}}
+    assignments = ["embeddingModels = :models"]
+    for index, (model, text_type) in enumerate((model, text_type) for model in models for text_type in TEXT_TYPES):
+        assignments.append(f"{model.attribute(text_type)} = :v{index}")
+        values[f":v{index}"] = _convert_to_decimal(vectors[(model.tag, texts[text_type])])
+    recommender.embeddings_db.update_item(
+        Key={"stockId": stock_id, "lastUpdate": existing["lastUpdate"]},
+        UpdateExpression="SET " + ", ".join(assignments),
+        ExpressionAttributeValues=values
+    )
+
 def _process_batch(
     recommender: CarRecommender,
     cars: List[Dict[str, Any]],
-    existing_embeddings: Dict[str, Dict[str, Any]],
     update_threshold: str,
-    now: datetime
-) -> tuple[int, int, int]:
+    now: datetime,
+    models: Optional[List[EmbeddingModel]] = None
+) -> Tuple[int, int, int, int, int]:
     """
-    Procesa un lote de autos para actualizar sus embeddings.
+    Procesa un lote de autos para actualizar sus embeddings. Los embeddings
+    de todos los autos que lo necesitan se piden en una sola llamada a
+    OpenAI por modelo. Durante una migración, a los autos que no requieren
+    actualización solo se les agregan los embeddings del modelo sombra.
+
+    Args:
+        recommender: CarRecommender con las tablas y el cliente de OpenAI
+        cars: Autos del catálogo
+        update_threshold: Se regeneran los embeddings anteriores a esta fecha
+        now: Fecha de la actualización (lastUpdate de las filas nuevas)
+        models: Modelos a generar (por defecto el activo y el sombra)
+
+    Returns:
+        Tupla (procesados, actualizados, saltados, errores, completados con el modelo sombra)
     """
+    models = models or _target_models(recommender)
     total_processed = 0
     total_updated = 0
     total_errors = 0
     total_skipped = 0
+    total_backfilled = 0
     batch_start_time = time.time()
+    pending = []
     
     for idx, car in enumerate(cars):
         item_start_time = time.time()
         try:
             total_processed += 1
             stock_id = car["stockId"]
+            rows = _embedding_rows(recommender, stock_id, EXISTING_FIELDS)
+            existing = max(rows, key=lambda row: row["lastUpdate"]) if rows else None
             
-            print(f"[DEBUG] [{datetime.now().isoformat()}] Procesando item {idx + 1}/{len(cars)} (stockId: {stock_id})")
+            logger.debug("[%s] Procesando item %s/%s (stockId: %s)", datetime.now().isoformat(), idx + 1, len(cars), stock_id)
             
             # Generar textos normalizados para cada tipo
             text_start = time.time()
             make_text = _normalize_car_text(car, "make")
             model_text = _normalize_car_text(car, "model")
             full_text = _normalize_car_text(car, "full")
-            print(f"[DEBUG] Texto normalizado en {time.time() - text_start:.2f}s")
+            logger.debug("Texto normalizado en %.2fs", time.time() - text_start)
             
             # Verificar si necesita actualización
             check_start = time.time()
-            if stock_id not in existing_embeddings:
-                print(f"  [DEBUG] {stock_id} no existe en embeddings")
+            if existing is None:
+                logger.debug("%s no existe en embeddings", stock_id)
                 needs_update = True
-            elif existing_embeddings[stock_id]["lastUpdate"] < update_threshold:
-                print(f"  [DEBUG] {stock_id} necesita actualización por tiempo")
+            elif existing["lastUpdate"] < update_threshold:
+                logger.debug("%s necesita actualización por tiempo", stock_id)
                 needs_update = True
             else:
-                # Verificar cambios en textos
-                existing_make = normalize_text(existing_embeddings[stock_id].get("make_text", ""))
-                existing_model = normalize_text(existing_embeddings[stock_id].get("model_text", ""))
-                existing_full = normalize_text(existing_embeddings[stock_id].get("full_text", ""))
+                # Verificar cambios en textos (se guardan ya normalizados)
+                existing_make = existing.get("make_text", "")
+                existing_model = existing.get("model_text", "")
+                existing_full = existing.get("full_text", "")
                 
                 if existing_make != make_text:
-                    print(f"  [DEBUG] {stock_id} cambió make_text: {existing_make} -> {make_text}")
+                    logger.debug("%s cambió make_text: %s -> %s", stock_id, existing_make, make_text)
                     needs_update = True
                 elif existing_model != model_text:
-                    print(f"  [DEBUG] {stock_id} cambió model_text: {existing_model} -> {model_text}")
+                    logger.debug("%s cambió model_text: %s -> %s", stock_id, existing_model, model_text)
                     needs_update = True
                 elif existing_full != full_text:
-                    print(f"  [DEBUG] {stock_id} cambió full_text: {existing_full} -> {full_text}")
+                    logger.debug("%s cambió full_text: %s -> %s", stock_id, existing_full, full_text)
                     needs_update = True
                 else:
-                    print(f"  [DEBUG] {stock_id} no necesita actualización")
+                    logger.debug("%s no necesita actualización", stock_id)
                     needs_update = False
-                    total_skipped += 1
-            print(f"[DEBUG] Verificación de actualización en {time.time() - check_start:.2f}s")
+            logger.debug("Verificación de actualización en %.2fs", time.time() - check_start)
             
+            texts = {"make": make_text, "model": model_text, "full": full_text}
             if needs_update:
-                print(f"  [DEBUG] Obteniendo embeddings para {stock_id}...")
-                
-                # Obtener embeddings para cada tipo
-                embedding_start = time.time()
-                make_embedding = recommender._get_embedding(make_text)
-                if not make_embedding:
-                    print(f"  [ERROR] Falló embedding de make para {stock_id}")
-                    total_errors += 1
-                    continue
-                    
-                model_embedding = recommender._get_embedding(model_text)
-                if not model_embedding:
-                    print(f"  [ERROR] Falló embedding de model para {stock_id}")
-                    total_errors += 1
-                    continue
-                    
-                full_embedding = recommender._get_embedding(full_text)
-                if not full_embedding:
-                    print(f"  [ERROR] Falló embedding de full para {stock_id}")
-                    total_errors += 1
-                    continue
-                print(f"[DEBUG] Embeddings generados en {time.time() - embedding_start:.2f}s")
-                
-                # Convertir embeddings a Decimal
-                convert_start = time.time()
-                make_embedding_decimal = _convert_to_decimal(make_embedding)
-                model_embedding_decimal = _convert_to_decimal(model_embedding)
-                full_embedding_decimal = _convert_to_decimal(full_embedding)
-                print(f"[DEBUG] Conversión a Decimal en {time.time() - convert_start:.2f}s")
-                
-                # Preparar item para DynamoDB
-                item = {
-                    "stockId": stock_id,
-                    "lastUpdate": now.isoformat(),
-                    "make_embedding": make_embedding_decimal,
-                    "model_embedding": model_embedding_decimal,
-                    "full_embedding": full_embedding_decimal,
-                    "make_text": make_text,
-                    "model_text": model_text,
-                    "full_text": full_text
-                }
-                
-                try:
-                    # Guardar en DynamoDB
-                    db_start = time.time()
-                    print(f"  [DEBUG] {'Actualizando' if stock_id in existing_embeddings else 'Creando'} en tabla {recommender.embeddings_table}...")
-                    
-                    if stock_id in existing_embeddings:
-                        # Actualizar item existente
-                        update_expression = "SET lastUpdate = :lu, make_embedding = :me, model_embedding = :moe, full_embedding = :fe, make_text = :mt, model_text = :mot, full_text = :ft"
-                        expression_values = {
-                            ":lu": now.isoformat(),
-                            ":me": make_embedding_decimal,
-                            ":moe": model_embedding_decimal,
-                            ":fe": full_embedding_decimal,
-                            ":mt": make_text,
-                            ":mot": model_text,
-                            ":ft": full_text
-                        }
-                        
-                        response = recommender.embeddings_db.update_item(
-                            Key={"stockId": stock_id},
-                            UpdateExpression=update_expression,
-                            ExpressionAttributeValues=expression_values,
-                            ReturnConsumedCapacity='TOTAL'
-                        )
-                    else:
-                        # Crear nuevo item
-                        response = recommender.embeddings_db.put_item(
-                            Item=item,
-                            ReturnConsumedCapacity='TOTAL'
-                        )
-                        
-                    print(f"  [DEBUG] Operación exitosa en {time.time() - db_start:.2f}s: {json.dumps(response, ensure_ascii=False)}")
-                    total_updated += 1
-                except Exception as db_error:
-                    print(f"  [ERROR] Error DynamoDB: {str(db_error)}")
-                    print(f"  [ERROR] Item: {json.dumps({k: str(v) if 'embedding' in k else v for k, v in item.items()}, ensure_ascii=False)}")
-                    total_errors += 1
+                pending.append((stock_id, texts, rows, existing, models, True))
+            else:
+                missing = [model for model in models if model.tag not in embedding_models_of(existing)]
+                if missing:
+                    logger.debug("%s sin embeddings de %s", stock_id, [model.tag for model in missing])
+                    pending.append((stock_id, texts, rows, existing, missing, False))
+                else:
+                    total_skipped += 1
                 
         except Exception as e:
-            print(f"[ERROR] Error general procesando {stock_id}: {str(e)}")
+            logger.error("Error general procesando %s: %s", stock_id, e)
             total_errors += 1
             continue
             
         item_time = time.time() - item_start_time
-        print(f"[DEBUG] Item {idx + 1} completado en {item_time:.2f}s")
+        logger.debug("Item %s completado en %.2fs", idx + 1, item_time)
+    
+    if pending:
+        # Embeddings de todos los autos del lote en una sola llamada por modelo
+        embedding_start = time.time()
+        texts_by_model: Dict[EmbeddingModel, List[str]] = {}
+        for _, texts, _, _, pending_models, _ in pending:
+            for model in pending_models:
+                texts_by_model.setdefault(model, []).extend(texts.values())
+        try:
+            vectors = _embed_texts(recommender, texts_by_model)
+            logger.debug("%s embeddings generados en %.2fs", len(vectors), time.time() - embedding_start)
+        except Exception as e:
+            # Los autos se cuentan como errores y se reintentan en la siguiente revisión
+            logger.error("Falló la generación de embeddings para %s: %s", [entry[0] for entry in pending], e)
+            total_errors += len(pending)
+            pending = []
+        
+        for stock_id, texts, rows, existing, pending_models, full in pending:
+            if not full:
+                try:
+                    _add_model_embeddings(recommender, stock_id, existing, texts, pending_models, vectors)
+                    total_backfilled += 1
+                except Exception as db_error:
+                    logger.error("Error DynamoDB al agregar embeddings de %s: %s", stock_id, db_error)
+                    total_errors += 1
+                continue
+            
+            item = {"stockId": stock_id, "lastUpdate": now.isoformat(), "embeddingModels": {model.tag for model in models}}
+            for text_type in TEXT_TYPES:
+                for model in models:
+                    item[model.attribute(text_type)] = _convert_to_decimal(vectors[(model.tag, texts[text_type])])
+                item[f"{text_type}_text"] = texts[text_type]
+            try:
+                # Guardar en DynamoDB (una sola fila por stockId)
+                db_start = time.time()
+                logger.debug("%s en tabla %s...", 'Actualizando' if existing else 'Creando', recommender.embeddings_table)
+                _save_embeddings(recommender, item, rows)
+                logger.debug("Operación exitosa en %.2fs", time.time() - db_start)
+                total_updated += 1
+            except Exception as db_error:
+                logger.error("Error DynamoDB: %s", db_error)
+                logger.error("Item: %s", LazyJson({k: str(v) if 'embedding' in k else v for k, v in item.items()}))
+                total_errors += 1
             
     batch_time = time.time() - batch_start_time
-    print(f"[DEBUG] Resumen del lote (completado en {batch_time:.2f}s):")
-    print(f"  - Procesados: {total_processed}")
-    print(f"  - Actualizados: {total_updated}")
-    print(f"  - Saltados: {total_skipped}")
-    print(f"  - Errores: {total_errors}")
+    logger.info("Resumen del lote (completado en %.2fs):", batch_time)
+    logger.info("- Procesados: %s", total_processed)
+    logger.info("- Actualizados: %s", total_updated)
+    logger.info("- Saltados: %s", total_skipped)
+    logger.info("- Errores: %s", total_errors)
+    if total_backfilled:
+        logger.info("- Completados con el modelo sombra: %s", total_backfilled)
             
-    return total_processed, total_updated, total_errors
+    return total_processed, total_updated, total_skipped, total_errors, total_backfilled
+
+def _latest_images(records: List[Dict[str, Any]]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Obtiene el último estado de cada auto en un lote de registros de
+    DynamoDB Streams (los registros de un mismo auto llegan en orden).
+
+    Args:
+        records: Registros del stream de la tabla del catálogo
+
+    Returns:
+        Diccionario stockId -> auto (None si se eliminó)
+    """
+    changes: Dict[str, Optional[Dict[str, Any]]] = {}
+    for record in records:
+        data = record["dynamodb"]
+        stock_id = _deserializer.deserialize(data["Keys"]["stockId"])
+        if record["eventName"] == "REMOVE":
+            changes[stock_id] = None
+        else:
+            changes[stock_id] = {key: _deserializer.deserialize(value) for key, value in data["NewImage"].items()}
+    return changes
+
+def _process_stream(recommender: CarRecommender, records: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Actualiza los embeddings a partir de los cambios del catálogo: solo se
+    generan los embeddings de los textos que cambiaron (todos en un mismo
+    lote de llamadas a OpenAI) y se eliminan los de los autos dados de baja.
+
+    Args:
+        recommender: CarRecommender con la tabla de embeddings y el cliente de OpenAI
+        records: Registros de DynamoDB Streams
+
+    Returns:
+        Estadísticas del lote
+
+    Raises:
+        Exception: Si falla OpenAI o DynamoDB (Lambda reintenta el lote)
+    """
+    changes = _latest_images(records)
+    stats = {"records": len(records), "cars": len(changes), "updated": 0, "backfilled": 0, "deleted": 0, "skipped": 0, "embedded_texts": 0}
+    now = datetime.utcnow().isoformat()
+    models = _target_models(recommender)
+
+    pending = []
+    for stock_id, car in changes.items():
+        if car is None:
+            if _delete_embeddings(recommender, stock_id):
+                stats["deleted"] += 1
+            continue
+
+        rows = _embedding_rows(recommender, stock_id)
+        current = max(rows, key=lambda row: row["lastUpdate"]) if rows else {}
+        texts = {text_type: _normalize_car_text(car, text_type) for text_type in TEXT_TYPES}
+        changed_texts = {text_type for text_type in TEXT_TYPES if current.get(f"{text_type}_text") != texts[text_type]}
+        changed: Dict[EmbeddingModel, List[str]] = {}
+        for model in models:
+            types = [
+                text_type for text_type in TEXT_TYPES
+                if text_type in changed_texts or model.attribute(text_type) not in current
+            ]
+            if types:
+                changed[model] = types
+        if not changed:
+            stats["skipped"] += 1
+            continue
+        pending.append((stock_id, texts, rows, current, changed))
+
+    texts_by_model: Dict[EmbeddingModel, List[str]] = {}
+    for _, texts, _, _, changed in pending:
+        for model, types in changed.items():
+            texts_by_model.setdefault(model, []).extend(texts[text_type] for text_type in types)
+    vectors = _embed_texts(recommender, texts_by_model)
+    stats["embedded_texts"] = len(vectors)
+
+    for stock_id, texts, rows, current, changed in pending:
+        item = {"stockId": stock_id, "lastUpdate": now, "embeddingModels": {model.tag for model in models}}
+        for text_type in TEXT_TYPES:
+            item[f"{text_type}_text"] = texts[text_type]
+            for model in models:
+                attribute = model.attribute(text_type)
+                item[attribute] = (
+                    _convert_to_decimal(vectors[(model.tag, texts[text_type])]) if text_type in changed.get(model, [])
+                    else current[attribute]
+                )
+        _save_embeddings(recommender, item, rows)
+        # Solo los cambios del modelo activo afectan a las búsquedas
+        stats["updated" if models[0] in changed else "backfilled"] += 1
+
+    if stats["updated"] or stats["deleted"]:
+        recommender.bump_index_version()
+    return stats
+
+def _handle_stream(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Procesa un lote de DynamoDB Streams de la tabla del catálogo.
+
+    Args:
+        records: Registros del stream
+
+    Returns:
+        Respuesta con las estadísticas del lote
+    """
+    start_time = time.time()
+    stats = _process_stream(get_car_recommender(), records)
+    stats["execution_time_seconds"] = round(time.time() - start_time, 3)
+    logger.info(
+        "Cambios del catálogo procesados: %s", payload(stats),
+        extra={"metrics": {"embeddings_updated": stats["updated"], "embeddings_deleted": stats["deleted"], "embedded_texts": stats["embedded_texts"]}}
+    )
+    return {"statusCode": 200, "body": json.dumps(stats)}
+
+def _new_cursor() -> Dict[str, Any]:
+    """Crea el cursor de una revisión completa nueva."""
+    now = datetime.utcnow()
+    return {
+        "refreshId": now.strftime("%Y%m%dT%H%M%S"),
+        "status": "running",
+        "startedAt": now.isoformat(),
+        "batchIndex": 0,
+        "invocations": 0,
+        "elapsedSeconds": 0,
+        **{total: 0 for total in REFRESH_TOTALS}
+    }
+
+def _load_cursor(recommender: CarRecommender) -> Optional[Dict[str, Any]]:
+    """
+    Obtiene el cursor de la revisión completa en curso.
+
+    Returns:
+        Cursor (llave del scan del catálogo, lote dentro de la página y
+        totales acumulados) o None si no hay una revisión sin terminar
+    """
+    item = recommender.embeddings_db.get_item(Key=REFRESH_CURSOR_KEY, ConsistentRead=True).get("Item")
+    if not item or item.get("status") != "running":
+        return None
+    cursor = {key: value for key, value in item.items() if key not in REFRESH_CURSOR_KEY}
+    for key in ("batchIndex", "invocations", *REFRESH_TOTALS):
+        cursor[key] = int(cursor.get(key, 0))
+    cursor["elapsedSeconds"] = float(cursor.get("elapsedSeconds", 0))
+    return cursor
+
+def _save_cursor(recommender: CarRecommender, cursor: Dict[str, Any]) -> None:
+    """Guarda el cursor de la revisión completa en la tabla de embeddings."""
+    item = {**cursor, **REFRESH_CURSOR_KEY, "elapsedSeconds": Decimal(str(round(cursor["elapsedSeconds"], 3)))}
+    recommender.embeddings_db.put_item(Item=item)
+
+def refresh_catalog(
+    recommender: CarRecommender,
+    cursor: Dict[str, Any],
+    should_stop: Callable[[], bool] = lambda: False,
+    concurrency: int = 4,
+    page_size: int = 100,
+    batch_size: int = 10,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    models: Optional[List[EmbeddingModel]] = None
+) -> bool:
+    """
+    Revisa el catálogo desde el cursor: lee una página del scan, la divide
+    en lotes de batch_size autos y los procesa de concurrency en
+    concurrency. Después de cada grupo de lotes avanza el cursor (llave del
+    scan de la página y siguiente lote) y llama a on_progress para
+    guardarlo; antes de cada grupo consulta should_stop.
+
+    Args:
+        recommender: CarRecommender con las tablas y el cliente de OpenAI
+        cursor: Cursor de la revisión (se actualiza en el lugar)
+        should_stop: Indica si hay que detenerse (p. ej. se acaba el tiempo)
+        concurrency: Lotes procesados en paralelo
+        page_size: Autos por página del scan del catálogo
+        batch_size: Autos por lote
+        on_progress: Se llama con el cursor cada vez que avanza
+        models: Modelos a generar (por defecto el activo y el sombra)
+
+    Returns:
+        True si se revisó todo el catálogo, False si se detuvo antes
+    """
+    models = models or _target_models(recommender)
+    started_at = datetime.fromisoformat(cursor["startedAt"])
+    update_threshold = (started_at - timedelta(hours=24)).isoformat()
+    concurrency = max(1, concurrency)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while True:
+            scan_params: Dict[str, Any] = {"Limit": page_size}
+            if cursor.get("scanKey"):
+                scan_params["ExclusiveStartKey"] = cursor["scanKey"]
+            response = recommender.catalog_db.scan(**scan_params)
+            cars = response.get("Items", [])
+            batches = [cars[i:i + batch_size] for i in range(0, len(cars), batch_size)]
+
+            while cursor["batchIndex"] < len(batches):
+                if should_stop():
+                    return False
+                group = batches[cursor["batchIndex"]:cursor["batchIndex"] + concurrency]
+                futures = [
+                    executor.submit(contextvars.copy_context().run, _process_batch, recommender, batch, update_threshold, started_at, models)
+                    for batch in group
+                ]
+                for future in futures:
+                    for total, value in zip(REFRESH_TOTALS, future.result()):
+                        cursor[total] += value
+                cursor["batchIndex"] += len(group)
+                if on_progress:
+                    on_progress(cursor)
+
+            if not response.get("LastEvaluatedKey"):
+                return True
+            cursor["scanKey"] = response["LastEvaluatedKey"]
+            cursor["batchIndex"] = 0
+            if on_progress:
+                on_progress(cursor)
+
+def _continue_async(context: Any, cursor: Dict[str, Any]) -> bool:
+    """
+    Vuelve a invocar la función de forma asíncrona para continuar la
+    revisión desde el cursor.
+
+    Returns:
+        False si se alcanzó EMBEDDINGS_MAX_INVOCATIONS
+    """
+    max_invocations = int(os.environ.get("EMBEDDINGS_MAX_INVOCATIONS", "10"))
+    if cursor["invocations"] >= max_invocations:
+        logger.error(
+            "Revisión %s sin terminar después de %s invocaciones; continuará en la siguiente ejecución programada",
+            cursor["refreshId"], cursor["invocations"]
+        )
+        return False
+    get_boto3_session().client("lambda").invoke(
+        FunctionName=context.function_name,
+        InvocationType="Event",
+        Payload=json.dumps({"refresh_id": cursor["refreshId"]}).encode("utf-8")
+    )
+    return True
+
+def _refresh_summary(cursor: Dict[str, Any]) -> Dict[str, Any]:
+    """Resumen de la revisión completa (totales de todas las invocaciones)."""
+    elapsed = cursor["elapsedSeconds"]
+    return {
+        "refresh_id": cursor["refreshId"],
+        "status": "completed" if cursor["status"] == "completed" else "incomplete",
+        "invocations": cursor["invocations"],
+        **{f"total_{total}": cursor[total] for total in REFRESH_TOTALS},
+        "execution_time_seconds": round(elapsed, 2),
+        "cars_per_second": round(cursor["processed"] / elapsed, 2) if elapsed else 0.0
+    }
+
+def _promote_if_covered(recommender: CarRecommender) -> Optional[Dict[str, Any]]:
+    """
+    Promueve el modelo sombra si ya tiene embeddings de todo el catálogo.
+
+    Returns:
+        Cobertura del modelo sombra (None si no hay una migración en curso)
+    """
+    shadow = recommender.get_index_state()["shadow"]
+    if shadow is None:
+        return None
+    covered, total = recommender.shadow_coverage(shadow)
+    result = {"model": shadow.tag, "covered": covered, "total": total, "promoted": False}
+    if not total or covered < total:
+        logger.info("El modelo %s cubre %s de %s autos; se promoverá al completar la cobertura", shadow.tag, covered, total)
+        return result
+    try:
+        recommender.promote_shadow_model(shadow)
+        result["promoted"] = True
+    except Exception as e:
+        # Otra ejecución lo promovió o se canceló la migración
+        if getattr(e, "response", {}).get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        logger.warning("No se promovió %s: el modelo sombra cambió", shadow.tag)
+    return result
+
+def _handle_refresh(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Revisión completa del catálogo (evento programado o continuación).
+    Retoma la revisión sin terminar si la hay; antes de que se acabe el
+    tiempo de la Lambda guarda el cursor y se vuelve a invocar.
+
+    Args:
+        event: Evento programado o {"refresh_id": ...} de una continuación
+        context: Contexto de Lambda (None al ejecutar localmente)
+
+    Returns:
+        Respuesta con el resumen de la revisión
+    """
+    start_time = time.time()
+    recommender = CarRecommender()
+
+    cursor = _load_cursor(recommender)
+    if cursor is None and event.get("refresh_id"):
+        # Continuación duplicada de una revisión que ya terminó
+        logger.info("La revisión %s ya terminó", event["refresh_id"])
+        return {"statusCode": 200, "body": json.dumps({"refresh_id": event["refresh_id"], "status": "completed"})}
+    if cursor is None:
+        cursor = _new_cursor()
+    elif not event.get("refresh_id"):
+        logger.warning("Retomando la revisión sin terminar %s", cursor["refreshId"])
+    cursor["invocations"] += 1
+    updated_before = cursor["updated"]
+    logger.info(
+        "Revisión %s, invocación %s (lote %s de la página %s)",
+        cursor["refreshId"], cursor["invocations"], cursor["batchIndex"], payload(cursor.get("scanKey"))
+    )
+
+    margin_ms = int(os.environ.get("EMBEDDINGS_SAFETY_MARGIN_MS", "60000"))
+    elapsed_before = cursor["elapsedSeconds"]
+
+    def should_stop() -> bool:
+        return context is not None and context.get_remaining_time_in_millis() < margin_ms
+
+    def save_progress(current: Dict[str, Any]) -> None:
+        current["elapsedSeconds"] = elapsed_before + time.time() - start_time
+        _save_cursor(recommender, current)
+
+    finished = refresh_catalog(
+        recommender,
+        cursor,
+        should_stop=should_stop,
+        concurrency=int(os.environ.get("EMBEDDINGS_CONCURRENCY", "4")),
+        on_progress=save_progress
+    )
+    if finished:
+        cursor["status"] = "completed"
+    save_progress(cursor)
+
+    # Los recomendadores recargan el índice con lo actualizado en esta invocación
+    if cursor["updated"] > updated_before:
+        recommender.bump_index_version()
+
+    summary = _refresh_summary(cursor)
+    summary["openai"] = dict(getattr(recommender.client, "stats", {}))
+    if finished:
+        summary["shadow_model"] = _promote_if_covered(recommender)
+        logger.info(
+            "Revisión de embeddings completada: %s", payload(summary),
+            extra={"metrics": {"embeddings_updated": summary["total_updated"], "embeddings_errors": summary["total_errors"]}}
+        )
+        emit_metric("EmbeddingsRefreshCarsPerSecond", summary["cars_per_second"], "Count/Second", Function="UpdateEmbeddings")
+    else:
+        logger.info("Revisión de embeddings pausada: %s", payload(summary))
+        if context is not None:
+            _continue_async(context, cursor)
+    return {"statusCode": 200, "body": json.dumps(summary)}
 
 def handler(event, context):
     """
     Actualiza los embeddings de los autos en el catálogo.
-    Se ejecuta periódicamente para mantener los embeddings actualizados.
+    Con un evento de DynamoDB Streams de la tabla del catálogo actualiza solo
+    los autos que cambiaron; con el evento programado revisa todo el catálogo
+    guardando un cursor y reinvocándose hasta terminar.
     
     Args:
-        event: Evento de CloudWatch Events/EventBridge
+        event: Evento de DynamoDB Streams, de CloudWatch Events/EventBridge o
+            {"refresh_id": ...} de una continuación
         context: Contexto de Lambda
     """
+    event = event if isinstance(event, dict) else {}
+    records = event.get("Records")
+    if records and records[0].get("eventSource") == "aws:dynamodb":
+        return _handle_stream(records)
+    
     try:
-        start_time = time.time()
-        print(f"[DEBUG] [{datetime.now().isoformat()}] Iniciando actualización de embeddings...")
-        
-        # Inicializar servicios
-        init_start = time.time()
-        recommender = CarRecommender()
-        print(f"[DEBUG] Servicios inicializados en {time.time() - init_start:.2f}s")
-        
-        # Obtener todos los autos del catálogo
-        catalog_start = time.time()
-        print("[DEBUG] Obteniendo catálogo de autos...")
-        catalog_response = recommender.catalog_db.scan()
-        cars = catalog_response.get("Items", [])
-        print(f"[DEBUG] Se encontraron {len(cars)} autos en el catálogo (en {time.time() - catalog_start:.2f}s)")
-        
-        # Obtener embeddings existentes
-        embeddings_start = time.time()
-        print("[DEBUG] Obteniendo embeddings existentes...")
-        embeddings_response = recommender.embeddings_db.scan()
-        existing_embeddings = {
-            item["stockId"]: item 
-            for item in embeddings_response.get("Items", [])
-        }
-        print(f"[DEBUG] Se encontraron {len(existing_embeddings)} embeddings existentes (en {time.time() - embeddings_start:.2f}s)")
-        
-        # Verificar qué embeddings necesitan actualización
-        now = datetime.utcnow()
-        update_threshold = (now - timedelta(hours=24)).isoformat()
-        print(f"[DEBUG] Umbral de actualización: {update_threshold}")
-        
-        # Procesar en lotes de 10 autos
-        batch_size = 10
-        total_processed = 0
-        total_updated = 0
-        total_errors = 0
-        total_skipped = 0
-        
-        for i in range(0, len(cars), batch_size):
-            batch_start = time.time()
-            batch = cars[i:i + batch_size]
-            print(f"\n[DEBUG] [{datetime.now().isoformat()}] Procesando lote {i//batch_size + 1} de {(len(cars) + batch_size - 1)//batch_size}")
-            
-            # Procesar lote
-            processed, updated, errors = _process_batch(
-                recommender,
-                batch,
-                existing_embeddings,
-                update_threshold,
-                now
-            )
-            
-            total_processed += processed
-            total_updated += updated
-            total_errors += errors
-            
-            batch_time = time.time() - batch_start
-            print(f"[DEBUG] Lote {i//batch_size + 1} completado en {batch_time:.2f}s")
-        
-        total_time = time.time() - start_time
-        print(f"\n[DEBUG] Resumen final (completado en {total_time:.2f}s):")
-        print(f"  - Total procesados: {total_processed}")
-        print(f"  - Total actualizados: {total_updated}")
-        print(f"  - Total saltados: {total_skipped}")
-        print(f"  - Total errores: {total_errors}")
-        
-        return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "message": "Actualización de embeddings completada",
-                "total_processed": total_processed,
-                "total_updated": total_updated,
-                "total_skipped": total_skipped,
-                "total_errors": total_errors,
-                "execution_time_seconds": total_time
-            })
-        }
-        
+        return _handle_refresh(event, context)
     except Exception as e:
-        print(f"[ERROR] Error en handler: {str(e)}")
-        import traceback
-        print(f"[ERROR] Error traceback: {traceback.format_exc()}")
+        # El cursor conserva el avance; la siguiente ejecución retoma desde ahí
+        logger.exception("Error en handler: %s", e)
         return {
             "statusCode": 500,
             "body": json.dumps({
                 "error": str(e)
             })
-        } 
\ No newline at end of file
+        }
@@ -3,6 +3,9 @@ import json
 from typing import Dict, Any
 from twilio.request_validator import RequestValidator
 from urllib.parse import parse_qsl
+from core.utils.logger import get_logger, set_correlation_id
+
+logger = get_logger(__name__)
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -22,6 +25,8 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Extraer información del evento
         headers = event.get('headers', {})
         body = event.get('body', {})
+        if isinstance(body, dict):
+            set_correlation_id(body.get('MessageSid'), conversation_id=body.get('From'))
         
         # Obtener la firma de Twilio
         twilio_signature = headers.get('x-twilio-signature', '') or headers.get('X-Twilio-Signature', '')
@@ -30,7 +35,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         # Obtener el stage directamente del evento de API Gateway
         stage = event.get('requestContext', {}).get('stage', os.environ.get('STAGE', 'dev'))
-        print(f"Stage from API Gateway: {stage}")
+        logger.debug("Stage from API Gateway: %s", stage)
         
         if not twilio_signature:
             raise Exception("No Twilio signature found in headers")
@@ -65,7 +70,5 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        print(f"Error en validación de webhook: {str(e)}")
-        import traceback
-        print(f"Error traceback: {traceback.format_exc()}")
+        logger.exception("Error en validación de webhook: %s", e)
         raise 
\ No newline at end of file
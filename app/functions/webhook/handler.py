@@ -1,4 +1,5 @@
 import os
+import re
 import json
 import boto3
 from typing import Dict, Any
@@ -6,6 +7,55 @@ from twilio.request_validator import RequestValidator
 from twilio.twiml.messaging_response import MessagingResponse
 from urllib.parse import parse_qsl
 from core.utils.response import create_error_response
+from core.utils.logger import get_logger, set_correlation_id
+from core.utils.tracing import emit_metric
+from core.services.container import get_idempotency_service, get_message_buffer
+from core.services.message_buffer import get_coalesce_wait_seconds
+
+logger = get_logger(__name__)
+
+def _execution_name(message_sid: str) -> str:
+    """
+    Convierte el MessageSid en un nombre de ejecución válido para Step Functions
+    (máximo 80 caracteres, solo letras, números, guiones y guiones bajos).
+    Con el mismo nombre, un workflow Standard rechaza una segunda ejecución;
+    uno Express la acepta, así que ahí solo protege la tabla de idempotencia.
+    """
+    return re.sub(r"[^A-Za-z0-9_-]", "_", message_sid)[:80]
+
+def _empty_twiml_response() -> Dict[str, Any]:
+    """Respuesta HTTP 200 con TwiML vacío (Twilio no envía nada al usuario)."""
+    twiml_str = str(MessagingResponse())
+    if not twiml_str.startswith('<?xml'):
+        twiml_str = '<?xml version="1.0" encoding="UTF-8"?>' + twiml_str
+
+    return {
+        "statusCode": 200,
+        "headers": {
+            "Content-Type": "application/xml",
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Credentials": True
+        },
+        "body": twiml_str
+    }
+
+def _drop_duplicate(message_sid: str, reason: str) -> Dict[str, Any]:
+    """
+    Registra un reintento descartado y responde de inmediato a Twilio.
+
+    Args:
+        message_sid: MessageSid duplicado
+        reason: Dónde se detectó (idempotency_table o execution_name)
+
+    Returns:
+        Respuesta HTTP con TwiML vacío
+    """
+    logger.info(
+        "Mensaje duplicado descartado: %s", message_sid,
+        extra={"metrics": {"dropped_duplicates": 1}, "duplicate_reason": reason}
+    )
+    emit_metric("DroppedDuplicates", 1, Function="Webhook", Reason=reason)
+    return _empty_twiml_response()
 
 def validate_twilio_request(event):
     """Validate that the request is coming from Twilio."""
@@ -20,24 +70,24 @@ def validate_twilio_request(event):
         
         # Obtener el stage directamente del evento de API Gateway
         stage = event.get('requestContext', {}).get('stage', os.environ.get('STAGE', 'dev'))
-        print(f"Stage from API Gateway: {stage}")
-        print(f"Proto: {proto}")
-        print(f"Host: {host}")
-        print(f"Twilio signature: {twilio_signature}")
+        logger.debug("Stage from API Gateway: %s", stage)
+        logger.debug("Proto: %s", proto)
+        logger.debug("Host: %s", host)
+        logger.debug("Twilio signature: %s", twilio_signature)
 
         
         if not twilio_signature:
-            print("ERROR: No Twilio signature found in headers")
+            logger.error("No Twilio signature found in headers")
             return False
             
         # Use the exact URL from Twilio console
         url = f"{proto}://{host}/{stage}/webhook"
-        print(f"URL: {url}")
+        logger.debug("URL: %s", url)
         # Get the raw body and parse it as form-urlencoded
         raw_body = event.get('body', '')
-        print(f"Raw body: {raw_body}")
+        logger.debug("Raw body: %s", raw_body)
         if not raw_body:
-            print("ERROR: Empty body received")
+            logger.error("Empty body received")
             return False
         
         # Parse the body as form-urlencoded parameters
@@ -46,7 +96,7 @@ def validate_twilio_request(event):
         # Get auth token
         auth_token = os.environ.get('TWILIO_AUTH_TOKEN')
         if not auth_token:
-            print("ERROR: TWILIO_AUTH_TOKEN not found in environment")
+            logger.error("TWILIO_AUTH_TOKEN not found in environment")
             return False
             
         # Create validator and validate
@@ -54,14 +104,46 @@ def validate_twilio_request(event):
         is_valid = validator.validate(url, params, twilio_signature)
         
         if not is_valid:
-            print("WARNING: Twilio request validation failed")
+            logger.warning("Twilio request validation failed")
         
         return is_valid
         
     except Exception as e:
-        print(f"ERROR in validate_twilio_request: {str(e)}")
+        logger.error("Error in validate_twilio_request: %s", e)
         return False
 
+def _enqueue_message(from_number: str, message_body: str, message_sid: str) -> Dict[str, Any]:
+    """
+    Envía el mensaje a la cola SQS FIFO del worker (PipelineMode=worker).
+    El grupo es la conversación, así que sus mensajes se procesan en orden.
+    
+    Args:
+        from_number: Número de WhatsApp del usuario
+        message_body: Texto del mensaje
+        message_sid: MessageSid de Twilio
+        
+    Returns:
+        Respuesta HTTP con TwiML vacío
+    """
+    queue_url = os.environ.get('MESSAGE_QUEUE_URL')
+    if not queue_url:
+        raise ValueError("MESSAGE_QUEUE_URL no está configurado en las variables de entorno")
+    
+    sqs = boto3.client('sqs')
+    sqs.send_message(
+        QueueUrl=queue_url,
+        MessageBody=json.dumps({
+            'from_number': from_number,
+            'message_body': message_body,
+            'message_sid': message_sid
+        }),
+        MessageGroupId=from_number,
+        # SQS también descarta duplicados con el mismo id durante 5 minutos
+        MessageDeduplicationId=_execution_name(message_sid or f"{from_number}-{message_body}")
+    )
+    logger.info("Mensaje encolado para el worker")
+    return _empty_twiml_response()
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Manejador del webhook de WhatsApp que inicia el Step Function.
@@ -74,6 +156,9 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     Returns:
         Respuesta HTTP con TwiML vacío
     """
+    claimed_sid = ""
+    from_number = ""
+    buffer_key = ""
     try:
         # Validar que la petición venga de Twilio
         if not validate_twilio_request(event):
@@ -93,6 +178,8 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 
         from_number = body.get("From", "")
         message_body = body.get("Body", "")
+        message_sid = body.get("MessageSid", "")
+        set_correlation_id(message_sid or None, conversation_id=from_number or None)
         
         if not from_number or not message_body:
             return create_error_response(
@@ -106,37 +193,59 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if not state_machine_arn:
             raise ValueError("STATE_MACHINE_ARN no está configurado en las variables de entorno")
         
-        sfn = boto3.client('stepfunctions')
-        execution = sfn.start_execution(
-            stateMachineArn=state_machine_arn,
-            input=json.dumps({
+        # Descartar reintentos de Twilio (mismo MessageSid) antes de iniciar trabajo
+        if message_sid and not get_idempotency_service().claim(message_sid, fromNumber=from_number):
+            return _drop_duplicate(message_sid, "idempotency_table")
+        claimed_sid = message_sid
+        
+        # Pipeline con worker: una sola Lambda consume la cola FIFO (orden por conversación)
+        if os.environ.get('PIPELINE_MODE', 'standard') == 'worker':
+            return _enqueue_message(from_number, message_body, message_sid)
+        
+        # Con la ventana de agrupación activa, el mensaje queda pendiente y el
+        # Step Function espera antes de procesar el turno de la conversación
+        wait_seconds = get_coalesce_wait_seconds()
+        if wait_seconds and message_sid:
+            buffer_key = get_message_buffer().append(from_number, message_sid, message_body)
+        
+        start_params = {
+            'stateMachineArn': state_machine_arn,
+            'input': json.dumps({
                 'headers': event.get('headers', {}),
                 'body': body,
-                'requestContext': event.get('requestContext', {})
+                'requestContext': event.get('requestContext', {}),
+                'coalesce': {
+                    'wait_seconds': wait_seconds if buffer_key else 0,
+                    'buffer_key': buffer_key
+                }
             })
-        )
-        print(f"Step Function iniciada con execution ARN: {execution['executionArn']}")
+        }
+        # El nombre de la ejecución es una segunda barrera si la tabla no está
+        # disponible (solo en workflows Standard; Express no rechaza nombres repetidos)
+        if message_sid:
+            start_params['name'] = _execution_name(message_sid)
+        
+        sfn = boto3.client('stepfunctions')
+        try:
+            execution = sfn.start_execution(**start_params)
+        except sfn.exceptions.ExecutionAlreadyExists:
+            return _drop_duplicate(message_sid, "execution_name")
+        logger.info("Step Function iniciada con execution ARN: %s", execution['executionArn'])
         
         # Responder con TwiML vacío
-        twiml = MessagingResponse()
-        twiml_str = str(twiml)
-        if not twiml_str.startswith('<?xml'):
-            twiml_str = '<?xml version="1.0" encoding="UTF-8"?>' + twiml_str
-        
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Content-Type": "application/xml",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Credentials": True
-            },
-            "body": twiml_str
-        }
+        return _empty_twiml_response()
         
     except Exception as e:
-        print(f"Error en el handler de webhook: {str(e)}")
-        import traceback
-        print(f"Error traceback: {traceback.format_exc()}")
+        logger.exception("Error en el handler de webhook: %s", e)
+        # El trabajo no se inició: liberar el mensaje para que el reintento
+        # de Twilio (mismo MessageSid) no se descarte como duplicado
+        if buffer_key:
+            try:
+                get_message_buffer().consume(from_number, [{"itemKey": buffer_key}])
+            except Exception as cleanup_error:
+                logger.error("No se pudo eliminar el mensaje pendiente %s: %s", buffer_key, cleanup_error)
+        if claimed_sid:
+            get_idempotency_service().release(claimed_sid)
         return create_error_response(
             "Error interno del servidor",
             status_code=500,
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Importa el catálogo de autos desde un CSV a DynamoDB.
+
+Lee el CSV en streaming, convierte los tipos (Sí -> bool, números ->
+Decimal), valida cada fila y escribe con BatchWriteItem en paralelo,
+reintentando los items no procesados.
+
+Modos:
+- Por defecto (upsert): escribe todas las filas válidas.
+- --diff: lee el catálogo actual y solo escribe los autos nuevos o con cambios.
+- --delete-missing: elimina los autos que ya no están en el CSV.
+
+Uso:
+    python app/scripts/import_catalog.py catalogo.csv --table kavak-ai-agent-catalog-prod
+    STAGE=dev python app/scripts/import_catalog.py catalogo.csv --diff --delete-missing
+"""
+
+import os
+import sys
+import csv
+import time
+import random
+import argparse
+import threading
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+# Agregar el directorio app al path para importar los módulos core
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.services.container import get_dynamodb
+from core.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Columnas del CSV por tipo
+STRING_FIELDS = ("make", "model", "version")
+REQUIRED_NUMBER_FIELDS = ("year", "price", "km")
+OPTIONAL_NUMBER_FIELDS = ("largo", "ancho", "altura")
+BOOLEAN_FIELDS = ("bluetooth", "carPlay")
+TRUE_VALUES = {"sí", "si", "true", "1"}
+
+# Límite de BatchWriteItem
+BATCH_SIZE = 25
+
+def _to_decimal(value: str) -> Decimal:
+    """Convierte un número del CSV (admite separadores de miles) a Decimal."""
+    number = Decimal(value.replace(",", "").strip())
+    if not number.is_finite():
+        raise InvalidOperation(value)
+    return number
+
+def coerce_row(row: Dict[str, str]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Convierte una fila del CSV en un item del catálogo con los mismos tipos
+    que usaba el script de shell.
+
+    Args:
+        row: Fila del CSV
+
+    Returns:
+        Tupla (item, error); item es None si la fila no es válida
+    """
+    stock_id = (row.get("stockId") or "").strip()
+    if not stock_id:
+        return None, "falta stockId"
+
+    item: Dict[str, Any] = {"stockId": stock_id}
+    for field in STRING_FIELDS:
+        item[field] = (row.get(field) or "").strip()
+    if not item["make"] or not item["model"]:
+        return None, "falta make o model"
+
+    for field in REQUIRED_NUMBER_FIELDS + OPTIONAL_NUMBER_FIELDS:
+        value = (row.get(field) or "").strip()
+        if not value:
+            if field in REQUIRED_NUMBER_FIELDS:
+                return None, f"falta {field}"
+            continue
+        try:
+            item[field] = _to_decimal(value)
+        except InvalidOperation:
+            return None, f"{field} no es numérico: {value!r}"
+
+    for field in BOOLEAN_FIELDS:
+        item[field] = (row.get(field) or "").strip().lower() in TRUE_VALUES
+    return item, None
+
+def read_rows(csv_file: str) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """
+    Lee el CSV fila por fila (no carga el archivo completo).
+
+    Args:
+        csv_file: Ruta del CSV
+
+    Returns:
+        Iterador de (número de línea, fila)
+    """
+    with open(csv_file, newline="", encoding="utf-8-sig") as f:
+        for line_number, row in enumerate(csv.DictReader(f), start=2):
+            yield line_number, row
+
+class CatalogImporter:
+    """
+    Escribe el catálogo con BatchWriteItem desde un pool de hilos. El número
+    de lotes en vuelo está acotado, así la memoria no depende del tamaño del CSV.
+    """
+
+    def __init__(self, table_name: str, dynamodb: Any = None, max_workers: int = 8, max_retries: int = 8):
+        """
+        Inicializa el importador.
+
+        Args:
+            table_name: Tabla del catálogo
+            dynamodb: Recurso de DynamoDB (por defecto el compartido)
+            max_workers: Lotes escritos en paralelo
+            max_retries: Reintentos de los items no procesados por lote
+        """
+        self.table_name = table_name
+        self.dynamodb = dynamodb or get_dynamodb()
+        self.table = self.dynamodb.Table(table_name)
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.stats = {"read": 0, "written": 0, "unchanged": 0, "invalid": 0, "deleted": 0, "failed": 0, "retries": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key: str, value: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += value
+
+    def _write_batch(self, requests: List[Dict[str, Any]], stat: str) -> None:
+        """
+        Escribe un lote de hasta 25 requests, reintentando los no procesados
+        con backoff exponencial y jitter.
+
+        Args:
+            requests: PutRequest/DeleteRequest del lote
+            stat: Contador a incrementar con los requests escritos
+        """
+        pending = requests
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.dynamodb.batch_write_item(RequestItems={self.table_name: pending})
+                unprocessed = response.get("UnprocessedItems", {}).get(self.table_name, [])
+            except Exception as e:
+                code = getattr(e, "response", {}).get("Error", {}).get("Code")
+                if code not in ("ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded") or attempt == self.max_retries:
+                    logger.error("Lote de %s items: %s", len(pending), e)
+                    break
+                unprocessed = pending
+            self._count(stat, len(pending) - len(unprocessed))
+            pending = unprocessed
+            if not pending:
+                return
+            self._count("retries")
+            time.sleep(random.uniform(0, min(5.0, 0.05 * 2 ** attempt)))
+        self._count("failed", len(pending))
+
+    def _run_batches(self, batches: Iterator[Tuple[List[Dict[str, Any]], str]]) -> None:
+        """Ejecuta los lotes en el pool con un máximo de lotes en vuelo."""
+        in_flight = threading.BoundedSemaphore(self.max_workers * 2)
+
+        def run(requests: List[Dict[str, Any]], stat: str) -> None:
+            try:
+                self._write_batch(requests, stat)
+            finally:
+                in_flight.release()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for requests, stat in batches:
+                in_flight.acquire()
+                executor.submit(run, requests, stat)
+
+    def load_existing(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Lee el catálogo actual (para --diff y --delete-missing).
+
+        Returns:
+            Diccionario stockId -> item
+        """
+        existing: Dict[str, Dict[str, Any]] = {}
+        params: Dict[str, Any] = {}
+        while True:
+            response = self.table.scan(**params)
+            for item in response.get("Items", []):
+                existing[item["stockId"]] = item
+            if "LastEvaluatedKey" not in response:
+                return existing
+            params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def import_csv(
+        self,
+        csv_file: str,
+        diff: bool = False,
+        delete_missing: bool = False,
+        dry_run: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Importa el CSV.
+
+        Args:
+            csv_file: Ruta del CSV
+            diff: Solo escribir autos nuevos o con cambios
+            delete_missing: Eliminar los autos que no están en el CSV
+            dry_run: Calcular los cambios sin escribir
+
+        Returns:
+            Estadísticas de la importación, con filas por segundo
+        """
+        started = time.monotonic()
+        existing = self.load_existing() if diff or delete_missing else {}
+        seen: Set[str] = set()
+
+        def put_batches() -> Iterator[Tuple[List[Dict[str, Any]], str]]:
+            batch: List[Dict[str, Any]] = []
+            for line_number, row in read_rows(csv_file):
+                self.stats["read"] += 1
+                item, error = coerce_row(row)
+                if item and item["stockId"] in seen:
+                    item, error = None, f"stockId {item['stockId']} duplicado"
+                if error:
+                    self.stats["invalid"] += 1
+                    logger.warning("Línea %s: %s", line_number, error)
+                    continue
+                seen.add(item["stockId"])
+                current = existing.get(item["stockId"])
+                if diff and current and all(current.get(key) == value for key, value in item.items()):
+                    self.stats["unchanged"] += 1
+                    continue
+                if dry_run:
+                    self.stats["written"] += 1
+                    continue
+                batch.append({"PutRequest": {"Item": item}})
+                if len(batch) == BATCH_SIZE:
+                    yield batch, "written"
+                    batch = []
+            if batch:
+                yield batch, "written"
+
+        self._run_batches(put_batches())
+
+        if delete_missing:
+            missing = [stock_id for stock_id in existing if stock_id not in seen]
+            if self.stats["failed"] or self.stats["invalid"]:
+                # Una fila inválida o un lote fallido no debe borrar autos vigentes
+                logger.warning("No se eliminan %s autos: hubo filas inválidas o escrituras fallidas", len(missing))
+            elif dry_run:
+                self.stats["deleted"] = len(missing)
+            else:
+                self._run_batches(
+                    ([{"DeleteRequest": {"Key": {"stockId": stock_id}}} for stock_id in missing[start:start + BATCH_SIZE]], "deleted")
+                    for start in range(0, len(missing), BATCH_SIZE)
+                )
+
+        elapsed = time.monotonic() - started
+        return {
+            **self.stats,
+            "elapsed_s": round(elapsed, 2),
+            "rows_per_second": round(self.stats["read"] / elapsed, 1) if elapsed else 0.0
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa el catálogo de autos desde un CSV a DynamoDB")
+    parser.add_argument("csv_file", help="Archivo CSV del catálogo")
+    parser.add_argument("--table", help="Tabla del catálogo (por defecto CATALOG_TABLE)")
+    parser.add_argument("--workers", type=int, default=8, help="Lotes escritos en paralelo")
+    parser.add_argument("--diff", action="store_true", help="Solo escribir autos nuevos o con cambios")
+    parser.add_argument("--delete-missing", action="store_true", help="Eliminar autos que no están en el CSV")
+    parser.add_argument("--dry-run", action="store_true", help="Mostrar los cambios sin escribir")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.csv_file):
+        logger.error("El archivo %s no existe", args.csv_file)
+        sys.exit(1)
+
+    table_name = args.table or os.environ.get(
+        "CATALOG_TABLE",
+        f"kavak-ai-agent-catalog-{os.environ.get('STAGE', 'dev')}"
+    )
+    logger.info("Importando %s a %s...", args.csv_file, table_name)
+    stats = CatalogImporter(table_name, max_workers=args.workers).import_csv(
+        args.csv_file,
+        diff=args.diff,
+        delete_missing=args.delete_missing,
+        dry_run=args.dry_run
+    )
+
+    prefix = "[DRY RUN] " if args.dry_run else ""
+    print(f"\n{prefix}Resumen de la importación:")
+    print(f"Filas leídas: {stats['read']}")
+    print(f"Escritas: {stats['written']}")
+    print(f"Sin cambios: {stats['unchanged']}")
+    print(f"Eliminadas: {stats['deleted']}")
+    print(f"Inválidas: {stats['invalid']}")
+    print(f"Fallidas: {stats['failed']} (reintentos: {stats['retries']})")
+    print(f"Tiempo: {stats['elapsed_s']}s ({stats['rows_per_second']} filas/s)")
+
+    if stats["failed"] or stats["invalid"]:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
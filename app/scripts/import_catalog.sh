@@ -4,44 +4,10 @@ CSV_FILE=$1
 TABLE_NAME=$2
 
 if [ -z "$CSV_FILE" ] || [ -z "$TABLE_NAME" ]; then
-  echo "Uso: $0 archivo.csv nombre_tabla"
+  echo "Uso: $0 archivo.csv nombre_tabla [--diff] [--delete-missing] [--dry-run] [--workers N]"
   exit 1
 fi
 
-# Convierte CSV a JSON
-tmpfile=$(mktemp)
-csvjson "$CSV_FILE" > "$tmpfile"
-
-# Importa cada registro a DynamoDB
-cat "$tmpfile" | jq -c '.[]' | while read -r item; do
-  # Transforma el item para asegurar los tipos de datos correctos
-  transformed_item=$(echo "$item" | jq -c '
-    def tostring_if_number:
-      if type == "number" then tostring else . end;
-    
-    {
-      "stockId": { "S": (.stockId|tostring_if_number) },
-      "make": { "S": .make },
-      "model": { "S": .model },
-      "year": { "N": (.year|tostring_if_number) },
-      "price": { "N": (.price|tostring_if_number) },
-      "km": { "N": (.km|tostring_if_number) },
-      "version": { "S": (.version // "") },
-      "bluetooth": { "BOOL": (.bluetooth == "Sí") },
-      "carPlay": { "BOOL": (.carPlay == "Sí") },
-      "largo": { "N": (.largo|tostring_if_number) },
-      "ancho": { "N": (.ancho|tostring_if_number) },
-      "altura": { "N": (.altura|tostring_if_number) }
-    } | with_entries(select(.value != null and .value != "" and .value != "null"))
-  ')
-
-  aws dynamodb put-item \
-    --table-name "$TABLE_NAME" \
-    --item "$transformed_item" \
-    --region us-east-1
-
-  echo "Importado: $(echo "$item" | jq -r '.stockId')"
-done
-
-rm "$tmpfile"
-echo "Importación terminada." 
\ No newline at end of file
+# La importación (tipos, validación y escritura por lotes) la hace import_catalog.py
+export AWS_DEFAULT_REGION=${AWS_DEFAULT_REGION:-us-east-1}
+exec python3 "$(dirname "$0")/import_catalog.py" "$CSV_FILE" --table "$TABLE_NAME" "${@:3}"
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Prueba local de la reserva de citas con contadores por hora.
+
+Contra moto (tablas de citas y de horarios con los esquemas de
+create_local_tables.sh) verifica que:
+- se reservan citas hasta llenar la hora (SLOT_CAPACITY) y la siguiente se
+  rechaza con horarios alternativos
+- cancelar libera el lugar y reactivar lo vuelve a ocupar
+- el backfill cuenta las citas creadas antes de los contadores (sin slotKey),
+  omite las pasadas y canceladas, y se puede volver a ejecutar sin contar dos veces
+- cancelar una cita anterior a los contadores no libera un lugar que no ocupaba
+
+Termina con código 1 si alguna verificación falla. Requiere moto.
+
+Uso:
+    python benchmarks/appointment_slots.py
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+# Agregar la raíz del repo y el directorio app al path
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "app"))
+
+from benchmarks.load_test import FAKE_ENV, create_tables, get_mock_aws
+
+def next_weekday(days_ahead: int = 2) -> str:
+    """Primer lunes a viernes a partir de days_ahead días (YYYY-MM-DD)."""
+    day = datetime.utcnow() + timedelta(days=days_ahead)
+    while day.weekday() > 4:
+        day += timedelta(days=1)
+    return day.strftime("%Y-%m-%d")
+
+def main():
+    mock = get_mock_aws()
+    mock.start()
+    failures: List[str] = []
+
+    def check(name: str, condition: bool, detail: Optional[Any] = None) -> None:
+        print(f"{'OK  ' if condition else 'FAIL'} {name}" + (f" ({detail})" if detail is not None else ""))
+        if not condition:
+            failures.append(name)
+
+    try:
+        os.environ.update(FAKE_ENV)
+        os.environ.pop("DYNAMODB_ENDPOINT", None)
+        os.environ["SLOT_CAPACITY"] = "3"
+
+        from core.services.container import get_dynamodb
+        from core.services.prospect_service import ProspectService
+
+        dynamodb = get_dynamodb()
+        create_tables(dynamodb)
+        # Las citas solo leen los detalles del auto para el mensaje de confirmación
+        recommender = SimpleNamespace(
+            get_car_details=lambda stock_id: {"make": "Mazda", "model": "3", "year": 2020},
+            get_cars_details=lambda stock_ids, fields=None: {}
+        )
+        service = ProspectService(dynamodb=dynamodb, car_recommender=recommender)
+        date = next_weekday()
+
+        # Reservar hasta llenar la hora
+        results = [
+            service.save_appointment(f"whatsapp:+5210000000{idx}", f"Cliente {idx}", date, "10:00", "243587")
+            for idx in range(4)
+        ]
+        check("3 citas reservadas", [ok for ok, _ in results[:3]] == [True] * 3, [message[:40] for _, message in results[:3]])
+        check("la cuarta se rechaza por cupo", not results[3][0] and "no hay disponibilidad" in results[3][1], results[3][1][:60])
+        check("el rechazo sugiere horarios", "Horarios disponibles" in results[3][1])
+        check("la hora aparece llena", not service.check_availability(date, "10:00"))
+
+        # Cancelar libera el lugar y reactivar lo ocupa de nuevo
+        first = service.get_prospect_appointments("whatsapp:+52100000000")["appointments"][0]
+        check("cancelar", service.update_appointment_status("whatsapp:+52100000000", first["appointmentId"], "cancelled"))
+        check("la hora vuelve a tener lugar", service.check_availability(date, "10:00"))
+        check("reactivar", service.update_appointment_status("whatsapp:+52100000000", first["appointmentId"], "pending"))
+        check("la hora vuelve a estar llena", not service.check_availability(date, "10:00"))
+
+        # Citas anteriores a los contadores (sin slotKey)
+        legacy = [
+            ("whatsapp:+5211111111", date, "15:00", "pending"),
+            ("whatsapp:+5211111112", date, "15:00", "confirmed"),
+            ("whatsapp:+5211111113", date, "15:00", "confirmed"),
+            ("whatsapp:+5211111114", date, "15:00", "cancelled"),
+            ("whatsapp:+5211111115", date, "16:00", "pending"),
+            ("whatsapp:+5211111116", "2020-01-06", "10:00", "pending")
+        ]
+        for number, day, hour, status in legacy:
+            service.table.put_item(Item={
+                "whatsappNumber": number,
+                "appointmentId": f"2020-01-01T00:00:00#{number}",
+                "prospectName": "Cliente anterior",
+                "appointmentDate": day,
+                "appointmentTime": hour,
+                "statusAppointment": f"{status}#{day} {hour}",
+                "stockId": "243587",
+                "status": status
+            })
+        check("antes del backfill la hora con citas anteriores aparece libre", service.check_availability(date, "15:00"))
+
+        stats = service.backfill_slot_counters()
+        print(f"Backfill: {stats}")
+        check("backfill cuenta las 4 citas futuras activas", stats["counted"] == 4, stats["counted"])
+        check("backfill omite la pasada y la cancelada", stats["skipped"] == 2, stats["skipped"])
+        check("la hora con 3 citas anteriores queda llena", not service.check_availability(date, "15:00"))
+        check("la hora con 1 cita anterior tiene lugar", service.check_availability(date, "16:00"))
+        rejected, _ = service.save_appointment("whatsapp:+5219999999", "Nuevo", date, "15:00", "243587")
+        check("no se sobrevende la hora con citas anteriores", not rejected)
+
+        stats = service.backfill_slot_counters()
+        check("el backfill se puede repetir sin contar dos veces", stats["counted"] == 0, stats)
+
+        # Una cita anterior cancelada antes del backfill no libera un lugar ajeno
+        service.table.put_item(Item={
+            "whatsappNumber": "whatsapp:+5211111117",
+            "appointmentId": "2020-01-01T00:00:00#whatsapp:+5211111117",
+            "prospectName": "Cliente anterior",
+            "appointmentDate": date,
+            "appointmentTime": "10:00",
+            "statusAppointment": f"pending#{date} 10:00",
+            "stockId": "243587",
+            "status": "pending"
+        })
+        check(
+            "cancelar una cita sin contar",
+            service.update_appointment_status("whatsapp:+5211111117", "2020-01-01T00:00:00#whatsapp:+5211111117", "cancelled")
+        )
+        check("la hora llena sigue llena", not service.check_availability(date, "10:00"))
+    finally:
+        mock.stop()
+
+    print()
+    if failures:
+        print(f"{len(failures)} verificaciones fallaron")
+        sys.exit(1)
+    print("Todas las verificaciones pasaron")
+
+if __name__ == '__main__':
+    main()
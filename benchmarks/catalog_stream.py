@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Prueba local de la actualización incremental de embeddings.
+
+Alimenta functions.update_embeddings.handler con registros sintéticos de
+DynamoDB Streams de la tabla del catálogo (alta, cambio de precio repetido,
+cambio sin efecto en los textos y baja) contra moto y el servidor falso de
+OpenAI, y verifica que:
+- solo se generan los embeddings de los textos que cambiaron, en una llamada
+- los autos dados de baja pierden sus embeddings
+- queda una sola fila de embeddings por auto
+- la versión del índice sube y un recomendador ya cargado ve los cambios
+
+Termina con código 1 si alguna verificación falla. Requiere moto.
+
+Uso:
+    python benchmarks/catalog_stream.py --cars 30
+"""
+
+import os
+import sys
+import json
+import argparse
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Agregar la raíz del repo y el directorio app al path
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "app"))
+
+from benchmarks.fakes.openai_server import FakeOpenAIServer
+from benchmarks.load_test import FAKE_ENV, create_tables, seed_tables, load_catalog, get_mock_aws
+
+def stream_record(event_name: str, car: Dict[str, Any], sequence: int) -> Dict[str, Any]:
+    """
+    Construye un registro de DynamoDB Streams (NEW_AND_OLD_IMAGES) para un auto.
+
+    Args:
+        event_name: INSERT, MODIFY o REMOVE
+        car: Auto (imagen nueva, o la anterior en REMOVE)
+        sequence: Número de secuencia del registro
+
+    Returns:
+        Registro con el formato de Lambda
+    """
+    from boto3.dynamodb.types import TypeSerializer
+    serializer = TypeSerializer()
+    image = {key: serializer.serialize(value) for key, value in car.items()}
+    data: Dict[str, Any] = {
+        "Keys": {"stockId": serializer.serialize(car["stockId"])},
+        "SequenceNumber": str(sequence),
+        "StreamViewType": "NEW_AND_OLD_IMAGES"
+    }
+    if event_name == "REMOVE":
+        data["OldImage"] = image
+    else:
+        data["NewImage"] = image
+    return {"eventID": str(sequence), "eventName": event_name, "eventSource": "aws:dynamodb", "dynamodb": data}
+
+def embedding_rows(table: Any, stock_id: str) -> List[Dict[str, Any]]:
+    return table.query(
+        KeyConditionExpression="stockId = :sid",
+        ExpressionAttributeValues={":sid": stock_id}
+    ).get("Items", [])
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de la actualización incremental de embeddings")
+    parser.add_argument("--cars", type=int, default=30, help="Autos del catálogo a sembrar")
+    args = parser.parse_args()
+
+    cars = load_catalog(ROOT / "sample_caso_ai_engineer.csv")[:max(4, args.cars)]
+    server = FakeOpenAIServer().start()
+    mock = get_mock_aws()
+    mock.start()
+    failures: List[str] = []
+
+    def check(name: str, condition: bool, detail: Optional[Any] = None) -> None:
+        print(f"{'OK  ' if condition else 'FAIL'} {name}" + (f" ({detail})" if detail is not None else ""))
+        if not condition:
+            failures.append(name)
+
+    try:
+        os.environ.update(FAKE_ENV)
+        os.environ.pop("DYNAMODB_ENDPOINT", None)
+        os.environ["OPENAI_BASE_URL"] = server.url
+        os.environ["INDEX_VERSION_CHECK_SECONDS"] = "0"
+
+        from core.services.container import get_dynamodb, get_car_recommender
+        from functions.update_embeddings.handler import handler, _normalize_car_text
+
+        dynamodb = get_dynamodb()
+        create_tables(dynamodb)
+        new_car, existing = cars[-1], cars[:-1]
+        seed_tables(dynamodb, existing, _normalize_car_text)
+        embeddings = dynamodb.Table(FAKE_ENV["EMBEDDINGS_TABLE"])
+
+        # Recomendador "caliente" con el índice ya en memoria
+        recommender = get_car_recommender()
+        _, warm_ids, _ = recommender.get_all_catalog_embeddings("full")
+        repriced, untouched, removed = existing[0], existing[1], existing[2]
+        before = {row["stockId"]: row for row in embeddings.scan()["Items"]}
+
+        records = [
+            stream_record("INSERT", new_car, 1),
+            stream_record("MODIFY", {**repriced, "price": repriced["price"] + Decimal(5000)}, 2),
+            stream_record("MODIFY", {**repriced, "price": repriced["price"] + Decimal(25000)}, 3),
+            stream_record("MODIFY", untouched, 4),
+            stream_record("REMOVE", removed, 5)
+        ]
+        requests_before = server.stats["embedding_requests"]
+        response = handler({"Records": records}, None)
+        stats = json.loads(response["body"])
+        print(f"Resultado: {stats}")
+
+        check("respuesta 200", response["statusCode"] == 200)
+        check("autos actualizados (alta y cambio de precio)", stats["updated"] == 2, stats["updated"])
+        check("auto sin cambios en los textos omitido", stats["skipped"] == 1, stats["skipped"])
+        check("auto dado de baja eliminado", stats["deleted"] == 1, stats["deleted"])
+        check(
+            "una sola llamada de embeddings para el lote",
+            server.stats["embedding_requests"] - requests_before == 1,
+            server.stats["embedding_requests"] - requests_before
+        )
+        check("solo textos cambiados (3 del alta + full del cambio)", stats["embedded_texts"] == 4, stats["embedded_texts"])
+
+        rows = embedding_rows(embeddings, repriced["stockId"])
+        check("una sola fila por auto", len(rows) == 1, len(rows))
+        expected_full = _normalize_car_text({**repriced, "price": repriced["price"] + Decimal(25000)}, "full")
+        check("full_text con el último precio", rows and rows[0]["full_text"] == expected_full)
+        check(
+            "embedding de marca reutilizado",
+            rows and rows[0]["make_embedding"] == before[repriced["stockId"]]["make_embedding"]
+        )
+        check("alta con embeddings", len(embedding_rows(embeddings, new_car["stockId"])) == 1)
+        check("baja sin embeddings", not embedding_rows(embeddings, removed["stockId"]))
+
+        check("versión del índice incrementada", recommender.get_index_version() == 1, recommender.get_index_version())
+        _, ids, _ = recommender.get_all_catalog_embeddings("full")
+        check("el índice en memoria no tenía el alta", new_car["stockId"] not in warm_ids)
+        check("el índice recargado incluye el alta", new_car["stockId"] in ids)
+        check("el índice recargado excluye la baja", removed["stockId"] not in ids)
+    finally:
+        mock.stop()
+        server.stop()
+
+    print()
+    if failures:
+        print(f"{len(failures)} verificaciones fallaron")
+        sys.exit(1)
+    print("Todas las verificaciones pasaron")
+
+if __name__ == '__main__':
+    main()
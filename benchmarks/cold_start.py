@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque en frío de ProcessMessageFunction.
+
+Importa functions.process_message.handler en un proceso nuevo (como lo hace
+Lambda en la fase de inicialización) y reporta:
+- Tiempo de importación con -X importtime (módulos más costosos)
+- Tiempo total de importación + construcción de servicios
+- Número de recursos de DynamoDB y clientes de OpenAI construidos
+
+Con --baseline-ref compara contra otra versión del código (ej: el commit
+anterior al contenedor de servicios), extraída con git archive.
+
+Uso:
+    python benchmarks/cold_start.py --rounds 5 --baseline-ref HEAD~1
+"""
+
+import os
+import sys
+import json
+import tarfile
+import argparse
+import tempfile
+import statistics
+import subprocess
+from io import BytesIO
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Variables mínimas para construir los servicios sin tocar AWS ni OpenAI
+FAKE_ENV = {
+    "STAGE": "dev",
+    "OPENAI_API_KEY": "sk-fake",
+    "CATALOG_TABLE": "kavak-ai-agent-catalog-dev",
+    "EMBEDDINGS_TABLE": "kavak-ai-agent-embeddings-dev",
+    "PROSPECTS_TABLE": "kavak-ai-prospects-dev",
+    "TWILIO_ACCOUNT_SID": "ACfake",
+    "TWILIO_AUTH_TOKEN": "fake",
+    "TWILIO_PHONE_NUMBER": "+10000000000"
+}
+
+# Cuenta los clientes construidos durante la importación del handler
+COUNTING_BOOTSTRAP = """
+import json, time
+import boto3.session, openai
+counts = {"dynamodb_resources": 0, "openai_clients": 0}
+_resource = boto3.session.Session.resource
+def resource(self, *args, **kwargs):
+    counts["dynamodb_resources"] += 1
+    return _resource(self, *args, **kwargs)
+boto3.session.Session.resource = resource
+_init = openai.OpenAI.__init__
+def init(self, *args, **kwargs):
+    counts["openai_clients"] += 1
+    return _init(self, *args, **kwargs)
+openai.OpenAI.__init__ = init
+start = time.perf_counter()
+import functions.process_message.handler
+counts["init_ms"] = (time.perf_counter() - start) * 1000
+print(json.dumps(counts))
+"""
+
+TIMED_BOOTSTRAP = """
+import json, time
+start = time.perf_counter()
+import functions.process_message.handler
+print(json.dumps({"total_ms": (time.perf_counter() - start) * 1000}))
+"""
+
+def run_python(app_dir: Path, code: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    """Ejecuta código en un intérprete nuevo con app_dir en el path."""
+    env = {**os.environ, **FAKE_ENV, "PYTHONPATH": str(app_dir)}
+    args = [sys.executable]
+    if importtime:
+        args += ["-X", "importtime"]
+    args += ["-c", code]
+    result = subprocess.run(args, cwd=app_dir, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Falló la importación en {app_dir}:\n{result.stderr[-2000:]}")
+    return result
+
+def parse_importtime(stderr: str):
+    """Extrae (módulo, self_us, cumulative_us) de la salida de -X importtime."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, values = line.split(":", 1)
+        self_us, cumulative_us, name = [part for part in values.split("|")]
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def measure(app_dir: Path, rounds: int, top: int) -> dict:
+    """Mide el arranque en frío de una versión del código."""
+    totals = []
+    import_rows = []
+    for _ in range(rounds):
+        result = run_python(app_dir, TIMED_BOOTSTRAP, importtime=True)
+        totals.append(json.loads(result.stdout.strip().splitlines()[-1])["total_ms"])
+        import_rows = parse_importtime(result.stderr)
+
+    counts = json.loads(run_python(app_dir, COUNTING_BOOTSTRAP).stdout.strip().splitlines()[-1])
+
+    # Módulos de primer nivel (sin sangría) ordenados por tiempo acumulado
+    top_level = sorted(
+        [(name.strip(), cumulative) for name, _, cumulative in import_rows if not name.startswith("  ")],
+        key=lambda row: row[1],
+        reverse=True
+    )[:top]
+    return {
+        "total_ms": statistics.median(totals),
+        "import_self_ms": sum(self_us for _, self_us, _ in import_rows) / 1000,
+        "construction_ms": counts["init_ms"],
+        "dynamodb_resources": counts["dynamodb_resources"],
+        "openai_clients": counts["openai_clients"],
+        "top_modules": top_level
+    }
+
+def extract_ref(ref: str, target: Path) -> Path:
+    """Extrae el directorio app de un commit con git archive."""
+    archive = subprocess.run(
+        ["git", "archive", "--format=tar", ref, "app"],
+        cwd=ROOT, capture_output=True, check=True
+    ).stdout
+    with tarfile.open(fileobj=BytesIO(archive)) as tar:
+        tar.extractall(target)
+    return target / "app"
+
+def print_result(label: str, result: dict) -> None:
+    print(f"\n== {label} ==")
+    print(f"Importación + inicialización (mediana): {result['total_ms']:8.1f} ms")
+    print(f"Suma de tiempos propios de import:      {result['import_self_ms']:8.1f} ms")
+    print(f"Construcción de servicios (deps ya importadas): {result['construction_ms']:8.1f} ms")
+    print(f"Recursos de DynamoDB: {result['dynamodb_resources']}, clientes de OpenAI: {result['openai_clients']}")
+    print("Módulos más costosos (acumulado):")
+    for name, cumulative in result["top_modules"]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío")
+    parser.add_argument("--rounds", type=int, default=5, help="Repeticiones (se reporta la mediana)")
+    parser.add_argument("--top", type=int, default=10, help="Número de módulos a mostrar")
+    parser.add_argument("--baseline-ref", help="Commit de git para comparar (ej: HEAD~1)")
+    args = parser.parse_args()
+
+    current = measure(ROOT / "app", args.rounds, args.top)
+    print_result("Versión actual", current)
+
+    if args.baseline_ref:
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline = measure(extract_ref(args.baseline_ref, Path(tmp)), args.rounds, args.top)
+        print_result(f"Base ({args.baseline_ref})", baseline)
+        saved = baseline["total_ms"] - current["total_ms"]
+        print(f"\nReducción del arranque en frío: {saved:.1f} ms ({saved / baseline['total_ms']:.0%})")
+        print(
+            f"Clientes construidos: DynamoDB {baseline['dynamodb_resources']} -> {current['dynamodb_resources']}, "
+            f"OpenAI {baseline['openai_clients']} -> {current['openai_clients']}"
+        )
+
+if __name__ == '__main__':
+    main()
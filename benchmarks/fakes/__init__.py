@@ -0,0 +1,3 @@
+"""
+Servidores y stand-ins locales para pruebas y benchmarks sin servicios externos.
+"""
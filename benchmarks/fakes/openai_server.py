@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Servidor falso de la API de OpenAI para pruebas locales.
+
+Implementa /v1/chat/completions (con y sin stream=True) y /v1/embeddings.
+Las respuestas de chat salen de un guion (lista de respuestas o función),
+con latencia configurable antes del primer token y entre tokens.
+
+Uso como módulo:
+    server = FakeOpenAIServer(script=[{"content": "Hola"}], token_delay_ms=20).start()
+    os.environ["OPENAI_BASE_URL"] = server.url
+    ...
+    server.stop()
+
+Uso como proceso:
+    python benchmarks/fakes/openai_server.py --port 8089 --latency-ms 300
+"""
+
+import json
+import math
+import time
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Union
+
+DEFAULT_CONTENT = "¡Hola! Soy tu asistente de Kavak 🚗\n\n¿Qué tipo de auto estás buscando?"
+
+def estimate_tokens(text: str) -> int:
+    """Estimación aproximada de tokens (misma heurística que PromptOptimizer)."""
+    return max(1, int(len(str(text).split()) * 1.3))
+
+def fake_embedding(text: str, dimensions: int = 1536) -> List[float]:
+    """
+    Embedding determinista tipo bolsa de palabras: textos con palabras en
+    común tienen similitud coseno alta, lo que hace útiles las búsquedas.
+    """
+    vector = [0.0] * dimensions
+    for word in str(text).lower().split():
+        digest = hashlib.md5(word.encode("utf-8")).digest()
+        idx = int.from_bytes(digest[:4], "little") % dimensions
+        vector[idx] += 1.0 if digest[4] % 2 else -1.0
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+class FakeOpenAIServer:
+    """Servidor HTTP en un hilo que imita la API de OpenAI."""
+
+    def __init__(
+        self,
+        script: Optional[Union[List[Dict[str, Any]], Callable[[Dict[str, Any]], Dict[str, Any]]]] = None,
+        latency_ms: float = 0,
+        token_delay_ms: float = 0,
+        embedding_latency_ms: float = 0,
+        embedding_dimensions: int = 1536,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        """
+        Args:
+            script: Respuestas de chat en orden ({"content": ...} o
+                {"tool_calls": [{"name": ..., "arguments": {...}}]}) o una
+                función que recibe el request y retorna la respuesta
+            latency_ms: Latencia antes de la respuesta (o del primer token)
+            token_delay_ms: Latencia entre fragmentos en streaming
+            embedding_latency_ms: Latencia de /v1/embeddings
+            embedding_dimensions: Dimensión de los embeddings
+            host: Host de escucha
+            port: Puerto (0 = libre)
+        """
+        self.script = script if script is not None else []
+        self.latency_ms = latency_ms
+        self.token_delay_ms = token_delay_ms
+        self.embedding_latency_ms = embedding_latency_ms
+        self.embedding_dimensions = embedding_dimensions
+        self.lock = threading.Lock()
+        self.requests: List[Dict[str, Any]] = []
+        self.stats = {
+            "chat_requests": 0,
+            "stream_requests": 0,
+            "embedding_requests": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "embedding_tokens": 0
+        }
+        self._script_index = 0
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """URL base para OPENAI_BASE_URL."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        """Inicia el servidor en un hilo en segundo plano."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Detiene el servidor."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def next_chat_response(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Obtiene la siguiente respuesta del guion."""
+        if callable(self.script):
+            return self.script(request)
+        with self.lock:
+            if self._script_index < len(self.script):
+                response = self.script[self._script_index]
+                self._script_index += 1
+                return response
+        return {"content": DEFAULT_CONTENT}
+
+    def _record(self, **increments: int) -> None:
+        with self.lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, payload: Dict[str, Any], status: int = 200) -> None:
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _write_chunk(self, data: str) -> None:
+                encoded = data.encode("utf-8")
+                self.wfile.write(f"{len(encoded):x}\r\n".encode("ascii") + encoded + b"\r\n")
+                self.wfile.flush()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with server.lock:
+                    server.requests.append({"path": self.path, "body": request})
+
+                if self.path.endswith("/embeddings"):
+                    self._handle_embeddings(request)
+                elif self.path.endswith("/chat/completions"):
+                    self._handle_chat(request)
+                else:
+                    self._send_json({"error": {"message": f"Ruta no soportada: {self.path}"}}, 404)
+
+            def _handle_embeddings(self, request: Dict[str, Any]) -> None:
+                time.sleep(server.embedding_latency_ms / 1000)
+                inputs = request.get("input", "")
+                if isinstance(inputs, str):
+                    inputs = [inputs]
+                dimensions = request.get("dimensions") or server.embedding_dimensions
+                tokens = sum(estimate_tokens(text) for text in inputs)
+                server._record(embedding_requests=1, embedding_tokens=tokens)
+                self._send_json({
+                    "object": "list",
+                    "model": request.get("model", "text-embedding-ada-002"),
+                    "data": [
+                        {"object": "embedding", "index": idx, "embedding": fake_embedding(text, dimensions)}
+                        for idx, text in enumerate(inputs)
+                    ],
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+                })
+
+            def _handle_chat(self, request: Dict[str, Any]) -> None:
+                try:
+                    scripted = server.next_chat_response(request)
+                except Exception as e:
+                    # Un guion que rechaza la petición falla el turno (400 no se reintenta)
+                    self._send_json({"error": {"message": str(e), "type": "invalid_request_error"}}, 400)
+                    return
+                content = scripted.get("content")
+                tool_calls = [
+                    {
+                        "id": call.get("id", f"call_{idx}_{int(time.time() * 1000)}"),
+                        "type": "function",
+                        "function": {
+                            "name": call["name"],
+                            "arguments": call["arguments"] if isinstance(call.get("arguments"), str)
+                            else json.dumps(call.get("arguments", {}), ensure_ascii=False)
+                        }
+                    }
+                    for idx, call in enumerate(scripted.get("tool_calls") or [])
+                ]
+                prompt_tokens = sum(
+                    estimate_tokens(msg.get("content") or "") for msg in request.get("messages", [])
+                )
+                completion_tokens = estimate_tokens(content or "") + sum(
+                    estimate_tokens(call["function"]["arguments"]) for call in tool_calls
+                )
+                finish_reason = "tool_calls" if tool_calls else "stop"
+                server._record(
+                    chat_requests=1,
+                    stream_requests=1 if request.get("stream") else 0,
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens
+                )
+
+                time.sleep(server.latency_ms / 1000)
+                base = {
+                    "id": f"chatcmpl-fake-{int(time.time() * 1000)}",
+                    "created": int(time.time()),
+                    "model": request.get("model", "fake-model")
+                }
+
+                if not request.get("stream"):
+                    message = {"role": "assistant", "content": content}
+                    if tool_calls:
+                        message["tool_calls"] = tool_calls
+                    self._send_json({
+                        **base,
+                        "object": "chat.completion",
+                        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                        "usage": {
+                            "prompt_tokens": prompt_tokens,
+                            "completion_tokens": completion_tokens,
+                            "total_tokens": prompt_tokens + completion_tokens
+                        }
+                    })
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def emit(delta: Dict[str, Any], reason: Optional[str] = None) -> None:
+                    chunk = {
+                        **base,
+                        "object": "chat.completion.chunk",
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": reason}]
+                    }
+                    self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+
+                emit({"role": "assistant", "content": ""})
+                if content:
+                    pieces = [content[i:i + 8] for i in range(0, len(content), 8)]
+                    for piece in pieces:
+                        time.sleep(server.token_delay_ms / 1000)
+                        emit({"content": piece})
+                for idx, call in enumerate(tool_calls):
+                    emit({"tool_calls": [{
+                        "index": idx,
+                        "id": call["id"],
+                        "type": "function",
+                        "function": {"name": call["function"]["name"], "arguments": ""}
+                    }]})
+                    arguments = call["function"]["arguments"]
+                    for i in range(0, len(arguments), 16):
+                        time.sleep(server.token_delay_ms / 1000)
+                        emit({"tool_calls": [{"index": idx, "function": {"arguments": arguments[i:i + 16]}}]})
+                emit({}, finish_reason)
+                self._write_chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Servidor falso de OpenAI")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--token-delay-ms", type=float, default=0)
+    parser.add_argument("--script", help="Archivo JSON con la lista de respuestas de chat")
+    args = parser.parse_args()
+
+    script = []
+    if args.script:
+        with open(args.script, encoding="utf-8") as f:
+            script = json.load(f)
+
+    fake = FakeOpenAIServer(
+        script=script,
+        latency_ms=args.latency_ms,
+        token_delay_ms=args.token_delay_ms,
+        port=args.port
+    )
+    print(f"Servidor falso de OpenAI en {fake.url} (export OPENAI_BASE_URL={fake.url})")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        fake.stop()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Stub local de la API REST de Twilio (envío de mensajes).
+
+Implementa POST /2010-04-01/Accounts/{AccountSid}/Messages.json y responde
+como Twilio con el mensaje en estado "queued". Registra los mensajes
+enviados para que las pruebas puedan verificarlos.
+
+Permite inyectar fallas para probar los reintentos del sender: una
+secuencia fija de estados (inject_faults) o una tasa aleatoria (fail_rate).
+
+Uso como módulo:
+    stub = TwilioStub(latency_ms=50).start()
+    os.environ["TWILIO_API_BASE_URL"] = stub.url
+    stub.inject_faults(429, 503)   # las dos siguientes peticiones fallan
+    ...
+    stub.stop()
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl
+
+class TwilioStub:
+    """Servidor HTTP en un hilo que imita el envío de mensajes de Twilio."""
+
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        fail_rate: float = 0.0,
+        fail_status: int = 503,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            latency_ms: Latencia de cada envío
+            host: Host de escucha
+            port: Puerto (0 = libre)
+            fail_rate: Fracción de peticiones que fallan con fail_status
+            fail_status: Estado HTTP de las fallas aleatorias (ej: 429, 503)
+            seed: Semilla de las fallas aleatorias
+        """
+        self.latency_ms = latency_ms
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.messages: List[Dict[str, Any]] = []
+        self.faults: List[int] = []
+        self.requests = 0
+        self.failures = 0
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """URL base para TWILIO_API_BASE_URL."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def inject_faults(self, *statuses: int) -> None:
+        """
+        Hace que las siguientes peticiones fallen con los estados indicados, en orden.
+
+        Args:
+            *statuses: Estados HTTP (ej: 429, 500, 503)
+        """
+        with self.lock:
+            self.faults.extend(statuses)
+
+    def _next_fault(self) -> Optional[int]:
+        """Obtiene el estado de falla de la petición actual (None si no falla)."""
+        with self.lock:
+            self.requests += 1
+            if self.faults:
+                status = self.faults.pop(0)
+            elif self.fail_rate and self.random.random() < self.fail_rate:
+                status = self.fail_status
+            else:
+                return None
+            self.failures += 1
+            return status
+
+    def start(self) -> "TwilioStub":
+        """Inicia el servidor en un hilo en segundo plano."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Detiene el servidor."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, payload: Dict[str, Any], status: int) -> None:
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                form = dict(parse_qsl(self.rfile.read(length).decode("utf-8")))
+                parts = self.path.strip("/").split("/")
+                if len(parts) != 4 or parts[1] != "Accounts" or parts[3] != "Messages.json":
+                    self._send_json({"code": 20404, "message": f"Ruta no soportada: {self.path}", "status": 404}, 404)
+                    return
+
+                time.sleep(stub.latency_ms / 1000)
+                fault = stub._next_fault()
+                if fault:
+                    code = 20429 if fault == 429 else 20500
+                    self._send_json({"code": code, "message": f"Falla inyectada ({fault})", "status": fault}, fault)
+                    return
+
+                with stub.lock:
+                    sid = f"SM{len(stub.messages) + 1:032x}"
+                    message = {
+                        "sid": sid,
+                        "account_sid": parts[2],
+                        "to": form.get("To"),
+                        "from": form.get("From"),
+                        "body": form.get("Body", ""),
+                        "sent_at": time.time()
+                    }
+                    stub.messages.append(message)
+
+                now = datetime.now(timezone.utc).strftime("%a, %d %b %Y %H:%M:%S +0000")
+                self._send_json({
+                    "sid": sid,
+                    "account_sid": parts[2],
+                    "to": message["to"],
+                    "from": message["from"],
+                    "body": message["body"],
+                    "status": "queued",
+                    "direction": "outbound-api",
+                    "num_segments": "1",
+                    "date_created": now,
+                    "date_updated": now,
+                    "api_version": "2010-04-01",
+                    "uri": f"/2010-04-01/Accounts/{parts[2]}/Messages/{sid}.json"
+                }, 201)
+
+        return Handler
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stub local de Twilio")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fracción de peticiones que fallan")
+    parser.add_argument("--fail-status", type=int, default=503, help="Estado HTTP de las fallas")
+    args = parser.parse_args()
+
+    twilio = TwilioStub(latency_ms=args.latency_ms, port=args.port, fail_rate=args.fail_rate, fail_status=args.fail_status)
+    print(f"Stub de Twilio en {twilio.url} (export TWILIO_API_BASE_URL={twilio.url})")
+    try:
+        twilio._server.serve_forever()
+    except KeyboardInterrupt:
+        twilio.stop()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark del enrutador de intenciones: qué parte del tráfico evita al LLM.
+
+Clasifica una muestra de mensajes (la conversación de ejemplo del README más
+búsquedas típicas) y estima la latencia ahorrada con la duración promedio de
+un turno con LLM y de un turno atendido por reglas.
+
+Uso:
+    python benchmarks/intent_router.py --llm-turn-ms 4500 --routed-turn-ms 600
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Agregar el directorio app al path para importar los módulos core
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from core.services.intent_router import IntentRouter
+
+# (mensaje, es primer contacto)
+SAMPLE_MESSAGES = [
+    ("Hola 👋", True),
+    ("Busco un auto económico familiar", False),
+    ("¿Tiene bluetooth el Spark?", False),
+    ("Muéstrame más opciones", False),
+    ("¿Cuánto sería la mensualidad del Versa?", False),
+    ("Sí, me interesa", False),
+    ("Mañana a las 11", False),
+    ("Juan Pérez", False),
+    ("No, gracias", False),
+    ("5", False),
+    ("Buenas tardes", True),
+    ("Busco un Jetta", False),
+    ("¿Tienen Mazda 3?", False),
+    ("Quiero un Mercedes", False),
+    ("Algo entre 200 y 300 mil", False),
+    ("Autos de menos de 250k", False),
+    ("Quiero agendar una cita para ver el CR-V", False),
+    ("Tengo 80 mil de enganche", False),
+    ("¿Qué diferencia hay entre el Sentra y el Versa?", False),
+    ("4", False)
+]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del enrutador de intenciones")
+    parser.add_argument("--llm-turn-ms", type=float, default=4500, help="Duración promedio de un turno con LLM")
+    parser.add_argument("--routed-turn-ms", type=float, default=600, help="Duración promedio de un turno por reglas")
+    parser.add_argument("--rounds", type=int, default=1000, help="Repeticiones para medir la clasificación")
+    args = parser.parse_args()
+
+    router = IntentRouter(conversation_service=None, functions={})
+    first_contact_context = []
+    ongoing_context = [{"role": "user", "content": "Hola"}, {"role": "assistant", "content": "¡Hola!"}]
+
+    routed = 0
+    for message, first_contact in SAMPLE_MESSAGES:
+        classified = router.classify(message, first_contact_context if first_contact else ongoing_context)
+        label = f"{classified[0]} {classified[1]}" if classified else "LLM"
+        print(f"{message[:45]:<47} -> {label}")
+        if classified:
+            routed += 1
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        for message, first_contact in SAMPLE_MESSAGES:
+            router.classify(message, first_contact_context if first_contact else ongoing_context)
+    per_message = (time.perf_counter() - start) / (args.rounds * len(SAMPLE_MESSAGES))
+
+    share = routed / len(SAMPLE_MESSAGES)
+    saved = routed * (args.llm_turn_ms - args.routed_turn_ms)
+    print()
+    print(f"Mensajes sin LLM: {routed}/{len(SAMPLE_MESSAGES)} ({share:.0%})")
+    print(f"Costo de clasificación: {per_message * 1e6:.1f} µs por mensaje")
+    print(f"Latencia ahorrada estimada: {saved:.0f} ms en la muestra ({saved / len(SAMPLE_MESSAGES):.0f} ms por mensaje)")
+    print("Nota: las respuestas de MSAT solo se atienden por reglas si hay una encuesta pendiente.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,736 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga de extremo a extremo sin servicios externos.
+
+Ejecuta functions.process_message.handler y functions.send_response.handler
+contra stand-ins locales:
+- OpenAI: servidor falso (benchmarks/fakes/openai_server.py) con tool calls
+  y respuestas guionadas y latencia configurable
+- DynamoDB: moto en el mismo proceso, sembrado desde sample_caso_ai_engineer.csv
+  (catálogo y embeddings deterministas)
+- Twilio: stub local (benchmarks/fakes/twilio_stub.py)
+
+Reproduce N conversaciones sintéticas concurrentes y reporta throughput,
+percentiles de latencia por turno, operaciones de DynamoDB y tokens del LLM
+por turno.
+
+Con --pipeline se elige cómo se ejecuta cada turno:
+- direct: ProcessMessage y SendResponse en orden (sin overhead de orquestación)
+- standard: los pasos del Step Function (ValidateRequest con una firma de
+  Twilio real, ProcessMessage y SendResponse) más un overhead modelado por
+  invocación de Lambda y por transición de estado
+- worker: el worker de SQS (functions.message_worker) en una sola invocación
+  más el overhead modelado de la cola
+- compare: ejecuta los tres y muestra la comparación de latencias
+
+Antes de medir se carga el índice de embeddings y, por pipeline, se ejecutan
+--warmup conversaciones sin medir (como en un contenedor caliente).
+
+Los overheads (--invoke-overhead-ms, --transition-ms, --queue-overhead-ms) son
+estimaciones configurables: el harness no ejecuta Step Functions ni SQS reales.
+Por eso el resumen reporta por separado la latencia medida (lo que se ejecuta
+en el proceso) y el overhead modelado (las pausas), que solo refleja esos
+parámetros.
+
+Requiere moto (pip install -r requirements.txt).
+
+Uso:
+    python benchmarks/load_test.py --conversations 50 --concurrency 10 --latency-ms 300
+    python benchmarks/load_test.py --pipeline compare --conversations 20
+"""
+
+import os
+import sys
+import csv
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from decimal import Decimal
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+# Agregar la raíz del repo y el directorio app al path
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "app"))
+
+from benchmarks.fakes.openai_server import FakeOpenAIServer, fake_embedding
+from benchmarks.fakes.twilio_stub import TwilioStub
+
+STAGE = "loadtest"
+
+# STAGE distinto de dev para que el contenedor no apunte a DynamoDB local
+FAKE_ENV = {
+    "STAGE": STAGE,
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "OPENAI_API_KEY": "sk-fake",
+    "CATALOG_TABLE": f"kavak-ai-agent-catalog-{STAGE}",
+    "EMBEDDINGS_TABLE": f"kavak-ai-agent-embeddings-{STAGE}",
+    "PROSPECTS_TABLE": f"kavak-ai-agent-prospects-{STAGE}",
+    "SLOTS_TABLE": f"kavak-ai-agent-slots-{STAGE}",
+    "IDEMPOTENCY_TABLE": f"kavak-ai-agent-idempotency-{STAGE}",
+    "TWILIO_ACCOUNT_SID": "ACfake",
+    "TWILIO_AUTH_TOKEN": "fake",
+    "TWILIO_PHONE_NUMBER": "+10000000000",
+    "LOG_LEVEL": "WARNING",
+    "TRACE_MODE": "off"
+}
+
+CONVERSATIONS_TABLE = f"kavak-ai-agent-conversations-{STAGE}"
+
+NUMBER_FIELDS = ("km", "price", "year", "largo", "ancho", "altura")
+BOOL_FIELDS = ("bluetooth", "carPlay")
+
+# Conversaciones sintéticas (se asignan de forma cíclica)
+CONVERSATION_SCRIPTS = [
+    [
+        "Hola",
+        "Busco un Volkswagen Touareg",
+        "¿Qué opciones de financiamiento tengo con 100 mil de enganche?",
+        "Gracias"
+    ],
+    [
+        "Buenas tardes, quiero un auto familiar espacioso",
+        "¿Tienen algo de menos de 300 mil?",
+        "¿Cuáles son los detalles del primero?"
+    ],
+    [
+        "Hola, ¿qué garantía tienen los autos?",
+        "¿Dónde están sus sucursales?",
+        "Me interesa un Nissan Versa 2019",
+        "¿Y con 50 mil de enganche cuánto pagaría?"
+    ]
+]
+
+SUMMARY_MARKER = "Eres un asistente que resume conversaciones"
+
+PIPELINES = ("direct", "standard", "worker")
+
+# Estados del Step Function por turno con respuesta: ValidateRequest,
+# ExtractMessageData, WaitForBurst, ProcessMessage, HasPendingMessage, SendResponse
+STANDARD_TRANSITIONS = 6
+
+def load_catalog(csv_path: Path) -> List[Dict[str, Any]]:
+    """
+    Lee el CSV del catálogo con los mismos tipos que import_local_catalog.sh.
+
+    Args:
+        csv_path: Ruta del CSV
+
+    Returns:
+        Lista de autos listos para DynamoDB
+    """
+    cars = []
+    with open(csv_path, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            car: Dict[str, Any] = {"stockId": str(row["stockId"])}
+            for field in ("make", "model", "version"):
+                if row.get(field):
+                    car[field] = row[field]
+            for field in NUMBER_FIELDS:
+                if row.get(field):
+                    car[field] = Decimal(row[field])
+            for field in BOOL_FIELDS:
+                car[field] = row.get(field) == "Sí"
+            cars.append(car)
+    return cars
+
+def create_tables(dynamodb: Any) -> None:
+    """Crea las tablas con los mismos esquemas que scripts/create_local_tables.sh."""
+    definitions = [
+        {
+            "TableName": CONVERSATIONS_TABLE,
+            "KeySchema": [
+                {"AttributeName": "conversationId", "KeyType": "HASH"},
+                {"AttributeName": "messageId", "KeyType": "RANGE"}
+            ],
+            "AttributeDefinitions": [
+                {"AttributeName": "conversationId", "AttributeType": "S"},
+                {"AttributeName": "messageId", "AttributeType": "S"},
+                {"AttributeName": "userId", "AttributeType": "S"}
+            ],
+            "GlobalSecondaryIndexes": [
+                {
+                    "IndexName": "SummaryIndex",
+                    "KeySchema": [{"AttributeName": "conversationId", "KeyType": "HASH"}],
+                    "Projection": {"ProjectionType": "ALL"}
+                },
+                {
+                    "IndexName": "UserIdIndex",
+                    "KeySchema": [{"AttributeName": "userId", "KeyType": "HASH"}],
+                    "Projection": {"ProjectionType": "ALL"}
+                }
+            ]
+        },
+        {
+            "TableName": FAKE_ENV["CATALOG_TABLE"],
+            "KeySchema": [{"AttributeName": "stockId", "KeyType": "HASH"}],
+            "AttributeDefinitions": [{"AttributeName": "stockId", "AttributeType": "S"}]
+        },
+        {
+            "TableName": FAKE_ENV["EMBEDDINGS_TABLE"],
+            "KeySchema": [
+                {"AttributeName": "stockId", "KeyType": "HASH"},
+                {"AttributeName": "lastUpdate", "KeyType": "RANGE"}
+            ],
+            "AttributeDefinitions": [
+                {"AttributeName": "stockId", "AttributeType": "S"},
+                {"AttributeName": "lastUpdate", "AttributeType": "S"}
+            ]
+        },
+        {
+            "TableName": FAKE_ENV["PROSPECTS_TABLE"],
+            "KeySchema": [
+                {"AttributeName": "whatsappNumber", "KeyType": "HASH"},
+                {"AttributeName": "appointmentId", "KeyType": "RANGE"}
+            ],
+            "AttributeDefinitions": [
+                {"AttributeName": "whatsappNumber", "AttributeType": "S"},
+                {"AttributeName": "appointmentId", "AttributeType": "S"},
+                {"AttributeName": "statusAppointment", "AttributeType": "S"}
+            ],
+            "GlobalSecondaryIndexes": [{
+                "IndexName": "WhatsappStatusIndex",
+                "KeySchema": [
+                    {"AttributeName": "whatsappNumber", "KeyType": "HASH"},
+                    {"AttributeName": "statusAppointment", "KeyType": "RANGE"}
+                ],
+                "Projection": {"ProjectionType": "ALL"}
+            }]
+        },
+        {
+            "TableName": FAKE_ENV["SLOTS_TABLE"],
+            "KeySchema": [
+                {"AttributeName": "calendarId", "KeyType": "HASH"},
+                {"AttributeName": "slotKey", "KeyType": "RANGE"}
+            ],
+            "AttributeDefinitions": [
+                {"AttributeName": "calendarId", "AttributeType": "S"},
+                {"AttributeName": "slotKey", "AttributeType": "S"}
+            ]
+        },
+        {
+            "TableName": FAKE_ENV["IDEMPOTENCY_TABLE"],
+            "KeySchema": [{"AttributeName": "messageSid", "KeyType": "HASH"}],
+            "AttributeDefinitions": [{"AttributeName": "messageSid", "AttributeType": "S"}]
+        }
+    ]
+    for definition in definitions:
+        dynamodb.create_table(BillingMode="PAY_PER_REQUEST", **definition)
+
+def seed_tables(dynamodb: Any, cars: List[Dict[str, Any]], normalize_car_text: Callable[..., str]) -> None:
+    """
+    Siembra el catálogo y sus embeddings. Los embeddings usan la misma función
+    determinista que el servidor falso, así las búsquedas encuentran resultados.
+
+    Args:
+        dynamodb: Recurso de DynamoDB
+        cars: Autos del catálogo
+        normalize_car_text: CarRecommender._normalize_car_text
+    """
+    now = time.strftime("%Y-%m-%dT%H:%M:%S")
+    catalog = dynamodb.Table(FAKE_ENV["CATALOG_TABLE"])
+    embeddings = dynamodb.Table(FAKE_ENV["EMBEDDINGS_TABLE"])
+    with catalog.batch_writer() as batch:
+        for car in cars:
+            batch.put_item(Item=car)
+    with embeddings.batch_writer() as batch:
+        for car in cars:
+            item = {"stockId": car["stockId"], "lastUpdate": now}
+            for text_type in ("make", "model", "full"):
+                text = normalize_car_text(car, text_type)
+                item[f"{text_type}_text"] = text
+                item[f"{text_type}_embedding"] = [Decimal(str(round(x, 8))) for x in fake_embedding(text)]
+            batch.put_item(Item=item)
+
+class DynamoDBCounter:
+    """Cuenta las operaciones de DynamoDB con los event hooks de botocore."""
+
+    READS = {"GetItem", "BatchGetItem", "Query", "Scan", "TransactGetItems"}
+    WRITES = {"PutItem", "UpdateItem", "DeleteItem", "BatchWriteItem", "TransactWriteItems"}
+
+    def __init__(self, client: Any):
+        self.lock = threading.Lock()
+        self.operations: Counter = Counter()
+        client.meta.events.register("before-call.dynamodb", self._on_call)
+
+    def _on_call(self, model: Any = None, **kwargs) -> None:
+        with self.lock:
+            self.operations[model.name] += 1
+
+    def reset(self) -> None:
+        with self.lock:
+            self.operations.clear()
+
+    @property
+    def reads(self) -> int:
+        return sum(count for name, count in self.operations.items() if name in self.READS)
+
+    @property
+    def writes(self) -> int:
+        return sum(count for name, count in self.operations.items() if name in self.WRITES)
+
+def make_chat_script(cars: List[Dict[str, Any]]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Crea el guion del servidor falso: pide herramientas según el último mensaje
+    del usuario y responde en texto después de recibir sus resultados.
+    Rechaza las peticiones con herramientas que no incluyen un mensaje del
+    usuario (el turno falla).
+
+    Args:
+        cars: Autos del catálogo (para elegir marcas y precios reales)
+
+    Returns:
+        Función request -> respuesta guionada
+    """
+    makes = sorted({car["make"] for car in cars if car.get("make")}, key=len, reverse=True)
+    reference_price = float(cars[0]["price"]) if cars else 300000.0
+
+    def script(request: Dict[str, Any]) -> Dict[str, Any]:
+        messages = request.get("messages", [])
+        if messages and SUMMARY_MARKER in (messages[0].get("content") or ""):
+            return {"content": "Número: whatsapp:+5215500000000\nIntención: comprar un auto\nPreferencias: Ninguna\n"
+                               "Autos consultados: Ninguno\nAutos seleccionados: Ninguno\nEstado: explorando"}
+        last = messages[-1] if messages else {}
+        if last.get("role") == "tool" or not request.get("tools"):
+            return {"content": "Estas son las opciones que encontré para ti 🚗\n\n"
+                               "¿Te gustaría ver más detalles o agendar una prueba de manejo?"}
+
+        last_user = next((msg for msg in reversed(messages) if msg.get("role") == "user"), None)
+        if last_user is None:
+            raise AssertionError("El prompt no incluye el mensaje del usuario")
+        text = (last_user.get("content") or "").lower()
+        if "enganche" in text or "financ" in text:
+            return {"tool_calls": [{"name": "get_financing_options", "arguments": {
+                "car_price": reference_price, "down_payment": 100000
+            }}]}
+        if "detalle" in text and cars:
+            return {"tool_calls": [{"name": "get_car_details", "arguments": {"stock_id": cars[0]["stockId"]}}]}
+        for make in makes:
+            if make.lower() in text:
+                return {"tool_calls": [{"name": "search_by_make_model", "arguments": {"make": make}}]}
+        if "mil" in text or "precio" in text:
+            return {"tool_calls": [{"name": "search_by_price_range", "arguments": {"max_price": 300000}}]}
+        if "familiar" in text or "espacioso" in text:
+            return {"tool_calls": [{"name": "get_car_recommendations", "arguments": {"query": text}}]}
+        return {"content": "En Kavak todos los autos tienen garantía de 3 meses y 7 días de prueba 😊"}
+
+    return script
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano (0 si no hay valores)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def _sleep_ms(milliseconds: float) -> float:
+    """Simula un overhead de orquestación y lo retorna (ms modelados)."""
+    if milliseconds:
+        time.sleep(milliseconds / 1000)
+    return milliseconds
+
+def make_turn_runner(
+    pipeline: str,
+    process_handler: Callable[..., Dict[str, Any]],
+    send_handler: Callable[..., Dict[str, Any]],
+    invoke_overhead_ms: float = 0,
+    transition_ms: float = 0,
+    queue_overhead_ms: float = 0
+) -> Callable[[str, str, str], float]:
+    """
+    Crea la función que ejecuta un turno según el pipeline.
+
+    Args:
+        pipeline: direct, standard o worker
+        process_handler: Handler de ProcessMessage
+        send_handler: Handler de SendResponse
+        invoke_overhead_ms: Overhead modelado por invocación de Lambda
+        transition_ms: Overhead modelado por transición de estado (standard)
+        queue_overhead_ms: Overhead modelado de SQS hasta el worker (worker)
+
+    Returns:
+        Función (from_number, mensaje, correlation_id) que retorna los ms de
+        overhead modelado del turno y lanza excepción si el turno falla
+    """
+    if pipeline == "direct":
+        def run_direct(from_number: str, message: str, correlation_id: str) -> None:
+            response = process_handler({
+                "from_number": from_number,
+                "message_body": message,
+                "correlation_id": correlation_id
+            }, None)
+            if response.get("agent_message"):
+                send_handler({**response, "from_number": from_number}, None)
+            return 0.0
+        return run_direct
+
+    if pipeline == "standard":
+        from twilio.request_validator import RequestValidator
+        from functions.validate_webhook.handler import handler as validate_handler
+        validator = RequestValidator(FAKE_ENV["TWILIO_AUTH_TOKEN"])
+        host = "loadtest.execute-api.local"
+
+        def run_standard(from_number: str, message: str, correlation_id: str) -> float:
+            body = {"From": from_number, "Body": message, "MessageSid": correlation_id}
+            signature = validator.compute_signature(f"https://{host}/{STAGE}/webhook", body)
+            modeled = _sleep_ms(transition_ms + invoke_overhead_ms)
+            validated = validate_handler({
+                "headers": {"Host": host, "X-Forwarded-Proto": "https", "X-Twilio-Signature": signature},
+                "body": body,
+                "requestContext": {"stage": STAGE}
+            }, None)
+            modeled += _sleep_ms(3 * transition_ms + invoke_overhead_ms)
+            response = process_handler({
+                "from_number": validated["from_number"],
+                "message_body": validated["message_body"],
+                "correlation_id": correlation_id,
+                "buffer_key": "",
+                "coalesce_wait_seconds": 0
+            }, None)
+            modeled += _sleep_ms(transition_ms)
+            if response.get("agent_message"):
+                modeled += _sleep_ms(transition_ms + invoke_overhead_ms)
+                send_handler({**response, "from_number": from_number}, None)
+            return modeled
+        return run_standard
+
+    if pipeline == "worker":
+        from functions.message_worker.handler import handler as worker_handler
+
+        def run_worker(from_number: str, message: str, correlation_id: str) -> float:
+            modeled = _sleep_ms(queue_overhead_ms + invoke_overhead_ms)
+            result = worker_handler({"Records": [{
+                "messageId": correlation_id,
+                "body": json.dumps({
+                    "from_number": from_number,
+                    "message_body": message,
+                    "message_sid": correlation_id
+                }),
+                "attributes": {"ApproximateReceiveCount": "1", "MessageGroupId": from_number}
+            }]}, None)
+            if result["batchItemFailures"]:
+                raise RuntimeError(f"El worker reportó {len(result['batchItemFailures'])} mensajes fallidos")
+            return modeled
+        return run_worker
+
+    raise ValueError(f"Pipeline desconocido: {pipeline}")
+
+def run_conversation(
+    conversation_idx: int,
+    turns: List[str],
+    run_turn: Callable[[str, str, str], float],
+    think_time_ms: float,
+    number_prefix: str = "52155"
+) -> List[Dict[str, Any]]:
+    """
+    Ejecuta los turnos de una conversación en orden.
+
+    Args:
+        conversation_idx: Índice de la conversación
+        turns: Mensajes del usuario
+        run_turn: Función creada por make_turn_runner
+        think_time_ms: Pausa aleatoria máxima entre turnos
+        number_prefix: Prefijo del número (distinto por pipeline para no mezclar contextos)
+
+    Returns:
+        Lista con la latencia, el overhead modelado y el resultado de cada turno
+    """
+    from_number = f"whatsapp:+{number_prefix}{conversation_idx:08d}"
+    results = []
+    for turn_idx, message in enumerate(turns):
+        correlation_id = f"SM{number_prefix}{conversation_idx:011x}{turn_idx:016x}"
+        start = time.perf_counter()
+        try:
+            modeled_ms = run_turn(from_number, message, correlation_id)
+            results.append({"latency": time.perf_counter() - start, "modeled_ms": modeled_ms, "ok": True})
+        except Exception as e:
+            results.append({"latency": time.perf_counter() - start, "ok": False, "error": str(e)})
+        if think_time_ms:
+            time.sleep(random.uniform(0, think_time_ms) / 1000)
+    return results
+
+def get_mock_aws() -> Any:
+    """Obtiene el mock de AWS de moto (mock_aws en moto 5, mock_dynamodb en moto 4)."""
+    try:
+        from moto import mock_aws
+    except ImportError:
+        try:
+            from moto import mock_dynamodb as mock_aws
+        except ImportError:
+            sys.exit("Se requiere moto: pip install -r requirements.txt")
+    return mock_aws()
+
+def prepare_pipeline(
+    cars: List[Dict[str, Any]],
+    openai_url: str,
+    twilio_url: str,
+    stream: bool = False
+) -> Tuple[DynamoDBCounter, Callable[..., Dict[str, Any]], Callable[..., Dict[str, Any]]]:
+    """
+    Configura el entorno, crea y siembra las tablas e importa los handlers.
+    El mock de moto debe estar activo.
+
+    Args:
+        cars: Autos del catálogo
+        openai_url: URL del servidor falso de OpenAI
+        twilio_url: URL del stub de Twilio
+        stream: Activar STREAM_RESPONSES
+
+    Returns:
+        Tupla con (contador de DynamoDB, handler de ProcessMessage, handler de SendResponse)
+    """
+    os.environ.update(FAKE_ENV)
+    os.environ.pop("DYNAMODB_ENDPOINT", None)
+    os.environ["OPENAI_BASE_URL"] = openai_url
+    os.environ["TWILIO_API_BASE_URL"] = twilio_url
+    os.environ["STREAM_RESPONSES"] = "true" if stream else "false"
+
+    from core.services.container import get_dynamodb
+    from core.services.car_recommender import CarRecommender
+
+    dynamodb = get_dynamodb()
+    create_tables(dynamodb)
+    seed_tables(dynamodb, cars, CarRecommender(dynamodb=dynamodb)._normalize_car_text)
+    counter = DynamoDBCounter(dynamodb.meta.client)
+
+    # Importar los handlers después de preparar el entorno (se construyen al importar)
+    from functions.process_message.handler import handler as process_handler
+    from functions.send_response.handler import handler as send_handler
+    return counter, process_handler, send_handler
+
+def warm_index() -> None:
+    """
+    Carga en memoria el índice de embeddings de cada tipo. En moto cada
+    carga es un scan completo que tarda más que TOOL_TIMEOUT_SECONDS, así
+    que sin esto la búsqueda fría falla por timeout en vez de medirse.
+    """
+    from core.services.container import get_car_recommender
+
+    start = time.perf_counter()
+    recommender = get_car_recommender()
+    for embedding_type in ("make", "model", "full"):
+        recommender.get_all_catalog_embeddings(embedding_type)
+    print(f"Índice de embeddings cargado en {time.perf_counter() - start:.2f}s")
+
+def warmup(pipeline: str, run_turn: Callable[[str, str, str], float], conversations: int, number_prefix: str) -> None:
+    """
+    Ejecuta conversaciones sin medir antes de la corrida (clientes, imports
+    y caminos de cada pipeline), para medir contenedores calientes.
+
+    Args:
+        pipeline: Pipeline que se va a medir
+        run_turn: Función creada por make_turn_runner
+        conversations: Conversaciones a ejecutar en orden
+        number_prefix: Prefijo del número (distinto al de la corrida medida)
+    """
+    start = time.perf_counter()
+    results = [
+        result
+        for idx in range(conversations)
+        for result in run_conversation(idx, CONVERSATION_SCRIPTS[idx % len(CONVERSATION_SCRIPTS)], run_turn, 0, number_prefix)
+    ]
+    errors = sum(1 for result in results if not result["ok"])
+    print(f"Calentamiento [{pipeline}]: {len(results)} turnos en {time.perf_counter() - start:.2f}s, errores: {errors}")
+
+def run_load(
+    pipeline: str,
+    run_turn: Callable[[str, str, str], float],
+    args: argparse.Namespace,
+    counter: DynamoDBCounter,
+    server: Any,
+    twilio: TwilioStub,
+    number_prefix: str
+) -> Dict[str, Any]:
+    """
+    Ejecuta las conversaciones sintéticas con un pipeline y resume los resultados.
+
+    Returns:
+        Resumen con throughput, latencias, DynamoDB, LLM y Twilio
+    """
+    conversations = [
+        CONVERSATION_SCRIPTS[idx % len(CONVERSATION_SCRIPTS)]
+        for idx in range(args.conversations)
+    ]
+    counter.reset()
+    chat_before = dict(server.stats)
+    twilio_before = len(twilio.messages)
+    twilio_failures_before = twilio.failures
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [
+            executor.submit(run_conversation, idx, turns, run_turn, args.think_time_ms, number_prefix)
+            for idx, turns in enumerate(conversations)
+        ]
+        turn_results = [result for future in futures for result in future.result()]
+    wall_time = time.perf_counter() - start
+
+    llm = {key: server.stats[key] - chat_before[key] for key in server.stats}
+    latencies = [result["latency"] * 1000 for result in turn_results if result["ok"]]
+    # Latencia ejecutada en el proceso, sin los overheads modelados (sleeps)
+    measured = [result["latency"] * 1000 - result["modeled_ms"] for result in turn_results if result["ok"]]
+    modeled = [result["modeled_ms"] for result in turn_results if result["ok"]]
+    errors = [result for result in turn_results if not result["ok"]]
+    turns = len(turn_results) or 1
+
+    return {
+        "pipeline": pipeline,
+        "conversations": args.conversations,
+        "concurrency": args.concurrency,
+        "turns": len(turn_results),
+        "errors": len(errors),
+        "error_samples": [error["error"] for error in errors[:5]],
+        "wall_time_s": wall_time,
+        "throughput_turns_per_s": len(turn_results) / wall_time if wall_time else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies) if latencies else 0.0
+        },
+        "measured_latency_ms": {
+            "p50": percentile(measured, 50),
+            "p95": percentile(measured, 95),
+            "p99": percentile(measured, 99)
+        },
+        "modeled_overhead_ms": sum(modeled) / len(modeled) if modeled else 0.0,
+        "dynamodb": {
+            "reads": counter.reads,
+            "writes": counter.writes,
+            "reads_per_turn": counter.reads / turns,
+            "writes_per_turn": counter.writes / turns,
+            "operations": dict(counter.operations)
+        },
+        "llm": {
+            **llm,
+            "chat_requests_per_turn": llm["chat_requests"] / turns,
+            "prompt_tokens_per_turn": llm["prompt_tokens"] / turns,
+            "completion_tokens_per_turn": llm["completion_tokens"] / turns,
+            "embedding_tokens_per_turn": llm["embedding_tokens"] / turns
+        },
+        "twilio_messages": len(twilio.messages) - twilio_before,
+        "twilio_failures": twilio.failures - twilio_failures_before
+    }
+
+def print_summary(summary: Dict[str, Any]) -> None:
+    """Imprime el resumen de una corrida."""
+    llm = summary["llm"]
+    dynamodb = summary["dynamodb"]
+    print(f"\n[{summary['pipeline']}]")
+    print(f"Conversaciones: {summary['conversations']} (concurrencia {summary['concurrency']}), turnos: {summary['turns']}, errores: {summary['errors']}")
+    print(f"Tiempo total: {summary['wall_time_s']:.2f}s, throughput: {summary['throughput_turns_per_s']:.2f} turnos/s")
+    print("Latencia por turno (ms): " + ", ".join(f"{name} {value:.1f}" for name, value in summary["latency_ms"].items()))
+    if summary["modeled_overhead_ms"]:
+        print(
+            "  medida sin overhead modelado: "
+            + ", ".join(f"{name} {value:.1f}" for name, value in summary["measured_latency_ms"].items())
+            + f"; overhead modelado {summary['modeled_overhead_ms']:.1f} ms/turno"
+        )
+    print(
+        f"DynamoDB: {dynamodb['reads']} lecturas ({dynamodb['reads_per_turn']:.1f}/turno), "
+        f"{dynamodb['writes']} escrituras ({dynamodb['writes_per_turn']:.1f}/turno)"
+    )
+    for name, count in sorted(dynamodb["operations"].items(), key=lambda item: -item[1]):
+        print(f"  {name:<20} {count:6d}")
+    print(
+        f"LLM: {llm['chat_requests']} llamadas de chat ({llm['chat_requests_per_turn']:.2f}/turno), "
+        f"{llm['prompt_tokens_per_turn']:.0f} tokens de prompt y "
+        f"{llm['completion_tokens_per_turn']:.0f} de respuesta por turno, "
+        f"{llm['embedding_requests']} llamadas de embeddings"
+    )
+    print(f"Twilio: {summary['twilio_messages']} mensajes enviados, {summary['twilio_failures']} rechazos reintentados")
+    for error in summary["error_samples"]:
+        print(f"Error: {error}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga local de process_message")
+    parser.add_argument("--conversations", type=int, default=20, help="Número de conversaciones sintéticas")
+    parser.add_argument("--concurrency", type=int, default=5, help="Conversaciones simultáneas")
+    parser.add_argument("--latency-ms", type=float, default=300, help="Latencia del LLM falso")
+    parser.add_argument("--embedding-latency-ms", type=float, default=50, help="Latencia de embeddings falsos")
+    parser.add_argument("--twilio-latency-ms", type=float, default=50, help="Latencia del stub de Twilio")
+    parser.add_argument("--twilio-fail-rate", type=float, default=0.0, help="Fracción de envíos que Twilio rechaza con 429 (prueba los reintentos)")
+    parser.add_argument("--think-time-ms", type=float, default=0, help="Pausa aleatoria máxima entre turnos")
+    parser.add_argument("--stream", action="store_true", help="Activar STREAM_RESPONSES")
+    parser.add_argument("--pipeline", choices=PIPELINES + ("compare",), default="direct", help="Pipeline a ejecutar")
+    parser.add_argument("--invoke-overhead-ms", type=float, default=20, help="Overhead modelado por invocación de Lambda")
+    parser.add_argument("--transition-ms", type=float, default=25, help="Overhead modelado por transición de Step Functions")
+    parser.add_argument("--queue-overhead-ms", type=float, default=30, help="Overhead modelado de SQS hasta el worker")
+    parser.add_argument("--warmup", type=int, default=len(CONVERSATION_SCRIPTS), help="Conversaciones sin medir antes de cada pipeline (0 para omitir)")
+    parser.add_argument("--catalog", default=str(ROOT / "sample_caso_ai_engineer.csv"), help="CSV del catálogo")
+    parser.add_argument("--output", help="Guardar el resultado en JSON")
+    args = parser.parse_args()
+
+    mock = get_mock_aws()
+    cars = load_catalog(Path(args.catalog))
+    server = FakeOpenAIServer(
+        script=make_chat_script(cars),
+        latency_ms=args.latency_ms,
+        embedding_latency_ms=args.embedding_latency_ms
+    ).start()
+    twilio = TwilioStub(latency_ms=args.twilio_latency_ms, fail_rate=args.twilio_fail_rate, fail_status=429).start()
+
+    pipelines = PIPELINES if args.pipeline == "compare" else (args.pipeline,)
+    summaries = []
+    mock.start()
+    try:
+        counter, process_handler, send_handler = prepare_pipeline(cars, server.url, twilio.url, stream=args.stream)
+        if args.warmup:
+            warm_index()
+        for idx, pipeline in enumerate(pipelines):
+            run_turn = make_turn_runner(
+                pipeline,
+                process_handler,
+                send_handler,
+                invoke_overhead_ms=args.invoke_overhead_ms,
+                transition_ms=args.transition_ms,
+                queue_overhead_ms=args.queue_overhead_ms
+            )
+            if args.warmup:
+                warmup(pipeline, run_turn, args.warmup, number_prefix=f"5219{idx}")
+            summary = run_load(pipeline, run_turn, args, counter, server, twilio, number_prefix=f"5215{idx}")
+            summaries.append(summary)
+            print_summary(summary)
+    finally:
+        mock.stop()
+        server.stop()
+        twilio.stop()
+
+    if len(summaries) > 1:
+        print("\nComparación de latencia por turno (ms):")
+        print(f"{'pipeline':<10} {'p50 medido':>11} {'p95 medido':>11} {'modelado':>9} {'p50 total':>10} {'p95 total':>10} {'turnos/s':>9}")
+        for summary in summaries:
+            latency = summary["latency_ms"]
+            measured = summary["measured_latency_ms"]
+            print(
+                f"{summary['pipeline']:<10} {measured['p50']:11.1f} {measured['p95']:11.1f} "
+                f"{summary['modeled_overhead_ms']:9.1f} {latency['p50']:10.1f} {latency['p95']:10.1f} "
+                f"{summary['throughput_turns_per_s']:9.2f}"
+            )
+        print(
+            "La columna modelado no es una medición: son las pausas de --invoke-overhead-ms, "
+            "--transition-ms y --queue-overhead-ms (no se ejecutan Step Functions ni SQS). "
+            "Compare los modos con las columnas medidas."
+        )
+
+    if args.output:
+        result = summaries[0] if len(summaries) == 1 else {"pipelines": summaries}
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"Resultado guardado en {args.output}")
+
+    if any(summary["errors"] for summary in summaries):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
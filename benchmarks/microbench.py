@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks de las rutas calientes del recomendador, el procesamiento
+de texto y el financiamiento.
+
+Genera catálogos sintéticos reproducibles (semilla fija) de varios tamaños y
+mide cada función con varias repeticiones (se reporta la mediana y el mínimo):
+- similarity: CarRecommender._calculate_similarity (query vs N embeddings)
+- normalize_text: N descripciones de autos
+- normalize_car_text: CarRecommender._normalize_car_text (texto "full") de N autos
+- extract_car_info: N mensajes de usuario
+- convert_decimal_to_float / convert_decimals: N items de DynamoDB
+- compress_recommendations: PromptOptimizer.compress_recommendations de N autos
+- financing: N llamadas a CarRecommender.get_financing_options
+
+Los resultados se guardan en JSON; con --baseline se comparan contra una
+corrida anterior y, con --fail-threshold, termina con código 1 si alguna
+función es más lenta que el baseline por encima del umbral.
+
+Uso:
+    python benchmarks/microbench.py --sizes 100,1000,10000 --output results.json
+    python benchmarks/microbench.py --sizes 100,1000,10000,100000 --only normalize_text,financing
+    python benchmarks/microbench.py --baseline results.json --fail-threshold 0.2
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+# Agregar el directorio app al path para importar los módulos core
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from core.services.car_recommender import CarRecommender, _convert_decimal_to_float
+from core.services.conversation import _convert_decimals
+from core.services.prompt_optimizer import PromptOptimizer
+from core.utils.text_processing import normalize_text, extract_car_info
+
+MAKES_MODELS = {
+    "Volkswagen": ["Jetta", "Vento", "Golf", "Tiguan", "Touareg"],
+    "Nissan": ["Versa", "Sentra", "March", "Kicks", "X-Trail"],
+    "Chevrolet": ["Spark", "Aveo", "Onix", "Cavalier", "Trax"],
+    "Toyota": ["Corolla", "Yaris", "RAV4", "Camry", "Hilux"],
+    "Honda": ["Civic", "City", "CR-V", "HR-V", "Accord"],
+    "Mazda": ["Mazda 3", "Mazda 2", "CX-3", "CX-5", "CX-30"],
+    "Kia": ["Rio", "Forte", "Seltos", "Sportage", "Soul"],
+    "Mercedes Benz": ["Clase A", "Clase C", "GLA", "GLC", "Clase E"],
+    "Land Rover": ["Discovery Sport", "Range Rover Evoque", "Defender"]
+}
+
+VERSIONS = [
+    "1.6 SENSE MT", "2.0 SPORT AUTO", "1.5 EXCLUSIVE CVT", "1.4 TURBO HIGHLINE DSG",
+    "3.0 V6 TDI WOLFSBURG EDITION AUTO 4WD", "2.0 HSE LUXURY AUTO 4WD", "1.2 LT TM"
+]
+
+MESSAGES = [
+    "Hola, busco un Volkswagen Jetta 2019",
+    "¿Tienen algún Nissan Versa con menos de 50,000 km?",
+    "Me interesa una camioneta familiar de unos 350 mil pesos",
+    "¿Cuánto cuesta el Mazda 3 2020?",
+    "Quiero un auto económico, ¿qué me recomiendas?",
+    "¿El Spark tiene bluetooth y CarPlay?",
+    "Busco una RAV4 o una CR-V del 2021",
+    "¿Qué mensualidad pagaría con 80 mil de enganche?"
+]
+
+def generate_catalog(size: int, seed: int) -> List[Dict[str, Any]]:
+    """
+    Genera un catálogo sintético con los tipos de DynamoDB (Decimal y bool).
+
+    Args:
+        size: Número de autos
+        seed: Semilla del generador
+
+    Returns:
+        Lista de autos
+    """
+    rng = random.Random(seed)
+    makes = sorted(MAKES_MODELS)
+    cars = []
+    for idx in range(size):
+        make = rng.choice(makes)
+        cars.append({
+            "stockId": str(200000 + idx),
+            "make": make,
+            "model": rng.choice(MAKES_MODELS[make]),
+            "version": rng.choice(VERSIONS),
+            "year": Decimal(rng.randint(2012, 2023)),
+            "price": Decimal(f"{rng.randint(150, 1200) * 1000 - 1}.0"),
+            "km": Decimal(rng.randint(5000, 180000)),
+            "largo": Decimal(f"{rng.randint(3600, 5100)}.0"),
+            "ancho": Decimal(f"{rng.randint(1600, 2100)}.0"),
+            "altura": Decimal(f"{rng.randint(1400, 1900)}.0"),
+            "bluetooth": rng.random() < 0.8,
+            "carPlay": rng.random() < 0.5
+        })
+    return cars
+
+def generate_embeddings(size: int, dimensions: int, seed: int, pool_size: int = 256) -> List[List[float]]:
+    """
+    Genera N embeddings. Para no agotar la memoria en tamaños grandes se
+    reutiliza un conjunto de vectores distintos (el cálculo se repite igual).
+    """
+    rng = random.Random(seed)
+    pool = [[rng.uniform(-1, 1) for _ in range(dimensions)] for _ in range(min(size, pool_size))]
+    return [pool[idx % len(pool)] for idx in range(size)]
+
+def measure(func: Callable[[], Any], rounds: int) -> Dict[str, float]:
+    """Ejecuta func varias veces y retorna la mediana y el mínimo en segundos."""
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(times), "min_s": min(times)}
+
+def build_benchmarks(size: int, dimensions: int, seed: int) -> Dict[str, Callable[[], Any]]:
+    """
+    Prepara los datos de un tamaño y retorna las funciones a medir.
+
+    Args:
+        size: Número de elementos (autos, mensajes o llamadas)
+        dimensions: Dimensión de los embeddings
+        seed: Semilla del generador
+
+    Returns:
+        Diccionario nombre -> función sin argumentos
+    """
+    # Instancias sin __init__: las funciones medidas no usan DynamoDB ni OpenAI
+    recommender = CarRecommender.__new__(CarRecommender)
+    optimizer = PromptOptimizer.__new__(PromptOptimizer)
+
+    cars = generate_catalog(size, seed)
+    descriptions = [f"{car['make']} {car['model']} {car['version']} {car['year']} Eléctrico Ñandú" for car in cars]
+    messages = [MESSAGES[idx % len(MESSAGES)] for idx in range(size)]
+    items = [{**car, "embedding": [Decimal("0.0123"), Decimal("-0.5"), Decimal("1")]} for car in cars]
+    query = generate_embeddings(1, dimensions, seed + 1)[0]
+    embeddings = generate_embeddings(size, dimensions, seed)
+    prices = [float(car["price"]) for car in cars]
+
+    return {
+        "similarity": lambda: recommender._calculate_similarity(query, embeddings),
+        "normalize_text": lambda: [normalize_text(text) for text in descriptions],
+        "normalize_car_text": lambda: [recommender._normalize_car_text(car, "full") for car in cars],
+        "extract_car_info": lambda: [extract_car_info(message) for message in messages],
+        "convert_decimal_to_float": lambda: _convert_decimal_to_float(items),
+        "convert_decimals": lambda: _convert_decimals(items),
+        "compress_recommendations": lambda: optimizer.compress_recommendations(cars),
+        "financing": lambda: [recommender.get_financing_options(price, price * 0.2) for price in prices]
+    }
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Compara las medianas contra el baseline.
+
+    Returns:
+        Lista de filas (benchmark, tamaño, baseline, actual, cambio relativo)
+    """
+    rows = []
+    for name, sizes in results["results"].items():
+        for size, current in sizes.items():
+            old = baseline.get("results", {}).get(name, {}).get(size)
+            if not old:
+                continue
+            change = current["median_s"] / old["median_s"] - 1 if old["median_s"] else 0.0
+            rows.append({
+                "benchmark": name,
+                "size": size,
+                "baseline_s": old["median_s"],
+                "current_s": current["median_s"],
+                "change": change
+            })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks de rutas calientes")
+    parser.add_argument("--sizes", default="100,1000,10000", help="Tamaños separados por coma (hasta 100000)")
+    parser.add_argument("--dimensions", type=int, default=1536, help="Dimensión de los embeddings")
+    parser.add_argument("--rounds", type=int, default=3, help="Repeticiones por medición")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de los datos sintéticos")
+    parser.add_argument("--only", help="Benchmarks a ejecutar separados por coma")
+    parser.add_argument("--output", help="Guardar resultados en JSON")
+    parser.add_argument("--baseline", help="Resultados anteriores para comparar")
+    parser.add_argument("--fail-threshold", type=float, help="Terminar con error si algo es más lento por encima de este cambio (ej: 0.2)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    only = set(args.only.split(",")) if args.only else None
+    results: Dict[str, Any] = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "dimensions": args.dimensions,
+            "rounds": args.rounds,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": {}
+    }
+
+    print(f"{'benchmark':<26} {'tamaño':>8} {'mediana (ms)':>13} {'mínimo (ms)':>12} {'µs/elemento':>12}")
+    for size in sizes:
+        benchmarks = build_benchmarks(size, args.dimensions, args.seed)
+        for name, func in benchmarks.items():
+            if only and name not in only:
+                continue
+            timing = measure(func, args.rounds)
+            timing["per_item_us"] = timing["median_s"] / size * 1e6
+            results["results"].setdefault(name, {})[str(size)] = timing
+            print(
+                f"{name:<26} {size:>8} {timing['median_s'] * 1000:13.2f} "
+                f"{timing['min_s'] * 1000:12.2f} {timing['per_item_us']:12.2f}"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResultados guardados en {args.output}")
+
+    if not args.baseline:
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline)
+    print(f"\nComparación contra {args.baseline}:")
+    print(f"{'benchmark':<26} {'tamaño':>8} {'base (ms)':>10} {'actual (ms)':>12} {'cambio':>8}")
+    for row in rows:
+        print(
+            f"{row['benchmark']:<26} {row['size']:>8} {row['baseline_s'] * 1000:10.2f} "
+            f"{row['current_s'] * 1000:12.2f} {row['change']:+8.1%}"
+        )
+
+    if args.fail_threshold is not None:
+        slower = [row for row in rows if row["change"] > args.fail_threshold]
+        if slower:
+            print(f"\n{len(slower)} mediciones más lentas que el baseline por más de {args.fail_threshold:.0%}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Verifica y mide la implementación rápida de normalize_text.
+
+Compara normalize_text contra la implementación original (lower + NFKD +
+quitar diacríticos + re.sub + split/join, copiada abajo como referencia):
+- cada código Unicode por separado (todo el rango, incluidos sustitutos)
+- textos aleatorios reproducibles que mezclan ASCII, acentos, marcas
+  combinantes, espacios Unicode, ligaduras, formas de ancho completo,
+  sigma final y códigos aleatorios
+
+Después mide ambas versiones con descripciones de autos y mensajes (sin
+caché y con caché). Termina con código 1 si algún resultado difiere.
+
+Uso:
+    python benchmarks/normalize_text.py --samples 200000
+    python benchmarks/normalize_text.py --skip-codepoints --size 10000
+"""
+
+import re
+import sys
+import time
+import random
+import argparse
+import unicodedata
+from pathlib import Path
+from typing import Callable, List
+
+# Agregar el directorio app y benchmarks al path
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.utils.text_processing import normalize_text, _normalize
+from microbench import MESSAGES, generate_catalog
+
+def reference_normalize_text(text: str) -> str:
+    """Implementación original de normalize_text."""
+    if not isinstance(text, str):
+        return ""
+    text = text.lower()
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join([c for c in text if not unicodedata.combining(c)])
+    text = re.sub(r"[^a-z0-9\s]", "", text)
+    text = " ".join(text.split())
+    return text
+
+# Fragmentos que ejercitan los casos difíciles
+POOLS = [
+    "abcdefghijklmnopqrstuvwxyz ABCDEFGHIJKLMNOPQRSTUVWXYZ 0123456789 .,;:!?¿¡-_/$%()\"'",
+    "áéíóúüñÁÉÍÓÚÜÑàèìòùâêîôûäëïöçÇãõ",
+    "ְ̧̣́̃̈ͅั〪",
+    " \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f\x85\xa0    ​    　",
+    "ﬁﬂﬀﬃ²³¹½¼ⅣⅫ①⑳㎞㎏™℃ℌℍℵÅǅǈǋ",
+    "ＡＢＣａｂｃ０１２３ｶﾀｶﾅ",
+    "ΣσςΑΒΓαβγİıẞßŉǰΐ",
+    "中文日本語한국어ไทยעברית🚗🚙✨"
+]
+
+def random_text(rng: random.Random) -> str:
+    """Genera un texto aleatorio con fragmentos de varios pools y códigos sueltos."""
+    chars: List[str] = []
+    for _ in range(rng.randint(0, 40)):
+        roll = rng.random()
+        if roll < 0.85:
+            chars.append(rng.choice(rng.choice(POOLS)))
+        elif roll < 0.95:
+            chars.append(chr(rng.randint(0, 0xFFFF)))
+        else:
+            chars.append(chr(rng.randint(0x10000, 0x10FFFF)))
+    return "".join(chars)
+
+def check_codepoints() -> List[str]:
+    """Compara cada código Unicode por separado (también con texto ASCII alrededor)."""
+    mismatches = []
+    for codepoint in range(0x110000):
+        for text in (chr(codepoint), f"Ab {chr(codepoint)}c"):
+            if normalize_text(text) != reference_normalize_text(text):
+                mismatches.append(text)
+    _normalize.cache_clear()
+    return mismatches
+
+def check_random(samples: int, seed: int) -> List[str]:
+    """Compara textos aleatorios reproducibles."""
+    rng = random.Random(seed)
+    mismatches = []
+    for _ in range(samples):
+        text = random_text(rng)
+        if normalize_text(text) != reference_normalize_text(text):
+            mismatches.append(text)
+    for value in (None, 123, b"bytes", ["lista"]):
+        if normalize_text(value) != reference_normalize_text(value):
+            mismatches.append(repr(value))
+    _normalize.cache_clear()
+    return mismatches
+
+def measure(func: Callable[[], object], rounds: int, before: Callable[[], None] = lambda: None) -> float:
+    """Mediana en segundos de varias ejecuciones."""
+    timings = []
+    for _ in range(rounds):
+        before()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2]
+
+def main():
+    parser = argparse.ArgumentParser(description="Equivalencia y rendimiento de normalize_text")
+    parser.add_argument("--samples", type=int, default=100000, help="Textos aleatorios a comparar")
+    parser.add_argument("--size", type=int, default=10000, help="Textos por medición")
+    parser.add_argument("--rounds", type=int, default=5, help="Repeticiones por medición")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de los textos aleatorios")
+    parser.add_argument("--skip-codepoints", action="store_true", help="No recorrer todos los códigos Unicode")
+    args = parser.parse_args()
+
+    failures = 0
+    if not args.skip_codepoints:
+        mismatches = check_codepoints()
+        failures += len(mismatches)
+        print(f"{'OK  ' if not mismatches else 'FAIL'} códigos Unicode ({len(mismatches)} diferencias)")
+        for text in mismatches[:10]:
+            print(f"     {text!r}: {normalize_text(text)!r} != {reference_normalize_text(text)!r}")
+
+    mismatches = check_random(args.samples, args.seed)
+    failures += len(mismatches)
+    print(f"{'OK  ' if not mismatches else 'FAIL'} {args.samples} textos aleatorios ({len(mismatches)} diferencias)")
+    for text in mismatches[:10]:
+        print(f"     {text!r}: {normalize_text(text)!r} != {reference_normalize_text(text)!r}")
+
+    cars = generate_catalog(args.size, args.seed)
+    datasets = {
+        "descripciones": [f"{car['make']} {car['model']} {car['version']} {car['year']} Eléctrico Ñandú" for car in cars],
+        "marca/modelo": [f"{car['make']} {car['model']}" for car in cars],
+        "mensajes": [MESSAGES[idx % len(MESSAGES)] + f" #{idx}" for idx in range(args.size)]
+    }
+
+    print()
+    print(f"{'textos':<14} {'referencia (ms)':>16} {'sin caché (ms)':>15} {'con caché (ms)':>15} {'mejora':>8}")
+    for name, texts in datasets.items():
+        reference = measure(lambda: [reference_normalize_text(text) for text in texts], args.rounds)
+        cold = measure(lambda: [normalize_text(text) for text in texts], args.rounds, _normalize.cache_clear)
+        warm = measure(lambda: [normalize_text(text) for text in texts], args.rounds)
+        print(
+            f"{name:<14} {reference * 1000:16.2f} {cold * 1000:15.2f} {warm * 1000:15.2f} "
+            f"{reference / cold if cold else 0:7.1f}x"
+        )
+
+    print()
+    if failures:
+        print(f"{failures} textos con resultados distintos")
+        sys.exit(1)
+    print("normalize_text es idéntica a la implementación original")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Replay de conversaciones grabadas y benchmark de regresión.
+
+Subcomandos:
+- export: exporta conversaciones de la tabla de conversaciones a un archivo
+  de replay (los números de WhatsApp se anonimizan)
+- ingest-readme: convierte las transcripciones del README ([Usuario]/[Bot])
+  al mismo formato
+- run: reproduce el archivo en el pipeline local de benchmarks/load_test.py
+  (moto, OpenAI falso y stub de Twilio) y mide por turno tokens, operaciones
+  de DynamoDB, tool calls y tiempo. Con --baseline compara contra un
+  resultado guardado y termina con código 1 si hay regresiones. Con
+  --llm recorded también termina con código 1 si alguna llamada al LLM no
+  tuvo respuesta grabada (usaría el guion falso).
+
+Formato del archivo de replay:
+    {"version": 1, "conversations": [
+        {"id": "...", "source": "...", "turns": [{"user": "...", "assistant": "..."}]}
+    ]}
+
+Uso:
+    python benchmarks/replay.py ingest-readme --output benchmarks/replays/readme.json
+    python benchmarks/replay.py export --stage dev --limit 50 --output replay.json
+    python benchmarks/replay.py run --replay replay.json --output result.json --baseline baseline.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Agregar la raíz del repo y el directorio app al path
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "app"))
+
+from benchmarks.fakes.openai_server import FakeOpenAIServer
+from benchmarks.fakes.twilio_stub import TwilioStub
+from benchmarks.load_test import (
+    SUMMARY_MARKER,
+    get_mock_aws,
+    load_catalog,
+    make_chat_script,
+    prepare_pipeline
+)
+
+REPLAY_VERSION = 1
+
+# Métricas por turno que se comparan contra el baseline
+COUNT_METRICS = (
+    "chat_requests",
+    "prompt_tokens",
+    "completion_tokens",
+    "embedding_requests",
+    "embedding_tokens",
+    "dynamodb_reads",
+    "dynamodb_writes",
+    "tool_calls"
+)
+
+TURN_PATTERN = re.compile(r"^\[(Usuario|Bot)\]\s?(.*)$")
+
+def anonymize(conversation_id: str) -> str:
+    """Reemplaza el número de WhatsApp por un identificador estable."""
+    return "conv-" + hashlib.sha256(conversation_id.encode("utf-8")).hexdigest()[:12]
+
+def export_conversations(table_name: str, endpoint_url: Optional[str], limit: int) -> List[Dict[str, Any]]:
+    """
+    Exporta conversaciones de DynamoDB al formato de replay.
+
+    Args:
+        table_name: Tabla de conversaciones
+        endpoint_url: Endpoint de DynamoDB (ej: http://localhost:8000) o None
+        limit: Número máximo de conversaciones
+
+    Returns:
+        Lista de conversaciones con sus turnos en orden
+    """
+    import boto3
+
+    table = boto3.resource("dynamodb", endpoint_url=endpoint_url).Table(table_name)
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    scan_params: Dict[str, Any] = {}
+    while True:
+        response = table.scan(**scan_params)
+        for item in response.get("Items", []):
+            # Omitir resúmenes y encuestas MSAT: solo turnos normales
+            if item.get("messageId") == "summary" or item.get("messageType") == "msat":
+                continue
+            if "userMessage" not in item:
+                continue
+            grouped.setdefault(item["conversationId"], []).append(item)
+        if "LastEvaluatedKey" not in response:
+            break
+        scan_params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    conversations = []
+    for conversation_id, items in sorted(grouped.items())[:limit]:
+        items.sort(key=lambda item: item.get("timestamp", ""))
+        conversations.append({
+            "id": anonymize(conversation_id),
+            "source": f"dynamodb:{table_name}",
+            "turns": [
+                {"user": item["userMessage"], "assistant": item.get("agentMessage", "")}
+                for item in items
+            ]
+        })
+    return conversations
+
+def ingest_readme(readme_path: Path) -> List[Dict[str, Any]]:
+    """
+    Convierte las transcripciones del README en una conversación de replay.
+    Los bloques de código con líneas [Usuario]/[Bot] se leen en orden como
+    una sola conversación (las secciones continúan la anterior).
+
+    Args:
+        readme_path: Ruta del README
+
+    Returns:
+        Lista con una conversación
+    """
+    turns: List[Dict[str, str]] = []
+    in_block = False
+    speaker = None
+    for line in readme_path.read_text(encoding="utf-8").splitlines():
+        if line.strip().startswith("```"):
+            in_block = not in_block
+            speaker = None
+            continue
+        if not in_block:
+            continue
+        match = TURN_PATTERN.match(line)
+        if match:
+            speaker, text = match.groups()
+            if speaker == "Usuario":
+                turns.append({"user": text, "assistant": ""})
+            elif turns:
+                turns[-1]["assistant"] = text
+        elif speaker == "Bot" and turns:
+            turns[-1]["assistant"] += "\n" + line
+
+    for turn in turns:
+        turn["assistant"] = turn["assistant"].strip()
+    return [{"id": "readme", "source": str(readme_path.name), "turns": turns}]
+
+def make_replay_script(
+    mode: str,
+    cars: List[Dict[str, Any]],
+    issued_tools: List[str],
+    current_turn: Dict[str, Any],
+    lock: threading.Lock
+) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Crea el guion del LLM falso para el replay.
+
+    Args:
+        mode: "recorded" responde con la respuesta grabada del turno;
+            "fake" usa el guion con tool calls de load_test
+        cars: Autos del catálogo
+        issued_tools: Lista donde se registran las tool calls emitidas
+        current_turn: Turno que se está reproduciendo ("assistant" con la
+            respuesta grabada); cuenta en "fallbacks" las llamadas que no
+            tuvieron respuesta grabada y usaron el guion falso
+        lock: Lock para issued_tools y current_turn
+
+    Returns:
+        Función request -> respuesta guionada
+    """
+    fake_script = make_chat_script(cars)
+
+    def script(request: Dict[str, Any]) -> Dict[str, Any]:
+        messages = request.get("messages", [])
+        is_summary = bool(messages) and SUMMARY_MARKER in (messages[0].get("content") or "")
+        if mode == "recorded" and not is_summary:
+            # La respuesta se toma del turno reproducido, no del prompt: el
+            # prompt optimizado puede no incluir el mensaje del usuario
+            with lock:
+                answer = current_turn.get("assistant")
+                if not answer:
+                    current_turn["fallbacks"] += 1
+            if answer:
+                return {"content": answer}
+        response = fake_script(request)
+        with lock:
+            issued_tools.extend(call["name"] for call in response.get("tool_calls") or [])
+        return response
+
+    return script
+
+def run_replay(
+    conversations: List[Dict[str, Any]],
+    mode: str,
+    catalog: Path,
+    latency_ms: float
+) -> Dict[str, Any]:
+    """
+    Reproduce las conversaciones en orden, un turno a la vez, y mide cada turno.
+
+    Returns:
+        Resultado con métricas por turno y totales
+    """
+    cars = load_catalog(catalog)
+    issued_tools: List[str] = []
+    current_turn: Dict[str, Any] = {"assistant": None, "fallbacks": 0}
+    lock = threading.Lock()
+    server = FakeOpenAIServer(
+        script=make_replay_script(mode, cars, issued_tools, current_turn, lock),
+        latency_ms=latency_ms
+    ).start()
+    twilio = TwilioStub().start()
+    mock = get_mock_aws()
+    mock.start()
+
+    turns: List[Dict[str, Any]] = []
+    try:
+        counter, process_handler, send_handler = prepare_pipeline(cars, server.url, twilio.url)
+        for conversation_idx, conversation in enumerate(conversations):
+            from_number = f"whatsapp:+52155{conversation_idx:08d}"
+            for turn_idx, turn in enumerate(conversation["turns"]):
+                counter.reset()
+                llm_before = dict(server.stats)
+                tools_before = len(issued_tools)
+                with lock:
+                    current_turn.update(assistant=turn.get("assistant"), fallbacks=0)
+
+                start = time.perf_counter()
+                error = None
+                try:
+                    response = process_handler({
+                        "from_number": from_number,
+                        "message_body": turn["user"],
+                        "correlation_id": f"replay-{conversation['id']}-{turn_idx}"
+                    }, None)
+                    if response.get("agent_message"):
+                        send_handler({**response, "from_number": from_number}, None)
+                except Exception as e:
+                    error = str(e)
+                wall_ms = (time.perf_counter() - start) * 1000
+
+                turns.append({
+                    "conversation": conversation["id"],
+                    "turn": turn_idx,
+                    "user": turn["user"],
+                    "wall_ms": wall_ms,
+                    "chat_requests": server.stats["chat_requests"] - llm_before["chat_requests"],
+                    "prompt_tokens": server.stats["prompt_tokens"] - llm_before["prompt_tokens"],
+                    "completion_tokens": server.stats["completion_tokens"] - llm_before["completion_tokens"],
+                    "embedding_requests": server.stats["embedding_requests"] - llm_before["embedding_requests"],
+                    "embedding_tokens": server.stats["embedding_tokens"] - llm_before["embedding_tokens"],
+                    "dynamodb_reads": counter.reads,
+                    "dynamodb_writes": counter.writes,
+                    "tool_calls": len(issued_tools) - tools_before,
+                    "tools": issued_tools[tools_before:],
+                    "fallbacks": current_turn["fallbacks"],
+                    "error": error
+                })
+    finally:
+        mock.stop()
+        server.stop()
+        twilio.stop()
+
+    totals = {metric: sum(turn[metric] for turn in turns) for metric in COUNT_METRICS + ("wall_ms",)}
+    fallbacks = sum(turn["fallbacks"] for turn in turns)
+    return {"version": REPLAY_VERSION, "mode": mode, "turns": turns, "totals": totals, "fallbacks": fallbacks}
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float,
+    time_threshold: float,
+    min_time_ms: float
+) -> List[str]:
+    """
+    Compara un resultado contra el baseline, turno por turno y en totales.
+
+    Args:
+        current: Resultado actual
+        baseline: Resultado guardado
+        threshold: Aumento relativo permitido en conteos (tokens, operaciones, llamadas)
+        time_threshold: Aumento relativo permitido en tiempo
+        min_time_ms: Diferencia mínima de tiempo para considerar regresión (ruido)
+
+    Returns:
+        Lista de regresiones encontradas (vacía si no hay)
+    """
+    regressions = []
+
+    def check(label: str, metric: str, old: float, new: float) -> None:
+        if metric == "wall_ms":
+            if new > old * (1 + time_threshold) and new - old > min_time_ms:
+                regressions.append(f"{label} {metric}: {old:.1f} -> {new:.1f} ms")
+        elif new > old * (1 + threshold) and new > old:
+            regressions.append(f"{label} {metric}: {old:g} -> {new:g}")
+
+    baseline_turns = {(turn["conversation"], turn["turn"]): turn for turn in baseline.get("turns", [])}
+    for turn in current["turns"]:
+        if turn.get("error"):
+            regressions.append(f"{turn['conversation']}#{turn['turn']} falló: {turn['error']}")
+            continue
+        old = baseline_turns.get((turn["conversation"], turn["turn"]))
+        if not old:
+            continue
+        label = f"{turn['conversation']}#{turn['turn']}"
+        for metric in COUNT_METRICS:
+            check(label, metric, old[metric], turn[metric])
+        if old.get("tools") != turn.get("tools"):
+            print(f"  {label}: herramientas {old.get('tools')} -> {turn.get('tools')}")
+
+    for metric, value in current["totals"].items():
+        check("total", metric, baseline["totals"].get(metric, value), value)
+    return regressions
+
+def print_summary(result: Dict[str, Any]) -> None:
+    """Imprime las métricas por turno y los totales."""
+    print(f"{'turno':<24} {'ms':>8} {'llm':>4} {'prompt':>7} {'resp':>6} {'emb':>4} {'lect':>5} {'escr':>5}  herramientas")
+    for turn in result["turns"]:
+        label = f"{turn['conversation'][:18]}#{turn['turn']}"
+        print(
+            f"{label:<24} {turn['wall_ms']:8.1f} {turn['chat_requests']:4d} {turn['prompt_tokens']:7d} "
+            f"{turn['completion_tokens']:6d} {turn['embedding_requests']:4d} {turn['dynamodb_reads']:5d} "
+            f"{turn['dynamodb_writes']:5d}  {', '.join(turn['tools']) or '-'}"
+            + (f"  SIN RESPUESTA GRABADA: {turn['fallbacks']}" if turn.get("fallbacks") else "")
+            + (f"  ERROR: {turn['error']}" if turn.get("error") else "")
+        )
+    totals = result["totals"]
+    print(
+        f"\nTotales: {len(result['turns'])} turnos, {totals['wall_ms']:.0f} ms, "
+        f"{totals['chat_requests']} llamadas al LLM, {totals['prompt_tokens']} + {totals['completion_tokens']} tokens, "
+        f"{totals['dynamodb_reads']} lecturas y {totals['dynamodb_writes']} escrituras en DynamoDB, "
+        f"{totals['tool_calls']} tool calls"
+    )
+
+def write_json(path: str, data: Dict[str, Any]) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay de conversaciones y benchmark de regresión")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Exportar conversaciones de DynamoDB")
+    export_parser.add_argument("--stage", default="dev", help="Stage de la tabla de conversaciones")
+    export_parser.add_argument("--table", help="Nombre de la tabla (por defecto según el stage)")
+    export_parser.add_argument("--endpoint-url", help="Endpoint de DynamoDB (por defecto el local en dev)")
+    export_parser.add_argument("--limit", type=int, default=50, help="Número máximo de conversaciones")
+    export_parser.add_argument("--output", required=True, help="Archivo de replay")
+
+    readme_parser = subparsers.add_parser("ingest-readme", help="Convertir las transcripciones del README")
+    readme_parser.add_argument("--readme", default=str(ROOT / "README.md"))
+    readme_parser.add_argument("--output", required=True, help="Archivo de replay")
+
+    run_parser = subparsers.add_parser("run", help="Reproducir un archivo de replay")
+    run_parser.add_argument("--replay", required=True, help="Archivo de replay")
+    run_parser.add_argument("--llm", choices=["recorded", "fake"], default="recorded",
+                            help="recorded: respuestas grabadas; fake: guion con tool calls")
+    run_parser.add_argument("--latency-ms", type=float, default=0, help="Latencia del LLM falso")
+    run_parser.add_argument("--catalog", default=str(ROOT / "sample_caso_ai_engineer.csv"))
+    run_parser.add_argument("--output", help="Guardar el resultado en JSON")
+    run_parser.add_argument("--baseline", help="Resultado guardado para comparar")
+    run_parser.add_argument("--update-baseline", action="store_true", help="Sobrescribir el baseline con este resultado")
+    run_parser.add_argument("--threshold", type=float, default=0.10, help="Aumento permitido en tokens y operaciones")
+    run_parser.add_argument("--time-threshold", type=float, default=0.25, help="Aumento permitido en tiempo")
+    run_parser.add_argument("--min-time-ms", type=float, default=20, help="Diferencia de tiempo ignorada como ruido")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        table = args.table or f"kavak-ai-agent-conversations-{args.stage}"
+        endpoint = args.endpoint_url or ("http://localhost:8000" if args.stage == "dev" else None)
+        if args.stage == "dev":
+            os.environ.setdefault("AWS_ACCESS_KEY_ID", "dummy")
+            os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "dummy")
+            os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+        conversations = export_conversations(table, endpoint, args.limit)
+        write_json(args.output, {"version": REPLAY_VERSION, "conversations": conversations})
+        print(f"{len(conversations)} conversaciones exportadas a {args.output}")
+        return
+
+    if args.command == "ingest-readme":
+        conversations = ingest_readme(Path(args.readme))
+        write_json(args.output, {"version": REPLAY_VERSION, "conversations": conversations})
+        print(f"{sum(len(c['turns']) for c in conversations)} turnos convertidos a {args.output}")
+        return
+
+    with open(args.replay, encoding="utf-8") as f:
+        replay = json.load(f)
+    result = run_replay(replay["conversations"], args.llm, Path(args.catalog), args.latency_ms)
+    print_summary(result)
+    if args.output:
+        write_json(args.output, result)
+    if result["mode"] == "recorded" and result["fallbacks"]:
+        # Sin respuesta grabada el turno usa el guion falso y la comparación no mide el replay
+        sys.exit(f"{result['fallbacks']} llamadas al LLM sin respuesta grabada usaron el guion falso")
+
+    if not args.baseline:
+        return
+    if args.update_baseline or not Path(args.baseline).exists():
+        write_json(args.baseline, result)
+        print(f"Baseline guardado en {args.baseline}")
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("mode") != result["mode"]:
+        sys.exit(f"El baseline usa --llm {baseline.get('mode')} y esta corrida --llm {result['mode']}")
+    regressions = compare(result, baseline, args.threshold, args.time_threshold, args.min_time_ms)
+    if regressions:
+        print(f"\n{len(regressions)} regresiones contra {args.baseline}:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+    print(f"\nSin regresiones contra {args.baseline}")
+
+if __name__ == '__main__':
+    main()
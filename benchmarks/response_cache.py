@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la caché semántica de respuestas.
+
+Usa el servidor falso de OpenAI (embeddings deterministas por palabras) para
+reproducir una secuencia de preguntas frecuentes y medir aciertos, fallos,
+costo de búsqueda según el tamaño de la caché y latencia ahorrada.
+
+Uso:
+    python benchmarks/response_cache.py --llm-turn-ms 4500 --threshold 0.8
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Agregar la raíz del repo y el directorio app al path
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "app"))
+
+from benchmarks.fakes.openai_server import FakeOpenAIServer
+
+SYSTEM_PROMPT = "Eres un agente comercial de Kavak"
+CONTEXT = [{"role": "user", "content": "Hola"}, {"role": "assistant", "content": "¡Hola!"}]
+
+FAQ_TRAFFIC = [
+    "¿Qué garantía tienen los autos?",
+    "¿Cuánto dura la garantía?",
+    "¿Qué garantía tienen los autos?",
+    "¿Cómo funciona el periodo de prueba?",
+    "¿Cómo funciona el periodo de prueba de 7 días?",
+    "¿Qué tasa de interés manejan?",
+    "¿Qué tasa de interés manejan para el crédito?",
+    "¿Cuántas sedes tiene Kavak?",
+    "¿Cuántas sedes tiene Kavak en México?",
+    "¿Qué revisan en la inspección de 240 puntos?",
+    "¿Qué garantía tienen los autos?",
+    "¿Puedo dejar mi auto a cuenta?",
+    "¿Qué garantía tienen los autos de Kavak?",
+    "Busco un Jetta 2020",
+    "¿Tienen app para el mantenimiento?"
+]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la caché semántica de respuestas")
+    parser.add_argument("--llm-turn-ms", type=float, default=4500, help="Duración simulada de un turno con LLM")
+    parser.add_argument("--threshold", type=float, default=0.8, help="Similitud mínima (embeddings falsos)")
+    parser.add_argument("--sizes", default="16,128,1024", help="Tamaños de caché para medir el costo de búsqueda")
+    args = parser.parse_args()
+
+    from openai import OpenAI
+    from core.services.response_cache import SemanticResponseCache
+
+    server = FakeOpenAIServer().start()
+    try:
+        client = OpenAI(api_key="fake", base_url=server.url)
+        cache = SemanticResponseCache(client=client, threshold=args.threshold, ttl_seconds=3600, max_entries=128)
+
+        skipped = 0
+        for question in FAQ_TRAFFIC:
+            if not cache.is_cacheable(question, CONTEXT):
+                skipped += 1
+                continue
+            start = time.perf_counter()
+            embedding = cache.embed(question)
+            cached = cache.lookup(embedding, SYSTEM_PROMPT)
+            if cached:
+                cache.record_hit_latency(cached["cost_seconds"], time.perf_counter() - start)
+            else:
+                cache.store(question, embedding, f"Respuesta a: {question}", SYSTEM_PROMPT, args.llm_turn_ms / 1000)
+
+        print()
+        print(f"Preguntas: {len(FAQ_TRAFFIC)}, no cacheables: {skipped}")
+        print(f"Aciertos: {cache.stats['hits']}, fallos: {cache.stats['misses']}")
+        print(f"Latencia ahorrada: {cache.stats['saved_seconds'] * 1000:.0f} ms")
+
+        # Invalidación al cambiar el system prompt
+        cache.lookup(cache.embed(FAQ_TRAFFIC[0]), SYSTEM_PROMPT + " v2")
+        print(f"Entradas tras cambiar el system prompt: {len(cache.entries)} (invalidaciones: {cache.stats['invalidations']})")
+
+        # Costo de búsqueda lineal según el tamaño
+        embedding = cache.embed(FAQ_TRAFFIC[0])
+        for size in [int(value) for value in args.sizes.split(",")]:
+            sized = SemanticResponseCache(client=client, threshold=2.0, max_entries=size)
+            for idx in range(size):
+                sized.store(f"pregunta {idx}", embedding, "respuesta", SYSTEM_PROMPT, 0.0)
+            start = time.perf_counter()
+            sized.lookup(embedding, SYSTEM_PROMPT)
+            print(f"Búsqueda con {size:5d} entradas: {(time.perf_counter() - start) * 1000:8.2f} ms")
+    finally:
+        server.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark de streaming: tiempo al primer mensaje entregado vs respuesta completa.
+
+Levanta el servidor falso de OpenAI con latencia por token, consume la misma
+respuesta con y sin stream=True y registra los envíos de StreamingDelivery
+con un sender local (sin Twilio).
+
+Uso:
+    python benchmarks/streaming.py --latency-ms 400 --token-delay-ms 25
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Agregar la raíz del repo y el directorio app al path
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "app"))
+
+from benchmarks.fakes.openai_server import FakeOpenAIServer
+from core.utils.streaming import StreamingDelivery, consume_chat_stream
+
+SAMPLE_RESPONSE = (
+    "¡Encontré 3 opciones que se ajustan a lo que buscas! 🚗\n\n"
+    "1. *Volkswagen Jetta 2020* [243001] - $289,000 MXN, 45,000 km. "
+    "Motor 1.4 turbo, pantalla táctil y Apple CarPlay.\n"
+    "2. *Nissan Sentra 2021* [243002] - $305,000 MXN, 32,000 km. "
+    "Cámara de reversa y control de crucero.\n"
+    "3. *Mazda 3 2019* [243003] - $279,000 MXN, 51,000 km. "
+    "Asientos de piel y sistema de sonido Bose.\n\n"
+    "Todos cuentan con la garantía de 3 meses de Kavak y puedes agendar una "
+    "prueba de manejo en cualquiera de nuestras sucursales. También puedo "
+    "calcularte un plan de financiamiento con el enganche que prefieras.\n\n"
+    "¿Te gustaría ver más detalles de alguno o revisar opciones de financiamiento? 😊"
+)
+
+class RecordingSender:
+    """Sender que registra el momento de cada envío."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sent = []
+
+    def __call__(self, to_number: str, body: str) -> str:
+        self.sent.append((time.perf_counter() - self.start, body))
+        return f"SM{len(self.sent):032d}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de entrega anticipada en streaming")
+    parser.add_argument("--latency-ms", type=float, default=400, help="Latencia hasta el primer token")
+    parser.add_argument("--token-delay-ms", type=float, default=25, help="Latencia entre fragmentos")
+    parser.add_argument("--min-chunk-chars", type=int, default=300, help="Tamaño mínimo de envíos posteriores")
+    args = parser.parse_args()
+
+    from openai import OpenAI
+
+    server = FakeOpenAIServer(
+        script=[{"content": SAMPLE_RESPONSE}, {"content": SAMPLE_RESPONSE}],
+        latency_ms=args.latency_ms,
+        token_delay_ms=args.token_delay_ms
+    ).start()
+    client = OpenAI(api_key="fake", base_url=server.url)
+    messages = [{"role": "user", "content": "Busco un sedán de menos de 300 mil"}]
+
+    try:
+        # Sin streaming: el usuario recibe todo al final
+        start = time.perf_counter()
+        response = client.chat.completions.create(model="fake-model", messages=messages)
+        blocking_total = time.perf_counter() - start
+        blocking_text = response.choices[0].message.content
+
+        # Con streaming: los párrafos se entregan conforme llegan
+        sender = RecordingSender()
+        delivery = StreamingDelivery("whatsapp:+5215500000000", send=sender, min_chunk_chars=args.min_chunk_chars)
+        stream = client.chat.completions.create(model="fake-model", messages=messages, stream=True)
+        message, finish_reason = consume_chat_stream(stream, delivery)
+        streaming_total = time.perf_counter() - sender.start
+        composed = delivery.compose(message.content)
+        pending = delivery.pending_text(composed)
+    finally:
+        server.stop()
+
+    first_chunk = sender.sent[0][0] if sender.sent else streaming_total
+    delivered = "\n\n".join(body for _, body in sender.sent)
+    reconstructed = "\n\n".join(part for part in (delivered, pending) if part)
+
+    print(f"Latencia primer token: {args.latency_ms:.0f} ms, entre fragmentos: {args.token_delay_ms:.0f} ms")
+    print(f"Sin streaming (respuesta completa): {blocking_total * 1000:8.1f} ms")
+    print(f"Con streaming (primer mensaje):     {first_chunk * 1000:8.1f} ms")
+    print(f"Con streaming (respuesta completa): {streaming_total * 1000:8.1f} ms")
+    print(f"Mensajes anticipados: {len(sender.sent)}, pendiente para SendResponse: {len(pending)} caracteres")
+    print(f"finish_reason: {finish_reason}")
+
+    ok = message.content == blocking_text == SAMPLE_RESPONSE and reconstructed == SAMPLE_RESPONSE
+    print(f"Contenido íntegro: {'sí' if ok else 'no'}")
+    if not ok:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
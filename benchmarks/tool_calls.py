@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark de ejecución de tool calls: secuencial vs pool de hilos acotado.
+
+Usa herramientas falsas con latencia conocida (simulando embedding + lecturas
+de DynamoDB) para medir la ganancia de execute_tool_calls.
+
+Uso:
+    python benchmarks/tool_calls.py --calls 3 --latency-ms 400 --workers 4
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Agregar el directorio app al path para importar los módulos core
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from core.utils.tool_executor import execute_tool_calls
+
+def make_fake_tool(latency_s: float):
+    """Crea una herramienta falsa que tarda latency_s segundos."""
+    def fake_tool(**kwargs):
+        time.sleep(latency_s)
+        return [{"stockId": str(kwargs.get("idx", 0)), "make": "Fake", "model": "Car"}]
+    return fake_tool
+
+def run_sequential(calls, functions):
+    """Ejecuta las tool calls en orden, como lo hacía process_message."""
+    return [functions[name](**args) for name, args in calls]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de tool calls en paralelo")
+    parser.add_argument("--calls", type=int, default=3, help="Número de tool calls por turno")
+    parser.add_argument("--latency-ms", type=float, default=400, help="Latencia de cada herramienta")
+    parser.add_argument("--workers", type=int, default=4, help="Tamaño del pool de hilos")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Timeout por herramienta (s)")
+    parser.add_argument("--rounds", type=int, default=5, help="Repeticiones por modo")
+    parser.add_argument("--slow-ms", type=float, default=0, help="Agrega una herramienta con esta latencia (para probar el timeout)")
+    args = parser.parse_args()
+
+    functions = {"fake_search": make_fake_tool(args.latency_ms / 1000)}
+    calls = [("fake_search", {"idx": i}) for i in range(args.calls)]
+    if args.slow_ms:
+        functions["fake_slow"] = make_fake_tool(args.slow_ms / 1000)
+        calls.append(("fake_slow", {"idx": len(calls)}))
+
+    sequential_times = []
+    parallel_times = []
+    for _ in range(args.rounds):
+        start = time.perf_counter()
+        run_sequential(calls, functions)
+        sequential_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        results = execute_tool_calls(calls, functions, max_workers=args.workers, timeout=args.timeout)
+        parallel_times.append(time.perf_counter() - start)
+
+    # Verificar que los resultados conservan el orden original
+    ordered = all(
+        not success or result[0]["stockId"] == str(idx)
+        for idx, (success, result, _) in enumerate(results)
+    )
+    timeouts = sum(1 for success, _, _ in results if not success)
+
+    seq = sum(sequential_times) / len(sequential_times)
+    par = sum(parallel_times) / len(parallel_times)
+    print(f"Tool calls por turno: {len(calls)} (latencia {args.latency_ms:.0f} ms, workers {args.workers})")
+    print(f"Secuencial: {seq * 1000:8.1f} ms")
+    print(f"Paralelo:   {par * 1000:8.1f} ms")
+    print(f"Speedup:    {seq / par:8.2f}x")
+    print(f"Orden conservado: {'sí' if ordered else 'no'}")
+    print(f"Timeouts: {timeouts}")
+
+    if not ordered:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Cuenta en el calendario de horarios (SlotsTable) las citas futuras
+pendientes y confirmadas que se crearon antes de los contadores por hora.
+
+Ejecutar una vez después del despliegue; sin esto, las horas con citas
+anteriores aparecen libres y se pueden sobrevender. Es seguro volver a
+ejecutarlo: cada cita se cuenta una sola vez (se marca con slotKey).
+
+Uso:
+    python scripts/backfill_slots.py --stage prod --dry-run
+    python scripts/backfill_slots.py --stage prod
+"""
+
+import os
+import sys
+import argparse
+from pathlib import Path
+
+# Agregar el directorio app al path para importar los módulos core
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Cuenta las citas existentes en los contadores de horarios")
+    parser.add_argument("--stage", default="dev", help="Stage de las tablas (dev usa DynamoDB local)")
+    parser.add_argument("--dry-run", action="store_true", help="Solo contar las citas, sin escribir")
+    args = parser.parse_args()
+
+    os.environ.setdefault("STAGE", args.stage)
+    os.environ.setdefault("TRACE_MODE", "off")
+
+    from core.services.prospect_service import ProspectService
+
+    service = ProspectService()
+    print(f"Tabla de citas: {service.table_name}")
+    print(f"Tabla de horarios: {service.slots_table_name}")
+    stats = service.backfill_slot_counters(dry_run=args.dry_run)
+
+    prefix = "[DRY RUN] " if args.dry_run else ""
+    print(f"\n{prefix}Resumen:")
+    print(f"Citas leídas: {stats['scanned']}")
+    print(f"Contadas ahora: {stats['counted']}")
+    print(f"Ya contadas: {stats['already_counted']}")
+    print(f"Omitidas (pasadas, canceladas o completadas): {stats['skipped']}")
+    print(f"Fallidas: {stats['failed']}")
+
+    if stats["failed"]:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
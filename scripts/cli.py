@@ -13,9 +13,11 @@ from rich.prompt import Prompt
 
 # Add the parent directory to sys.path to import app modules
 sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent.parent / "app"))
 
 # Importar el handler directamente
 from app.functions.process_message.handler import handler
+from core.utils.tracing import last_trace, format_flame
 
 # Configurar entorno local
 os.environ["STAGE"] = "dev"
@@ -71,7 +73,14 @@ def clean_conversation(conversation_id: str):
     except Exception as e:
         console.print(f"[red]Error limpiando conversación: {str(e)}[/red]")
 
-def chat(conversation_id: str, clean: bool = False):
+def print_trace():
+    """Muestra el desglose de tiempos del último turno (modo --trace)."""
+    trace = last_trace()
+    if trace is None:
+        return
+    console.print(Panel(format_flame(trace), title="Traza del turno", expand=False), markup=False)
+
+def chat(conversation_id: str, clean: bool = False, show_trace: bool = False):
     """Inicia una sesión de chat interactiva usando el handler de Lambda."""
     if clean:
         clean_conversation(conversation_id)
@@ -118,6 +127,8 @@ def chat(conversation_id: str, clean: bool = False):
             agent_message = response.get("agent_message", "Lo siento, hubo un error procesando tu mensaje.")
             
             console.print(Panel(Markdown(agent_message), title="Bot"))
+            if show_trace:
+                print_trace()
             
         except KeyboardInterrupt:
             console.print("\n[yellow]¡Hasta luego! 👋[/yellow]")
@@ -130,8 +141,12 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Chat Bot Kavak CLI')
     parser.add_argument('--clean', action='store_true', help='Limpiar historial de conversación antes de iniciar')
     parser.add_argument('--conversation-id', help='ID de la conversación a usar')
+    parser.add_argument('--trace', action='store_true', help='Mostrar el desglose de tiempos de cada turno')
     args = parser.parse_args()
     
+    # En local las trazas se imprimen como resumen en lugar de métricas EMF
+    os.environ["TRACE_MODE"] = "local" if args.trace else "off"
+    
     # Verificar variables de entorno necesarias
     required_env_vars = ["OPENAI_API_KEY"]
     missing_vars = [var for var in required_env_vars if not os.environ.get(var)]
@@ -163,4 +178,4 @@ if __name__ == '__main__':
     
     # Obtener conversation_id (por argumento o interactivamente)
     conversation_id = args.conversation_id if args.conversation_id else get_user_id()
-    chat(conversation_id, clean=args.clean) 
\ No newline at end of file
+    chat(conversation_id, clean=args.clean, show_trace=args.trace) 
\ No newline at end of file
@@ -71,6 +71,7 @@ create_table "kavak-ai-agent-catalog-dev" 'aws dynamodb create-table \
     --key-schema \
         AttributeName=stockId,KeyType=HASH \
     --billing-mode PAY_PER_REQUEST \
+    --stream-specification StreamEnabled=true,StreamViewType=NEW_AND_OLD_IMAGES \
     --global-secondary-indexes "[
         {
             \"IndexName\": \"MakeModelIndex\",
@@ -118,6 +119,7 @@ create_table "kavak-ai-agent-prospects-dev" 'aws dynamodb create-table \
         AttributeName=appointmentId,AttributeType=S \
         AttributeName=appointmentDate,AttributeType=S \
         AttributeName=status,AttributeType=S \
+        AttributeName=statusAppointment,AttributeType=S \
     --key-schema \
         AttributeName=whatsappNumber,KeyType=HASH \
         AttributeName=appointmentId,KeyType=RANGE \
@@ -130,10 +132,62 @@ create_table "kavak-ai-agent-prospects-dev" 'aws dynamodb create-table \
                 {\"AttributeName\":\"status\",\"KeyType\":\"RANGE\"}
             ],
             \"Projection\": {\"ProjectionType\":\"ALL\"}
+        },
+        {
+            \"IndexName\": \"WhatsappStatusIndex\",
+            \"KeySchema\": [
+                {\"AttributeName\":\"whatsappNumber\",\"KeyType\":\"HASH\"},
+                {\"AttributeName\":\"statusAppointment\",\"KeyType\":\"RANGE\"}
+            ],
+            \"Projection\": {\"ProjectionType\":\"ALL\"}
         }
     ]" \
     --endpoint-url http://localhost:8000'
 
+# Crear tabla de horarios de citas (contador por fecha y hora)
+create_table "kavak-ai-agent-slots-dev" 'aws dynamodb create-table \
+    --table-name kavak-ai-agent-slots-dev \
+    --attribute-definitions \
+        AttributeName=calendarId,AttributeType=S \
+        AttributeName=slotKey,AttributeType=S \
+    --key-schema \
+        AttributeName=calendarId,KeyType=HASH \
+        AttributeName=slotKey,KeyType=RANGE \
+    --billing-mode PAY_PER_REQUEST \
+    --endpoint-url http://localhost:8000'
+
+# Crear tabla de idempotencia del webhook (MessageSid de Twilio con TTL)
+create_table "kavak-ai-agent-idempotency-dev" 'aws dynamodb create-table \
+    --table-name kavak-ai-agent-idempotency-dev \
+    --attribute-definitions \
+        AttributeName=messageSid,AttributeType=S \
+    --key-schema \
+        AttributeName=messageSid,KeyType=HASH \
+    --billing-mode PAY_PER_REQUEST \
+    --endpoint-url http://localhost:8000'
+
+aws dynamodb update-time-to-live \
+    --table-name kavak-ai-agent-idempotency-dev \
+    --time-to-live-specification "Enabled=true, AttributeName=expiresAt" \
+    --endpoint-url http://localhost:8000 --no-cli-pager > /dev/null 2>&1 || true
+
+# Crear tabla de mensajes pendientes y leases por conversación
+create_table "kavak-ai-agent-message-buffer-dev" 'aws dynamodb create-table \
+    --table-name kavak-ai-agent-message-buffer-dev \
+    --attribute-definitions \
+        AttributeName=conversationId,AttributeType=S \
+        AttributeName=itemKey,AttributeType=S \
+    --key-schema \
+        AttributeName=conversationId,KeyType=HASH \
+        AttributeName=itemKey,KeyType=RANGE \
+    --billing-mode PAY_PER_REQUEST \
+    --endpoint-url http://localhost:8000'
+
+aws dynamodb update-time-to-live \
+    --table-name kavak-ai-agent-message-buffer-dev \
+    --time-to-live-specification "Enabled=true, AttributeName=expiresAt" \
+    --endpoint-url http://localhost:8000 --no-cli-pager > /dev/null 2>&1 || true
+
 # Listar todas las tablas al final
 echo -e "\n${YELLOW}📋 Tablas creadas en DynamoDB local:${NC}"
 aws dynamodb list-tables --endpoint-url http://localhost:8000 --no-cli-pager | jq -r '.TableNames[]' | while read -r table; do
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Administra el modelo de embeddings del catálogo.
+
+Para cambiar de modelo sin interrumpir las búsquedas se inicia una
+migración: el modelo nuevo queda como sombra, las actualizaciones de
+embeddings (revisión diaria y cambios del catálogo) generan también sus
+vectores y, cuando cubren todo el catálogo, la revisión lo promueve a
+activo en una sola escritura. Mientras tanto se sigue buscando con el
+modelo activo.
+
+Uso:
+    python scripts/embedding_model.py status --stage prod
+    python scripts/embedding_model.py start text-embedding-3-small:512 --stage prod
+    python scripts/embedding_model.py promote --stage prod
+    python scripts/embedding_model.py cancel --stage prod
+"""
+
+import os
+import sys
+import argparse
+from pathlib import Path
+
+# Agregar el directorio app al path para importar los módulos core
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Modelo de embeddings del catálogo")
+    parser.add_argument("action", choices=["status", "start", "promote", "cancel"], help="Acción")
+    parser.add_argument("model", nargs="?", help="Modelo nuevo como nombre:dimensión (para start)")
+    parser.add_argument("--stage", default="dev", help="Stage de las tablas (dev usa DynamoDB local)")
+    parser.add_argument("--force", action="store_true", help="Promover aunque la cobertura esté incompleta")
+    args = parser.parse_args()
+
+    os.environ.setdefault("STAGE", args.stage)
+    os.environ.setdefault("TRACE_MODE", "off")
+    os.environ.setdefault("CATALOG_TABLE", f"kavak-ai-agent-catalog-{args.stage}")
+    os.environ.setdefault("EMBEDDINGS_TABLE", f"kavak-ai-agent-embeddings-{args.stage}")
+    os.environ.setdefault("OPENAI_API_KEY", "no-usado")
+
+    from core.services.car_recommender import CarRecommender, EmbeddingModel
+
+    recommender = CarRecommender()
+    state = recommender.get_index_state()
+
+    if args.action == "start":
+        if not args.model:
+            parser.error("start requiere el modelo (ej: text-embedding-3-small:512)")
+        recommender.set_shadow_model(EmbeddingModel.parse(args.model))
+        print(f"Migración iniciada: {state['active'].tag} -> {EmbeddingModel.parse(args.model).tag}")
+        print("La siguiente revisión de embeddings generará los vectores del modelo nuevo.")
+        return
+
+    if args.action == "cancel":
+        recommender.set_shadow_model(None)
+        print("Migración cancelada")
+        return
+
+    print(f"Versión del índice: {state['version']}")
+    print(f"Modelo activo: {state['active'].tag}")
+    if state["shadow"] is None:
+        print("Sin migración en curso")
+        if args.action == "promote":
+            sys.exit(1)
+        return
+
+    covered, total = recommender.shadow_coverage(state["shadow"])
+    print(f"Modelo sombra: {state['shadow'].tag} ({covered}/{total} autos)")
+    if args.action == "promote":
+        if covered < total and not args.force:
+            print("Cobertura incompleta; usa --force para promover de todos modos")
+            sys.exit(1)
+        version = recommender.promote_shadow_model(state["shadow"])
+        print(f"Modelo {state['shadow'].tag} promovido (versión del índice {version})")
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,7 @@ NC='\033[0m' # No Color
 # Verificar argumentos
 if [ -z "$1" ]; then
     echo -e "${RED}❌ Error: Falta el archivo CSV${NC}"
-    echo -e "Uso: $0 archivo.csv"
+    echo -e "Uso: $0 archivo.csv [--diff] [--delete-missing] [--dry-run] [--workers N]"
     exit 1
 fi
 
@@ -56,87 +56,15 @@ echo -e "Tabla: ${GREEN}${TABLE_NAME}${NC}"
 echo -e "Archivo: ${GREEN}${CSV_FILE}${NC}"
 echo -e "Endpoint: ${GREEN}http://localhost:8000${NC}"
 
-# Verificar que csvjson está instalado
-if ! command -v csvjson &> /dev/null; then
-    echo -e "${RED}❌ Error: csvjson no está instalado${NC}"
-    echo -e "Por favor, instala csvkit:"
-    echo -e "pip install csvkit"
-    exit 1
-fi
-
-# Verificar que jq está instalado
-if ! command -v jq &> /dev/null; then
-    echo -e "${RED}❌ Error: jq no está instalado${NC}"
-    echo -e "Por favor, instala jq:"
-    echo -e "brew install jq"
-    exit 1
-fi
-
-# Convierte CSV a JSON
-echo -e "\n${YELLOW}🔄 Convirtiendo CSV a JSON...${NC}"
-tmpfile=$(mktemp)
-if ! csvjson "$CSV_FILE" > "$tmpfile"; then
-    echo -e "${RED}❌ Error convirtiendo CSV a JSON${NC}"
-    rm "$tmpfile"
-    exit 1
-fi
+# Importar con import_catalog.py (BatchWriteItem en paralelo) contra DynamoDB local
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+STAGE=dev DYNAMODB_ENDPOINT=http://localhost:8000 python3 "$SCRIPT_DIR/../app/scripts/import_catalog.py" \
+    "$CSV_FILE" --table "$TABLE_NAME" "${@:2}"
+status=$?
 
-# Contar registros
-total_records=$(jq 'length' "$tmpfile")
-echo -e "${GREEN}✅ Se encontraron ${total_records} registros para importar${NC}"
-
-# Importa cada registro a DynamoDB local
-echo -e "\n${YELLOW}📤 Importando registros...${NC}"
-current=0
-errors=0
-
-cat "$tmpfile" | jq -c '.[]' | while read -r item; do
-    ((current++))
-    
-    # Transforma el item para asegurar los tipos de datos correctos
-    transformed_item=$(echo "$item" | jq -c '
-        def tostring_if_number:
-            if type == "number" then tostring else . end;
-        
-        {
-            "stockId": { "S": (.stockId|tostring_if_number) },
-            "make": { "S": .make },
-            "model": { "S": .model },
-            "year": { "N": (.year|tostring_if_number) },
-            "price": { "N": (.price|tostring_if_number) },
-            "km": { "N": (.km|tostring_if_number) },
-            "version": { "S": (.version // "") },
-            "bluetooth": { "BOOL": (.bluetooth == "Sí") },
-            "carPlay": { "BOOL": (.carPlay == "Sí") },
-            "largo": { "N": (.largo|tostring_if_number) },
-            "ancho": { "N": (.ancho|tostring_if_number) },
-            "altura": { "N": (.altura|tostring_if_number) }
-        } | with_entries(select(.value != null and .value != "" and .value != "null"))
-    ')
-
-    if aws dynamodb put-item \
-        --endpoint-url http://localhost:8000 \
-        --table-name "$TABLE_NAME" \
-        --item "$transformed_item" \
-        --region us-east-1 \
-        --no-cli-pager 2>/dev/null; then
-        echo -e "${GREEN}✅ [${current}/${total_records}] Importado: $(echo "$item" | jq -r '.stockId')${NC}"
-    else
-        echo -e "${RED}❌ [${current}/${total_records}] Error importando: $(echo "$item" | jq -r '.stockId')${NC}"
-        ((errors++))
-    fi
-done
-
-rm "$tmpfile"
-
-# Mostrar resumen
-echo -e "\n${YELLOW}✨ Resumen de la importación:${NC}"
-echo -e "Total registros: ${GREEN}${total_records}${NC}"
-echo -e "Errores: ${RED}${errors}${NC}"
-
-if [ $errors -eq 0 ]; then
+if [ $status -eq 0 ]; then
     echo -e "\n${GREEN}✅ Importación completada exitosamente${NC}"
 else
-    echo -e "\n${YELLOW}⚠️  Importación completada con ${errors} errores${NC}"
+    echo -e "\n${YELLOW}⚠️  Importación completada con errores${NC}"
     exit 1
-fi 
\ No newline at end of file
+fi
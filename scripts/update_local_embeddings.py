@@ -9,11 +9,12 @@ app_dir = str(Path(__file__).parent.parent)
 if app_dir not in sys.path:
     sys.path.insert(0, app_dir)
 
-from datetime import datetime, timedelta
+import time
 import boto3
-from openai import OpenAI
 
-from app.functions.update_embeddings.handler import _process_batch
+from app.functions.update_embeddings.handler import (
+    _load_cursor, _new_cursor, _promote_if_covered, _refresh_summary, _save_cursor, refresh_catalog
+)
 from app.core.services.car_recommender import CarRecommender
 
 def verify_local_dynamodb():
@@ -75,26 +76,6 @@ print("\n🔍 Verificando tablas necesarias...")
 verify_local_tables(dynamodb)
 print("✅ Todas las tablas necesarias existen")
 
-def get_existing_embeddings():
-    """Obtiene los embeddings existentes de la tabla local."""
-    try:
-        embeddings_table = dynamodb.Table(os.environ["EMBEDDINGS_TABLE"])
-        response = embeddings_table.scan()
-        return {item["stockId"]: item for item in response.get("Items", [])}
-    except Exception as e:
-        print(f"[ERROR] Error obteniendo embeddings existentes: {str(e)}")
-        return {}
-
-def get_catalog_cars():
-    """Obtiene los autos del catálogo local."""
-    try:
-        catalog_table = dynamodb.Table(os.environ["CATALOG_TABLE"])
-        response = catalog_table.scan()
-        return response.get("Items", [])
-    except Exception as e:
-        print(f"[ERROR] Error obteniendo catálogo: {str(e)}")
-        return []
-
 def main():
     """Ejecuta la actualización de embeddings en local."""
     if not os.environ.get("OPENAI_API_KEY"):
@@ -106,45 +87,51 @@ def main():
     print("\n🚀 Iniciando actualización de embeddings en entorno local...")
     
     # Inicializar servicios
-    recommender = CarRecommender()
-    recommender.dynamodb = dynamodb  # Usar DynamoDB local verificada
-    recommender.catalog_db = dynamodb.Table(os.environ["CATALOG_TABLE"])
-    recommender.embeddings_db = dynamodb.Table(os.environ["EMBEDDINGS_TABLE"])
-    recommender.client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-    
-    # Obtener datos
-    print("\n📥 Obteniendo datos...")
-    existing_embeddings = get_existing_embeddings()
-    cars = get_catalog_cars()
-    
-    if not cars:
-        print("[ERROR] No se encontraron autos en el catálogo local")
-        sys.exit(1)
-        
-    print(f"✅ Se encontraron {len(cars)} autos en el catálogo")
-    print(f"✅ Se encontraron {len(existing_embeddings)} embeddings existentes")
-    
-    # Configurar parámetros
-    now = datetime.now()
-    update_threshold = (now - timedelta(days=1)).isoformat()  # Actualizar si tiene más de 1 día
+    recommender = CarRecommender(dynamodb=dynamodb)  # Usar DynamoDB local verificada
     
+    # Retomar la revisión interrumpida (Ctrl+C) o empezar una nueva
+    cursor = _load_cursor(recommender)
+    if cursor:
+        print(f"\n↩️  Retomando la revisión {cursor['refreshId']} ({cursor['processed']} autos procesados)")
+    else:
+        cursor = _new_cursor()
+    cursor["invocations"] += 1
+    start_time = time.time()
+    elapsed_before = cursor["elapsedSeconds"]
+    updated_before = cursor["updated"]
+
+    def save_progress(current):
+        current["elapsedSeconds"] = elapsed_before + time.time() - start_time
+        _save_cursor(recommender, current)
+
     # Procesar en lotes
     print("\n🔄 Procesando autos...")
-    total_processed, total_updated, total_errors = _process_batch(
-        recommender=recommender,
-        cars=cars,
-        existing_embeddings=existing_embeddings,
-        update_threshold=update_threshold,
-        now=now
-    )
+    concurrency = int(os.environ.get("EMBEDDINGS_CONCURRENCY", "4"))
+    try:
+        refresh_catalog(recommender, cursor, concurrency=concurrency, on_progress=save_progress)
+    except KeyboardInterrupt:
+        print("\n⏸️  Revisión interrumpida; vuelve a ejecutar el script para continuar")
+        sys.exit(130)
+    cursor["status"] = "completed"
+    save_progress(cursor)
+    if cursor["updated"] > updated_before:
+        recommender.bump_index_version()
+    summary = _refresh_summary(cursor)
+    shadow = _promote_if_covered(recommender)
     
     # Mostrar resumen
     print("\n✨ Resumen final:")
-    print(f"- Total procesados: {total_processed}")
-    print(f"- Total actualizados: {total_updated}")
-    print(f"- Total errores: {total_errors}")
+    print(f"- Total procesados: {summary['total_processed']}")
+    print(f"- Total actualizados: {summary['total_updated']}")
+    print(f"- Total saltados: {summary['total_skipped']}")
+    print(f"- Total errores: {summary['total_errors']}")
+    print(f"- Total completados con el modelo sombra: {summary['total_backfilled']}")
+    print(f"- Tiempo: {summary['execution_time_seconds']}s ({summary['cars_per_second']} autos/s, concurrencia {concurrency})")
+    if shadow:
+        status = "promovido" if shadow["promoted"] else "en migración"
+        print(f"- Modelo sombra {shadow['model']}: {shadow['covered']}/{shadow['total']} autos ({status})")
     
-    if total_errors > 0:
+    if summary['total_errors'] > 0:
         print("\n⚠️  Se encontraron errores durante la actualización")
         sys.exit(1)
     else: